@@ -258,6 +258,7 @@ CREATE INDEX IDX_FIN_MOV_CATEGORY ON FINANCIAL_MOVEMENTS (CATEGORY);
 CREATE INDEX IDX_FIN_MOV_CREATED_AT ON FINANCIAL_MOVEMENTS (CREATED_AT);
 CREATE INDEX IDX_FIN_MOV_GATEWAY ON FINANCIAL_MOVEMENTS (PAYMENT_GATEWAY_ID);
 CREATE INDEX IDX_FIN_MOV_MOVEMENT_DATE ON FINANCIAL_MOVEMENTS (MOVEMENT_DATE);
+CREATE DESCENDING INDEX IDX_FIN_MOV_MOVEMENT_DATE_ID_DESC ON FINANCIAL_MOVEMENTS (MOVEMENT_DATE, ID);
 CREATE INDEX IDX_FIN_MOV_RECONCILED ON FINANCIAL_MOVEMENTS (RECONCILED);
 CREATE INDEX IDX_FIN_MOV_RELATED ON FINANCIAL_MOVEMENTS (RELATED_ENTITY_TYPE, RELATED_ENTITY_ID);
 CREATE INDEX IDX_FIN_MOV_STATUS ON FINANCIAL_MOVEMENTS (PAYMENT_STATUS);
@@ -315,6 +316,7 @@ CREATE TABLE PURCHASE_INVOICES (
 	CONSTRAINT CHK_PURCHASE_INVOICES_VALUE CHECK (TOTAL_AMOUNT > 0)
 );
 CREATE INDEX IDX_PURCHASE_INVOICES_DATE ON PURCHASE_INVOICES (PURCHASE_DATE);
+CREATE DESCENDING INDEX IDX_PURCHASE_INVOICES_DATE_ID_DESC ON PURCHASE_INVOICES (PURCHASE_DATE, ID);
 CREATE INDEX IDX_PURCHASE_INVOICES_STATUS ON PURCHASE_INVOICES (PAYMENT_STATUS);
 CREATE INDEX IDX_PURCHASE_INVOICES_SUPPLIER ON PURCHASE_INVOICES (SUPPLIER_NAME);
 
@@ -511,6 +513,8 @@ CREATE TABLE ORDERS (
 	CONSTRAINT INTEG_61 FOREIGN KEY (ATTENDANT_ID) REFERENCES USERS(ID)
 );
 CREATE INDEX FK_ORDERS_DELIVERER ON ORDERS (DELIVERER_ID);
+CREATE INDEX IDX_ORDERS_CREATED_AT_ID ON ORDERS (CREATED_AT, ID);
+CREATE DESCENDING INDEX IDX_ORDERS_CREATED_AT_ID_DESC ON ORDERS (CREATED_AT, ID);
 CREATE INDEX IX_ORDERS_DELIVERER ON ORDERS (DELIVERER_ID);
 CREATE INDEX RDB$FOREIGN23 ON ORDERS (USER_ID);
 CREATE INDEX RDB$FOREIGN24 ON ORDERS (ADDRESS_ID);
@@ -597,6 +601,7 @@ CREATE TABLE PRODUCTS (
 );
 CREATE INDEX FK_PRODUCTS_CATEGORY ON PRODUCTS (CATEGORY_ID);
 CREATE INDEX IDX_PRODUCTS_CATEGORY_ID ON PRODUCTS (CATEGORY_ID);
+CREATE INDEX IDX_PRODUCTS_NAME_ID ON PRODUCTS (NAME, ID);
 CREATE UNIQUE INDEX RDB$PRIMARY15 ON PRODUCTS (ID);
 
 -- TOKEN_BLACKLIST definition
@@ -610,6 +615,7 @@ CREATE TABLE TOKEN_BLACKLIST (
 	CONSTRAINT INTEG_108 PRIMARY KEY (JTI)
 );
 CREATE UNIQUE INDEX RDB$PRIMARY46 ON TOKEN_BLACKLIST (JTI);
+CREATE INDEX IDX_TOKEN_BLACKLIST_CREATED_AT ON TOKEN_BLACKLIST (CREATED_AT);
 
 -- TWO_FACTOR_VERIFICATIONS definition
 -- Drop table
@@ -738,6 +744,49 @@ CREATE INDEX IDX_USER_DEVICES_USER_ID ON USER_DEVICES (USER_ID);
 CREATE INDEX IDX_USER_DEVICES_PUSH_TOKEN ON USER_DEVICES (PUSH_TOKEN);
 CREATE INDEX IDX_USER_DEVICES_LAST_USED ON USER_DEVICES (LAST_USED);
 
+-- USER_TOKEN_REVOCATIONS definition
+-- Drop table
+-- DROP TABLE USER_TOKEN_REVOCATIONS;
+-- Revogação global dos tokens do usuário: tokens emitidos até REVOKED_AT (UTC) estão revogados
+
+CREATE TABLE USER_TOKEN_REVOCATIONS (
+    USER_ID INTEGER NOT NULL,
+    REVOKED_AT TIMESTAMP NOT NULL,
+    CONSTRAINT PK_USER_TOKEN_REVOCATIONS PRIMARY KEY (USER_ID),
+    CONSTRAINT FK_USER_TOKEN_REVOCATIONS_USER FOREIGN KEY (USER_ID) REFERENCES USERS(ID) ON DELETE CASCADE
+);
+CREATE INDEX IDX_USER_TOKEN_REVOCATIONS_REVOKED_AT ON USER_TOKEN_REVOCATIONS (REVOKED_AT);
+
+-- EVENT_OUTBOX definition
+-- Drop table
+-- DROP TABLE EVENT_OUTBOX;
+-- Outbox transacional de eventos: SEQ é atribuído pelo relay após o commit (nulo = pendente)
+
+CREATE TABLE EVENT_OUTBOX (
+    ID BIGINT GENERATED BY DEFAULT AS IDENTITY NOT NULL,
+    SEQ BIGINT,
+    EVENT_TYPE VARCHAR(100) NOT NULL,
+    PAYLOAD BLOB SUB_TYPE TEXT NOT NULL,
+    CREATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PUBLISHED_AT TIMESTAMP,
+    CONSTRAINT PK_EVENT_OUTBOX PRIMARY KEY (ID)
+);
+CREATE UNIQUE INDEX UQ_EVENT_OUTBOX_SEQ ON EVENT_OUTBOX (SEQ);
+CREATE INDEX IDX_EVENT_OUTBOX_PUBLISHED_AT ON EVENT_OUTBOX (PUBLISHED_AT);
+
+-- EVENT_OUTBOX_STATE definition
+-- Drop table
+-- DROP TABLE EVENT_OUTBOX_STATE;
+-- Linha única com a última sequência atribuída aos eventos do outbox
+
+CREATE TABLE EVENT_OUTBOX_STATE (
+    ID SMALLINT NOT NULL,
+    LAST_SEQ BIGINT DEFAULT 0 NOT NULL,
+    CONSTRAINT PK_EVENT_OUTBOX_STATE PRIMARY KEY (ID),
+    CONSTRAINT CHK_EVENT_OUTBOX_STATE_ID CHECK (ID = 1)
+);
+INSERT INTO EVENT_OUTBOX_STATE (ID, LAST_SEQ) VALUES (1, 0);
+
 -- =====================================================
 -- COMENTÁRIOS SOBRE AS TABELAS
 -- =====================================================
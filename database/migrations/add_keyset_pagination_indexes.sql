@@ -0,0 +1,32 @@
+-- =====================================================
+-- MIGRAÇÃO: Índices compostos para a paginação keyset
+-- Data: 16/10/2026
+-- Descrição: As listagens paginadas por cursor (src/utils/keyset_pagination.py)
+--            ordenam por (coluna, ID) e retomam a partir do último registro lido.
+--            Sem um índice composto na mesma direção da ordenação, o Firebird
+--            ordena todas as linhas filtradas a cada página, anulando o ganho do
+--            keyset. Índices DESCENDING atendem ORDER BY ... DESC; o índice
+--            ascendente de ORDERS atende a ordenação date_asc de
+--            get_orders_with_filters.
+--            Não recebem índice: INGREDIENTS (NAME já tem índice único),
+--            CATEGORIES (tabela pequena, IDX_CATEGORIES_DISPLAY_ORDER) e o ranking
+--            de mais vendidos (ordenado por SUM(), não indexável).
+-- =====================================================
+
+-- Pedidos: get_orders_by_user_id, get_all_orders e get_orders_with_filters
+CREATE DESCENDING INDEX IDX_ORDERS_CREATED_AT_ID_DESC ON ORDERS (CREATED_AT, ID);
+CREATE INDEX IDX_ORDERS_CREATED_AT_ID ON ORDERS (CREATED_AT, ID);
+
+-- Movimentações financeiras: MOVEMENT_DATE anulável (NULLs no fim da ordem DESC)
+CREATE DESCENDING INDEX IDX_FIN_MOV_MOVEMENT_DATE_ID_DESC ON FINANCIAL_MOVEMENTS (MOVEMENT_DATE, ID);
+
+-- Promoções: CREATED_AT anulável em registros antigos
+CREATE DESCENDING INDEX IDX_PROMOTIONS_CREATED_AT_ID_DESC ON PROMOTIONS (CREATED_AT, ID);
+
+-- Notas fiscais de compra
+CREATE DESCENDING INDEX IDX_PURCHASE_INVOICES_DATE_ID_DESC ON PURCHASE_INVOICES (PURCHASE_DATE, ID);
+
+-- Produtos: listagens ordenadas por nome
+CREATE INDEX IDX_PRODUCTS_NAME_ID ON PRODUCTS (NAME, ID);
+
+COMMIT;
@@ -0,0 +1,12 @@
+-- =====================================================
+-- MIGRAÇÃO: Índice em TOKEN_BLACKLIST.CREATED_AT
+-- Data: 16/10/2026
+-- Descrição: A sincronização incremental do índice de revogação de tokens
+--            (src/utils/revocation_index.py) lê apenas as linhas criadas desde a
+--            última marca d'água de CREATED_AT; sem este índice cada ciclo faz
+--            varredura completa da tabela.
+-- =====================================================
+
+CREATE INDEX IDX_TOKEN_BLACKLIST_CREATED_AT ON TOKEN_BLACKLIST (CREATED_AT);
+
+COMMIT;
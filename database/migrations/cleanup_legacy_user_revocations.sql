@@ -0,0 +1,42 @@
+-- =====================================================
+-- MIGRAÇÃO: Remoção dos registros REVOKE_USER_ de TOKEN_BLACKLIST
+-- Data: 16/10/2026
+-- Descrição: Segunda etapa de create_user_token_revocations.sql. Aplique somente
+--            depois que TODOS os workers foram reiniciados com a tabela
+--            USER_TOKEN_REVOCATIONS no catálogo: processos com o catálogo antigo ainda
+--            verificam a revogação global pelos registros REVOKE_USER_ e, sem eles,
+--            voltariam a aceitar tokens emitidos antes da troca de senha.
+-- =====================================================
+
+-- Passo 1: Incorporar revogações gravadas no formato antigo durante a transição
+MERGE INTO USER_TOKEN_REVOCATIONS t
+USING (
+    SELECT r.USER_ID, MAX(r.REVOKED_AT) AS REVOKED_AT
+    FROM (
+        SELECT
+            CAST(SUBSTRING(JTI FROM 13 FOR CHAR_LENGTH(JTI) - 27) AS INTEGER) AS USER_ID,
+            CAST(
+                SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 13 FOR 4) || '-' ||
+                SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 9 FOR 2) || '-' ||
+                SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 7 FOR 2) || ' ' ||
+                SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 5 FOR 2) || ':' ||
+                SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 3 FOR 2) || ':' ||
+                SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 1 FOR 2)
+            AS TIMESTAMP) AS REVOKED_AT
+        FROM TOKEN_BLACKLIST
+        WHERE JTI LIKE 'REVOKE\_USER\_%' ESCAPE '\'
+          AND CHAR_LENGTH(JTI) > 27
+    ) r
+    JOIN USERS u ON u.ID = r.USER_ID
+    GROUP BY r.USER_ID
+) s
+ON t.USER_ID = s.USER_ID
+WHEN MATCHED AND s.REVOKED_AT > t.REVOKED_AT THEN
+    UPDATE SET REVOKED_AT = s.REVOKED_AT
+WHEN NOT MATCHED THEN
+    INSERT (USER_ID, REVOKED_AT) VALUES (s.USER_ID, s.REVOKED_AT);
+
+-- Passo 2: Remover os registros antigos de TOKEN_BLACKLIST
+DELETE FROM TOKEN_BLACKLIST WHERE JTI LIKE 'REVOKE\_USER\_%' ESCAPE '\';
+
+COMMIT;
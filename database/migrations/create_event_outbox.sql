@@ -0,0 +1,40 @@
+-- =====================================================
+-- MIGRAÇÃO: Outbox transacional de eventos (EVENT_OUTBOX)
+-- Data: 16/10/2026
+-- Descrição: Eventos de domínio (order.created, order.status_changed) passam a ser
+--            gravados na mesma transação da alteração do pedido. O relay da aplicação
+--            numera as linhas confirmadas (SEQ crescente e sem buracos, controlado por
+--            EVENT_OUTBOX_STATE.LAST_SEQ) e as publica em ordem; clientes WebSocket que
+--            reconectam informam last_seq e recebem os eventos perdidos.
+-- =====================================================
+
+-- Após aplicar, recarregue o catálogo do schema (POST /api/dashboard/db/schema/refresh)
+-- ou reinicie a aplicação; até lá os eventos continuam sendo publicados após o commit.
+
+-- Passo 1: Tabela de eventos (SEQ é nulo até o relay numerar a linha)
+CREATE TABLE EVENT_OUTBOX (
+    ID BIGINT GENERATED BY DEFAULT AS IDENTITY NOT NULL,
+    SEQ BIGINT,
+    EVENT_TYPE VARCHAR(100) NOT NULL,
+    PAYLOAD BLOB SUB_TYPE TEXT NOT NULL,
+    CREATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PUBLISHED_AT TIMESTAMP,
+    CONSTRAINT PK_EVENT_OUTBOX PRIMARY KEY (ID)
+);
+-- Índice único aceita vários nulos (linhas pendentes) e atende SEQ IS NULL / SEQ > ?
+CREATE UNIQUE INDEX UQ_EVENT_OUTBOX_SEQ ON EVENT_OUTBOX (SEQ);
+CREATE INDEX IDX_EVENT_OUTBOX_PUBLISHED_AT ON EVENT_OUTBOX (PUBLISHED_AT);
+
+-- Passo 2: Linha única com a última sequência atribuída (lock serializa os relays)
+CREATE TABLE EVENT_OUTBOX_STATE (
+    ID SMALLINT NOT NULL,
+    LAST_SEQ BIGINT DEFAULT 0 NOT NULL,
+    CONSTRAINT PK_EVENT_OUTBOX_STATE PRIMARY KEY (ID),
+    CONSTRAINT CHK_EVENT_OUTBOX_STATE_ID CHECK (ID = 1)
+);
+
+COMMIT;
+
+INSERT INTO EVENT_OUTBOX_STATE (ID, LAST_SEQ) VALUES (1, 0);
+
+COMMIT;
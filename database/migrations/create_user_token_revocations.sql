@@ -0,0 +1,51 @@
+-- =====================================================
+-- MIGRAÇÃO: Tabela USER_TOKEN_REVOCATIONS
+-- Data: 16/10/2026
+-- Descrição: A revogação global dos tokens de um usuário era gravada como um JTI
+--            falso 'REVOKE_USER_{ID}_{AAAAMMDDHHMMSS}' em TOKEN_BLACKLIST, exigindo
+--            LIKE por prefixo e parse do JTI. Passa a ser uma linha por usuário
+--            (consulta pela chave primária).
+-- =====================================================
+
+-- Após aplicar, reinicie todos os workers da aplicação (POST /api/dashboard/db/schema/refresh
+-- recarrega apenas o worker que atende a requisição); até lá o código continua usando
+-- os registros REVOKE_USER_.
+
+-- Passo 1: Criar a tabela
+CREATE TABLE USER_TOKEN_REVOCATIONS (
+    USER_ID INTEGER NOT NULL,
+    REVOKED_AT TIMESTAMP NOT NULL,
+    CONSTRAINT PK_USER_TOKEN_REVOCATIONS PRIMARY KEY (USER_ID),
+    CONSTRAINT FK_USER_TOKEN_REVOCATIONS_USER FOREIGN KEY (USER_ID) REFERENCES USERS(ID) ON DELETE CASCADE
+);
+CREATE INDEX IDX_USER_TOKEN_REVOCATIONS_REVOKED_AT ON USER_TOKEN_REVOCATIONS (REVOKED_AT);
+
+COMMIT;
+
+-- Passo 2: Backfill a partir dos JTIs 'REVOKE_USER_{ID}_{AAAAMMDDHHMMSS}'
+-- ('REVOKE_USER_' tem 12 caracteres; o sufixo '_' + timestamp tem 15)
+INSERT INTO USER_TOKEN_REVOCATIONS (USER_ID, REVOKED_AT)
+SELECT r.USER_ID, MAX(r.REVOKED_AT)
+FROM (
+    SELECT
+        CAST(SUBSTRING(JTI FROM 13 FOR CHAR_LENGTH(JTI) - 27) AS INTEGER) AS USER_ID,
+        CAST(
+            SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 13 FOR 4) || '-' ||
+            SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 9 FOR 2) || '-' ||
+            SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 7 FOR 2) || ' ' ||
+            SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 5 FOR 2) || ':' ||
+            SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 3 FOR 2) || ':' ||
+            SUBSTRING(JTI FROM CHAR_LENGTH(JTI) - 1 FOR 2)
+        AS TIMESTAMP) AS REVOKED_AT
+    FROM TOKEN_BLACKLIST
+    WHERE JTI LIKE 'REVOKE\_USER\_%' ESCAPE '\'
+      AND CHAR_LENGTH(JTI) > 27
+) r
+JOIN USERS u ON u.ID = r.USER_ID
+GROUP BY r.USER_ID;
+
+COMMIT;
+
+-- Os registros REVOKE_USER_ de TOKEN_BLACKLIST NÃO são removidos aqui: processos que
+-- ainda usam o catálogo antigo continuam lendo (e gravando) esses registros. Depois que
+-- todos os workers forem reiniciados, aplique cleanup_legacy_user_revocations.sql.
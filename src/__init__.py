@@ -287,6 +287,13 @@ def create_app():
         """Handler para erros 422 (Unprocessable Entity)"""
         return {"error": "Entidade não processável", "code": "UNPROCESSABLE_ENTITY"}, 422
     
+    from .utils.keyset_pagination import InvalidCursorError
+    
+    @app.errorhandler(InvalidCursorError)
+    def invalid_cursor(error):
+        """Handler para cursor de paginação inválido ou de outra listagem"""
+        return {"error": str(error), "code": "INVALID_CURSOR"}, 400
+    
     @app.errorhandler(500)
     def internal_error(error):
         """Handler para erros 500 (Internal Server Error)"""
@@ -317,7 +324,36 @@ def create_app():
     # O pool é criado automaticamente na primeira chamada de get_db_connection()
     # Fechamos o pool ao encerrar o app para shutdown graceful
     import atexit
-    from .database import get_pool
+    from .database import get_pool, close_reporting_pool, init_app as init_database
+    
+    # OTIMIZAÇÃO DE PERFORMANCE: Conexão e transação únicas por requisição,
+    # devolvidas ao pool ao término da requisição; pool esgotado responde 503
+    init_database(app)
+    
+    # OTIMIZAÇÃO DE PERFORMANCE: Agregação do trace de SQL por endpoint (quando habilitado)
+    from .utils import sql_profiler
+    sql_profiler.init_app(app)
+    
+    # OTIMIZAÇÃO DE PERFORMANCE: Catálogo do schema carregado uma vez (colunas/índices opcionais)
+    # Se o banco estiver indisponível, o catálogo é carregado sob demanda depois
+    try:
+        from .utils.schema_catalog import refresh_schema_catalog
+        refresh_schema_catalog()
+    except Exception as e:
+        logger.warning(f"Catálogo do schema não carregado na inicialização: {e}")
+    
+    # OTIMIZAÇÃO DE PERFORMANCE: bcrypt em pool dedicado; fila cheia responde 503 com Retry-After
+    from .utils import password_hasher
+    password_hasher.init_app(app)
+    
+    # OTIMIZAÇÃO DE PERFORMANCE: Índice em memória de TOKEN_BLACKLIST (verificação de revogação
+    # de JWT sem consulta ao banco), sincronizado em background
+    from .utils.revocation_index import init_revocation_index
+    init_revocation_index()
+    
+    # ALTERAÇÃO: Relay do outbox transacional de eventos (EVENT_OUTBOX), com sequência para replay
+    from .utils.event_outbox import init_event_outbox_relay
+    init_event_outbox_relay()
     
     def close_db_pool():
         """Fecha todas as conexões do pool ao encerrar aplicação"""
@@ -328,6 +364,7 @@ def create_app():
             if pool:
                 pool.close_all()
                 logger.info("Pool de conexões fechado com sucesso.")
+            close_reporting_pool()
         except Exception as e:
             logger.error(f"Erro ao fechar pool de conexões: {e}", exc_info=True)
     
@@ -337,6 +374,18 @@ def create_app():
     def health_check():  
         return "API is running!"
     
+    # OTIMIZAÇÃO DE PERFORMANCE: Warm-up do cache (produtos, categorias, configurações e horários)
+    # em background; o balanceador deve usar /api/health/ready para liberar tráfego à instância
+    from .utils import cache_warmup
+    cache_warmup.init_cache_warmup(app)
+    
+    @app.route('/api/health/ready')
+    def readiness_check():
+        """Prontidão da instância: 200 com o cache aquecido, 503 durante o warm-up ou com falhas"""
+        from flask import jsonify
+        status = cache_warmup.get_status()
+        return jsonify(status), 200 if cache_warmup.is_ready() else 503
+    
     # Rota segura para servir uploads
     @app.route('/api/uploads/<path:filename>')
     def serve_upload(filename):
@@ -61,6 +61,129 @@ class Config:
         )
         _firebird_password = 'sysdba'  # Apenas para desenvolvimento
     FIREBIRD_PASSWORD = _firebird_password  
+
+    # --- Configurações do Pool de Conexões Firebird ---
+    DB_POOL_MIN_CONNECTIONS = int(os.environ.get('DB_POOL_MIN_CONNECTIONS', 5))
+    DB_POOL_MAX_CONNECTIONS = int(os.environ.get('DB_POOL_MAX_CONNECTIONS', 20))
+    # Prazo de espera por uma conexão livre; ao estourar, a requisição recebe 503 com Retry-After
+    DB_POOL_ACQUIRE_TIMEOUT_SEC = float(os.environ.get('DB_POOL_ACQUIRE_TIMEOUT_SEC', 5))
+    DB_POOL_RETRY_AFTER_SEC = int(os.environ.get('DB_POOL_RETRY_AFTER_SEC', 2))
+    # OTIMIZAÇÃO DE PERFORMANCE: Validação preguiçosa de conexões
+    # Quando ativa, o pool só executa SELECT de validação em conexões ociosas há mais
+    # de DB_POOL_VALIDATION_IDLE_SEC segundos (evita 2 round-trips por requisição)
+    DB_POOL_LAZY_VALIDATION = os.environ.get('DB_POOL_LAZY_VALIDATION', 'true').lower() in ['true', '1', 't']
+    DB_POOL_VALIDATION_IDLE_SEC = int(os.environ.get('DB_POOL_VALIDATION_IDLE_SEC', 30))
+    # Idade máxima de uma conexão antes de ser reciclada pelo reaper (0 = sem limite)
+    DB_POOL_MAX_CONNECTION_AGE_SEC = int(os.environ.get('DB_POOL_MAX_CONNECTION_AGE_SEC', 3600))
+    # Intervalo do reaper em background que remove conexões mortas/antigas e repõe o mínimo (0 = desativado)
+    DB_POOL_REAPER_INTERVAL_SEC = int(os.environ.get('DB_POOL_REAPER_INTERVAL_SEC', 60))
+    # Máximo de statements preparados mantidos por conexão física (LRU; 0 = desativado)
+    DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 64))
+    # Linhas por EXECUTE BLOCK nas escritas em lote (bulk_execute)
+    DB_BULK_BATCH_SIZE = int(os.environ.get('DB_BULK_BATCH_SIZE', 50))
+    # --- Pool de relatórios (transações somente leitura, read committed) ---
+    # Relatórios e dashboards usam um pool separado para não competir com o checkout;
+    # pode apontar para outro host/arquivo (ex: shadow ou réplica). Desativado = pool principal
+    DB_REPORTING_POOL_ENABLED = os.environ.get('DB_REPORTING_POOL_ENABLED', 'true').lower() in ['true', '1', 't']
+    DB_REPORTING_POOL_MIN_CONNECTIONS = int(os.environ.get('DB_REPORTING_POOL_MIN_CONNECTIONS', 1))
+    DB_REPORTING_POOL_MAX_CONNECTIONS = int(os.environ.get('DB_REPORTING_POOL_MAX_CONNECTIONS', 4))
+    DB_REPORTING_POOL_ACQUIRE_TIMEOUT_SEC = float(os.environ.get('DB_REPORTING_POOL_ACQUIRE_TIMEOUT_SEC', 10))
+    DB_REPORTING_HOST = os.environ.get('DB_REPORTING_HOST') or FIREBIRD_HOST
+    DB_REPORTING_PORT = int(os.environ.get('DB_REPORTING_PORT') or FIREBIRD_PORT)
+    DB_REPORTING_DATABASE_PATH = os.environ.get('DB_REPORTING_DATABASE_PATH') or DATABASE_PATH
+    # --- Instrumentação de SQL (queries por endpoint, tempo de banco e log de queries lentas) ---
+    SQL_INSTRUMENTATION_ENABLED = os.environ.get('SQL_INSTRUMENTATION_ENABLED', 'false').lower() in ['true', '1', 't']
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 200))
+    # Quantidade de requisições recentes por endpoint usadas no cálculo de p50/p95
+    SQL_METRICS_SAMPLE_SIZE = int(os.environ.get('SQL_METRICS_SAMPLE_SIZE', 500))
+    # Detector de N+1 (desenvolvimento/testes): sinaliza statement repetido com parâmetros distintos
+    SQL_N_PLUS_ONE_DETECTION = os.environ.get('SQL_N_PLUS_ONE_DETECTION', 'false').lower() in ['true', '1', 't']
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+    # Levanta NPlusOneError ao final da requisição quando o limite é excedido
+    SQL_N_PLUS_ONE_RAISE = os.environ.get('SQL_N_PLUS_ONE_RAISE', 'false').lower() in ['true', '1', 't']
+    # Compartilha uma conexão/transação do pool entre todas as chamadas de serviço da mesma requisição
+    DB_REQUEST_SCOPED_CONNECTION = os.environ.get('DB_REQUEST_SCOPED_CONNECTION', 'true').lower() in ['true', '1', 't']
+    # Validade (segundos) do total aproximado das listagens paginadas (?total=approx)
+    PAGINATION_APPROX_TOTAL_TTL = int(os.environ.get('PAGINATION_APPROX_TOTAL_TTL', 60))
+    # --- Cache em memória (LRU com orçamento aproximado de bytes e varredura de expirados) ---
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    # Faixas de lock do cache (chaves distribuídas por hash; cada faixa tem lock e limites próprios)
+    CACHE_LOCK_STRIPES = int(os.environ.get('CACHE_LOCK_STRIPES', 16))
+    # Espera máxima (s) pelo cálculo em andamento da mesma chave (single-flight) antes de calcular por conta própria
+    CACHE_SINGLE_FLIGHT_TIMEOUT_SEC = float(os.environ.get('CACHE_SINGLE_FLIGHT_TIMEOUT_SEC', 10))
+    # Contadores de operações por prefixo de chave em get_metrics() (custo de formatar a chave a cada operação)
+    CACHE_PREFIX_METRICS_ENABLED = os.environ.get('CACHE_PREFIX_METRICS_ENABLED', 'false').lower() in ['true', '1', 't']
+    # --- Cache L2 compartilhado entre os workers do mesmo host (SQLite em modo WAL) ---
+    CACHE_L2_ENABLED = os.environ.get('CACHE_L2_ENABLED', 'false').lower() in ['true', '1', 't']
+    # Arquivo SQLite da L2 (vazio = diretório temporário privado do usuário)
+    CACHE_L2_PATH = os.environ.get('CACHE_L2_PATH', '')
+    # Intervalo máximo para uma invalidação feita em um worker chegar ao L1 dos demais
+    CACHE_L2_SYNC_INTERVAL_SEC = float(os.environ.get('CACHE_L2_SYNC_INTERVAL_SEC', 1))
+    CACHE_L2_MAX_VALUE_BYTES = int(os.environ.get('CACHE_L2_MAX_VALUE_BYTES', 1024 * 1024))
+    # Intervalo da varredura de entradas expiradas em background (0 = só expira na leitura)
+    CACHE_SWEEP_INTERVAL_SEC = float(os.environ.get('CACHE_SWEEP_INTERVAL_SEC', 30))
+    # Namespaces do cache (settings, store_hours, dashboard, auth_tokens, products, categories):
+    # limite padrão de entradas por namespace e ajustes por namespace no formato "nome=valor,nome2=valor2"
+    # (ex: CACHE_NAMESPACE_TTLS="dashboard=30,products=120"); sobrepõem os valores definidos no código
+    CACHE_NAMESPACE_DEFAULT_MAX_ENTRIES = int(os.environ.get('CACHE_NAMESPACE_DEFAULT_MAX_ENTRIES', 1000))
+    CACHE_NAMESPACE_TTLS = os.environ.get('CACHE_NAMESPACE_TTLS', '')
+    CACHE_NAMESPACE_MAX_ENTRIES = os.environ.get('CACHE_NAMESPACE_MAX_ENTRIES', '')
+    # Cache de respostas HTTP (ETag/304) dos endpoints de catálogo e horários (namespace 'http_responses')
+    HTTP_RESPONSE_CACHE_ENABLED = os.environ.get('HTTP_RESPONSE_CACHE_ENABLED', 'true').lower() in ['true', '1', 't']
+    # Warm-up do cache na inicialização (/api/health/ready responde 503 até concluir)
+    CACHE_WARMUP_ENABLED = os.environ.get('CACHE_WARMUP_ENABLED', 'true').lower() in ['true', '1', 't']
+    # Intervalo do job que repete aquecedores com falha e recarrega entradas expiradas (0 = desativado)
+    CACHE_WARMUP_INTERVAL_SEC = int(os.environ.get('CACHE_WARMUP_INTERVAL_SEC', 60))
+    # Re-aquecimento assíncrono após invalidação, agrupando invalidações em rajada (atraso em segundos)
+    CACHE_REWARM_ON_INVALIDATION = os.environ.get('CACHE_REWARM_ON_INVALIDATION', 'true').lower() in ['true', '1', 't']
+    CACHE_REWARM_DELAY_SEC = float(os.environ.get('CACHE_REWARM_DELAY_SEC', 0.5))
+    # --- Índice em memória de revogação de tokens (TOKEN_BLACKLIST) ---
+    REVOCATION_INDEX_ENABLED = os.environ.get('REVOCATION_INDEX_ENABLED', 'true').lower() in ['true', '1', 't']
+    # Intervalo da sincronização incremental (revogações feitas em outros workers)
+    REVOCATION_INDEX_SYNC_INTERVAL_SEC = float(os.environ.get('REVOCATION_INDEX_SYNC_INTERVAL_SEC', 2))
+    # Janela relida antes da marca d'água de CREATED_AT (transações que confirmaram com atraso)
+    REVOCATION_INDEX_SYNC_LOOKBACK_SEC = int(os.environ.get('REVOCATION_INDEX_SYNC_LOOKBACK_SEC', 60))
+    # Recarga completa periódica: reconcilia remoções e poda JTIs expirados
+    REVOCATION_INDEX_FULL_RELOAD_SEC = int(os.environ.get('REVOCATION_INDEX_FULL_RELOAD_SEC', 600))
+    # --- Hash de senhas (bcrypt) em pool dedicado, isolando a CPU de autenticação ---
+    PASSWORD_HASH_POOL_ENABLED = os.environ.get('PASSWORD_HASH_POOL_ENABLED', 'true').lower() in ['true', '1', 't']
+    # 'thread' (bcrypt libera o GIL) ou 'process' (requer app criado fora da importação do __main__)
+    PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread')
+    # Workers do pool (0 = metade dos núcleos, mínimo 1)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
+    # Operações em execução + na fila; acima disso espera PASSWORD_HASH_QUEUE_TIMEOUT_SEC e responde 503
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+    PASSWORD_HASH_QUEUE_TIMEOUT_SEC = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT_SEC', 5))
+    PASSWORD_HASH_RETRY_AFTER_SEC = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER_SEC', 2))
+    # Custo do bcrypt; hashes com custo diferente são regravados no próximo login
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    # --- Rate limiting em memória (janela deslizante aproximada por chave) ---
+    RATE_LIMIT_SHARDS = int(os.environ.get('RATE_LIMIT_SHARDS', 16))
+    # Intervalo da varredura que remove chaves ociosas (0 = sem varredura)
+    RATE_LIMIT_SWEEP_INTERVAL_SEC = float(os.environ.get('RATE_LIMIT_SWEEP_INTERVAL_SEC', 60))
+    # Backend dos contadores: 'memory' (por processo) ou 'sqlite' (compartilhado pelos workers do host)
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    # Arquivo SQLite do backend compartilhado (vazio = diretório temporário privado do usuário)
+    RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH', '')
+    # --- Barramento de eventos (WebSocket/listeners entregues fora da thread da requisição) ---
+    EVENT_BUS_ENABLED = os.environ.get('EVENT_BUS_ENABLED', 'true').lower() in ['true', '1', 't']
+    # Eventos pendentes aceitos; com a fila cheia o evento novo é descartado (e contabilizado)
+    EVENT_BUS_MAX_QUEUE = int(os.environ.get('EVENT_BUS_MAX_QUEUE', 10000))
+    # Eventos entregues por ciclo da thread despachante
+    EVENT_BUS_BATCH_SIZE = int(os.environ.get('EVENT_BUS_BATCH_SIZE', 100))
+    # Espera antes de cada lote para coalescer rajadas (ex: table.status_changed da mesma mesa)
+    EVENT_BUS_COALESCE_WINDOW_MS = float(os.environ.get('EVENT_BUS_COALESCE_WINDOW_MS', 20))
+    # --- Outbox transacional de eventos (EVENT_OUTBOX) com sequência e replay na reconexão ---
+    EVENT_OUTBOX_ENABLED = os.environ.get('EVENT_OUTBOX_ENABLED', 'true').lower() in ['true', '1', 't']
+    # Intervalo de leitura do outbox pelo relay (eventos gravados por outros workers)
+    EVENT_OUTBOX_POLL_INTERVAL_SEC = float(os.environ.get('EVENT_OUTBOX_POLL_INTERVAL_SEC', 1))
+    # Linhas numeradas/entregues por ciclo do relay
+    EVENT_OUTBOX_BATCH_SIZE = int(os.environ.get('EVENT_OUTBOX_BATCH_SIZE', 200))
+    # Máximo de eventos reenviados na conexão com last_seq (acima disso o cliente recarrega o estado)
+    EVENT_OUTBOX_REPLAY_LIMIT = int(os.environ.get('EVENT_OUTBOX_REPLAY_LIMIT', 500))
+    # Retenção dos eventos já numerados (janela máxima de replay)
+    EVENT_OUTBOX_RETENTION_HOURS = int(os.environ.get('EVENT_OUTBOX_RETENTION_HOURS', 24))
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')  
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))  
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() in ['true', '1', 't']  
@@ -1,19 +1,83 @@
 import fdb  
+from flask import g, has_request_context, jsonify
 from .config import Config  
+from .utils import sql_profiler
+import re
 import threading
-import queue
+import time
+from collections import deque, OrderedDict
 from contextlib import contextmanager
 
+class PoolExhaustedError(Exception):
+    """Nenhuma conexão do pool ficou disponível dentro do prazo de aquisição"""
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _PoolWaiter:
+    """Requisição aguardando conexão na fila FIFO do pool"""
+    __slots__ = ('event', 'conn', 'can_create')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.conn = None
+        self.can_create = False
+
+
 class FirebirdConnectionPool:
-    """Pool de conexões Firebird usando apenas bibliotecas padrão Python"""
-    def __init__(self, min_connections=5, max_connections=20, timeout=30):
+    """
+    Pool de conexões Firebird usando apenas bibliotecas padrão Python.
+
+    OTIMIZAÇÃO DE PERFORMANCE: Em modo de validação preguiçosa (lazy_validation),
+    o pool registra por conexão o instante de criação, de último uso e de última
+    validação. Apenas conexões ociosas além de validation_idle_seconds são validadas
+    com SELECT no checkout; a devolução não faz round-trip. Um reaper em background
+    remove conexões mortas ou antigas e repõe o pool até min_connections.
+
+    O pool nunca abre conexões além de max_connections: quando esgotado, as
+    requisições entram numa fila FIFO e recebem a próxima conexão devolvida. Quem
+    não for atendido até o prazo (timeout) recebe PoolExhaustedError.
+    """
+    def __init__(self, min_connections=5, max_connections=20, timeout=30,
+                 lazy_validation=None, validation_idle_seconds=None,
+                 max_connection_age=None, reaper_interval=None, statement_cache_size=None,
+                 name='main', connection_params=None):
+        self.name = name
         self.min_connections = min_connections
         self.max_connections = max_connections
         self.timeout = timeout
-        self._pool = queue.Queue(maxsize=max_connections)
+        self.lazy_validation = Config.DB_POOL_LAZY_VALIDATION if lazy_validation is None else lazy_validation
+        self.validation_idle_seconds = (
+            Config.DB_POOL_VALIDATION_IDLE_SEC if validation_idle_seconds is None else validation_idle_seconds
+        )
+        self.max_connection_age = (
+            Config.DB_POOL_MAX_CONNECTION_AGE_SEC if max_connection_age is None else max_connection_age
+        )
+        self.reaper_interval = Config.DB_POOL_REAPER_INTERVAL_SEC if reaper_interval is None else reaper_interval
+        self.statement_cache_size = (
+            Config.DB_STATEMENT_CACHE_SIZE if statement_cache_size is None else statement_cache_size
+        )
+        # Conexões ociosas (LIFO: reutiliza as mais recentes, que dispensam validação)
+        self._idle = deque()
+        # Fila FIFO de requisições aguardando conexão
+        self._waiters = deque()
         self._created = 0
+        self._closed = False
         self._lock = threading.Lock()
-        self._connection_params = {
+        self._stats = {
+            'acquisitions': 0,
+            'waits': 0,
+            'wait_timeouts': 0,
+            'total_wait_time': 0.0,
+            'peak_waiters': 0
+        }
+        # Metadados por conexão: id(conn) -> {'created_at', 'last_used', 'last_validated'}
+        self._conn_meta = {}
+        self._meta_lock = threading.Lock()
+        self._reaper_thread = None
+        self._reaper_stop = threading.Event()
+        self._connection_params = connection_params or {
             'host': Config.FIREBIRD_HOST,
             'port': Config.FIREBIRD_PORT,
             'database': Config.DATABASE_PATH,
@@ -22,117 +86,316 @@ class FirebirdConnectionPool:
             'charset': 'UTF-8'
         }
         self._initialize_pool()
+        if self.lazy_validation and self.reaper_interval > 0:
+            self._start_reaper()
 
     def _create_connection(self):
         """Cria uma nova conexão"""
         try:
-            return fdb.connect(**self._connection_params)
+            conn = fdb.connect(**self._connection_params)
         except fdb.Error as e:
             print(f"Erro ao criar conexão: {e}")
             return None
+        now = time.monotonic()
+        with self._meta_lock:
+            self._conn_meta[id(conn)] = {'created_at': now, 'last_used': now, 'last_validated': now}
+        return conn
+
+    def _close_connection(self, conn):
+        """Fecha a conexão física e descarta seus metadados"""
+        with self._meta_lock:
+            meta = self._conn_meta.pop(id(conn), None)
+        if meta and meta.get('statement_cache') is not None:
+            meta['statement_cache'].clear()
+        try:
+            conn.close()
+        except:
+            pass
+
+    def _hand_off(self, conn):
+        """Entrega a conexão ao primeiro da fila ou a devolve às ociosas (chamar com _lock)"""
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.conn = conn
+            waiter.event.set()
+        else:
+            self._idle.append(conn)
+
+    def _release_slot(self):
+        """Libera a vaga de uma conexão descartada, repassando-a ao primeiro da fila"""
+        with self._lock:
+            if self._waiters and not self._closed:
+                # A vaga continua contabilizada: o próximo da fila cria a conexão
+                waiter = self._waiters.popleft()
+                waiter.can_create = True
+                waiter.event.set()
+            elif self._created > 0:
+                self._created -= 1
+
+    def _discard_connection(self, conn):
+        """Fecha uma conexão que pertence ao pool e libera sua vaga"""
+        self._close_connection(conn)
+        self._release_slot()
+
+    def _validate_connection(self, conn):
+        """Executa um SELECT simples para verificar se a conexão está viva"""
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1 FROM RDB$DATABASE")
+            cur.fetchone()
+            cur.close()
+        except:
+            return False
+        with self._meta_lock:
+            meta = self._conn_meta.get(id(conn))
+            if meta:
+                meta['last_validated'] = time.monotonic()
+        return True
+
+    def _needs_validation(self, conn):
+        """Indica se a conexão deve ser validada antes de ser entregue"""
+        if not self.lazy_validation:
+            return True
+        if getattr(conn, 'closed', False):
+            return True
+        with self._meta_lock:
+            meta = self._conn_meta.get(id(conn))
+        if not meta:
+            return True
+        idle_since = max(meta['last_used'], meta['last_validated'])
+        return time.monotonic() - idle_since >= self.validation_idle_seconds
+
+    def _is_expired(self, conn, now=None):
+        """Indica se a conexão excedeu a idade máxima configurada"""
+        if not self.max_connection_age:
+            return False
+        with self._meta_lock:
+            meta = self._conn_meta.get(id(conn))
+        if not meta:
+            return False
+        return (now or time.monotonic()) - meta['created_at'] >= self.max_connection_age
+
+    def get_statement_cache(self, conn, create=True):
+        """Retorna o cache de statements preparados da conexão física (None se desativado)"""
+        if self.statement_cache_size <= 0:
+            return None
+        with self._meta_lock:
+            meta = self._conn_meta.get(id(conn))
+            if meta is None:
+                return None
+            statement_cache = meta.get('statement_cache')
+            if statement_cache is None and create:
+                statement_cache = StatementCache(conn, self.statement_cache_size)
+                meta['statement_cache'] = statement_cache
+            return statement_cache
+
+    def _touch(self, conn):
+        """Atualiza o instante de último uso da conexão"""
+        with self._meta_lock:
+            meta = self._conn_meta.get(id(conn))
+            if meta:
+                meta['last_used'] = time.monotonic()
 
     def _initialize_pool(self):
         """Inicializa o pool com conexões mínimas"""
         for _ in range(self.min_connections):
             conn = self._create_connection()
             if conn:
-                try:
-                    self._pool.put_nowait(conn)
-                    with self._lock:
-                        self._created += 1
-                except queue.Full:
-                    # Pool já cheio (não deveria acontecer na inicialização)
-                    try:
-                        conn.close()
-                    except:
-                        pass
-
-    def get_connection(self):
-        """Obtém uma conexão do pool"""
-        try:
-            # Tenta obter conexão do pool com timeout
-            conn = self._pool.get(timeout=self.timeout)
-            
-            # Verifica se conexão ainda está válida
-            try:
-                # Tenta executar um comando simples para verificar
-                cur = conn.cursor()
-                cur.execute("SELECT 1 FROM RDB$DATABASE")
-                cur.fetchone()
-                cur.close()
-            except:
-                # Se conexão inválida, cria nova
-                try:
-                    conn.close()
-                except:
-                    pass
-                conn = self._create_connection()
-                if not conn:
-                    # Se não conseguiu criar nova, tenta obter outra do pool
-                    return self.get_connection()
-            
-            return conn
-        except queue.Empty:
-            # Pool vazio, verifica se pode criar nova conexão
-            with self._lock:
-                if self._created < self.max_connections:
+                with self._lock:
                     self._created += 1
-                    conn = self._create_connection()
-                    if conn:
-                        return conn
-                    else:
-                        # Se falhou ao criar, decrementa contador
-                        self._created -= 1
-                        return None
-                else:
-                    # Pool cheio, cria conexão temporária (fora do pool)
-                    return self._create_connection()
+                    self._idle.append(conn)
+
+    def get_connection(self, timeout=None):
+        """
+        Obtém uma conexão do pool.
+
+        Args:
+            timeout: Prazo máximo de espera em segundos (None usa self.timeout)
+
+        Raises:
+            PoolExhaustedError: se nenhuma conexão ficar disponível no prazo
+        """
+        timeout = self.timeout if timeout is None else timeout
+        conn = None
+        create = False
+        waiter = None
+        with self._lock:
+            self._stats['acquisitions'] += 1
+            if self._idle and not self._waiters:
+                conn = self._idle.pop()
+            elif self._created < self.max_connections:
+                # Reserva a vaga antes de conectar (fora do lock)
+                self._created += 1
+                create = True
+            else:
+                # Pool esgotado: entra na fila FIFO em vez de abrir conexão extra
+                waiter = _PoolWaiter()
+                self._waiters.append(waiter)
+                self._stats['waits'] += 1
+                self._stats['peak_waiters'] = max(self._stats['peak_waiters'], len(self._waiters))
+
+        if waiter:
+            started = time.monotonic()
+            waiter.event.wait(timeout)
+            with self._lock:
+                if not waiter.event.is_set():
+                    self._waiters.remove(waiter)
+                    self._stats['wait_timeouts'] += 1
+                    raise PoolExhaustedError(
+                        f"Nenhuma conexão disponível em {timeout}s "
+                        f"({self._created}/{self.max_connections} em uso, {len(self._waiters)} na fila)",
+                        retry_after=Config.DB_POOL_RETRY_AFTER_SEC
+                    )
+                self._stats['total_wait_time'] += time.monotonic() - started
+            conn, create = waiter.conn, waiter.can_create
+
+        if create:
+            conn = self._create_connection()
+            if not conn:
+                # Se falhou ao criar, libera a vaga reservada
+                self._release_slot()
+                return None
+            return conn
+
+        # OTIMIZAÇÃO DE PERFORMANCE: só valida conexões ociosas além do limite
+        if self._needs_validation(conn) and not self._validate_connection(conn):
+            # Se conexão inválida, substitui mantendo a mesma vaga
+            self._close_connection(conn)
+            conn = self._create_connection()
+            if not conn:
+                self._release_slot()
+                return None
+
+        self._touch(conn)
+        return conn
 
     def return_connection(self, conn):
         """Retorna conexão ao pool"""
-        if conn:
+        if not conn:
+            return
+        if self.lazy_validation:
+            # OTIMIZAÇÃO DE PERFORMANCE: sem round-trip na devolução; conexões
+            # mortas são detectadas no próximo checkout ocioso ou pelo reaper
+            if getattr(conn, 'closed', False):
+                self._discard_connection(conn)
+                return
+        elif not self._validate_connection(conn):
+            # Conexão inválida, fecha e libera a vaga
+            self._discard_connection(conn)
+            return
+        self._touch(conn)
+        with self._lock:
+            if not self._closed:
+                self._hand_off(conn)
+                return
+        # Pool encerrado, fecha a conexão
+        self._close_connection(conn)
+
+    def _start_reaper(self):
+        """Inicia a thread de manutenção do pool em background"""
+        self._reaper_thread = threading.Thread(
+            target=self._reaper_loop,
+            name=f'firebird-pool-reaper-{self.name}',
+            daemon=True
+        )
+        self._reaper_thread.start()
+
+    def _reaper_loop(self):
+        while not self._reaper_stop.wait(self.reaper_interval):
             try:
-                # Verifica se conexão ainda está válida antes de retornar
-                try:
-                    cur = conn.cursor()
-                    cur.execute("SELECT 1 FROM RDB$DATABASE")
-                    cur.fetchone()
-                    cur.close()
-                    
-                    # Conexão válida, retorna ao pool
-                    self._pool.put_nowait(conn)
-                except:
-                    # Conexão inválida, fecha e decrementa contador
-                    try:
-                        conn.close()
-                    except:
-                        pass
-                    with self._lock:
-                        if self._created > 0:
-                            self._created -= 1
-            except queue.Full:
-                # Pool cheio, fecha a conexão
-                try:
-                    conn.close()
-                except:
-                    pass
-                with self._lock:
-                    if self._created > 0:
-                        self._created -= 1
+                self.reap()
+            except Exception as e:
+                print(f"Erro no reaper do pool de conexões: {e}")
+
+    def reap(self):
+        """
+        Remove conexões ociosas mortas ou acima da idade máxima e repõe o pool
+        até min_connections. Retorna o número de conexões removidas.
+        """
+        removed = 0
+        now = time.monotonic()
+        # Retira das ociosas apenas as que precisam ser verificadas
+        with self._lock:
+            candidates = [
+                conn for conn in self._idle
+                if self._is_expired(conn, now) or self._needs_validation(conn)
+            ]
+            for conn in candidates:
+                self._idle.remove(conn)
+
+        for conn in candidates:
+            if self._is_expired(conn, now) or not self._validate_connection(conn):
+                self._discard_connection(conn)
+                removed += 1
+                continue
+            with self._lock:
+                self._hand_off(conn)
+
+        # Repõe conexões até o mínimo configurado
+        while True:
+            with self._lock:
+                if self._closed or self._created >= self.min_connections:
+                    break
+                self._created += 1
+            conn = self._create_connection()
+            if not conn:
+                self._release_slot()
+                break
+            with self._lock:
+                self._hand_off(conn)
+        return removed
+
+    def get_stats(self):
+        """
+        Retorna estatísticas do pool para dimensionar max_connections.
+
+        Returns:
+            dict com conexões criadas/ociosas/em uso, fila de espera atual,
+            pico da fila, esperas, timeouts, tempo médio de espera (ms) e
+            hits/misses do cache de statements preparados
+        """
+        statement_cache = {'size': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+        with self._meta_lock:
+            for meta in self._conn_meta.values():
+                cache = meta.get('statement_cache')
+                if cache is not None:
+                    for key, value in cache.get_stats().items():
+                        statement_cache[key] += value
+        lookups = statement_cache['hits'] + statement_cache['misses']
+        statement_cache['hit_rate'] = round((statement_cache['hits'] / lookups) * 100, 2) if lookups else 0.0
+        with self._lock:
+            waits = self._stats['waits']
+            served_waits = waits - self._stats['wait_timeouts'] - len(self._waiters)
+            avg_wait = 0.0
+            if served_waits > 0:
+                avg_wait = (self._stats['total_wait_time'] / served_waits) * 1000
+            return {
+                'name': self.name,
+                'min_connections': self.min_connections,
+                'max_connections': self.max_connections,
+                'acquire_timeout_sec': self.timeout,
+                'created': self._created,
+                'idle': len(self._idle),
+                'in_use': self._created - len(self._idle),
+                'waiters': len(self._waiters),
+                'peak_waiters': self._stats['peak_waiters'],
+                'acquisitions': self._stats['acquisitions'],
+                'waits': waits,
+                'wait_timeouts': self._stats['wait_timeouts'],
+                'avg_wait_time_ms': round(avg_wait, 3),
+                'statement_cache': statement_cache
+            }
 
     def close_all(self):
         """Fecha todas as conexões do pool"""
-        while not self._pool.empty():
-            try:
-                conn = self._pool.get_nowait()
-                try:
-                    conn.close()
-                except:
-                    pass
-            except queue.Empty:
-                break
+        self._reaper_stop.set()
         with self._lock:
+            self._closed = True
+            conns = list(self._idle)
+            self._idle.clear()
             self._created = 0
+        for conn in conns:
+            self._close_connection(conn)
 
 # Instância global do pool
 _pool = None
@@ -144,9 +407,249 @@ def get_pool():
     if _pool is None:
         with _pool_lock:
             if _pool is None:
-                _pool = FirebirdConnectionPool()
+                _pool = FirebirdConnectionPool(
+                    min_connections=Config.DB_POOL_MIN_CONNECTIONS,
+                    max_connections=Config.DB_POOL_MAX_CONNECTIONS,
+                    timeout=Config.DB_POOL_ACQUIRE_TIMEOUT_SEC
+                )
     return _pool
 
+# Pool de relatórios: transações somente leitura, read committed
+_reporting_pool = None
+
+def get_reporting_pool():
+    """
+    Obtém ou cria o pool de relatórios.
+
+    OTIMIZAÇÃO DE PERFORMANCE: Relatórios e dashboards fazem SELECTs agregados longos.
+    Num pool próprio, com transações read-only/read committed (que não seguram a coleta
+    de lixo do Firebird), eles não disputam conexões com o checkout. O pool pode apontar
+    para outro host/arquivo (DB_REPORTING_HOST/DB_REPORTING_DATABASE_PATH).
+    Retorna None se DB_REPORTING_POOL_ENABLED estiver desativado.
+    """
+    global _reporting_pool
+    if not Config.DB_REPORTING_POOL_ENABLED:
+        return None
+    if _reporting_pool is None:
+        with _pool_lock:
+            if _reporting_pool is None:
+                _reporting_pool = FirebirdConnectionPool(
+                    min_connections=Config.DB_REPORTING_POOL_MIN_CONNECTIONS,
+                    max_connections=Config.DB_REPORTING_POOL_MAX_CONNECTIONS,
+                    timeout=Config.DB_REPORTING_POOL_ACQUIRE_TIMEOUT_SEC,
+                    name='reporting',
+                    connection_params={
+                        'host': Config.DB_REPORTING_HOST,
+                        'port': Config.DB_REPORTING_PORT,
+                        'database': Config.DB_REPORTING_DATABASE_PATH,
+                        'user': Config.FIREBIRD_USER,
+                        'password': Config.FIREBIRD_PASSWORD,
+                        'charset': 'UTF-8',
+                        'isolation_level': fdb.ISOLATION_LEVEL_READ_COMMITED_RO
+                    }
+                )
+    return _reporting_pool
+
+def close_reporting_pool():
+    """Fecha o pool de relatórios, se tiver sido criado"""
+    global _reporting_pool
+    with _pool_lock:
+        pool, _reporting_pool = _reporting_pool, None
+    if pool is not None:
+        pool.close_all()
+
+class _CachedStatement:
+    """Statement preparado (fdb cursor.prep) com cursor dedicado"""
+    __slots__ = ('cursor', 'prepared', 'in_use')
+
+    def __init__(self, cursor, prepared):
+        self.cursor = cursor
+        self.prepared = prepared
+        self.in_use = False
+
+
+class StatementCache:
+    """
+    Cache LRU de statements preparados de uma conexão física, indexado pelo texto SQL.
+
+    OTIMIZAÇÃO DE PERFORMANCE: Evita que o Firebird re-analise e re-prepare SQL
+    quente (ex: TOKEN_BLACKLIST, itens do carrinho, INGREDIENTS) a cada chamada.
+    Como no fdb um PreparedStatement pertence ao cursor que o criou, cada entrada
+    guarda um cursor próprio. Uma conexão é usada por uma thread por vez, então o
+    cache não precisa de lock.
+    """
+    def __init__(self, connection, max_size):
+        self._conn = connection
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, sql):
+        """Retorna o statement preparado livre para o SQL, preparando-o se necessário"""
+        entry = self._entries.get(sql)
+        if entry is not None:
+            if entry.in_use:
+                # Mesmo SQL ainda em leitura por outro cursor: não compartilha
+                return None
+            self._entries.move_to_end(sql)
+            self.hits += 1
+        else:
+            self.misses += 1
+            cursor = self._conn.cursor()
+            entry = _CachedStatement(cursor, cursor.prep(sql))
+            self._entries[sql] = entry
+            self._evict()
+        entry.in_use = True
+        return entry
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            for sql, entry in self._entries.items():
+                if not entry.in_use:
+                    del self._entries[sql]
+                    self._close_entry(entry)
+                    self.evictions += 1
+                    break
+            else:
+                # Todas as entradas em uso: tolera excesso temporário
+                return
+
+    def discard(self, sql):
+        """Remove uma entrada (ex: após erro na execução)"""
+        entry = self._entries.pop(sql, None)
+        if entry is not None:
+            self._close_entry(entry)
+
+    def release_all(self):
+        for entry in self._entries.values():
+            entry.in_use = False
+
+    def clear(self):
+        for entry in self._entries.values():
+            self._close_entry(entry)
+        self._entries.clear()
+
+    def _close_entry(self, entry):
+        try:
+            entry.cursor.close()
+        except Exception:
+            pass
+
+    def get_stats(self):
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class CachingCursor:
+    """
+    Cursor entregue por PooledConnection.cursor().
+    Executa SQL parametrizado através do StatementCache da conexão (prepara uma vez,
+    executa várias) e delega fetch*/description/rowcount ao cursor que executou por último.
+    SQL sem parâmetros costuma ser montado dinamicamente e segue pelo cursor comum.
+    Com a instrumentação de SQL ativa, cada execute e as linhas lidas são registrados
+    no trace da requisição (ver utils/sql_profiler).
+    """
+    def __init__(self, connection, statement_cache=None):
+        self._connection = connection
+        self._cache = statement_cache
+        self._plain_cursor = None
+        self._entry = None
+        self._active = None
+        self._trace_entry = None
+
+    def _plain(self):
+        if self._plain_cursor is None:
+            self._plain_cursor = self._connection.cursor()
+        return self._plain_cursor
+
+    def _release(self):
+        if self._entry is not None:
+            self._entry.in_use = False
+            self._entry = None
+
+    def _dispatch(self, method, sql, params):
+        self._release()
+        entry = None
+        if self._cache is not None and params and isinstance(sql, str):
+            entry = self._cache.acquire(sql)
+        if entry is None:
+            self._active = self._plain()
+            return getattr(self._active, method)(sql, params) if params else getattr(self._active, method)(sql)
+        self._entry = entry
+        self._active = entry.cursor
+        try:
+            return getattr(entry.cursor, method)(entry.prepared, params)
+        except Exception:
+            self._entry = None
+            self._active = None
+            self._cache.discard(sql)
+            raise
+
+    def _run(self, method, sql, params):
+        self._trace_entry = None
+        if not sql_profiler.is_enabled():
+            return self._dispatch(method, sql, params)
+        started = time.perf_counter()
+        try:
+            return self._dispatch(method, sql, params)
+        finally:
+            self._trace_entry = sql_profiler.record_query(sql, params, time.perf_counter() - started)
+
+    def execute(self, sql, parameters=None):
+        self._run('execute', sql, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._run('executemany', sql, seq_of_parameters)
+        return self
+
+    def fetchone(self):
+        row = (self._active or self._plain()).fetchone()
+        if row is not None:
+            sql_profiler.add_rows(self._trace_entry, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        cursor = self._active or self._plain()
+        rows = cursor.fetchmany(size) if size is not None else cursor.fetchmany()
+        sql_profiler.add_rows(self._trace_entry, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = (self._active or self._plain()).fetchall()
+        sql_profiler.add_rows(self._trace_entry, len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        """Delega description, rowcount, fetch*map etc. ao cursor ativo"""
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._active or self._plain(), name)
+
+    def __iter__(self):
+        for row in (self._active or self._plain()):
+            sql_profiler.add_rows(self._trace_entry, 1)
+            yield row
+
+    def close(self):
+        self._release()
+        if self._plain_cursor is not None:
+            try:
+                self._plain_cursor.close()
+            except Exception:
+                pass
+        self._active = None
+
+    def __del__(self):
+        self._release()
+
+
 # Wrapper para manter compatibilidade com código existente
 # O código atual espera que get_db_connection() retorne uma conexão
 # que precisa ser fechada manualmente. Para manter compatibilidade,
@@ -162,10 +665,17 @@ class PooledConnection:
         """Delega todos os atributos para a conexão real"""
         return getattr(self._conn, name)
     
+    def cursor(self):
+        """Cria cursor que reaproveita statements preparados da conexão física"""
+        return CachingCursor(self._conn, self._pool.get_statement_cache(self._conn))
+    
     def close(self):
         """Fecha a conexão e retorna ao pool"""
         if not self._closed:
             self._closed = True
+            statement_cache = self._pool.get_statement_cache(self._conn, create=False)
+            if statement_cache is not None:
+                statement_cache.release_all()
             self._pool.return_connection(self._conn)
     
     def __enter__(self):
@@ -174,20 +684,28 @@ class PooledConnection:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
-def get_db_connection():  
+def _acquire_pooled_connection(pool=None):
     """
-    Obtém uma conexão do pool.
-    Retorna uma conexão wrapper que automaticamente retorna ao pool quando fechada.
-    Compatível com código existente que fecha conexões manualmente.
+    Obtém uma conexão do pool (ou conexão direta como fallback).
+    Com um pool explícito (ex: relatórios), um erro retorna None em vez de abrir uma
+    conexão direta ao banco principal: o chamador decide o fallback (get_db_connection).
     """
+    explicit_pool = pool is not None
     try:
-        pool = get_pool()
+        pool = pool or get_pool()
         conn = pool.get_connection()
         if conn:
             return PooledConnection(conn, pool)
         return None
+    except PoolExhaustedError as e:
+        # Backpressure: não abre conexão fora do pool; a requisição responde 503
+        if has_request_context():
+            g._db_pool_retry_after = e.retry_after
+        raise
     except Exception as e:
         print(f"Erro ao obter conexão do pool: {e}")
+        if explicit_pool:
+            return None
         # Fallback: criar conexão direta em caso de erro no pool
         try:
             return fdb.connect(
@@ -202,6 +720,228 @@ def get_db_connection():
             print(f"Erro ao conectar ao Firebird: {e}")
             return None
 
+
+class RequestUnitOfWork:
+    """
+    Unidade de trabalho por requisição: uma conexão do pool e uma transação
+    compartilhadas por todas as chamadas de serviço feitas na mesma requisição.
+
+    OTIMIZAÇÃO DE PERFORMANCE: Evita que uma requisição ocupe vários slots do pool
+    (ex: create_order_from_cart chamando cart_service, store_service, table_service
+    e settings_service). O escopo mais externo controla o commit real; escopos
+    aninhados usam SAVEPOINTs, então commits internos ficam pendentes até o escopo
+    externo terminar e rollbacks internos desfazem apenas o próprio trecho.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 0
+        self.pending_commit = False
+        self._savepoint_seq = 0
+        self.after_commit = []  # callbacks executados após o próximo commit real
+
+    def _transaction_active(self):
+        try:
+            return bool(self.conn.main_transaction.active)
+        except Exception:
+            return False
+
+    def open_scope(self):
+        """Abre um novo escopo; escopos aninhados recebem um savepoint"""
+        savepoint = None
+        if self.depth > 0:
+            if not self._transaction_active():
+                self.conn.begin()
+            self._savepoint_seq += 1
+            savepoint = f"UOW_SP_{self._savepoint_seq}"
+            self.conn.savepoint(savepoint)
+        self.depth += 1
+        return RequestScopedConnection(self, savepoint)
+
+    def commit(self):
+        self.pending_commit = False
+        if self._transaction_active():
+            self.conn.commit()
+        self._run_after_commit()
+
+    def rollback(self):
+        self.pending_commit = False
+        if self._transaction_active():
+            self.conn.rollback()
+
+    def _run_after_commit(self):
+        callbacks, self.after_commit = self.after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Erro em callback pós-commit: {e}")
+
+    def close_scope(self):
+        self.depth = max(self.depth - 1, 0)
+        # Commits de escopos aninhados são efetivados quando o escopo externo termina
+        if self.depth == 0 and self.pending_commit:
+            self.commit()
+
+    def finish(self, exc=None):
+        """Encerra a unidade de trabalho e devolve a conexão ao pool"""
+        try:
+            if exc is None and self.pending_commit:
+                self.commit()
+            # Descarta trabalho não confirmado para não vazar estado para o próximo uso
+            self.rollback()
+        except Exception as e:
+            print(f"Erro ao finalizar unidade de trabalho da requisição: {e}")
+        finally:
+            self.conn.close()
+            # Invalidações pendentes são aplicadas mesmo sem commit (invalidar a mais é seguro)
+            self._run_after_commit()
+
+
+class RequestScopedConnection:
+    """
+    Visão de uma RequestUnitOfWork entregue por get_db_connection().
+    Mantém a interface de conexão usada pelos serviços (cursor, commit, rollback, close).
+    """
+    def __init__(self, unit_of_work, savepoint=None):
+        self._uow = unit_of_work
+        self._savepoint = savepoint
+        self._closed = False
+
+    def __getattr__(self, name):
+        """Delega os demais atributos para a conexão compartilhada"""
+        return getattr(self._uow.conn, name)
+
+    def commit(self):
+        if self._savepoint:
+            # Escopo aninhado: o commit real fica a cargo do escopo externo
+            self._uow.pending_commit = True
+        else:
+            self._uow.commit()
+
+    def rollback(self):
+        if self._savepoint:
+            self._uow.conn.rollback(savepoint=self._savepoint)
+        else:
+            self._uow.rollback()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._uow.close_scope()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _get_request_unit_of_work():
+    """Obtém (ou cria) a unidade de trabalho da requisição atual em flask.g"""
+    uow = getattr(g, '_db_unit_of_work', None)
+    if uow is None:
+        conn = _acquire_pooled_connection()
+        if conn is None or not isinstance(conn, PooledConnection):
+            # Sem pool disponível: não compartilha a conexão de fallback
+            return None, conn
+        uow = RequestUnitOfWork(conn)
+        g._db_unit_of_work = uow
+    return uow, None
+
+
+def get_db_connection(shared=True):  
+    """
+    Obtém uma conexão do pool.
+    Retorna uma conexão wrapper que automaticamente retorna ao pool quando fechada.
+    Compatível com código existente que fecha conexões manualmente.
+
+    Dentro de uma requisição Flask (e com DB_REQUEST_SCOPED_CONNECTION ativo), todas
+    as chamadas reutilizam a mesma conexão e transação da requisição.
+    Use shared=False para obter uma conexão isolada com transação própria.
+    """
+    if shared and Config.DB_REQUEST_SCOPED_CONNECTION and has_request_context():
+        uow, fallback_conn = _get_request_unit_of_work()
+        if uow is None:
+            return fallback_conn
+        return uow.open_scope()
+    return _acquire_pooled_connection()
+
+
+def get_reporting_connection():
+    """
+    Obtém uma conexão somente leitura do pool de relatórios, para SELECTs de
+    relatórios e dashboards. Não participa da unidade de trabalho da requisição:
+    a transação é própria, read-only e read committed (escritas falham).
+    Com o pool de relatórios desativado ou indisponível, usa o pool principal.
+    """
+    try:
+        pool = get_reporting_pool()
+    except Exception as e:
+        print(f"Erro ao criar pool de relatórios, usando pool principal: {e}")
+        pool = None
+    if pool is None:
+        return get_db_connection()
+    conn = _acquire_pooled_connection(pool)
+    if conn is None:
+        return get_db_connection()
+    return conn
+
+
+def run_after_commit(callback):
+    """
+    Executa callback depois que a transação da requisição for efetivada (commit real
+    do escopo externo). Fora de uma unidade de trabalho, executa imediatamente.
+    Usado para invalidar caches só quando as alterações já estão visíveis para as
+    demais transações; em caso de rollback o callback é executado no fim da requisição.
+    """
+    uow = getattr(g, '_db_unit_of_work', None) if has_request_context() else None
+    if uow is None:
+        callback()
+    else:
+        uow.after_commit.append(callback)
+
+
+def close_request_unit_of_work(exc=None):
+    """Finaliza a unidade de trabalho da requisição (registrado em teardown_request)"""
+    uow = g.pop('_db_unit_of_work', None)
+    if uow is not None:
+        uow.finish(exc)
+
+
+def _pool_exhausted_response(retry_after):
+    response = jsonify({
+        "error": "Serviço temporariamente sobrecarregado. Tente novamente em instantes.",
+        "code": "SERVICE_UNAVAILABLE",
+        "retry_after": retry_after
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def init_app(app):
+    """
+    Integra a camada de banco ao app Flask:
+    - finaliza a unidade de trabalho da requisição no teardown
+    - responde 503 com Retry-After quando o pool se esgota, mesmo que o serviço
+      tenha capturado a PoolExhaustedError e devolvido um erro 500 genérico.
+      Respostas de sucesso (ou 4xx) são mantidas: um acesso posterior da mesma
+      requisição pode ter obtido conexão e confirmado a transação, e um 503 faria
+      o cliente repetir uma operação já efetivada (ex: pedido duplicado).
+    """
+    app.teardown_request(close_request_unit_of_work)
+
+    @app.errorhandler(PoolExhaustedError)
+    def handle_pool_exhausted(e):
+        return _pool_exhausted_response(e.retry_after)
+
+    @app.after_request
+    def apply_pool_backpressure(response):
+        retry_after = g.pop('_db_pool_retry_after', None)
+        if retry_after is not None and response.status_code >= 500 and response.status_code != 503:
+            return _pool_exhausted_response(retry_after)
+        return response
+
 @contextmanager
 def get_db_connection_context():
     """Context manager para obter e retornar conexão automaticamente"""
@@ -214,3 +954,136 @@ def get_db_connection_context():
     finally:
         if conn:
             pool.return_connection(conn)  
+
+
+# OTIMIZAÇÃO DE PERFORMANCE: Escrita em lote (EXECUTE BLOCK)
+# Limites conservadores do Firebird para um EXECUTE BLOCK: mensagem de entrada (64KB)
+# e quantidade de parâmetros
+_EXECUTE_BLOCK_MAX_MESSAGE_BYTES = 60000
+_EXECUTE_BLOCK_MAX_PARAMS = 1000
+_PLACEHOLDER_RE = re.compile(r"'(?:[^']|'')*'|\?")
+_CHAR_TYPE_RE = re.compile(r"CHAR\s*\(\s*(\d+)\s*\)", re.IGNORECASE)
+
+
+def _bind_block_params(sql, row_index):
+    """Troca os '?' do statement (fora de literais) por parâmetros nomeados :P<linha>_<n>"""
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group(0) != '?':
+            return match.group(0)
+        name = f":P{row_index}_{count}"
+        count += 1
+        return name
+
+    return _PLACEHOLDER_RE.sub(replace, sql), count
+
+
+def _param_size(sql_type):
+    """Estimativa do tamanho do parâmetro na mensagem (UTF-8: até 4 bytes por caractere)"""
+    match = _CHAR_TYPE_RE.search(sql_type)
+    if match:
+        return int(match.group(1)) * 4 + 4
+    return 16
+
+
+def _block_rows_per_batch(param_types, batch_size):
+    row_bytes = sum(_param_size(t) for t in param_types) or 1
+    rows = min(
+        batch_size,
+        _EXECUTE_BLOCK_MAX_MESSAGE_BYTES // row_bytes,
+        _EXECUTE_BLOCK_MAX_PARAMS // max(len(param_types), 1)
+    )
+    return max(rows, 1)
+
+
+def bulk_execute(cur, sql, param_sets, param_types, returning=None, row_counts=False, batch_size=None):
+    """
+    Executa o mesmo statement DML para vários conjuntos de parâmetros em poucos round-trips.
+
+    Os conjuntos são agrupados em EXECUTE BLOCKs de até DB_BULK_BATCH_SIZE linhas (limitado
+    também pelo tamanho da mensagem de parâmetros). Com um único conjunto, executa direto.
+
+    Args:
+        cur: Cursor da conexão/transação atual
+        sql: Statement com placeholders '?'. Com returning, deve terminar em "RETURNING <coluna>"
+        param_sets: Lista de tuplas de parâmetros
+        param_types: Tipo SQL de cada placeholder, na ordem (ex: ['INTEGER', 'DECIMAL(10,2)'])
+        returning: Tipo SQL do valor do RETURNING (ex: 'INTEGER') para obter os IDs gerados
+        row_counts: Se True, retorna o ROW_COUNT de cada statement (ex: validar UPDATEs)
+        batch_size: Linhas por EXECUTE BLOCK (padrão: Config.DB_BULK_BATCH_SIZE)
+
+    Returns:
+        Lista na ordem de param_sets com os valores retornados (returning) ou as linhas
+        afetadas (row_counts); None caso contrário
+
+    Exemplo:
+        item_ids = bulk_execute(
+            cur,
+            "INSERT INTO ORDER_ITEMS (ORDER_ID, PRODUCT_ID, QUANTITY) VALUES (?, ?, ?) RETURNING ID",
+            [(order_id, 10, 1), (order_id, 12, 2)],
+            ['INTEGER', 'INTEGER', 'INTEGER'],
+            returning='INTEGER'
+        )
+    """
+    if returning and row_counts:
+        raise ValueError("Use returning ou row_counts, não ambos")
+    sql = sql.strip().rstrip(';').strip()
+    param_sets = [tuple(params) for params in param_sets]
+    if not param_sets:
+        return [] if (returning or row_counts) else None
+    batch_size = batch_size or Config.DB_BULK_BATCH_SIZE
+
+    if len(param_sets) == 1 or batch_size <= 1:
+        return _execute_one_by_one(cur, sql, param_sets, returning, row_counts)
+
+    results = []
+    rows_per_batch = _block_rows_per_batch(param_types, batch_size)
+    for start in range(0, len(param_sets), rows_per_batch):
+        chunk = param_sets[start:start + rows_per_batch]
+        declarations = []
+        statements = []
+        params = []
+        for row_index, row in enumerate(chunk):
+            if len(row) != len(param_types):
+                raise ValueError(
+                    f"Esperados {len(param_types)} parâmetros por linha, recebidos {len(row)}"
+                )
+            statement, _ = _bind_block_params(sql, row_index)
+            declarations.extend(
+                f"P{row_index}_{i} {sql_type} = ?" for i, sql_type in enumerate(param_types)
+            )
+            if returning:
+                statement += " INTO :R; SUSPEND;"
+            elif row_counts:
+                statement += "; R = ROW_COUNT; SUSPEND;"
+            else:
+                statement += ";"
+            statements.append(statement)
+            params.extend(row)
+
+        block = f"EXECUTE BLOCK ({', '.join(declarations)})"
+        if returning or row_counts:
+            block += f" RETURNS (R {returning or 'INTEGER'})"
+        block += " AS BEGIN " + " ".join(statements) + " END"
+
+        cur.execute(block, tuple(params))
+        if returning or row_counts:
+            results.extend(row[0] for row in cur.fetchall())
+
+    return results if (returning or row_counts) else None
+
+
+def _execute_one_by_one(cur, sql, param_sets, returning, row_counts):
+    if not returning and not row_counts:
+        cur.executemany(sql, param_sets)
+        return None
+    results = []
+    for params in param_sets:
+        cur.execute(sql, params)
+        if returning:
+            results.append(cur.fetchone()[0])
+        else:
+            results.append(cur.rowcount)
+    return results
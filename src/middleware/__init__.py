@@ -3,4 +3,5 @@ Middleware package para a API Royal Burger.
 
 Este pacote contém middlewares de segurança e proteção:
 - rate_limiter: Rate limiting para proteção contra brute force e abuse
+- sqlite_rate_limiter: Backend de rate limiting compartilhado entre workers (SQLite WAL)
 """
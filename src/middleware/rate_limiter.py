@@ -1,19 +1,297 @@
 """
 Middleware de Rate Limiting para proteção contra brute force e abuse.
 ALTERAÇÃO: Removido Redis - usando apenas cache em memória para melhor performance
+
+OTIMIZAÇÃO DE PERFORMANCE: Janela deslizante aproximada (sliding window counter) em vez
+de uma lista de timestamps por chave. Cada chave guarda apenas o início da janela fixa
+atual, a contagem da janela anterior e a da atual; a contagem estimada é
+    anterior * (fração da janela anterior ainda dentro da janela deslizante) + atual
+O custo por requisição e a memória por chave são O(1), independentes de max_requests.
+
+As chaves ficam distribuídas em RATE_LIMIT_SHARDS faixas, cada uma com lock próprio,
+e uma thread de varredura remove a cada RATE_LIMIT_SWEEP_INTERVAL_SEC as chaves ociosas
+(sem requisições há duas janelas, quando as duas contagens já valeriam zero), então a
+memória acompanha os clientes ativos e não todos os IPs já vistos.
+
+Com vários workers (gunicorn), RATE_LIMIT_BACKEND=sqlite guarda os contadores num
+arquivo SQLite (WAL) local, com incremento atômico entre processos (ver
+sqlite_rate_limiter), para que o limite valha para o host e não por worker.
 """
+import math
+import sys
+from abc import ABC, abstractmethod
 import time
 from functools import wraps
 from flask import request, jsonify
-from collections import defaultdict
 import threading
 import logging
+from typing import Any, Dict
+
+from ..config import Config
 
 logger = logging.getLogger(__name__)
 
-# Cache em memória para rate limiting
-_rate_limit_cache = defaultdict(list)
-_rate_limit_lock = threading.Lock()
+
+def apply_hit(window_start: float, previous: int, current: int, now: float,
+              max_requests: int, window_seconds: float):
+    """
+    Aplica uma requisição ao estado (início da janela, contagem anterior, contagem atual).
+    Função pura compartilhada pelos backends.
+
+    Returns:
+        (permitido, retry_after, window_start, previous, current) com o novo estado
+    """
+    current_start = now - (now % window_seconds)
+    if window_start is None:
+        previous, current = 0, 0
+    elif window_start != current_start:
+        # Avança a janela: a atual vira anterior (ou zera se passou mais de uma janela)
+        elapsed_windows = round((current_start - window_start) / window_seconds)
+        previous = current if elapsed_windows == 1 else 0
+        current = 0
+
+    elapsed = now - current_start
+    estimated = previous * (1 - elapsed / window_seconds) + current
+    if estimated + 1 > max_requests:
+        return False, _retry_after(previous, current, elapsed, max_requests, window_seconds), current_start, previous, current
+    return True, 0, current_start, previous, current + 1
+
+
+def _retry_after(previous: int, current: int, elapsed: float, max_requests: int, window_seconds: float) -> int:
+    """Tempo até a contagem estimada liberar mais uma requisição"""
+    allowance = max_requests - 1
+    if current <= allowance and previous > 0:
+        # Basta o peso da janela anterior cair o suficiente dentro desta janela
+        wait = window_seconds * (1 - (allowance - current) / previous) - elapsed
+    else:
+        # Só na próxima janela, quando a contagem atual passa a ser a anterior
+        wait = window_seconds - elapsed
+        if current > 0:
+            wait += max(0.0, window_seconds * (1 - allowance / current))
+    return max(1, math.ceil(wait))
+
+
+class RateLimitBackend(ABC):
+    """
+    Base dos backends de rate limiting: contadores de permitidas/limitadas e a thread
+    de varredura de chaves ociosas. Subclasses implementam hit, sweep, clear,
+    get_key_stats e _backend_stats (abstratos: um backend incompleto falha ao ser criado).
+    """
+    name = 'base'
+
+    def __init__(self, sweep_interval: float = 60):
+        self.sweep_interval = sweep_interval
+        self._sweeper_thread = None
+        self._sweeper_lock = threading.Lock()
+        self._sweeper_stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {'allowed': 0, 'limited': 0, 'swept': 0, 'sweeps': 0}
+
+    @abstractmethod
+    def hit(self, key: str, max_requests: int, window_seconds: float, now: float = None):
+        """
+        Registra uma requisição para a chave se estiver dentro do limite.
+
+        Returns:
+            (permitido, retry_after em segundos)
+        """
+
+    @abstractmethod
+    def sweep(self, now: float = None) -> int:
+        """Remove as chaves ociosas. Retorna quantas foram removidas."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove todos os contadores"""
+
+    @abstractmethod
+    def get_key_stats(self, identifier: str) -> Dict[str, Any]:
+        """Contagens das chaves que contêm o identificador (IP ou user_id)"""
+
+    @abstractmethod
+    def _backend_stats(self) -> Dict[str, Any]:
+        """Métricas específicas do backend (incluídas em get_stats)"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {'backend': self.name, 'sweep_interval': self.sweep_interval}
+        stats.update(self._backend_stats())
+        with self._stats_lock:
+            stats.update(self._stats)
+        return stats
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[stat] += amount
+
+    # --- varredura em background ---
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper_thread is not None or self.sweep_interval <= 0:
+            return
+        with self._sweeper_lock:
+            if self._sweeper_thread is not None:
+                return
+            self._sweeper_thread = threading.Thread(
+                target=self._sweeper_loop,
+                name='rate-limit-sweeper',
+                daemon=True
+            )
+        self._sweeper_thread.start()
+
+    def _sweeper_loop(self) -> None:
+        while not self._sweeper_stop.wait(self.sweep_interval):
+            try:
+                self._count('swept', self.sweep())
+                self._count('sweeps')
+            except Exception as e:
+                logger.error(f"Erro na varredura de chaves ociosas do rate limiting: {e}", exc_info=True)
+
+    def stop(self) -> None:
+        self._sweeper_stop.set()
+
+
+class _WindowCounter:
+    """Estado de uma chave: janela fixa atual, contagens anterior/atual e quando fica ociosa"""
+    __slots__ = ('window_start', 'previous', 'current', 'idle_at')
+
+    def __init__(self):
+        self.window_start = None
+        self.previous = 0
+        self.current = 0
+        self.idle_at = 0.0
+
+
+class _Shard:
+    __slots__ = ('entries', 'lock')
+
+    def __init__(self):
+        self.entries: Dict[str, _WindowCounter] = {}
+        self.lock = threading.Lock()
+
+
+class SlidingWindowRateLimiter(RateLimitBackend):
+    """
+    Backend em memória do processo: contadores de janela deslizante por chave, em
+    faixas com lock próprio. Caminho rápido para um único worker (desenvolvimento).
+    """
+    name = 'memory'
+
+    def __init__(self, shards: int = 16, sweep_interval: float = 60):
+        super().__init__(sweep_interval)
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def hit(self, key: str, max_requests: int, window_seconds: float, now: float = None):
+        now = time.time() if now is None else now
+        shard = self._shard(key)
+        with shard.lock:
+            counter = shard.entries.get(key)
+            if counter is None:
+                counter = _WindowCounter()
+                shard.entries[key] = counter
+            allowed, retry_after, counter.window_start, counter.previous, counter.current = apply_hit(
+                counter.window_start, counter.previous, counter.current, now, max_requests, window_seconds
+            )
+            if allowed or counter.current == 0:
+                counter.idle_at = counter.window_start + 2 * window_seconds
+        self._count('allowed' if allowed else 'limited')
+        self._ensure_sweeper()
+        return allowed, retry_after
+
+    def sweep(self, now: float = None) -> int:
+        """Remove as chaves ociosas. Retorna quantas foram removidas."""
+        now = time.time() if now is None else now
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                idle = [key for key, counter in shard.entries.items() if counter.idle_at <= now]
+                for key in idle:
+                    del shard.entries[key]
+            removed += len(idle)
+        return removed
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+
+    def get_key_stats(self, identifier: str) -> Dict[str, Any]:
+        now = time.time()
+        stats = {}
+        for shard in self._shards:
+            with shard.lock:
+                for key, counter in shard.entries.items():
+                    if identifier in key:
+                        stats[key] = {
+                            "window_start": counter.window_start,
+                            "previous_window_requests": counter.previous,
+                            "current_window_requests": counter.current,
+                            "idle_in_seconds": max(0, round(counter.idle_at - now, 1))
+                        }
+        return stats
+
+    def _backend_stats(self) -> Dict[str, Any]:
+        keys = 0
+        requests = 0
+        approx_bytes = 0
+        per_shard = []
+        for shard in self._shards:
+            with shard.lock:
+                count = len(shard.entries)
+                keys += count
+                per_shard.append(count)
+                approx_bytes += sys.getsizeof(shard.entries)
+                for key, counter in shard.entries.items():
+                    requests += counter.current
+                    approx_bytes += (
+                        sys.getsizeof(key) + sys.getsizeof(counter) +
+                        sys.getsizeof(counter.window_start) + sys.getsizeof(counter.idle_at)
+                    )
+        return {
+            "total_endpoints": keys,
+            "total_requests": requests,
+            "shards": len(self._shards),
+            "max_keys_per_shard": max(per_shard) if per_shard else 0,
+            "approx_memory_bytes": approx_bytes
+        }
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """
+    Backend configurado em RATE_LIMIT_BACKEND:
+    - 'memory' (padrão): contadores no processo; com N workers o limite efetivo vira N x max_requests
+    - 'sqlite': contadores num arquivo SQLite (WAL) compartilhado pelos workers do host
+    Se o arquivo SQLite não puder ser aberto, usa o backend em memória.
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+    with _backend_lock:
+        if _backend is None:
+            memory = SlidingWindowRateLimiter(
+                shards=Config.RATE_LIMIT_SHARDS,
+                sweep_interval=Config.RATE_LIMIT_SWEEP_INTERVAL_SEC
+            )
+            backend = memory
+            if Config.RATE_LIMIT_BACKEND.lower() == 'sqlite':
+                try:
+                    from .sqlite_rate_limiter import SqliteRateLimiter
+                    backend = SqliteRateLimiter(
+                        Config.RATE_LIMIT_SQLITE_PATH or None,
+                        fallback=memory,
+                        sweep_interval=Config.RATE_LIMIT_SWEEP_INTERVAL_SEC
+                    )
+                    logger.info(f"Rate limiting compartilhado entre workers: {backend.path}")
+                except Exception as e:
+                    logger.error(f"Rate limiting compartilhado desativado - usando memória do processo: {e}", exc_info=True)
+            _backend = backend
+    return _backend
 
 
 def get_client_identifier():
@@ -34,12 +312,12 @@ def get_client_identifier():
 def rate_limit(max_requests: int = 5, window_seconds: int = 60, per: str = 'ip'):
     """
     Decorator para rate limiting.
-    
+
     Args:
         max_requests: Número máximo de requisições permitidas
         window_seconds: Janela de tempo em segundos
         per: Base para rate limiting ('ip' ou 'user')
-    
+
     Returns:
         Decorator function
     """
@@ -59,73 +337,43 @@ def rate_limit(max_requests: int = 5, window_seconds: int = 60, per: str = 'ip')
                     identifier = get_client_identifier()
             else:
                 identifier = get_client_identifier()
-            
+
             # Cria chave única para este endpoint + identificador
             endpoint_key = f"rate_limit:{request.endpoint}:{identifier}"
-            current_time = time.time()
-            
+
             # ALTERAÇÃO: Usar apenas cache em memória (removido Redis)
-            with _rate_limit_lock:
-                # Remove requisições fora da janela de tempo
-                _rate_limit_cache[endpoint_key] = [
-                    req_time for req_time in _rate_limit_cache[endpoint_key]
-                    if current_time - req_time < window_seconds
-                ]
-                
-                # Verifica se excedeu o limite
-                if len(_rate_limit_cache[endpoint_key]) >= max_requests:
-                    # Calcula tempo até poder fazer nova requisição
-                    oldest_request = min(_rate_limit_cache[endpoint_key])
-                    retry_after = int(window_seconds - (current_time - oldest_request)) + 1
-                    
-                    return jsonify({
-                        "error": "Muitas requisições. Tente novamente mais tarde.",
-                        "code": "RATE_LIMIT_EXCEEDED",
-                        "retry_after": retry_after
-                    }), 429
-                
-                # Adiciona requisição atual
-                _rate_limit_cache[endpoint_key].append(current_time)
-            
+            allowed, retry_after = get_rate_limit_backend().hit(endpoint_key, max_requests, window_seconds)
+            if not allowed:
+                return jsonify({
+                    "error": "Muitas requisições. Tente novamente mais tarde.",
+                    "code": "RATE_LIMIT_EXCEEDED",
+                    "retry_after": retry_after
+                }), 429
+
             # Executa a função normalmente
             return f(*args, **kwargs)
-        
+
         return decorated_function
     return decorator
 
 
 def clear_rate_limit_cache():
     """Limpa o cache de rate limiting (útil para testes)"""
-    global _rate_limit_cache
-    with _rate_limit_lock:
-        _rate_limit_cache.clear()
+    get_rate_limit_backend().clear()
 
 
 def get_rate_limit_stats(identifier: str = None):
     """
     Obtém estatísticas de rate limiting (útil para debugging).
-    
+
     Args:
         identifier: Identificador do cliente (opcional)
-    
+
     Returns:
-        dict com estatísticas
+        dict com estatísticas (gerais, com memória aproximada, ou das chaves do identificador)
     """
-    with _rate_limit_lock:
-        if identifier:
-            # Retorna stats para um identificador específico
-            stats = {}
-            for key, requests in _rate_limit_cache.items():
-                if identifier in key:
-                    stats[key] = {
-                        "requests": len(requests),
-                        "oldest": min(requests) if requests else None,
-                        "newest": max(requests) if requests else None
-                    }
-            return stats
-        else:
-            # Retorna stats gerais
-            return {
-                "total_endpoints": len(_rate_limit_cache),
-                "total_requests": sum(len(reqs) for reqs in _rate_limit_cache.values())
-            }
+    if identifier:
+        # Retorna stats para um identificador específico
+        return get_rate_limit_backend().get_key_stats(identifier)
+    # Retorna stats gerais
+    return get_rate_limit_backend().get_stats()
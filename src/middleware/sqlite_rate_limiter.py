@@ -0,0 +1,169 @@
+"""
+Backend de rate limiting compartilhado entre os workers do mesmo host (SQLite em modo WAL).
+
+OTIMIZAÇÃO DE PERFORMANCE: Com o backend em memória, cada worker do gunicorn conta as
+requisições separadamente e o limite efetivo de login/recuperação de senha vira
+max_requests x workers, variando conforme o worker escolhido pelo balanceador. Aqui
+os contadores da janela deslizante ficam num arquivo SQLite local, sem serviço externo.
+
+Cada requisição lê e grava a linha da chave dentro de BEGIN IMMEDIATE, que obtém o lock
+de escrita do banco antes da leitura: o incremento é atômico entre threads e processos.
+Só os endpoints com @rate_limit pagam esse custo (uma escrita curta no WAL).
+
+Se o SQLite falhar (disco cheio, lock além do busy_timeout), a requisição é avaliada
+pelo backend em memória do processo, em vez de ser bloqueada ou liberada sem limite.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from ..utils.shared_cache import immediate_transaction, private_state_path
+from .rate_limiter import RateLimitBackend, apply_hit
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS rate_limits (
+        key TEXT PRIMARY KEY,
+        window_start REAL NOT NULL,
+        previous INTEGER NOT NULL,
+        current INTEGER NOT NULL,
+        idle_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_rate_limits_idle_at ON rate_limits (idle_at)",
+)
+
+
+class SqliteRateLimiter(RateLimitBackend):
+    """
+    Contadores de janela deslizante num arquivo SQLite (WAL) compartilhado pelos processos.
+
+    Args:
+        path: Arquivo SQLite (None = diretório privado do usuário no diretório temporário)
+        fallback: Backend usado quando o SQLite falha
+        sweep_interval: Intervalo da remoção de chaves ociosas
+        busy_timeout_ms: Espera pelo lock de escrita de outro processo
+    """
+    name = 'sqlite'
+
+    def __init__(self, path: Optional[str] = None, fallback: RateLimitBackend = None,
+                 sweep_interval: float = 60, busy_timeout_ms: int = 2000):
+        super().__init__(sweep_interval)
+        self.path = path or private_state_path('rate_limit.sqlite3')
+        self.fallback = fallback
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._stats.update({'errors': 0, 'fallbacks': 0})
+        conn = self._connect()
+        for statement in _SCHEMA:
+            conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Uma conexão por thread e por processo (a herdada no fork não é reutilizada)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        self._count('errors')
+        logger.warning(f"Rate limiting compartilhado indisponível ({operation}): {error}")
+
+    def hit(self, key: str, max_requests: int, window_seconds: float, now: float = None):
+        now = time.time() if now is None else now
+        try:
+            conn = self._connect()
+            with immediate_transaction(conn):
+                row = conn.execute(
+                    "SELECT window_start, previous, current FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                window_start, previous, current = row if row else (None, 0, 0)
+                allowed, retry_after, window_start, previous, current = apply_hit(
+                    window_start, previous, current, now, max_requests, window_seconds
+                )
+                if allowed or row is None or row[0] != window_start:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO rate_limits (key, window_start, previous, current, idle_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, window_start, previous, current, window_start + 2 * window_seconds)
+                    )
+        except sqlite3.Error as e:
+            self._failed('hit', e)
+            if self.fallback is None:
+                return True, 0
+            self._count('fallbacks')
+            return self.fallback.hit(key, max_requests, window_seconds, now)
+        self._count('allowed' if allowed else 'limited')
+        self._ensure_sweeper()
+        return allowed, retry_after
+
+    def sweep(self, now: float = None) -> int:
+        """Remove as chaves ociosas (de todos os workers). Retorna quantas foram removidas."""
+        now = time.time() if now is None else now
+        removed = 0
+        try:
+            conn = self._connect()
+            with immediate_transaction(conn):
+                removed = conn.execute("DELETE FROM rate_limits WHERE idle_at <= ?", (now,)).rowcount
+        except sqlite3.Error as e:
+            self._failed('sweep', e)
+        if self.fallback is not None:
+            removed += self.fallback.sweep(now)
+        return removed
+
+    def clear(self) -> None:
+        try:
+            self._connect().execute("DELETE FROM rate_limits")
+        except sqlite3.Error as e:
+            self._failed('clear', e)
+        if self.fallback is not None:
+            self.fallback.clear()
+
+    def get_key_stats(self, identifier: str) -> Dict[str, Any]:
+        now = time.time()
+        escaped = identifier.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        try:
+            rows = self._connect().execute(
+                "SELECT key, window_start, previous, current, idle_at FROM rate_limits "
+                "WHERE key LIKE ? ESCAPE '\\'",
+                (f"%{escaped}%",)
+            ).fetchall()
+        except sqlite3.Error as e:
+            self._failed('stats', e)
+            return {}
+        return {
+            key: {
+                "window_start": window_start,
+                "previous_window_requests": previous,
+                "current_window_requests": current,
+                "idle_in_seconds": max(0, round(idle_at - now, 1))
+            }
+            for key, window_start, previous, current, idle_at in rows
+        }
+
+    def _backend_stats(self) -> Dict[str, Any]:
+        stats = {'path': self.path}
+        try:
+            conn = self._connect()
+            keys, requests = conn.execute("SELECT COUNT(*), COALESCE(SUM(current), 0) FROM rate_limits").fetchone()
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            stats.update({
+                'total_endpoints': keys,
+                'total_requests': requests,
+                'db_bytes': page_count * page_size
+            })
+        except sqlite3.Error as e:
+            self._failed('stats', e)
+        if self.fallback is not None:
+            stats['fallback'] = self.fallback._backend_stats()
+        return stats
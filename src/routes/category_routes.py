@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from ..services import category_service
 from ..services.auth_service import require_role
+from ..utils.keyset_pagination import parse_total_mode
+from ..utils.response_cache import cached_response, CATALOG
 
 category_bp = Blueprint('categories', __name__)
 
@@ -27,11 +29,15 @@ def create_category_route():
 
 
 @category_bp.route('/', methods=['GET'])
+@cached_response(CATALOG)
 def list_categories_route():
     name = request.args.get('name')
     page = request.args.get('page', type=int, default=1)
     page_size = request.args.get('page_size', type=int, default=10)
-    result = category_service.list_categories(name_filter=name, page=page, page_size=page_size)
+    result = category_service.list_categories(
+        name_filter=name, page=page, page_size=page_size,
+        cursor=request.args.get('cursor'), total_mode=parse_total_mode(request.args.get('total'))
+    )
     return jsonify(result), 200
 
 
@@ -158,6 +164,7 @@ def move_category_route(category_id):
 
 
 @category_bp.route('/select', methods=['GET'])
+@cached_response(CATALOG)
 def get_categories_for_select_route():
     """
     Retorna todas as categorias ativas apenas com ID e nome para uso em selects.
@@ -173,6 +180,7 @@ def get_categories_for_select_route():
 
 
 @category_bp.route('/with-products', methods=['GET'])
+@cached_response(CATALOG)
 def get_categories_with_products_route():
     """
     Retorna todas as categorias ativas com seus produtos já incluídos.
@@ -88,3 +88,176 @@ def reset_cache_metrics_route():
     except Exception as e:
         logger.error(f"Erro ao resetar métricas de cache: {e}", exc_info=True)
         return jsonify({"error": "Erro ao resetar métricas de cache"}), 500
+
+
+@dashboard_bp.route('/cache/namespaces', methods=['GET'])
+@require_role('admin', 'manager')
+def get_cache_namespaces_route():
+    """
+    Retorna as métricas de cada namespace do cache (TTL, limite e número de entradas,
+    hits/misses/hit_rate, evictions e flushes), para ajustar CACHE_NAMESPACE_TTLS e
+    CACHE_NAMESPACE_MAX_ENTRIES a partir de dados reais.
+    """
+    try:
+        return jsonify(get_cache_manager().get_namespace_metrics()), 200
+    except Exception as e:
+        logger.error(f"Erro ao obter métricas dos namespaces de cache: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao obter métricas dos namespaces de cache"}), 500
+
+
+@dashboard_bp.route('/cache/namespaces/<string:name>/flush', methods=['POST'])
+@require_role('admin')
+def flush_cache_namespace_route(name):
+    """Remove todas as entradas de um namespace do cache (apenas admin)"""
+    try:
+        namespace = get_cache_manager().get_namespace(name)
+        if namespace is None:
+            return jsonify({"error": f"Namespace de cache '{name}' não encontrado"}), 404
+        removed = namespace.clear()
+        return jsonify({"message": f"Namespace de cache '{name}' limpo com sucesso", "removed": removed}), 200
+    except Exception as e:
+        logger.error(f"Erro ao limpar namespace de cache {name}: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao limpar namespace de cache"}), 500
+
+
+@dashboard_bp.route('/auth/revocation-index', methods=['GET'])
+@require_role('admin', 'manager')
+def get_revocation_index_stats_route():
+    """
+    Retorna o estado do índice em memória de revogação de tokens (JTIs revogados,
+    usuários com revogação global, marca d'água de CREATED_AT e sincronizações).
+    """
+    try:
+        from ..utils.revocation_index import get_revocation_index
+        return jsonify(get_revocation_index().get_stats()), 200
+    except Exception as e:
+        logger.error(f"Erro ao obter estado do índice de revogação: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao obter estado do índice de revogação"}), 500
+
+
+@dashboard_bp.route('/auth/password-hasher', methods=['GET'])
+@require_role('admin', 'manager')
+def get_password_hasher_stats_route():
+    """
+    Retorna as métricas do pool de hash de senhas (workers, operações pendentes,
+    profundidade da fila, rejeições por fila cheia, latência p50/p95 e rehashes).
+    """
+    try:
+        from ..utils.password_hasher import get_password_hasher
+        return jsonify(get_password_hasher().get_stats()), 200
+    except Exception as e:
+        logger.error(f"Erro ao obter métricas do pool de hash de senhas: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao obter métricas do pool de hash de senhas"}), 500
+
+
+@dashboard_bp.route('/rate-limit/stats', methods=['GET'])
+@require_role('admin', 'manager')
+def get_rate_limit_stats_route():
+    """
+    Retorna as estatísticas do rate limiting (chaves ativas, memória aproximada,
+    requisições permitidas/limitadas e varreduras). Com ?identifier=<ip ou user_id>,
+    retorna as contagens das chaves desse cliente.
+    """
+    try:
+        from ..middleware.rate_limiter import get_rate_limit_stats
+        return jsonify(get_rate_limit_stats(request.args.get('identifier'))), 200
+    except Exception as e:
+        logger.error(f"Erro ao obter estatísticas de rate limiting: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao obter estatísticas de rate limiting"}), 500
+
+
+@dashboard_bp.route('/events/bus/stats', methods=['GET'])
+@require_role('admin', 'manager')
+def get_event_bus_stats_route():
+    """
+    Retorna as métricas do barramento de eventos (profundidade da fila, eventos
+    publicados/entregues/coalescidos/descartados, latência de entrega e atraso na fila p50/p95).
+    """
+    try:
+        from ..utils.event_publisher import get_event_bus_stats
+        return jsonify(get_event_bus_stats()), 200
+    except Exception as e:
+        logger.error(f"Erro ao obter métricas do barramento de eventos: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao obter métricas do barramento de eventos"}), 500
+
+
+@dashboard_bp.route('/events/outbox/stats', methods=['GET'])
+@require_role('admin', 'manager')
+def get_event_outbox_stats_route():
+    """
+    Retorna as métricas do relay do outbox de eventos (última sequência entregue neste
+    processo, eventos numerados/entregues, conflitos de lock, replays e erros).
+    """
+    try:
+        from ..utils.event_outbox import get_event_outbox_relay
+        return jsonify(get_event_outbox_relay().get_stats()), 200
+    except Exception as e:
+        logger.error(f"Erro ao obter métricas do outbox de eventos: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao obter métricas do outbox de eventos"}), 500
+
+
+@dashboard_bp.route('/db/pool/metrics', methods=['GET'])
+@require_role('admin', 'manager')
+def get_db_pool_metrics_route():
+    """
+    Retorna estatísticas do pool de conexões (em uso, ociosas, fila de espera e timeouts).
+    Usado para dimensionar DB_POOL_MAX_CONNECTIONS a partir de dados reais.
+    Inclui em 'reporting' as estatísticas do pool de relatórios (None se desativado).
+    """
+    try:
+        from ..database import get_pool, get_reporting_pool
+        stats = get_pool().get_stats()
+        reporting_pool = get_reporting_pool()
+        stats['reporting'] = reporting_pool.get_stats() if reporting_pool else None
+        return jsonify(stats), 200
+    except Exception as e:
+        logger.error(f"Erro ao obter métricas do pool de conexões: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao obter métricas do pool de conexões"}), 500
+
+
+@dashboard_bp.route('/db/queries/metrics', methods=['GET'])
+@require_role('admin', 'manager')
+def get_sql_metrics_route():
+    """
+    Retorna o resumo de SQL por endpoint (queries por requisição, p50/p95 de tempo
+    de banco, statements mais custosos), as queries lentas e as violações de N+1 recentes.
+    Requer SQL_INSTRUMENTATION_ENABLED=true e/ou SQL_N_PLUS_ONE_DETECTION=true para coletar dados.
+    """
+    try:
+        from ..utils import sql_profiler
+        summary = sql_profiler.get_endpoint_summary()
+        summary['slow_queries'] = sql_profiler.get_slow_queries()
+        summary['n_plus_one_violations'] = sql_profiler.get_n_plus_one_violations()
+        return jsonify(summary), 200
+    except Exception as e:
+        logger.error(f"Erro ao obter métricas de SQL: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao obter métricas de SQL"}), 500
+
+
+@dashboard_bp.route('/db/queries/metrics/reset', methods=['POST'])
+@require_role('admin')
+def reset_sql_metrics_route():
+    """Reseta as métricas de SQL por endpoint (apenas admin)"""
+    try:
+        from ..utils import sql_profiler
+        sql_profiler.reset_metrics()
+        return jsonify({"message": "Métricas de SQL resetadas com sucesso"}), 200
+    except Exception as e:
+        logger.error(f"Erro ao resetar métricas de SQL: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao resetar métricas de SQL"}), 500
+
+
+@dashboard_bp.route('/db/schema/refresh', methods=['POST'])
+@require_role('admin')
+def refresh_schema_catalog_route():
+    """
+    Recarrega o catálogo do schema (tabelas, colunas e índices).
+    Deve ser chamado após aplicar scripts de database/migrations (apenas admin).
+    """
+    try:
+        from ..utils.schema_catalog import refresh_schema_catalog
+        catalog = refresh_schema_catalog()
+        return jsonify(catalog.get_stats()), 200
+    except Exception as e:
+        logger.error(f"Erro ao recarregar catálogo do schema: {e}", exc_info=True)
+        return jsonify({"error": "Erro ao recarregar catálogo do schema"}), 500
@@ -105,6 +105,12 @@ def get_financial_movements_route():
         except ValueError:
             return jsonify({"error": "page_size deve ser um número válido"}), 400
     
+    # OTIMIZAÇÃO DE PERFORMANCE: paginação por cursor (keyset) e total opcional/aproximado
+    if request.args.get('cursor'):
+        filters['cursor'] = request.args.get('cursor')
+    if request.args.get('total'):
+        filters['total_mode'] = request.args.get('total')
+    
     movements = financial_movement_service.get_financial_movements(filters)
     return jsonify(movements), 200
 
@@ -270,6 +276,12 @@ def get_pending_payments_route():
         except ValueError:
             return jsonify({"error": "page_size deve ser um número válido"}), 400
     
+    # OTIMIZAÇÃO DE PERFORMANCE: paginação por cursor (keyset) e total opcional/aproximado
+    if request.args.get('cursor'):
+        filters['cursor'] = request.args.get('cursor')
+    if request.args.get('total'):
+        filters['total_mode'] = request.args.get('total')
+    
     movements = financial_movement_service.get_financial_movements(filters)
     return jsonify(movements), 200
 
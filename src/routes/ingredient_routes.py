@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify  
 from ..services import ingredient_service  
 from ..services.auth_service import require_role  
+from ..utils.keyset_pagination import parse_total_mode
 
 ingredient_bp = Blueprint('ingredients', __name__)  
 
@@ -35,7 +36,9 @@ def list_ingredients_route():
         status_filter=status_filter, 
         category_filter=category_filter, 
         page=page, 
-        page_size=page_size
+        page_size=page_size,
+        cursor=request.args.get('cursor'),
+        total_mode=parse_total_mode(request.args.get('total'))
     )
     return jsonify(result), 200
 
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, Response
 from ..services import order_service, address_service, store_service  
 from ..services.auth_service import require_role  
+from ..utils.keyset_pagination import parse_total_mode
 from flask_jwt_extended import jwt_required, get_jwt  
 from ..services.printing_service import generate_kitchen_ticket_pdf, print_kitchen_ticket, format_order_for_kitchen_json
 from .. import socketio
@@ -217,7 +218,10 @@ def get_my_orders_route():
     if page_size > 100:  # Limite máximo para evitar sobrecarga
         page_size = 100
     
-    result = order_service.get_orders_by_user_id(user_id, page=page, page_size=page_size)
+    result = order_service.get_orders_by_user_id(
+        user_id, page=page, page_size=page_size,
+        cursor=request.args.get('cursor'), total_mode=parse_total_mode(request.args.get('total'))
+    )
     
     # Compatibilidade: Se retornar lista (formato antigo), manter compatibilidade
     if isinstance(result, list):
@@ -281,7 +285,9 @@ def get_all_orders_route():
         search=search,
         status=status,
         channel=channel,
-        period=period
+        period=period,
+        cursor=request.args.get('cursor'),
+        total_mode=parse_total_mode(request.args.get('total'))
     )
     
     return jsonify(orders), 200  
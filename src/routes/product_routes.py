@@ -5,6 +5,7 @@ import logging
 from ..database import get_db_connection
 from ..services import product_service  
 from ..services.auth_service import require_role
+from ..utils.keyset_pagination import parse_total_mode
 from ..utils.image_handler import save_product_image, delete_product_image, update_product_image
 
 product_bp = Blueprint('products', __name__)
@@ -83,7 +84,9 @@ def list_products_route():
         page_size=page_size, 
         include_inactive=include_inactive,
         only_inactive=only_inactive,
-        filter_unavailable=filter_unavailable
+        filter_unavailable=filter_unavailable,
+        cursor=request.args.get('cursor'),
+        total_mode=parse_total_mode(request.args.get('total'))
     )
     
     # ALTERAÇÃO: Log apenas contagem, não detalhes de produtos (evita exposição de dados)
@@ -914,7 +917,10 @@ def get_most_ordered_products_route():
     """Retorna os produtos mais pedidos baseado no histórico de pedidos completos."""
     page = request.args.get('page', type=int, default=1)
     page_size = request.args.get('page_size', type=int, default=10)
-    result = product_service.get_most_ordered_products(page=page, page_size=page_size)
+    result = product_service.get_most_ordered_products(
+        page=page, page_size=page_size,
+        cursor=request.args.get('cursor'), total_mode=parse_total_mode(request.args.get('total'))
+    )
     return jsonify(result), 200
 
 
@@ -995,7 +1001,9 @@ def get_products_by_category_route(category_id):
         page=page, 
         page_size=page_size, 
         include_inactive=include_inactive,
-        filter_unavailable=False  # Painel admin vê todos os produtos
+        filter_unavailable=False,  # Painel admin vê todos os produtos
+        cursor=request.args.get('cursor'),
+        total_mode=parse_total_mode(request.args.get('total'))
     )
     
     if result:
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from ..services import promotion_service
 from ..services.auth_service import require_role
+from ..utils.keyset_pagination import parse_total_mode
 from flask_jwt_extended import get_jwt_identity
 
 promotion_bp = Blueprint('promotions', __name__)
@@ -110,7 +111,9 @@ def list_promotions_route():
         search=search,
         status=status,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        cursor=request.args.get('cursor'),
+        total_mode=parse_total_mode(request.args.get('total'))
     )
     
     return jsonify(result), 200
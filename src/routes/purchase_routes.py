@@ -90,6 +90,12 @@ def get_purchase_invoices_route():
         except ValueError:
             return jsonify({"error": "page_size deve ser um número válido"}), 400
     
+    # OTIMIZAÇÃO DE PERFORMANCE: paginação por cursor (keyset) e total opcional/aproximado
+    if request.args.get('cursor'):
+        filters['cursor'] = request.args.get('cursor')
+    if request.args.get('total'):
+        filters['total_mode'] = request.args.get('total')
+    
     invoices = purchase_service.get_purchase_invoices(filters)
     return jsonify(invoices), 200
 
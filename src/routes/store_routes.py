@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify
 from ..services import store_service
 from ..services.auth_service import require_role
+from ..utils.response_cache import cached_response, STORE_HOURS
 
 store_bp = Blueprint('store', __name__)
 
 @store_bp.route('/hours', methods=['GET'])
+@cached_response(STORE_HOURS)
 def get_store_hours_route():
     """Retorna os horários de funcionamento da loja (público - sem autenticação)"""
     try:
@@ -6,7 +6,7 @@ Gera relatórios detalhados com gráficos, análises e métricas avançadas
 import fdb
 import logging
 from datetime import datetime, date, timedelta
-from ..database import get_db_connection
+from ..database import get_reporting_connection
 from ..utils.report_formatters import (
     format_currency, format_percentage, format_date, 
     calculate_growth_percentage, safe_divide
@@ -66,7 +66,7 @@ def generate_detailed_sales_report(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         # Converte para datetime range para usar índices
@@ -408,7 +408,7 @@ def generate_orders_performance_report(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         start_datetime = datetime.combine(start_dt.date(), datetime.min.time()) if isinstance(start_dt, date) else start_dt
@@ -594,7 +594,7 @@ def generate_products_analysis_report(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         start_datetime = datetime.combine(start_dt.date(), datetime.min.time()) if isinstance(start_dt, date) else start_dt
@@ -853,7 +853,7 @@ def generate_complete_financial_report(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         # Usa MOVEMENT_DATE para fluxo de caixa real (apenas Paid)
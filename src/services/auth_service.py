@@ -1,11 +1,13 @@
-import bcrypt  
 import fdb  
 import logging  # ALTERAÇÃO: Adicionado logging estruturado
 from functools import wraps  
 from flask import jsonify  
-from datetime import datetime, timezone, timedelta
-import threading
+from datetime import datetime, timezone
 from ..database import get_db_connection  
+from ..utils.cache_manager import get_cache_manager
+from ..utils import schema_catalog
+from ..utils import password_hasher
+from ..utils.revocation_index import get_revocation_index, parse_revoke_watermark, watermark_from_datetime
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity
 from flask import g
 from .two_factor_service import create_2fa_verification, verify_2fa_code, is_2fa_enabled
@@ -37,9 +39,14 @@ def authenticate(email, password):
         if not is_email_verified:
             return (None, "EMAIL_NOT_VERIFIED", "E-mail não verificado. Verifique seu e-mail para continuar.")
         # Por último, verifica a senha
-        if not bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8')):  
+        # OTIMIZAÇÃO DE PERFORMANCE: bcrypt roda no pool dedicado de hash, fora da thread da requisição
+        if not password_hasher.check_password(password, hashed_password):  
             return (None, "INVALID_PASSWORD", "Senha incorreta")
         
+        # Rehash transparente quando o custo configurado (BCRYPT_ROUNDS) mudou
+        if password_hasher.needs_rehash(hashed_password):
+            _rehash_password(conn, user_id, password, hashed_password)
+        
         # Se 2FA está habilitado, retorna status especial
         if two_factor_enabled:
             success, error_code, message = create_2fa_verification(user_id, email)
@@ -63,6 +70,29 @@ def authenticate(email, password):
     finally:  
         if conn: conn.close()  
 
+def _rehash_password(conn, user_id, password, old_hash):
+    """Regrava o hash da senha com o custo atual; falhas não impedem o login"""
+    try:
+        new_hash = password_hasher.hash_password(password)
+        cur = conn.cursor()
+        # Só substitui se o hash não mudou desde a leitura (troca de senha concorrente)
+        cur.execute(
+            "UPDATE USERS SET PASSWORD_HASH = ? WHERE ID = ? AND PASSWORD_HASH = ?",
+            (new_hash, user_id, old_hash)
+        )
+        conn.commit()
+        password_hasher.get_password_hasher().record_rehash()
+        logger.info(f"Hash de senha do usuário {user_id} atualizado para o custo {password_hasher.get_hash_rounds(new_hash)}")
+    except password_hasher.PasswordHasherBusyError:
+        # Pool de hash saturado: a senha já foi verificada, o rehash fica para o próximo login
+        logger.info(f"Rehash de senha do usuário {user_id} adiado: pool de hash ocupado")
+    except Exception as e:
+        logger.warning(f"Falha ao regravar hash de senha do usuário {user_id}: {e}", exc_info=True)
+        try:
+            conn.rollback()
+        except fdb.Error:
+            pass
+
 def require_role(*roles):  
     def decorator(f):  
         @wraps(f)  
@@ -101,6 +131,8 @@ def add_token_to_blacklist(jti, expires_at):
         sql = "INSERT INTO TOKEN_BLACKLIST (JTI, EXPIRES_AT) VALUES (?, ?);"  
         cur.execute(sql, (jti, expires_at))  
         conn.commit()  
+        # OTIMIZAÇÃO DE PERFORMANCE: Revogação visível imediatamente no índice em memória deste processo
+        get_revocation_index().add_jti(jti)
         # OTIMIZAÇÃO: Invalida cache quando token é adicionado à blacklist
         _invalidate_token_cache(jti=jti)
     except fdb.Error as e:  
@@ -146,52 +178,61 @@ def verify_2fa_and_login(user_id, code):
     finally:  
         if conn: conn.close()
 
-# Cache em memória para tokens revogados (usando apenas Python padrão)
-_token_cache = {}
-_cache_lock = threading.Lock()
-_cache_ttl = timedelta(minutes=5)
-_max_cache_size = 1000  # Limite para evitar consumo excessivo de memória
+# OTIMIZAÇÃO DE PERFORMANCE: Cache de status de revogação no namespace 'auth_tokens' do CacheManager
+# Cada entrada tem as tags 'jti:<jti>' e 'user:<id>' para invalidação exata (antes as chaves
+# eram filtradas por sufixo, o que também removia outros usuários com o mesmo final de ID)
+_token_cache = get_cache_manager().namespace('auth_tokens', ttl=300, max_entries=5000)
 
-def _clean_expired_cache():
-    """Remove entradas expiradas do cache"""
-    now = datetime.now()
-    expired_keys = [
-        key for key, (_, cached_time) in _token_cache.items()
-        if now - cached_time >= _cache_ttl
-    ]
-    for key in expired_keys:
-        _token_cache.pop(key, None)
+def _cache_token_status(jti, user_sub, revoked):
+    """Grava no cache se o token (jti, usuário) está revogado"""
+    tags = [f"jti:{jti}"]
+    if user_sub:
+        tags.append(f"user:{user_sub}")
+    _token_cache.set(f"{jti}_{user_sub}", revoked, tags=tags)
 
 def _invalidate_token_cache(user_id=None, jti=None):
     """Invalida cache de tokens para um usuário ou token específico"""
-    with _cache_lock:
-        if user_id:
-            # Remove todas as entradas do cache para este usuário
-            keys_to_remove = [key for key in _token_cache.keys() if key.endswith(f"_{user_id}")]
-            for key in keys_to_remove:
-                _token_cache.pop(key, None)
-        elif jti:
-            # Remove entrada específica do cache
-            keys_to_remove = [key for key in _token_cache.keys() if key.startswith(f"{jti}_")]
-            for key in keys_to_remove:
-                _token_cache.pop(key, None)
+    if user_id:
+        # Remove todas as entradas do cache para este usuário
+        _token_cache.invalidate_tags(f"user:{user_id}")
+    elif jti:
+        # Remove entrada específica do cache
+        _token_cache.invalidate_tags(f"jti:{jti}")
+
+def _use_revocations_table():
+    """USER_TOKEN_REVOCATIONS existe (migração create_user_token_revocations.sql aplicada)"""
+    return schema_catalog.has_table('USER_TOKEN_REVOCATIONS')
+
+def _get_user_revocation_watermark(cur, user_id):
+    """Marca de revogação global do usuário (epoch, segundos) ou None se não houver"""
+    if _use_revocations_table():
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        cur.execute("SELECT REVOKED_AT FROM USER_TOKEN_REVOCATIONS WHERE USER_ID = ?", (user_id,))
+        row = cur.fetchone()
+        return watermark_from_datetime(row[0]) if row else None
+    # Legado: token especial "REVOKE_USER_{USER_ID}_{TIMESTAMP}" em TOKEN_BLACKLIST
+    cur.execute("SELECT FIRST 1 JTI FROM TOKEN_BLACKLIST WHERE JTI LIKE ?", (f"REVOKE_USER_{user_id}_%",))
+    row = cur.fetchone()
+    return parse_revoke_watermark(row[0]) if row else None
 
 def is_token_revoked(jwt_payload):  
     jti = jwt_payload['jti']  
     user_sub = jwt_payload.get('sub')  
     token_iat = jwt_payload.get('iat')  
     
+    # OTIMIZAÇÃO DE PERFORMANCE: Com o índice de revogação carregado a verificação é O(1)
+    # em memória (sem banco); as consultas abaixo só rodam até a primeira carga do índice
+    revocation_index = get_revocation_index()
+    if revocation_index.loaded:
+        return revocation_index.is_revoked(jti, user_sub, token_iat)
+    
     # Verificar cache primeiro
-    cache_key = f"{jti}_{user_sub}"
-    with _cache_lock:
-        # Limpa cache expirado periodicamente
-        if len(_token_cache) > _max_cache_size:
-            _clean_expired_cache()
-        
-        if cache_key in _token_cache:
-            cached_result, cached_time = _token_cache[cache_key]
-            if datetime.now() - cached_time < _cache_ttl:
-                return cached_result
+    cached_result = _token_cache.get(f"{jti}_{user_sub}")
+    if cached_result is not None:
+        return cached_result
     
     # Se não estiver em cache, verificar banco
     conn = None  
@@ -203,48 +244,17 @@ def is_token_revoked(jwt_payload):
         sql = "SELECT 1 FROM TOKEN_BLACKLIST WHERE JTI = ?;"  
         cur.execute(sql, (jti,))  
         if cur.fetchone() is not None:
-            with _cache_lock:
-                _token_cache[cache_key] = (True, datetime.now())
+            _cache_token_status(jti, user_sub, True)
             return True
             
-        # 2) Revogação global por usuário (verifica token especial de revogação)
-        if user_sub:
+        # 2) Revogação global por usuário (USER_TOKEN_REVOCATIONS, consulta pela chave primária)
+        if user_sub and token_iat is not None:
             try:
-                # Verifica se existe um token de revogação global para este usuário
-                # OTIMIZAÇÃO: Usar FIRST 1 ao invés de LIKE sem limite
-                cur.execute("SELECT FIRST 1 JTI FROM TOKEN_BLACKLIST WHERE JTI LIKE ?", (f"REVOKE_USER_{user_sub}_%",))
-                revoke_token = cur.fetchone()
-                
-                if revoke_token and token_iat is not None:
-                    # Extrai o timestamp do token de revogação
-                    revoke_jti = revoke_token[0]
-                    # Formato: "REVOKE_USER_{USER_ID}_{TIMESTAMP}"
-                    try:
-                        revoke_timestamp_str = revoke_jti.split('_')[-1]
-                        revoke_timestamp = datetime.strptime(revoke_timestamp_str, "%Y%m%d%H%M%S")
-                        
-                        # Converte token_iat (epoch seconds) para datetime
-                        token_time = datetime.fromtimestamp(int(token_iat), tz=timezone.utc)
-                        
-                        # Se o token foi criado antes da revogação, considera revogado
-                        if token_time <= revoke_timestamp.replace(tzinfo=timezone.utc):
-                            with _cache_lock:
-                                _token_cache[cache_key] = (True, datetime.now())
-                            return True
-                        else:
-                            # Token válido, cachear como não revogado
-                            with _cache_lock:
-                                _token_cache[cache_key] = (False, datetime.now())
-                            return False
-                            
-                    except (ValueError, IndexError) as e:
-                        # ALTERAÇÃO: Logging estruturado
-                        logger.warning(f"Erro ao processar timestamp de revogação para user {user_sub}: {e}", exc_info=True)
-                        # Se não conseguir extrair o timestamp, considera revogado por segurança
-                        with _cache_lock:
-                            _token_cache[cache_key] = (True, datetime.now())
-                        return True
-                        
+                watermark = _get_user_revocation_watermark(cur, user_sub)
+                # Se o token foi criado até a revogação, considera revogado
+                revoked = watermark is not None and int(token_iat) <= watermark
+                _cache_token_status(jti, user_sub, revoked)
+                return revoked
             except fdb.Error as e:
                 # ALTERAÇÃO: Logging estruturado
                 logger.error(f"Erro ao verificar revogação global do usuário {user_sub}: {e}", exc_info=True)
@@ -252,8 +262,7 @@ def is_token_revoked(jwt_payload):
                 pass
         
         # Token não revogado, cachear resultado
-        with _cache_lock:
-            _token_cache[cache_key] = (False, datetime.now())
+        _cache_token_status(jti, user_sub, False)
         return False  
     except fdb.Error as e:  
         # ALTERAÇÃO: Logging estruturado
@@ -266,38 +275,37 @@ def is_token_revoked(jwt_payload):
 
 def revoke_all_tokens_for_user(user_id):
     """Marca todos os tokens do usuário como revogados a partir de agora.
-    Usa a tabela TOKEN_BLACKLIST existente com um token especial para marcar a revogação global.
+    Grava REVOKED_AT (UTC) em USER_TOKEN_REVOCATIONS, uma linha por usuário.
     """
     conn = None
     try:
         conn = get_db_connection()
         cur = conn.cursor()
         
-        # Cria um token especial para marcar a revogação global do usuário
-        # Formato: "REVOKE_USER_{USER_ID}_{TIMESTAMP}"
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        special_jti = f"REVOKE_USER_{user_id}_{timestamp}"
-        
-        # Adiciona o token especial à blacklist com expiração longa (1 ano)
-        expires_at = datetime.now().replace(year=datetime.now().year + 1)
-        
-        # Verifica se já existe um token de revogação para este usuário
-        cur.execute("SELECT FIRST 1 JTI FROM TOKEN_BLACKLIST WHERE JTI LIKE ?", (f"REVOKE_USER_{user_id}_%",))
-        existing_revoke = cur.fetchone()
-        
-        if existing_revoke:
-            # Remove o token de revogação antigo
-            cur.execute("DELETE FROM TOKEN_BLACKLIST WHERE JTI = ?", (existing_revoke[0],))
-            # ALTERAÇÃO: Logging estruturado
-            logger.info(f"Token de revogação antigo removido para user_id {user_id}")
-        
-        # OTIMIZAÇÃO: Invalida cache de tokens deste usuário antes de adicionar novo token de revogação
+        # OTIMIZAÇÃO: Invalida cache de tokens deste usuário antes de gravar a nova revogação
         _invalidate_token_cache(user_id=user_id)
         
-        # Adiciona o novo token de revogação
-        cur.execute("INSERT INTO TOKEN_BLACKLIST (JTI, EXPIRES_AT) VALUES (?, ?)", (special_jti, expires_at))
+        if _use_revocations_table():
+            # Tokens com iat até este instante (UTC, precisão de segundos) ficam revogados
+            revoked_at = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+            cur.execute(
+                "UPDATE OR INSERT INTO USER_TOKEN_REVOCATIONS (USER_ID, REVOKED_AT) VALUES (?, ?) MATCHING (USER_ID)",
+                (user_id, revoked_at)
+            )
+            watermark = watermark_from_datetime(revoked_at)
+        else:
+            # Legado: token especial "REVOKE_USER_{USER_ID}_{TIMESTAMP}" em TOKEN_BLACKLIST
+            # (até a aplicação da migração create_user_token_revocations.sql)
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            special_jti = f"REVOKE_USER_{user_id}_{timestamp}"
+            # Expiração longa (1 ano)
+            expires_at = datetime.now().replace(year=datetime.now().year + 1)
+            cur.execute("DELETE FROM TOKEN_BLACKLIST WHERE JTI LIKE ?", (f"REVOKE_USER_{user_id}_%",))
+            cur.execute("INSERT INTO TOKEN_BLACKLIST (JTI, EXPIRES_AT) VALUES (?, ?)", (special_jti, expires_at))
+            watermark = parse_revoke_watermark(special_jti)
         
         conn.commit()
+        get_revocation_index().set_user_watermark(user_id, watermark)
         # ALTERAÇÃO: Logging estruturado (não expõe JTI completo por segurança)
         logger.info(f"Tokens do usuário {user_id} revogados com sucesso")
         return True
@@ -310,20 +318,26 @@ def revoke_all_tokens_for_user(user_id):
         if conn: conn.close()
 
 def clear_user_revoke_tokens(user_id):
-    """Remove tokens de revogação antigos quando o usuário faz login novamente."""
+    """Remove a revogação global do usuário quando ele faz login novamente."""
     conn = None
     try:
         conn = get_db_connection()
         cur = conn.cursor()
         
-        # Remove todos os tokens de revogação para este usuário
-        cur.execute("DELETE FROM TOKEN_BLACKLIST WHERE JTI LIKE ?", (f"REVOKE_USER_{user_id}_%",))
+        if _use_revocations_table():
+            cur.execute("DELETE FROM USER_TOKEN_REVOCATIONS WHERE USER_ID = ?", (user_id,))
+        else:
+            # Legado: remove todos os tokens especiais de revogação deste usuário
+            cur.execute("DELETE FROM TOKEN_BLACKLIST WHERE JTI LIKE ?", (f"REVOKE_USER_{user_id}_%",))
         deleted_count = cur.rowcount
         
         if deleted_count > 0:
             conn.commit()
+            get_revocation_index().clear_user_watermark(user_id)
+            # Status de revogação cacheado para os tokens deste usuário deixou de valer
+            _invalidate_token_cache(user_id=user_id)
             # ALTERAÇÃO: Logging estruturado
-            logger.info(f"Removidos {deleted_count} tokens de revogação antigos para o usuário {user_id}")
+            logger.info(f"Revogação global removida para o usuário {user_id}")
         
         return True
     except fdb.Error as e:
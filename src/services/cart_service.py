@@ -1,4 +1,4 @@
-from ..database import get_db_connection
+from ..database import get_db_connection, bulk_execute
 from . import stock_service, promotion_service
 import fdb
 import logging
@@ -7,6 +7,32 @@ from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Extras (TYPE='extra') e modificações de base (TYPE='base') de um item do carrinho
+_INSERT_CART_ITEM_EXTRA_SQL = (
+    "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_CART_ITEM_EXTRA_TYPES = ['INTEGER', 'INTEGER', 'INTEGER', 'VARCHAR(10)', 'INTEGER', 'DECIMAL(10,2)']
+
+
+def _get_available_ingredient_prices(cur, ingredient_ids):
+    """Preço adicional (ou preço) dos ingredientes disponíveis, em uma única query: {id: preço}"""
+    ids = set()
+    for ingredient_id in ingredient_ids:
+        try:
+            ids.add(int(ingredient_id))
+        except (ValueError, TypeError):
+            continue
+    ingredient_ids = list(ids)
+    if not ingredient_ids:
+        return {}
+    placeholders = ', '.join(['?' for _ in ingredient_ids])
+    cur.execute(
+        f"SELECT ID, COALESCE(ADDITIONAL_PRICE, PRICE) FROM INGREDIENTS WHERE ID IN ({placeholders}) AND IS_AVAILABLE = TRUE;",
+        tuple(ingredient_ids)
+    )
+    return {row[0]: float(row[1] or 0.0) for row in cur.fetchall()}
+
 def _validate_cart_id(cart_id):
     """Valida se cart_id é um inteiro válido e converte se necessário"""
     # Converte para inteiro se for string
@@ -746,6 +772,8 @@ def add_item_to_cart(user_id, product_id, quantity, extras=None, notes=None, bas
             # OTIMIZAÇÃO: Busca preços de ingredientes em batch ao invés de queries individuais
             # Adiciona extras se fornecidos (TYPE='extra')
             # IMPORTANTE: Inserir extras e base_modifications ANTES de criar reservas temporárias
+            # OTIMIZAÇÃO DE PERFORMANCE: linhas acumuladas e gravadas em lote (bulk_execute)
+            extra_rows = []
             if extras:
                 logger.info(f"[add_item_to_cart] Processando {len(extras)} extras para item {new_item_id}")
                 # Coleta IDs de ingredientes e busca preços de uma vez
@@ -785,11 +813,7 @@ def add_item_to_cart(user_id, product_id, quantity, extras=None, notes=None, bas
                             ingredient_prices[ingredient_id] = unit_price  # Adiciona ao cache
                     
                     if unit_price > 0:  # Só insere se ingrediente existe e tem preço
-                        sql_extra = (
-                            "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) "
-                            "VALUES (?, ?, ?, 'extra', ?, ?);"
-                        )
-                        cur.execute(sql_extra, (new_item_id, ingredient_id, extra_quantity, extra_quantity, unit_price))
+                        extra_rows.append((new_item_id, ingredient_id, extra_quantity, 'extra', extra_quantity, unit_price))
                         extras_inserted += 1
                         logger.info(f"[add_item_to_cart] Extra inserido: item_id={new_item_id}, ingredient_id={ingredient_id}, quantity={extra_quantity}, price={unit_price}")
                     else:
@@ -921,10 +945,10 @@ def add_item_to_cart(user_id, product_id, quantity, extras=None, notes=None, bas
                     
                     unit_price = base_mod_prices.get(ing_id, 0.0)
                     if unit_price >= 0:  # Permite preço zero
-                        cur.execute(
-                            "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, 0, 'base', ?, ?);",
-                            (new_item_id, ing_id, delta, unit_price)
-                        )
+                        extra_rows.append((new_item_id, ing_id, 0, 'base', delta, unit_price))
+
+            if extra_rows:
+                bulk_execute(cur, _INSERT_CART_ITEM_EXTRA_SQL, extra_rows, _CART_ITEM_EXTRA_TYPES)
             
             # NOVA INTEGRAÇÃO: Cria reservas temporárias para o novo item APÓS inserir todos os dados
             # (extras e base_modifications já foram inseridos)
@@ -1204,6 +1228,8 @@ def add_item_to_cart_by_cart_id(cart_id, product_id, quantity, extras=None, note
             cur.execute(sql, (cart_id, product_id, quantity, notes))
             new_item_id = cur.fetchone()[0]
 
+            # OTIMIZAÇÃO DE PERFORMANCE: linhas acumuladas e gravadas em lote (bulk_execute)
+            extra_rows = []
             # OTIMIZAÇÃO: Busca preços de ingredientes em batch
             if extras:
                 # Coleta IDs de ingredientes e busca preços de uma vez
@@ -1227,10 +1253,7 @@ def add_item_to_cart_by_cart_id(cart_id, product_id, quantity, extras=None, note
                     
                     unit_price = ingredient_prices.get(ingredient_id, 0.0)
                     if unit_price > 0:  # Só insere se ingrediente existe e tem preço
-                        cur.execute(
-                            "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, ?, 'extra', ?, ?);",
-                            (new_item_id, ingredient_id, extra_quantity, extra_quantity, unit_price)
-                        )
+                        extra_rows.append((new_item_id, ingredient_id, extra_quantity, 'extra', extra_quantity, unit_price))
 
             if base_modifications:
                 rules = _get_product_rules(cur, product_id)
@@ -1269,10 +1292,10 @@ def add_item_to_cart_by_cart_id(cart_id, product_id, quantity, extras=None, note
                     
                     unit_price = base_mod_prices.get(ing_id, 0.0)
                     if unit_price >= 0:  # Permite preço zero
-                        cur.execute(
-                            "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, 0, 'base', ?, ?);",
-                            (new_item_id, ing_id, delta, unit_price)
-                        )
+                        extra_rows.append((new_item_id, ing_id, 0, 'base', delta, unit_price))
+
+            if extra_rows:
+                bulk_execute(cur, _INSERT_CART_ITEM_EXTRA_SQL, extra_rows, _CART_ITEM_EXTRA_TYPES)
             
             # NOVA INTEGRAÇÃO: Cria reservas temporárias para o novo item APÓS inserir todos os dados (visitante)
             # (extras e base_modifications já foram inseridos)
@@ -1553,19 +1576,21 @@ def update_cart_item(user_id, cart_item_id, quantity=None, extras=None, notes=No
             
             # Remove e recria apenas linhas TYPE='extra'
             cur.execute("DELETE FROM CART_ITEM_EXTRAS WHERE CART_ITEM_ID = ? AND TYPE = 'extra';", (cart_item_id,))
+            # OTIMIZAÇÃO DE PERFORMANCE: preços em uma query e extras gravados em lote
+            prices = _get_available_ingredient_prices(cur, [ex.get("ingredient_id") for ex in extras])
+            extra_rows = []
             for extra in extras:
-                ingredient_id = extra.get("ingredient_id")
+                try:
+                    ingredient_id = int(extra.get("ingredient_id"))
+                except (ValueError, TypeError):
+                    continue
                 extra_quantity_total = int(extra.get("quantity", 1))  # CORREÇÃO: quantity é o total
                 if extra_quantity_total <= 0:
                     continue
-                cur.execute("SELECT COALESCE(ADDITIONAL_PRICE, PRICE) FROM INGREDIENTS WHERE ID = ? AND IS_AVAILABLE = TRUE;", (ingredient_id,))
-                rowp = cur.fetchone()
-                if rowp:
-                    unit_price = float(rowp[0] or 0.0)
-                    cur.execute(
-                        "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, ?, 'extra', ?, ?);",
-                        (cart_item_id, ingredient_id, extra_quantity_total, extra_quantity_total, unit_price)
-                    )
+                if ingredient_id in prices:
+                    extra_rows.append((cart_item_id, ingredient_id, extra_quantity_total, 'extra', extra_quantity_total, prices[ingredient_id]))
+            if extra_rows:
+                bulk_execute(cur, _INSERT_CART_ITEM_EXTRA_SQL, extra_rows, _CART_ITEM_EXTRA_TYPES)
         
         # Atualiza base_modifications se fornecido
         if base_modifications is not None:
@@ -1574,6 +1599,7 @@ def update_cart_item(user_id, cart_item_id, quantity=None, extras=None, notes=No
             # ALTERAÇÃO: Usa product_id já obtido acima (evita query duplicada)
             product_id = item_product_id
             rules = _get_product_rules(cur, product_id)
+            base_rows = []
             for bm in base_modifications:
                 try:
                     ing_id = int(bm.get("ingredient_id"))
@@ -1583,12 +1609,14 @@ def update_cart_item(user_id, cart_item_id, quantity=None, extras=None, notes=No
                 rule = rules.get(ing_id)
                 if not rule or float(rule["portions"]) == 0.0 or delta == 0:
                     continue
-                cur.execute("SELECT COALESCE(ADDITIONAL_PRICE, PRICE) FROM INGREDIENTS WHERE ID = ? AND IS_AVAILABLE = TRUE;", (ing_id,))
-                rowp = cur.fetchone()
-                unit_price = float(rowp[0] or 0.0) if rowp else 0.0
-                cur.execute(
-                    "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, 0, 'base', ?, ?);",
-                    (cart_item_id, ing_id, delta, unit_price)
+                base_rows.append((ing_id, delta))
+            # OTIMIZAÇÃO DE PERFORMANCE: preços em uma query e modificações gravadas em lote
+            if base_rows:
+                prices = _get_available_ingredient_prices(cur, [ing_id for ing_id, _ in base_rows])
+                bulk_execute(
+                    cur, _INSERT_CART_ITEM_EXTRA_SQL,
+                    [(cart_item_id, ing_id, 0, 'base', delta, prices.get(ing_id, 0.0)) for ing_id, delta in base_rows],
+                    _CART_ITEM_EXTRA_TYPES
                 )
         
         # ALTERAÇÃO: Recria reservas temporárias APENAS UMA VEZ após todas as atualizações
@@ -1774,19 +1802,21 @@ def update_cart_item_by_cart(cart_id, cart_item_id, quantity=None, extras=None,
 
             # Remove e recria apenas TYPE='extra'
             cur.execute("DELETE FROM CART_ITEM_EXTRAS WHERE CART_ITEM_ID = ? AND TYPE = 'extra';", (cart_item_id,))
+            # OTIMIZAÇÃO DE PERFORMANCE: preços em uma query e extras gravados em lote
+            prices = _get_available_ingredient_prices(cur, [ex.get("ingredient_id") for ex in extras])
+            extra_rows = []
             for extra in extras:
-                ingredient_id = extra.get("ingredient_id")
+                try:
+                    ingredient_id = int(extra.get("ingredient_id"))
+                except (ValueError, TypeError):
+                    continue
                 extra_quantity = int(extra.get("quantity", 1))
                 if extra_quantity <= 0:
                     continue
-                cur.execute("SELECT COALESCE(ADDITIONAL_PRICE, PRICE) FROM INGREDIENTS WHERE ID = ? AND IS_AVAILABLE = TRUE;", (ingredient_id,))
-                rowp = cur.fetchone()
-                if rowp:
-                    unit_price = float(rowp[0] or 0.0)
-                    cur.execute(
-                        "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, ?, 'extra', ?, ?);",
-                        (cart_item_id, ingredient_id, extra_quantity, extra_quantity, unit_price)
-                    )
+                if ingredient_id in prices:
+                    extra_rows.append((cart_item_id, ingredient_id, extra_quantity, 'extra', extra_quantity, prices[ingredient_id]))
+            if extra_rows:
+                bulk_execute(cur, _INSERT_CART_ITEM_EXTRA_SQL, extra_rows, _CART_ITEM_EXTRA_TYPES)
 
         # Atualiza base_modifications se fornecido
         if base_modifications is not None:
@@ -1794,6 +1824,7 @@ def update_cart_item_by_cart(cart_id, cart_item_id, quantity=None, extras=None,
             # ALTERAÇÃO: Usa product_id já obtido acima (evita query duplicada)
             product_id = item_product_id
             rules = _get_product_rules(cur, product_id)
+            base_rows = []
             for bm in base_modifications:
                 try:
                     ing_id = int(bm.get("ingredient_id"))
@@ -1803,12 +1834,14 @@ def update_cart_item_by_cart(cart_id, cart_item_id, quantity=None, extras=None,
                 rule = rules.get(ing_id)
                 if not rule or float(rule["portions"]) == 0.0 or delta == 0:
                     continue
-                cur.execute("SELECT COALESCE(ADDITIONAL_PRICE, PRICE) FROM INGREDIENTS WHERE ID = ? AND IS_AVAILABLE = TRUE;", (ing_id,))
-                rowp = cur.fetchone()
-                unit_price = float(rowp[0] or 0.0) if rowp else 0.0
-                cur.execute(
-                    "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, 0, 'base', ?, ?);",
-                    (cart_item_id, ing_id, delta, unit_price)
+                base_rows.append((ing_id, delta))
+            # OTIMIZAÇÃO DE PERFORMANCE: preços em uma query e modificações gravadas em lote
+            if base_rows:
+                prices = _get_available_ingredient_prices(cur, [ing_id for ing_id, _ in base_rows])
+                bulk_execute(
+                    cur, _INSERT_CART_ITEM_EXTRA_SQL,
+                    [(cart_item_id, ing_id, 0, 'base', delta, prices.get(ing_id, 0.0)) for ing_id, delta in base_rows],
+                    _CART_ITEM_EXTRA_TYPES
                 )
         
         # ALTERAÇÃO: Recria reservas temporárias APENAS UMA VEZ após todas as atualizações (visitante)
@@ -3049,25 +3082,27 @@ def claim_guest_cart(guest_cart_id, user_id):
                 )
                 new_user_item_id = cur.fetchone()[0]
                 
-                # Insere extras (TYPE='extra')
-                for ex in extras:
-                    cur.execute("SELECT COALESCE(ADDITIONAL_PRICE, PRICE) FROM INGREDIENTS WHERE ID = ?;", (ex["ingredient_id"],))
-                    price_row = cur.fetchone()
-                    unit_price = float(price_row[0] or 0.0) if price_row else 0.0
+                # OTIMIZAÇÃO DE PERFORMANCE: preços em uma query e extras/base gravados em lote
+                ingredient_ids = list({r["ingredient_id"] for r in extras + base_modifications})
+                prices = {}
+                if ingredient_ids:
+                    placeholders = ', '.join(['?' for _ in ingredient_ids])
                     cur.execute(
-                        "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, ?, 'extra', ?, ?);",
-                        (new_user_item_id, ex["ingredient_id"], ex["quantity"], ex["quantity"], unit_price)
-                    )
-                
-                # Insere base_modifications (TYPE='base')
-                for bm in base_modifications:
-                    cur.execute("SELECT COALESCE(ADDITIONAL_PRICE, PRICE) FROM INGREDIENTS WHERE ID = ?;", (bm["ingredient_id"],))
-                    price_row = cur.fetchone()
-                    unit_price = float(price_row[0] or 0.0) if price_row else 0.0
-                    cur.execute(
-                        "INSERT INTO CART_ITEM_EXTRAS (CART_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, 0, 'base', ?, ?);",
-                        (new_user_item_id, bm["ingredient_id"], bm["delta"], unit_price)
+                        f"SELECT ID, COALESCE(ADDITIONAL_PRICE, PRICE) FROM INGREDIENTS WHERE ID IN ({placeholders});",
+                        tuple(ingredient_ids)
                     )
+                    prices = {row[0]: float(row[1] or 0.0) for row in cur.fetchall()}
+
+                extra_rows = [
+                    (new_user_item_id, ex["ingredient_id"], ex["quantity"], 'extra', ex["quantity"], prices.get(ex["ingredient_id"], 0.0))
+                    for ex in extras
+                ]
+                extra_rows.extend(
+                    (new_user_item_id, bm["ingredient_id"], 0, 'base', bm["delta"], prices.get(bm["ingredient_id"], 0.0))
+                    for bm in base_modifications
+                )
+                if extra_rows:
+                    bulk_execute(cur, _INSERT_CART_ITEM_EXTRA_SQL, extra_rows, _CART_ITEM_EXTRA_TYPES)
 
         # CORREÇÃO: Recria reservas temporárias para o carrinho do usuário após mesclar itens
         # Isso garante que as reservas do carrinho visitante sejam transferidas para o carrinho autenticado
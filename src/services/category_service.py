@@ -1,38 +1,41 @@
 import fdb
 from ..database import get_db_connection
-from datetime import datetime
+from ..utils.keyset_pagination import KeysetPage, count_total, build_pagination, TOTAL_MODE_EXACT
+from ..utils.cache_manager import get_cache_manager
+from ..utils.response_cache import bump_data_version, CATALOG
 
-# OTIMIZAÇÃO DE PERFORMANCE: Cache em memória para listas de categorias
-_category_list_cache = {}
-_category_list_cache_timestamp = {}
-_category_list_cache_ttl = 600  # 10 minutos de TTL (categorias mudam menos frequentemente)
+# OTIMIZAÇÃO DE PERFORMANCE: Cache de listas de categorias no namespace 'categories' do CacheManager
+# (listagens, select e reordenação; TTL de 10 minutos, pois categorias mudam menos frequentemente)
+_category_cache = get_cache_manager().namespace('categories', ttl=600)
 
 def _invalidate_category_cache():
     """Invalida cache de categorias forçando refresh na próxima chamada"""
-    global _category_list_cache, _category_list_cache_timestamp
-    _category_list_cache = {}
-    _category_list_cache_timestamp = {}
-    # Também invalida caches específicos
-    if "_categories_for_select" in _category_list_cache:
-        del _category_list_cache["_categories_for_select"]
-    if "_categories_for_select_timestamp" in _category_list_cache_timestamp:
-        del _category_list_cache_timestamp["_categories_for_select_timestamp"]
-    if "_categories_for_reorder" in _category_list_cache:
-        del _category_list_cache["_categories_for_reorder"]
-    if "_categories_for_reorder_timestamp" in _category_list_cache_timestamp:
-        del _category_list_cache_timestamp["_categories_for_reorder_timestamp"]
-
-def _get_category_cache_key(name_filter, page, page_size):
+    _category_cache.clear()
+    bump_data_version(CATALOG)
+
+def _get_category_cache_key(name_filter, page, page_size, cursor=None, total_mode=TOTAL_MODE_EXACT):
     """Gera chave única para o cache baseada nos parâmetros"""
-    return f"{name_filter or ''}_{page}_{page_size}"
+    return f"list:{name_filter or ''}_{page}_{page_size}_{total_mode}_{cursor or ''}"
+
+def _get_cached_categories(cache_key):
+    """Retorna o valor em cache (None se ausente/expirado)"""
+    return _category_cache.get(cache_key)
+
+def _set_cached_categories(cache_key, value, tags=None):
+    """Salva no namespace de categorias"""
+    _category_cache.set(cache_key, value, tags=tags)
 
-def _is_category_cache_valid(cache_key):
-    """Verifica se o cache ainda é válido"""
-    if cache_key not in _category_list_cache_timestamp:
-        return False
-    elapsed = (datetime.now() - _category_list_cache_timestamp[cache_key]).total_seconds()
-    return elapsed < _category_list_cache_ttl
+# Categorias com produtos embutidos (tela inicial do mobile): também invalidadas quando produtos mudam
+_WITH_PRODUCTS_TAG = 'with_products'
 
+def _invalidate_categories_with_products_cache():
+    """Invalida apenas as entradas de categorias com produtos"""
+    _category_cache.invalidate_tags(_WITH_PRODUCTS_TAG)
+
+def warm_cache():
+    """Pré-carrega categorias com produtos (warm-up). Retorna False se a consulta falhou"""
+    result, error_code, _ = get_categories_with_products()
+    return result is not None
 
 def create_category(category_data):
     name = (category_data.get('name') or '').strip()
@@ -71,10 +74,11 @@ def create_category(category_data):
         if conn: conn.close()
 
 
-def list_categories(name_filter=None, page=1, page_size=10):
+def list_categories(name_filter=None, page=1, page_size=10, cursor=None, total_mode=TOTAL_MODE_EXACT):
     """
     Lista categorias com cache em memória para melhor performance.
     Cache TTL: 10 minutos. Invalidado automaticamente quando categorias são modificadas.
+    Suporta paginação por cursor (keyset em DISPLAY_ORDER, NAME, ID).
     """
     # OTIMIZAÇÃO: Usar validador centralizado de paginação
     from ..utils.validators import validate_pagination_params
@@ -82,61 +86,55 @@ def list_categories(name_filter=None, page=1, page_size=10):
         page, page_size, offset = validate_pagination_params(page, page_size, max_page_size=100)
     except ValueError:
         page, page_size, offset = 1, 10, 0
+    keyset = KeysetPage(
+        [("COALESCE(DISPLAY_ORDER, 0)", "ASC"), ("NAME", "ASC"), ("ID", "ASC")],
+        page_size, cursor, offset
+    )
 
     # OTIMIZAÇÃO: Verifica cache antes de consultar banco
     # Cache apenas para listagens sem filtro de nome
     use_cache = not name_filter
-    cache_key = _get_category_cache_key(name_filter, page, page_size)
+    cache_key = _get_category_cache_key(name_filter, page, page_size, cursor, total_mode)
     
-    if use_cache and _is_category_cache_valid(cache_key) and cache_key in _category_list_cache:
-        return _category_list_cache[cache_key]
+    if use_cache:
+        cached_result = _get_cached_categories(cache_key)
+        if cached_result is not None:
+            return cached_result
 
     conn = None
     try:
         conn = get_db_connection()
         cur = conn.cursor()
 
+        where_sql = "IS_ACTIVE = TRUE"
+        params = []
         if name_filter:
-            cur.execute(
-                "SELECT COUNT(*) FROM CATEGORIES WHERE IS_ACTIVE = TRUE AND UPPER(NAME) LIKE UPPER(?);",
-                (f"%{name_filter}%",)
-            )
-        else:
-            cur.execute("SELECT COUNT(*) FROM CATEGORIES WHERE IS_ACTIVE = TRUE;")
-        total = cur.fetchone()[0] or 0
+            where_sql += " AND UPPER(NAME) LIKE UPPER(?)"
+            params.append(f"%{name_filter}%")
+        total = count_total(cur, f"SELECT COUNT(*) FROM CATEGORIES WHERE {where_sql};", params, total_mode)
 
-        if name_filter:
-            cur.execute(
-                f"SELECT FIRST {page_size} SKIP {offset} ID, NAME, DISPLAY_ORDER "
-                "FROM CATEGORIES "
-                "WHERE IS_ACTIVE = TRUE AND UPPER(NAME) LIKE UPPER(?) "
-                "ORDER BY DISPLAY_ORDER, NAME;",
-                (f"%{name_filter}%",)
-            )
-        else:
-            cur.execute(
-                f"SELECT FIRST {page_size} SKIP {offset} ID, NAME, DISPLAY_ORDER "
-                "FROM CATEGORIES "
-                "WHERE IS_ACTIVE = TRUE "
-                "ORDER BY DISPLAY_ORDER, NAME;"
-            )
-        items = [{"id": row[0], "name": row[1], "display_order": row[2]} for row in cur.fetchall()]
+        # OTIMIZAÇÃO DE PERFORMANCE: keyset (DISPLAY_ORDER, NAME, ID) em vez de SKIP
+        keyset_sql, keyset_params = keyset.where()
+        cur.execute(
+            f"SELECT {keyset.select_prefix()} ID, NAME, DISPLAY_ORDER "
+            "FROM CATEGORIES "
+            f"WHERE {where_sql} AND {keyset_sql} "
+            f"ORDER BY {keyset.order_by_sql()};",
+            tuple(params) + tuple(keyset_params)
+        )
+        rows, next_cursor = keyset.paginate(
+            cur.fetchall(), lambda row: (row[2] if row[2] is not None else 0, row[1], row[0])
+        )
+        items = [{"id": row[0], "name": row[1], "display_order": row[2]} for row in rows]
 
-        total_pages = (total + page_size - 1) // page_size
         result = {
             "items": items,
-            "pagination": {
-                "total": total,
-                "page": page,
-                "page_size": page_size,
-                "total_pages": total_pages
-            }
+            "pagination": build_pagination(page, page_size, total, next_cursor)
         }
         
         # OTIMIZAÇÃO: Salva resultado no cache se for cacheável
         if use_cache:
-            _category_list_cache[cache_key] = result
-            _category_list_cache_timestamp[cache_key] = datetime.now()
+            _set_cached_categories(cache_key, result)
         
         return result
     except fdb.Error as e:
@@ -329,16 +327,12 @@ def get_categories_for_reorder():
     OTIMIZAÇÃO DE PERFORMANCE: Usa cache para reduzir queries ao banco.
     """
     # OTIMIZAÇÃO: Cache específico para categorias de reordenação
-    cache_key_reorder = "_categories_for_reorder"
-    cache_key_timestamp_reorder = "_categories_for_reorder_timestamp"
+    cache_key_reorder = "for_reorder"
     
     # Verifica cache (TTL de 10 minutos)
-    if cache_key_reorder in _category_list_cache:
-        cache_timestamp = _category_list_cache_timestamp.get(cache_key_timestamp_reorder)
-        if cache_timestamp:
-            elapsed = (datetime.now() - cache_timestamp).total_seconds()
-            if elapsed < _category_list_cache_ttl:
-                return (_category_list_cache[cache_key_reorder], None, None)
+    cached_categories = _get_cached_categories(cache_key_reorder)
+    if cached_categories is not None:
+        return (cached_categories, None, None)
     
     conn = None
     try:
@@ -354,8 +348,7 @@ def get_categories_for_reorder():
         ]
         
         # OTIMIZAÇÃO: Salva no cache
-        _category_list_cache[cache_key_reorder] = categories
-        _category_list_cache_timestamp[cache_key_timestamp_reorder] = datetime.now()
+        _set_cached_categories(cache_key_reorder, categories)
         
         return (categories, None, None)
         
@@ -378,16 +371,12 @@ def get_categories_for_select():
     Esta função é chamada frequentemente em formulários e selects.
     """
     # OTIMIZAÇÃO: Cache específico para categorias de select (mais leve, sem paginação)
-    cache_key_select = "_categories_for_select"
-    cache_key_timestamp_select = "_categories_for_select_timestamp"
+    cache_key_select = "for_select"
     
     # Verifica cache (TTL de 10 minutos, mesmo das listagens)
-    if cache_key_select in _category_list_cache:
-        cache_timestamp = _category_list_cache_timestamp.get(cache_key_timestamp_select)
-        if cache_timestamp:
-            elapsed = (datetime.now() - cache_timestamp).total_seconds()
-            if elapsed < _category_list_cache_ttl:
-                return (_category_list_cache[cache_key_select], None, None)
+    cached_categories = _get_cached_categories(cache_key_select)
+    if cached_categories is not None:
+        return (cached_categories, None, None)
     
     conn = None
     try:
@@ -403,8 +392,7 @@ def get_categories_for_select():
         ]
         
         # OTIMIZAÇÃO: Salva no cache
-        _category_list_cache[cache_key_select] = categories
-        _category_list_cache_timestamp[cache_key_timestamp_select] = datetime.now()
+        _set_cached_categories(cache_key_select, categories)
         
         return (categories, None, None)
         
@@ -504,6 +492,11 @@ def get_categories_with_products(include_inactive=False):
     Útil para a tela inicial do mobile que precisa mostrar todas as categorias e produtos.
     Retorna (resultado, error_code, mensagem)
     """
+    cache_key = f"with_products:{bool(include_inactive)}"
+    cached = _get_cached_categories(cache_key)
+    if cached is not None:
+        return (cached, None, None)
+    
     conn = None
     try:
         conn = get_db_connection()
@@ -574,6 +567,7 @@ def get_categories_with_products(include_inactive=False):
             }
             result.append(category)
         
+        _set_cached_categories(cache_key, result, tags=[_WITH_PRODUCTS_TAG])
         return (result, None, None)
         
     except fdb.Error as e:
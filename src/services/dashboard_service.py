@@ -1,44 +1,34 @@
 import fdb  
 import logging
 from datetime import datetime, date, timedelta
-from ..database import get_db_connection
+from ..database import get_reporting_connection
+from ..utils.cache_manager import get_cache_manager
 from . import settings_service  # ALTERAÇÃO: Import para buscar meta mensal
 
 logger = logging.getLogger(__name__)
 
-# OTIMIZAÇÃO DE PERFORMANCE: Cache de métricas do dashboard
-_dashboard_metrics_cache = None
-_dashboard_cache_timestamp = None
-_dashboard_cache_ttl = 60  # 1 minuto de TTL (métricas mudam frequentemente)
-
-def _is_dashboard_cache_valid():
-    """Verifica se o cache de métricas ainda é válido"""
-    global _dashboard_cache_timestamp
-    if _dashboard_cache_timestamp is None:
-        return False
-    elapsed = (datetime.now() - _dashboard_cache_timestamp).total_seconds()
-    return elapsed < _dashboard_cache_ttl
+# OTIMIZAÇÃO DE PERFORMANCE: Cache de métricas no namespace 'dashboard' do CacheManager
+# (TTL de 1 minuto, ajustável por CACHE_NAMESPACE_TTLS; métricas em /api/dashboard/cache/namespaces)
+_DASHBOARD_METRICS_CACHE_KEY = 'metrics'
+_dashboard_cache = get_cache_manager().namespace('dashboard', ttl=60, max_entries=16)
 
 def _invalidate_dashboard_cache():
     """Invalida o cache de métricas forçando refresh na próxima chamada"""
-    global _dashboard_metrics_cache, _dashboard_cache_timestamp
-    _dashboard_metrics_cache = None
-    _dashboard_cache_timestamp = None  
+    _dashboard_cache.clear()
 
 def get_dashboard_metrics():  
     """
     Retorna métricas do dashboard com cache de 1 minuto para melhor performance.
     Métricas são atualizadas frequentemente, então TTL curto é apropriado.
     """
-    global _dashboard_metrics_cache, _dashboard_cache_timestamp
-    
     # OTIMIZAÇÃO: Verifica cache antes de consultar banco
-    if _is_dashboard_cache_valid() and _dashboard_metrics_cache is not None:
-        return _dashboard_metrics_cache
+    cached = _dashboard_cache.get(_DASHBOARD_METRICS_CACHE_KEY)
+    if cached is not None:
+        return cached
     
     conn = None  
     try:  
-        conn = get_db_connection()  
+        conn = get_reporting_connection()  
         cur = conn.cursor()  
         
         # OTIMIZAÇÃO: Calcular range de datas (substitui DATE() por range para usar índices)
@@ -185,8 +175,7 @@ def get_dashboard_metrics():
         }
         
         # OTIMIZAÇÃO: Salva resultado no cache
-        _dashboard_metrics_cache = result
-        _dashboard_cache_timestamp = datetime.now()
+        _dashboard_cache.set(_DASHBOARD_METRICS_CACHE_KEY, result)
         
         return result
     except fdb.Error as e:  
@@ -216,7 +205,7 @@ def get_menu_dashboard_metrics():
     """
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         # Query consolidada para métricas de produtos
@@ -278,7 +267,7 @@ def get_promotions_dashboard_metrics():
     """
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         now = datetime.now()
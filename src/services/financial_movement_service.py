@@ -16,6 +16,7 @@ from datetime import datetime, date, timedelta
 from decimal import Decimal
 from ..database import get_db_connection
 from ..utils.cache_manager import get_cache_manager
+from ..utils.keyset_pagination import KeysetPage, count_total, parse_total_mode
 from .stock_service import _convert_unit
 
 logger = logging.getLogger(__name__)
@@ -36,6 +37,10 @@ CATEGORY_FIXED_COSTS = 'Custos Fixos'
 CATEGORY_TAXES = 'Tributos'
 CATEGORY_STOCK_PURCHASES = 'Compras de Estoque'
 
+# Tags de cache (invalidadas em _invalidate_financial_movements_cache)
+CACHE_TAG_FINANCIAL_MOVEMENTS = 'financial_movements'
+CACHE_TAG_CASH_FLOW_SUMMARY = 'cash_flow_summary'
+
 
 def _invalidate_financial_movements_cache():
     """
@@ -43,10 +48,9 @@ def _invalidate_financial_movements_cache():
     """
     try:
         cache = get_cache_manager()
-        # ALTERAÇÃO: Limpar todas as chaves de cache de movimentações
-        cache.clear_pattern('financial_movements:*')
-        # ALTERAÇÃO: Limpar também cache do resumo do fluxo de caixa
-        cache.clear_pattern('cash_flow_summary:*')
+        # OTIMIZAÇÃO DE PERFORMANCE: invalida por tag (listagens de movimentações e
+        # resumo do fluxo de caixa) sem varrer todas as chaves do cache
+        cache.invalidate_tags(CACHE_TAG_FINANCIAL_MOVEMENTS, CACHE_TAG_CASH_FLOW_SUMMARY)
         # ALTERAÇÃO: Log removido - não é necessário em produção
     except Exception as e:
         logger.warning(f"Erro ao invalidar cache de movimentações: {e}")
@@ -644,6 +648,8 @@ def get_financial_movements(filters=None):
             - related_entity_id: int
             - page: int (opcional, default: 1) - Número da página
             - page_size: int (opcional, default: 100) - Itens por página
+            - cursor: str (opcional) - Cursor opaco da próxima página (keyset)
+            - total_mode: 'exact' | 'approx' | 'none' (opcional) - Como calcular o total
     
     Returns:
         dict com:
@@ -839,13 +845,21 @@ def get_financial_movements(filters=None):
         # Calcular offset
         offset = (page - 1) * page_size
         
+        # OTIMIZAÇÃO DE PERFORMANCE: Paginação keyset (MOVEMENT_DATE, ID) quando há cursor
+        # Coluna pura (índice DESCENDING em (MOVEMENT_DATE, ID)); as linhas sem data vêm
+        # no fim, como segmento separado (ver KeysetPage.segments)
+        keyset = KeysetPage(
+            [("fm.MOVEMENT_DATE", "DESC", True), ("fm.ID", "DESC")],
+            page_size, filters.get('cursor') if filters else None, offset
+        )
+        total_mode = parse_total_mode(filters.get('total_mode') if filters else None)
+        
         # ALTERAÇÃO: Contar total de registros antes de aplicar paginação
         count_sql = "SELECT COUNT(*) FROM FINANCIAL_MOVEMENTS fm"
         if conditions:
             count_sql += " WHERE " + " AND ".join(conditions)
         
-        cur.execute(count_sql, params)
-        total_count = cur.fetchone()[0] or 0
+        total_count = count_total(cur, count_sql, params, total_mode)
         
         # ALTERAÇÃO: No Firebird, FIRST/SKIP deve vir logo após SELECT, não depois de ORDER BY
         # Reconstruir a query com FIRST/SKIP no lugar correto
@@ -865,33 +879,25 @@ def get_financial_movements(filters=None):
         # ALTERAÇÃO: Adicionar FIRST/SKIP logo após SELECT (sintaxe correta do Firebird)
         # CORREÇÃO SEGURANÇA: page_size e offset são validados e convertidos para int acima
         # Firebird não suporta parametrização de FIRST/SKIP, então f-string é necessário
-        # Garantir que são inteiros para evitar SQL injection
-        page_size = int(page_size)
-        offset = int(offset)
-        if offset > 0:
-            select_clause = f"SELECT FIRST {page_size} SKIP {offset}"
-        else:
-            select_clause = f"SELECT FIRST {page_size}"
-        
         from_clause = """
             FROM FINANCIAL_MOVEMENTS fm
             LEFT JOIN USERS u ON fm.CREATED_BY = u.ID
         """
         
-        # Construir query completa
-        base_sql = select_clause + fields_clause + from_clause
-        
-        # Aplicar condições
-        if conditions:
-            base_sql += " WHERE " + " AND ".join(conditions)
-        
-        # Adicionar ORDER BY
-        base_sql += " ORDER BY fm.MOVEMENT_DATE DESC NULLS LAST, fm.CREATED_AT DESC"
+        # Construir query completa (condições mais o predicado keyset de cada segmento)
+        def build_sql(select_prefix, keyset_sql):
+            return (
+                f"SELECT {select_prefix}" + fields_clause + from_clause
+                + " WHERE " + " AND ".join(conditions + [keyset_sql])
+                + f" ORDER BY {keyset.order_by_sql()}"
+            )
         
-        cur.execute(base_sql, params)
+        rows, next_cursor = keyset.paginate(
+            keyset.fetch(cur, build_sql, params), lambda row: (row[6], row[0])
+        )
         
         movements = []
-        for row in cur.fetchall():
+        for row in rows:
             movements.append({
                 "id": row[0],
                 "type": row[1],
@@ -917,19 +923,21 @@ def get_financial_movements(filters=None):
             })
         
         # ALTERAÇÃO: Calcular total de páginas
-        total_pages = (total_count + page_size - 1) // page_size if page_size > 0 else 0
+        total_pages = (total_count + page_size - 1) // page_size if total_count is not None else None
         
-        # ALTERAÇÃO: Retornar objeto com paginação
+        # ALTERAÇÃO: Retornar objeto com paginação (next_cursor para paginação keyset)
         result = {
             "items": movements,
             "total": total_count,
             "page": page,
             "page_size": page_size,
-            "total_pages": total_pages
+            "total_pages": total_pages,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         }
         
         # ALTERAÇÃO: Cachear resultado (TTL de 60 segundos)
-        cache.set(cache_key, result, ttl=60)
+        cache.set(cache_key, result, ttl=60, tags=[CACHE_TAG_FINANCIAL_MOVEMENTS])
         
         return result
         
@@ -1210,13 +1218,40 @@ def get_cash_flow_summary(period='this_month', include_pending=False):
     # Construir chave de cache baseada nos parâmetros
     cache_key = f"cash_flow_summary:{period}:{include_pending}"
     
-    # ALTERAÇÃO: Tentar obter do cache (TTL de 60 segundos para dados financeiros)
-    # Cache mais curto para garantir dados atualizados
-    cached_result = cache.get(cache_key)
-    if cached_result is not None:
-        # ALTERAÇÃO: Log removido - não é necessário em produção
-        return cached_result
+    # ALTERAÇÃO: TTL de 60 segundos para dados financeiros (cache mais curto para garantir dados atualizados)
+    # OTIMIZAÇÃO DE PERFORMANCE: ao expirar, um único cálculo por chave (as requisições
+    # concorrentes aguardam) e o valor anterior é servido por até 30s enquanto é recalculado.
+    # Escritas em movimentações invalidam a tag, então o valor velho só cobre a expiração por tempo.
+    try:
+        return cache.get_or_compute(
+            cache_key,
+            lambda: _calculate_cash_flow_summary(period, include_pending),
+            ttl=60,
+            tags=[CACHE_TAG_CASH_FLOW_SUMMARY],
+            stale_ttl=30
+        )
+    except fdb.Error as e:
+        # ALTERAÇÃO: Substituído print() por logger para código de produção
+        logger.error(f"Erro ao calcular resumo do fluxo de caixa: {e}", exc_info=True)
+        return {
+            "total_revenue": 0.0,
+            "total_expense": 0.0,
+            "total_cmv": 0.0,
+            "total_tax": 0.0,
+            "gross_profit": 0.0,
+            "net_profit": 0.0,
+            "cash_flow": 0.0,
+            "period": period
+        }
+
+
+def _calculate_cash_flow_summary(period, include_pending):
+    """
+    Calcula o resumo do fluxo de caixa no banco (sem cache).
     
+    Raises:
+        fdb.Error: em erro de banco (não é cacheado)
+    """
     conn = None
     try:
         conn = get_db_connection()
@@ -1420,24 +1455,7 @@ def get_cash_flow_summary(period='this_month', include_pending=False):
             
             result["pending_amount"] = pending_amount
         
-        # ALTERAÇÃO: Cachear resultado (TTL de 60 segundos)
-        cache.set(cache_key, result, ttl=60)
-        
         return result
-        
-    except fdb.Error as e:
-        # ALTERAÇÃO: Substituído print() por logger para código de produção
-        logger.error(f"Erro ao calcular resumo do fluxo de caixa: {e}", exc_info=True)
-        return {
-            "total_revenue": 0.0,
-            "total_expense": 0.0,
-            "total_cmv": 0.0,
-            "total_tax": 0.0,
-            "gross_profit": 0.0,
-            "net_profit": 0.0,
-            "cash_flow": 0.0,
-            "period": period
-        }
     finally:
         if conn:
             conn.close()
@@ -6,7 +6,7 @@ Separado para manter o código organizado
 import fdb
 import logging
 from datetime import datetime, date, timedelta
-from ..database import get_db_connection
+from ..database import get_reporting_connection
 from ..utils.report_formatters import calculate_growth_percentage, safe_divide
 from ..utils.chart_generators import generate_bar_chart, generate_pie_chart
 from ..utils.report_validators import validate_filters, validate_date_range
@@ -49,7 +49,7 @@ def generate_cmv_report(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         start_datetime = datetime.combine(start_dt.date(), datetime.min.time()) if isinstance(start_dt, date) else start_dt
@@ -230,7 +230,7 @@ def generate_taxes_report_data(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         start_datetime = datetime.combine(start_dt.date(), datetime.min.time()) if isinstance(start_dt, date) else start_dt
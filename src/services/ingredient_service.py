@@ -2,6 +2,8 @@ import fdb
 import logging
 from decimal import Decimal
 from ..database import get_db_connection
+from ..utils.response_cache import bump_data_version, CATALOG
+from ..utils.keyset_pagination import KeysetPage, count_total, TOTAL_MODE_EXACT
 
 # ALTERAÇÃO: Configurar logger estruturado para substituir print()
 logger = logging.getLogger(__name__)  
@@ -63,6 +65,7 @@ def create_ingredient(data):
         ))  
         row = cur.fetchone()  
         conn.commit()  
+        bump_data_version(CATALOG)
         return ({  
             "id": row[0], "name": row[1],  
             "price": float(row[2]) if row[2] is not None else 0.0,
@@ -90,13 +93,15 @@ def create_ingredient(data):
     finally:  
         if conn: conn.close()  
 
-def list_ingredients(name_filter=None, status_filter=None, category_filter=None, page=1, page_size=10):  
+def list_ingredients(name_filter=None, status_filter=None, category_filter=None, page=1, page_size=10, cursor=None, total_mode=TOTAL_MODE_EXACT):  
     # OTIMIZAÇÃO: Usar validador centralizado de paginação
     from ..utils.validators import validate_pagination_params
     try:
         page, page_size, offset = validate_pagination_params(page, page_size, max_page_size=100)
     except ValueError:
         page, page_size, offset = 1, 10, 0  
+    # OTIMIZAÇÃO DE PERFORMANCE: Paginação keyset (NAME é único) em vez de SKIP
+    keyset = KeysetPage([("NAME", "ASC"), ("ID", "ASC")], page_size, cursor, offset)
     conn = None  
     try:  
         conn = get_db_connection()  
@@ -124,14 +129,16 @@ def list_ingredients(name_filter=None, status_filter=None, category_filter=None,
         where_sql = (" WHERE " + " AND ".join(where)) if where else ""  
         # total  
         # ALTERAÇÃO: Query parametrizada - where_sql é construído de forma segura (apenas cláusulas fixas)
-        cur.execute(f"SELECT COUNT(*) FROM INGREDIENTS{where_sql};", tuple(params))  
-        total = cur.fetchone()[0] or 0  
+        total = count_total(cur, f"SELECT COUNT(*) FROM INGREDIENTS{where_sql};", params, total_mode)  
         # page  
+        keyset_sql, keyset_params = keyset.where()
+        page_where_sql = (where_sql + " AND " if where_sql else " WHERE ") + keyset_sql
         cur.execute(  
-            f"SELECT FIRST {page_size} SKIP {offset} ID, NAME, PRICE, ADDITIONAL_PRICE, IS_AVAILABLE, CURRENT_STOCK, STOCK_UNIT, MIN_STOCK_THRESHOLD, MAX_STOCK, SUPPLIER, CATEGORY, BASE_PORTION_QUANTITY, BASE_PORTION_UNIT "  
-            f"FROM INGREDIENTS{where_sql} ORDER BY NAME;",  
-            tuple(params)  
+            f"SELECT {keyset.select_prefix()} ID, NAME, PRICE, ADDITIONAL_PRICE, IS_AVAILABLE, CURRENT_STOCK, STOCK_UNIT, MIN_STOCK_THRESHOLD, MAX_STOCK, SUPPLIER, CATEGORY, BASE_PORTION_QUANTITY, BASE_PORTION_UNIT "  
+            f"FROM INGREDIENTS{page_where_sql} ORDER BY {keyset.order_by_sql()};",  
+            tuple(params) + tuple(keyset_params)
         )  
+        rows, next_cursor = keyset.paginate(cur.fetchall(), lambda row: (row[1], row[0]))
         items = [{  
             "id": row[0],  
             "name": row[1],  
@@ -146,9 +153,9 @@ def list_ingredients(name_filter=None, status_filter=None, category_filter=None,
             "category": row[10] if row[10] else "",
             "base_portion_quantity": float(row[11]) if row[11] is not None else 1.0,
             "base_portion_unit": row[12] if row[12] else "un"
-        } for row in cur.fetchall()]  
-        total_pages = (total + page_size - 1) // page_size if total > 0 else 1
-        # ALTERAÇÃO: Retornar formato padronizado com current_page, next, previous
+        } for row in rows]  
+        total_pages = ((total + page_size - 1) // page_size if total > 0 else 1) if total is not None else None
+        # ALTERAÇÃO: Retornar formato padronizado com current_page, next, previous (+ next_cursor)
         return {  
             "items": items,  
             "pagination": {  
@@ -157,8 +164,10 @@ def list_ingredients(name_filter=None, status_filter=None, category_filter=None,
                 "current_page": page,
                 "page": page,  # Manter para compatibilidade
                 "page_size": page_size,  
-                "next": page + 1 if page < total_pages else None,
-                "previous": page - 1 if page > 1 else None
+                "next": page + 1 if next_cursor else None,
+                "previous": page - 1 if page > 1 else None,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
             }  
         }  
     except fdb.Error as e:  
@@ -247,6 +256,7 @@ def update_ingredient(ingredient_id, data):
         sql = f"UPDATE INGREDIENTS SET {', '.join(set_parts)} WHERE ID = ?;"  
         cur.execute(sql, tuple(values))  
         conn.commit()  
+        bump_data_version(CATALOG)
         return (True, None, "Ingrediente atualizado com sucesso")
     except fdb.Error as e:  
         # ALTERAÇÃO: Substituído print() por logging estruturado
@@ -264,6 +274,7 @@ def update_ingredient_availability(ingredient_id, is_available):
         sql = "UPDATE INGREDIENTS SET IS_AVAILABLE = ? WHERE ID = ?;"  
         cur.execute(sql, (is_available, ingredient_id))  
         conn.commit()  
+        bump_data_version(CATALOG)
         return cur.rowcount > 0  
     except fdb.Error as e:  
         # ALTERAÇÃO: Substituído print() por logging estruturado
@@ -309,6 +320,7 @@ def delete_ingredient(ingredient_id):
         rows_affected = cur.rowcount
         
         conn.commit()  
+        bump_data_version(CATALOG)
         
         if rows_affected > 0:
             # ALTERAÇÃO: Mensagem informando quantos registros foram excluídos
@@ -403,6 +415,7 @@ def add_ingredient_to_product(product_id, ingredient_id, portions):
             cur.execute(sql, (product_id, ingredient_id, portions_decimal))
         
         conn.commit()  
+        bump_data_version(CATALOG)
         return True  
     except fdb.Error as e:  
         # ALTERAÇÃO: Logging estruturado sem expor dados sensíveis
@@ -464,6 +477,7 @@ def update_product_ingredient(product_id, ingredient_id, portions=None):
         sql = "UPDATE PRODUCT_INGREDIENTS SET PORTIONS = ? WHERE PRODUCT_ID = ? AND INGREDIENT_ID = ?;"
         cur.execute(sql, (portions_decimal, product_id, ingredient_id))
         conn.commit()
+        bump_data_version(CATALOG)
         
         # ALTERAÇÃO: Verificar se a atualização foi bem-sucedida
         if cur.rowcount == 0:
@@ -508,6 +522,7 @@ def remove_ingredient_from_product(product_id, ingredient_id):
         sql = "DELETE FROM PRODUCT_INGREDIENTS WHERE PRODUCT_ID = ? AND INGREDIENT_ID = ?;"  
         cur.execute(sql, (product_id, ingredient_id))  
         conn.commit()  
+        bump_data_version(CATALOG)
         
         # ALTERAÇÃO: Verificar se a remoção foi bem-sucedida
         deleted = cur.rowcount > 0
@@ -665,6 +680,7 @@ def adjust_ingredient_stock(ingredient_id, change_amount):
         
         cur.execute("UPDATE INGREDIENTS SET CURRENT_STOCK = ?, STOCK_STATUS = ? WHERE ID = ?", (new_stock, new_status, ingredient_id))  
         conn.commit()  
+        bump_data_version(CATALOG)
         return (True, None, f"Estoque ajustado de {current_stock} para {new_stock} (status: {new_status})")  
     except fdb.Error as e:  
         # ALTERAÇÃO: Substituído print() por logging estruturado
@@ -704,6 +720,7 @@ def add_ingredient_quantity(ingredient_id, quantity_to_add):
         
         cur.execute("UPDATE INGREDIENTS SET CURRENT_STOCK = ?, STOCK_STATUS = ? WHERE ID = ?", (new_stock, new_status, ingredient_id))  
         conn.commit()  
+        bump_data_version(CATALOG)
         return (True, None, f"Estoque atualizado de {current_stock} para {new_stock} (+{quantity_to_add}, status: {new_status})")  
     except fdb.Error as e:  
         # ALTERAÇÃO: Substituído print() por logging estruturado
@@ -932,6 +949,7 @@ def consume_ingredients_for_product(product_id, quantity=1):
             )
         
         conn.commit()
+        bump_data_version(CATALOG)
         return (True, None, f"Estoque consumido com sucesso para {quantity} unidade(s) do produto")
         
     except fdb.Error as e:
@@ -6,7 +6,7 @@ Inclui: Estoque, Compras, Clientes, Fidelidade, Mesas, Dashboard Executivo
 import fdb
 import logging
 from datetime import datetime, date, timedelta
-from ..database import get_db_connection
+from ..database import get_reporting_connection
 from ..utils.report_formatters import calculate_growth_percentage, safe_divide, format_currency, format_percentage
 from ..utils.chart_generators import generate_bar_chart, generate_pie_chart, generate_line_chart
 from ..utils.report_validators import validate_filters, validate_date_range
@@ -39,7 +39,7 @@ def generate_complete_stock_report_data(filters=None):
         if not is_valid:
             raise ValueError(error_msg)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         # Condições base
@@ -249,7 +249,7 @@ def generate_purchases_report_data(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         start_datetime = datetime.combine(start_dt.date(), datetime.min.time()) if isinstance(start_dt, date) else start_dt
@@ -427,7 +427,7 @@ def generate_customers_analysis_report_data(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         start_datetime = datetime.combine(start_dt.date(), datetime.min.time()) if isinstance(start_dt, date) else start_dt
@@ -655,7 +655,7 @@ def generate_loyalty_report_data(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         start_datetime = datetime.combine(start_dt.date(), datetime.min.time()) if isinstance(start_dt, date) else start_dt
@@ -813,7 +813,7 @@ def generate_tables_report_data(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         start_datetime = datetime.combine(start_dt.date(), datetime.min.time()) if isinstance(start_dt, date) else start_dt
@@ -969,7 +969,7 @@ def generate_executive_dashboard_data(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         start_datetime = datetime.combine(start_dt.date(), datetime.min.time()) if isinstance(start_dt, date) else start_dt
@@ -1158,7 +1158,7 @@ def generate_reconciliation_report_data(filters=None):
             end_dt = datetime.now()
             start_dt = end_dt - timedelta(days=30)
         
-        conn = get_db_connection()
+        conn = get_reporting_connection()
         cur = conn.cursor()
         
         start_datetime = datetime.combine(start_dt.date(), datetime.min.time()) if isinstance(start_dt, date) else start_dt
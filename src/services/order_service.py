@@ -8,8 +8,9 @@ from . import loyalty_service, notification_service, user_service, email_service
 from .printing_service import print_kitchen_ticket, format_order_for_kitchen_json
 from .. import socketio
 from ..config import Config
-from ..database import get_db_connection
-from ..utils import validators, event_publisher
+from ..database import get_db_connection, bulk_execute, run_after_commit
+from ..utils import validators, event_publisher, event_outbox
+from ..utils.keyset_pagination import KeysetPage, count_total, build_pagination, TOTAL_MODE_EXACT
 
 logger = logging.getLogger(__name__)
 
@@ -264,6 +265,22 @@ def _add_order_items(order_id, items, cur, promotions_map=None):
         # Converte Decimal para float ao extrair do banco
         extra_prices = {row[0]: float(row[1] or 0) for row in cur.fetchall()}
 
+    # OTIMIZAÇÃO DE PERFORMANCE: Preços de base_modifications de todos os itens em uma query
+    base_mod_ids = {
+        bm['ingredient_id']
+        for item in items
+        for bm in (item.get('base_modifications') or [])
+        if bm.get('delta', 0) != 0
+    }
+    base_mod_prices_dict = {}
+    if base_mod_ids:
+        placeholders = ', '.join(['?' for _ in base_mod_ids])
+        cur.execute(f"SELECT ID, COALESCE(ADDITIONAL_PRICE, PRICE) FROM INGREDIENTS WHERE ID IN ({placeholders});", tuple(base_mod_ids))
+        base_mod_prices_dict = {row[0]: float(row[1] or 0.0) for row in cur.fetchall()}
+
+    # Monta todas as linhas antes de escrever (validações falham antes de qualquer INSERT)
+    item_rows = []
+    item_extra_rows = []
     for item in items:
         product_id = item.get('product_id')
         quantity = item.get('quantity')
@@ -291,11 +308,10 @@ def _add_order_items(order_id, items, cur, promotions_map=None):
             item_notes = str(item_notes)
 
         # ALTERAÇÃO: Salvar preço COM desconto aplicado no banco e incluir observações
-        sql_item = "INSERT INTO ORDER_ITEMS (ORDER_ID, PRODUCT_ID, QUANTITY, UNIT_PRICE, NOTES) VALUES (?, ?, ?, ?, ?) RETURNING ID;"
-        cur.execute(sql_item, (order_id, product_id, quantity, unit_price, item_notes))
-        new_order_item_id = cur.fetchone()[0]
+        item_rows.append((order_id, product_id, quantity, unit_price, item_notes))
 
-        # Insere extras (TYPE='extra')
+        extra_rows = []
+        # Extras (TYPE='extra')
         if 'extras' in item and item['extras']:
             for extra in item['extras']:
                 extra_id = extra.get('ingredient_id')
@@ -313,22 +329,10 @@ def _add_order_items(order_id, items, cur, promotions_map=None):
                 
                 # Garante que o preço é float
                 extra_price = float(extra_price)
-                
-                logger.info(f"[_add_order_items] Inserindo extra: order_item_id={new_order_item_id}, ingredient_id={extra_id}, quantity={extra_qty}, price={extra_price}")
-                
-                sql_extra = "INSERT INTO ORDER_ITEM_EXTRAS (ORDER_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, ?, 'extra', ?, ?);"
-                cur.execute(sql_extra, (new_order_item_id, extra_id, extra_qty, extra_qty, extra_price))
+                extra_rows.append((extra_id, extra_qty, 'extra', extra_qty, extra_price))
         
-        # Insere base_modifications (TYPE='base')
-        # CORREÇÃO: Buscar preços de base_modifications em batch para evitar query N+1
+        # base_modifications (TYPE='base')
         if 'base_modifications' in item and item['base_modifications']:
-            base_mod_ids = [bm['ingredient_id'] for bm in item['base_modifications'] if bm.get('delta', 0) != 0]
-            base_mod_prices_dict = {}
-            if base_mod_ids:
-                placeholders = ', '.join(['?' for _ in base_mod_ids])
-                cur.execute(f"SELECT ID, COALESCE(ADDITIONAL_PRICE, PRICE) FROM INGREDIENTS WHERE ID IN ({placeholders});", tuple(base_mod_ids))
-                base_mod_prices_dict = {row[0]: float(row[1] or 0.0) for row in cur.fetchall()}
-            
             for bm in item['base_modifications']:
                 bm_id = bm['ingredient_id']
                 bm_delta = bm.get('delta', 0)
@@ -336,9 +340,32 @@ def _add_order_items(order_id, items, cur, promotions_map=None):
                     # CORREÇÃO: Verifica se ingrediente foi encontrado (não apenas se preço é 0)
                     if bm_id not in base_mod_prices_dict:
                         raise ValueError(f"Ingrediente {bm_id} não encontrado ou preço indisponível")
-                    bm_price = base_mod_prices_dict[bm_id]
-                    sql_base_mod = "INSERT INTO ORDER_ITEM_EXTRAS (ORDER_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, 0, 'base', ?, ?);"
-                    cur.execute(sql_base_mod, (new_order_item_id, bm_id, bm_delta, bm_price))
+                    extra_rows.append((bm_id, 0, 'base', bm_delta, base_mod_prices_dict[bm_id]))
+        item_extra_rows.append(extra_rows)
+
+    # OTIMIZAÇÃO DE PERFORMANCE: Itens e extras gravados em lote (EXECUTE BLOCK) em vez de
+    # um INSERT por linha; os IDs gerados dos itens voltam na mesma ordem
+    order_item_ids = bulk_execute(
+        cur,
+        "INSERT INTO ORDER_ITEMS (ORDER_ID, PRODUCT_ID, QUANTITY, UNIT_PRICE, NOTES) VALUES (?, ?, ?, ?, ?) RETURNING ID",
+        item_rows,
+        ['INTEGER', 'INTEGER', 'INTEGER', 'DECIMAL(10,2)', 'BLOB SUB_TYPE TEXT'],
+        returning='INTEGER'
+    )
+
+    extras_params = [
+        (order_item_id, *extra_row)
+        for order_item_id, extra_rows in zip(order_item_ids, item_extra_rows)
+        for extra_row in extra_rows
+    ]
+    if extras_params:
+        logger.info(f"[_add_order_items] Inserindo {len(extras_params)} extras/modificações para o pedido {order_id}")
+        bulk_execute(
+            cur,
+            "INSERT INTO ORDER_ITEM_EXTRAS (ORDER_ITEM_ID, INGREDIENT_ID, QUANTITY, TYPE, DELTA, UNIT_PRICE) VALUES (?, ?, ?, ?, ?, ?)",
+            extras_params,
+            ['INTEGER', 'INTEGER', 'INTEGER', 'VARCHAR(10)', 'INTEGER', 'DECIMAL(10,2)']
+        )
 
 def _notify_kitchen(order_id):
     """Notifica a cozinha sobre novo pedido"""
@@ -607,6 +634,22 @@ def create_order(user_id, address_id, items, payment_method, amount_paid=None, n
                 return (None, error_code, message)
             logger.info(f"Estoque deduzido para pedido {new_order_id}: {message}")
             
+            # Garantir que user_id seja inteiro
+            user_id_int = int(user_id) if user_id else None
+            
+            # Monta payload resumido para o evento
+            event_data = {
+                "order_id": new_order_id,
+                "total": float(order_total_float),
+                "status": initial_status,
+                "items_count": len(items),
+                "order_type": order_type,
+                "user_id": user_id_int
+            }
+            
+            # ALTERAÇÃO: Evento gravado no outbox na mesma transação do pedido
+            outboxed = event_outbox.enqueue(cur, 'order.created', event_data)
+            
             conn.commit()
             
             # Notificação para cozinha
@@ -614,21 +657,11 @@ def create_order(user_id, address_id, items, payment_method, amount_paid=None, n
             
             # Publica evento de criação de pedido via WebSocket
             try:
-                # Garantir que user_id seja inteiro
-                user_id_int = int(user_id) if user_id else None
-                
-                # Monta payload resumido para o evento
-                event_data = {
-                    "order_id": new_order_id,
-                    "total": float(order_total_float),
-                    "status": initial_status,
-                    "items_count": len(items),
-                    "order_type": order_type,
-                    "user_id": user_id_int
-                }
-                
-                logger.info(f"Publicando evento order.created para pedido {new_order_id}: {event_data}")
-                event_publisher.publish_event('order.created', event_data)
+                logger.debug(f"Publicando evento order.created para pedido {new_order_id}")
+                if outboxed:
+                    run_after_commit(event_outbox.notify_committed)
+                else:
+                    event_publisher.publish_event('order.created', event_data)
             except Exception as e:
                 # Não falha a criação do pedido se houver erro ao publicar evento
                 logger.error(f"Erro ao publicar evento de criação de pedido {new_order_id}: {e}", exc_info=True)
@@ -675,10 +708,10 @@ def create_order(user_id, address_id, items, payment_method, amount_paid=None, n
         logger.error(f"Erro inesperado ao processar pedido: {type(e).__name__}: {e}", exc_info=Config.DEBUG)
         return (None, "UNKNOWN_ERROR", "Erro inesperado ao processar pedido")
 
-def get_orders_by_user_id(user_id, page=1, page_size=50):
+def get_orders_by_user_id(user_id, page=1, page_size=50, cursor=None, total_mode=TOTAL_MODE_EXACT):
     """Busca o histórico de pedidos de um usuário específico com otimizações.
     Inclui total_amount e items básicos na mesma query para evitar N+1 queries.
-    Suporta paginação opcional."""
+    Suporta paginação opcional por page/page_size ou por cursor (keyset)."""
     # OTIMIZAÇÃO: Usar validador centralizado de paginação
     from ..utils.validators import validate_pagination_params
     try:
@@ -686,19 +719,21 @@ def get_orders_by_user_id(user_id, page=1, page_size=50):
     except ValueError:
         page, page_size, offset = 1, 50, 0
     
+    # OTIMIZAÇÃO DE PERFORMANCE: Paginação keyset (CREATED_AT, ID) em vez de SKIP
+    keyset = KeysetPage([("o.CREATED_AT", "DESC"), ("o.ID", "DESC")], page_size, cursor, offset)
     conn = None
     try:
         conn = get_db_connection()
         cur = conn.cursor()
         
         # Contar total de pedidos do usuário
-        cur.execute("SELECT COUNT(*) FROM ORDERS WHERE USER_ID = ?", (user_id,))
-        total = cur.fetchone()[0] or 0
+        total = count_total(cur, "SELECT COUNT(*) FROM ORDERS WHERE USER_ID = ?", (user_id,), total_mode)
         
         # Query otimizada que inclui total_amount e agrega items básicos
         # ALTERAÇÃO: Incluir UPDATED_AT para reiniciar cronômetro quando status muda
+        keyset_sql, keyset_params = keyset.where()
         sql = f"""
-            SELECT FIRST {page_size} SKIP {offset}
+            SELECT {keyset.select_prefix()}
                 o.ID, 
                 o.STATUS, 
                 o.CONFIRMATION_CODE, 
@@ -710,22 +745,16 @@ def get_orders_by_user_id(user_id, page=1, page_size=50):
                 a."NUMBER"
             FROM ORDERS o
             LEFT JOIN ADDRESSES a ON o.ADDRESS_ID = a.ID
-            WHERE o.USER_ID = ?
-            ORDER BY o.CREATED_AT DESC
+            WHERE o.USER_ID = ? AND {keyset_sql}
+            ORDER BY {keyset.order_by_sql()}
         """
-        cur.execute(sql, (user_id,))
-        order_rows = cur.fetchall()
+        cur.execute(sql, (user_id, *keyset_params))
+        order_rows, next_cursor = keyset.paginate(cur.fetchall(), lambda row: (row[3], row[0]))
         
         if not order_rows:
-            total_pages = (total + page_size - 1) // page_size if total > 0 else 0
             return {
                 "items": [],
-                "pagination": {
-                    "total": total,
-                    "page": page,
-                    "page_size": page_size,
-                    "total_pages": total_pages
-                }
+                "pagination": build_pagination(page, page_size, total, None)
             }
         
         # Busca todos os items de todos os pedidos de uma vez (evita N+1)
@@ -789,15 +818,9 @@ def get_orders_by_user_id(user_id, page=1, page_size=50):
             orders.append(order_data)
         
         # Retornar com metadados de paginação
-        total_pages = (total + page_size - 1) // page_size if total > 0 else 0
         return {
             "items": orders,
-            "pagination": {
-                "total": total,
-                "page": page,
-                "page_size": page_size,
-                "total_pages": total_pages
-            }
+            "pagination": build_pagination(page, page_size, total, next_cursor)
         }
     except fdb.Error as e:
         logger.error(f"Erro ao buscar pedidos do usuário {user_id}: {e}", exc_info=True)
@@ -814,7 +837,7 @@ def get_orders_by_user_id(user_id, page=1, page_size=50):
         if conn:
             conn.close()
 
-def get_all_orders(page=1, page_size=50, search=None, status=None, channel=None, period=None):
+def get_all_orders(page=1, page_size=50, search=None, status=None, channel=None, period=None, cursor=None, total_mode=TOTAL_MODE_EXACT):
     """Busca todos os pedidos para a visão do administrador com paginação e filtros."""
     # OTIMIZAÇÃO: Validação de parâmetros de paginação usando função utilitária (seção 1.9 e 1.10)
     from ..utils.validators import validate_pagination_params
@@ -825,6 +848,7 @@ def get_all_orders(page=1, page_size=50, search=None, status=None, channel=None,
         page_size = 50
         offset = 0
     
+    keyset = KeysetPage([("o.CREATED_AT", "DESC"), ("o.ID", "DESC")], page_size, cursor, offset)
     conn = None
     try:
         conn = get_db_connection()
@@ -891,23 +915,25 @@ def get_all_orders(page=1, page_size=50, search=None, status=None, channel=None,
         
         where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
         
-        # OTIMIZAÇÃO: Query com paginação usando FIRST/SKIP do Firebird
+        # OTIMIZAÇÃO DE PERFORMANCE: Paginação keyset (CREATED_AT, ID) em vez de SKIP
         # ALTERAÇÃO: Incluir TOTAL_AMOUNT para permitir cálculos de receita no frontend
         # ALTERAÇÃO: Incluir UPDATED_AT para reiniciar cronômetro quando status muda
+        keyset_sql, keyset_params = keyset.where()
         sql = f"""
-            SELECT FIRST {page_size} SKIP {offset}
+            SELECT {keyset.select_prefix()}
                 o.ID, o.STATUS, o.CONFIRMATION_CODE, o.CREATED_AT, o.UPDATED_AT, o.ORDER_TYPE, o.TOTAL_AMOUNT, u.FULL_NAME, a.STREET, a."NUMBER"
             FROM ORDERS o
             JOIN USERS u ON o.USER_ID = u.ID
             LEFT JOIN ADDRESSES a ON o.ADDRESS_ID = a.ID
-            WHERE {where_sql}
-            ORDER BY o.CREATED_AT DESC
+            WHERE {where_sql} AND {keyset_sql}
+            ORDER BY {keyset.order_by_sql()}
         """
         
-        cur.execute(sql, tuple(params))
+        cur.execute(sql, tuple(params) + tuple(keyset_params))
+        order_rows, next_cursor = keyset.paginate(cur.fetchall(), lambda row: (row[3], row[0]))
         
         orders = []
-        for row in cur.fetchall():
+        for row in order_rows:
             # CORREÇÃO: Consistência com get_orders_by_user_id - extrair order_type primeiro
             # ALTERAÇÃO: Índices ajustados após adicionar UPDATED_AT
             order_type = row[5] if row[5] else ORDER_TYPE_DELIVERY
@@ -934,19 +960,11 @@ def get_all_orders(page=1, page_size=50, search=None, status=None, channel=None,
         # ALTERAÇÃO: Buscar total para paginação usando os mesmos filtros
         count_where_sql = where_sql
         count_query = f"SELECT COUNT(*) FROM ORDERS o JOIN USERS u ON o.USER_ID = u.ID WHERE {count_where_sql}"
-        cur.execute(count_query, tuple(params))
-        total = cur.fetchone()[0] or 0
-        
-        total_pages = (total + page_size - 1) // page_size if page_size > 0 else 1
+        total = count_total(cur, count_query, params, total_mode)
         
         result = {
             "items": orders,
-            "pagination": {
-                "total": total,
-                "page": page,
-                "page_size": page_size,
-                "total_pages": total_pages
-            }
+            "pagination": build_pagination(page, page_size, total, next_cursor)
         }
         
         return result
@@ -1131,24 +1149,30 @@ def update_order_status(order_id, new_status):
                 
                 logger.info(f"Receita, CMV e taxa registrados para pedido {order_id}: revenue_id={revenue_id}, cmv_id={cmv_id}, payment_fee_id={payment_fee_id}")
         
-        # Commit único de tudo (status + movimentações financeiras)
+        # Garantir que user_id seja inteiro (pode vir como string do banco)
+        user_id_int = int(user_id) if user_id else None
+        
+        event_data = {
+            "order_id": order_id,
+            "new_status": db_status,
+            "old_status": current_status,
+            "user_id": user_id_int,
+            "order_type": order_type
+        }
+        
+        # ALTERAÇÃO: Evento gravado no outbox na mesma transação da mudança de status
+        outboxed = event_outbox.enqueue(cur, 'order.status_changed', event_data)
+        
+        # Commit único de tudo (status + movimentações financeiras + evento)
         conn.commit()
         
         # Publica evento de mudança de status via WebSocket
         try:
-            # Garantir que user_id seja inteiro (pode vir como string do banco)
-            user_id_int = int(user_id) if user_id else None
-            
-            event_data = {
-                "order_id": order_id,
-                "new_status": db_status,
-                "old_status": current_status,
-                "user_id": user_id_int,
-                "order_type": order_type
-            }
-            
-            logger.info(f"Publicando evento order.status_changed para pedido {order_id}: {event_data}")
-            event_publisher.publish_event('order.status_changed', event_data)
+            logger.debug(f"Publicando evento order.status_changed para pedido {order_id}")
+            if outboxed:
+                run_after_commit(event_outbox.notify_committed)
+            else:
+                event_publisher.publish_event('order.status_changed', event_data)
         except Exception as e:
             # Não falha a atualização se houver erro ao publicar evento
             logger.error(f"Erro ao publicar evento de mudança de status do pedido {order_id}: {e}", exc_info=True)
@@ -2373,36 +2397,37 @@ def get_orders_with_filters(filters=None):
         if conditions:
             count_query += " AND " + " AND ".join(conditions)
         
-        cur.execute(count_query, params)
-        total = cur.fetchone()[0] or 0
+        total_mode = filters.get('total_mode', TOTAL_MODE_EXACT) if filters else TOTAL_MODE_EXACT
+        total = count_total(cur, count_query, params, total_mode)
         
         # Ordenação
         sort_by = filters.get('sort_by', 'date_desc') if filters else 'date_desc'
-        if sort_by == 'date_desc':
-            order_clause = " ORDER BY o.CREATED_AT DESC"
-        elif sort_by == 'date_asc':
-            order_clause = " ORDER BY o.CREATED_AT ASC"
-        else:
-            order_clause = " ORDER BY o.CREATED_AT DESC"
+        direction = "ASC" if sort_by == 'date_asc' else "DESC"
         
-        # OTIMIZAÇÃO: Query principal com paginação usando FIRST/SKIP do Firebird
+        # OTIMIZAÇÃO DE PERFORMANCE: Paginação keyset (CREATED_AT, ID) em vez de SKIP
+        keyset = KeysetPage(
+            [("o.CREATED_AT", direction), ("o.ID", direction)],
+            page_size, filters.get('cursor') if filters else None, offset
+        )
+        keyset_sql, keyset_params = keyset.where()
         paginated_query = f"""
-            SELECT FIRST {page_size} SKIP {offset}
+            SELECT {keyset.select_prefix()}
                 o.ID, o.STATUS, o.CONFIRMATION_CODE, o.CREATED_AT, o.TOTAL_AMOUNT,
                 o.ORDER_TYPE, u.FULL_NAME as customer_name, a.STREET, a."NUMBER"
             FROM ORDERS o
             JOIN USERS u ON o.USER_ID = u.ID
             LEFT JOIN ADDRESSES a ON o.ADDRESS_ID = a.ID
-            WHERE 1=1
+            WHERE {keyset_sql}
         """
         if conditions:
             paginated_query += " AND " + " AND ".join(conditions)
-        paginated_query += order_clause
+        paginated_query += f" ORDER BY {keyset.order_by_sql()}"
         
-        cur.execute(paginated_query, params)
+        cur.execute(paginated_query, keyset_params + params)
+        order_rows, next_cursor = keyset.paginate(cur.fetchall(), lambda row: (row[3], row[0]))
         orders = []
         
-        for row in cur.fetchall():
+        for row in order_rows:
             # Monta endereço ou exibe tipo de retirada
             # row[0] = o.ID
             # row[1] = o.STATUS
@@ -2435,16 +2460,9 @@ def get_orders_with_filters(filters=None):
                 "address": address_str
             })
         
-        total_pages = (total + page_size - 1) // page_size if page_size > 0 else 1
-        
         return {
             "items": orders,
-            "pagination": {
-                "total": total,
-                "page": page,
-                "page_size": page_size,
-                "total_pages": total_pages
-            }
+            "pagination": build_pagination(page, page_size, total, next_cursor)
         }
         
     except fdb.Error as e:
@@ -4,6 +4,10 @@ import math
 from ..database import get_db_connection
 from . import groups_service, stock_service
 from ..utils.image_handler import get_product_image_url
+from ..utils import schema_catalog
+from ..utils.cache_manager import get_cache_manager
+from ..utils.response_cache import bump_data_version, CATALOG
+from ..utils.keyset_pagination import KeysetPage, count_total, build_pagination, TOTAL_MODE_EXACT
 from decimal import Decimal
 from datetime import datetime, timedelta
 # ALTERAÇÃO: Removido import não utilizado lru_cache
@@ -485,17 +489,14 @@ def _batch_get_product_availability_status(product_ids, cur, for_listing=False):
         # LOG: Iniciando busca de ingredientes
         logger.info(f"[PRODUCT_SERVICE] _batch_get_product_availability_status: buscando ingredientes para {len(product_ids)} produtos")
         
-        # Verifica se campo LOSS_PERCENTAGE existe antes de usar
-        use_loss_percentage = False
-        try:
-            # Tenta buscar coluna LOSS_PERCENTAGE (pode não existir em versões antigas do schema)
-            placeholders = ', '.join(['?' for _ in product_ids])
-            cur.execute(f"""
+        # OTIMIZAÇÃO DE PERFORMANCE: Existência de LOSS_PERCENTAGE vem do catálogo do schema
+        placeholders = ', '.join(['?' for _ in product_ids])
+        ingredients_sql = """
                 SELECT 
                     pi.PRODUCT_ID,
                     pi.INGREDIENT_ID,
                     pi.PORTIONS,
-                    COALESCE(pi.LOSS_PERCENTAGE, 0) as LOSS_PERCENTAGE,
+                    {loss_column}
                     i.NAME,
                     i.BASE_PORTION_QUANTITY,
                     i.BASE_PORTION_UNIT,
@@ -506,37 +507,19 @@ def _batch_get_product_availability_status(product_ids, cur, for_listing=False):
                 WHERE pi.PRODUCT_ID IN ({placeholders})
                   AND pi.PORTIONS > 0
                   AND i.IS_AVAILABLE = TRUE
-            """, tuple(product_ids))
-            use_loss_percentage = True
-            logger.debug(f"[PRODUCT_SERVICE] Query com LOSS_PERCENTAGE executada com sucesso")
+            """
+        try:
+            use_loss_percentage = schema_catalog.execute_with_optional_column(
+                cur, 'PRODUCT_INGREDIENTS', 'LOSS_PERCENTAGE',
+                ingredients_sql.format(loss_column="COALESCE(pi.LOSS_PERCENTAGE, 0) as LOSS_PERCENTAGE,", placeholders=placeholders),
+                ingredients_sql.format(loss_column="", placeholders=placeholders),
+                tuple(product_ids)
+            )
         except fdb.Error as e:
-            # Se campo não existe, usa query sem LOSS_PERCENTAGE
-            error_msg = str(e).lower()
-            if 'loss_percentage' in error_msg or 'unknown' in error_msg or 'column' in error_msg:
-                logger.debug(f"[PRODUCT_SERVICE] Campo LOSS_PERCENTAGE não encontrado, usando query sem perdas para produtos em batch")
-                placeholders = ', '.join(['?' for _ in product_ids])
-                cur.execute(f"""
-                    SELECT 
-                        pi.PRODUCT_ID,
-                        pi.INGREDIENT_ID,
-                        pi.PORTIONS,
-                        i.NAME,
-                        i.BASE_PORTION_QUANTITY,
-                        i.BASE_PORTION_UNIT,
-                        i.STOCK_UNIT,
-                        i.IS_AVAILABLE
-                    FROM PRODUCT_INGREDIENTS pi
-                    JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
-                    WHERE pi.PRODUCT_ID IN ({placeholders})
-                      AND pi.PORTIONS > 0
-                      AND i.IS_AVAILABLE = TRUE
-                """, tuple(product_ids))
-                use_loss_percentage = False
-            else:
-                logger.error(f"[PRODUCT_SERVICE] Erro inesperado ao buscar ingredientes em batch: {e}", exc_info=True)
-                # Se erro não relacionado a coluna, retorna status unknown para todos
-                return {pid: {'status': 'unknown', 'capacity': 0, 'is_available': False, 'limiting_ingredient': None} 
-                        for pid in product_ids}
+            logger.error(f"[PRODUCT_SERVICE] Erro inesperado ao buscar ingredientes em batch: {e}", exc_info=True)
+            # Retorna status unknown para todos
+            return {pid: {'status': 'unknown', 'capacity': 0, 'is_available': False, 'limiting_ingredient': None} 
+                    for pid in product_ids}
         
         # Agrupa ingredientes por produto
         product_ingredients = {}
@@ -1284,30 +1267,41 @@ def get_ingredient_max_available_quantity(ingredient_id, max_quantity_from_rule=
         if should_close_conn and conn:
             conn.close()
 
-# OTIMIZAÇÃO DE PERFORMANCE: Cache em memória para listas de produtos
-# Cache é invalidado quando produtos são criados/atualizados/deletados
-_product_list_cache = {}
-_product_list_cache_timestamp = {}
-_product_list_cache_ttl = 60  # ALTERAÇÃO: Reduzido de 5 minutos para 60 segundos conforme especificação
+# OTIMIZAÇÃO DE PERFORMANCE: Cache de listas de produtos no namespace 'products' do CacheManager,
+# limpo quando produtos são criados/atualizados/deletados
+# ALTERAÇÃO: TTL reduzido de 5 minutos para 60 segundos conforme especificação
+_product_cache = get_cache_manager().namespace('products', ttl=60)
+
+# Listagens pré-carregadas no warm-up: primeira página padrão da rota (painel, sem filtro de
+# disponibilidade) e da vitrine (filter_unavailable=true)
+_WARM_LIST_VARIANTS = (False, True)
 
 def _invalidate_product_cache():
     """Invalida cache de produtos forçando refresh na próxima chamada"""
-    global _product_list_cache, _product_list_cache_timestamp
-    _product_list_cache = {}
-    _product_list_cache_timestamp = {}
-
-def _get_cache_key(name_filter, category_id, page, page_size, include_inactive):
+    _product_cache.clear()
+    # Categorias com produtos embutidos também ficam desatualizadas
+    from .category_service import _invalidate_categories_with_products_cache
+    _invalidate_categories_with_products_cache()
+    bump_data_version(CATALOG)
+
+def warm_cache():
+    """Pré-carrega as listagens mais acessadas (warm-up). Retorna False se alguma falhou"""
+    warmed = True
+    for filter_unavailable in _WARM_LIST_VARIANTS:
+        list_products(page=1, page_size=10, filter_unavailable=filter_unavailable)
+        cache_key = _get_cache_key(None, None, 1, 10, False, filter_unavailable=filter_unavailable)
+        warmed = warmed and _product_cache.get(cache_key) is not None
+    return warmed
+
+def _get_cache_key(name_filter, category_id, page, page_size, include_inactive, cursor=None,
+                   filter_unavailable=True, total_mode=TOTAL_MODE_EXACT):
     """Gera chave única para o cache baseada nos parâmetros"""
-    return f"{name_filter or ''}_{category_id or ''}_{page}_{page_size}_{include_inactive}"
+    return (
+        f"list:{name_filter or ''}_{category_id or ''}_{page}_{page_size}_{include_inactive}_"
+        f"{filter_unavailable}_{total_mode}_{cursor or ''}"
+    )
 
-def _is_cache_valid(cache_key):
-    """Verifica se o cache ainda é válido"""
-    if cache_key not in _product_list_cache_timestamp:
-        return False
-    elapsed = (datetime.now() - _product_list_cache_timestamp[cache_key]).total_seconds()
-    return elapsed < _product_list_cache_ttl
-
-def list_products(name_filter=None, category_id=None, page=1, page_size=10, include_inactive=False, only_inactive=False, filter_unavailable=True):  
+def list_products(name_filter=None, category_id=None, page=1, page_size=10, include_inactive=False, only_inactive=False, filter_unavailable=True, cursor=None, total_mode=TOTAL_MODE_EXACT):  
     """
     Lista produtos com cache em memória para melhor performance.
     Cache TTL: 60 segundos. Invalidado automaticamente quando produtos são modificados.
@@ -1316,10 +1310,13 @@ def list_products(name_filter=None, category_id=None, page=1, page_size=10, incl
     com capacidade >= 1 ao invés de apenas verificar availability_status.
     
     ALTERAÇÃO: Adiciona suporte ao parâmetro only_inactive para filtrar apenas produtos inativos.
+    
+    OTIMIZAÇÃO DE PERFORMANCE: Suporta paginação por cursor (keyset em NAME, ID).
     """
     page = max(int(page or 1), 1)  
     page_size = max(int(page_size or 10), 1)  
     offset = (page - 1) * page_size  
+    keyset = KeysetPage([("p.NAME", "ASC"), ("p.ID", "ASC")], page_size, cursor, offset)
     
     # ALTERAÇÃO: Se only_inactive=True, deve incluir inativos na query
     if only_inactive:
@@ -1329,10 +1326,13 @@ def list_products(name_filter=None, category_id=None, page=1, page_size=10, incl
     # Nota: Cache desabilitado para filtros de nome (busca dinâmica) e produtos inativos
     # Cache apenas para listagens padrão (sem filtro de nome, apenas ativos)
     use_cache = not name_filter and not include_inactive and not only_inactive
-    cache_key = _get_cache_key(name_filter, category_id, page, page_size, include_inactive)
+    cache_key = _get_cache_key(name_filter, category_id, page, page_size, include_inactive, cursor,
+                               filter_unavailable, total_mode)
     
-    if use_cache and _is_cache_valid(cache_key) and cache_key in _product_list_cache:
-        return _product_list_cache[cache_key]
+    if use_cache:
+        cached_result = _product_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
     
     conn = None  
     try:  
@@ -1355,24 +1355,24 @@ def list_products(name_filter=None, category_id=None, page=1, page_size=10, incl
         where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"  
         # total  
         # ALTERAÇÃO: Query parametrizada - where_sql é construído de forma segura (apenas cláusulas fixas)
-        cur.execute(f"SELECT COUNT(*) FROM PRODUCTS WHERE {where_sql.replace('p.', '')};", tuple(params))  
-        total = cur.fetchone()[0] or 0  
-        # page - Query com sintaxe FIRST/SKIP do Firebird
+        total = count_total(cur, f"SELECT COUNT(*) FROM PRODUCTS WHERE {where_sql.replace('p.', '')};", params, total_mode)
+        # page - OTIMIZAÇÃO DE PERFORMANCE: keyset (NAME, ID) em vez de SKIP quando há cursor
         # OTIMIZAÇÃO: Incluir nome da categoria via LEFT JOIN para evitar N+1
+        keyset_sql, keyset_params = keyset.where()
         query = f"""
-            SELECT FIRST {page_size} SKIP {offset} 
+            SELECT {keyset.select_prefix()} 
                 p.ID, p.NAME, p.DESCRIPTION, p.PRICE, p.COST_PRICE, 
                 p.PREPARATION_TIME_MINUTES, p.CATEGORY_ID, p.IMAGE_URL, p.IS_ACTIVE,
                 COALESCE(c.NAME, 'Sem categoria') as CATEGORY_NAME
             FROM PRODUCTS p
             LEFT JOIN CATEGORIES c ON p.CATEGORY_ID = c.ID
-            WHERE {where_sql} 
-            ORDER BY p.NAME
+            WHERE {where_sql} AND {keyset_sql}
+            ORDER BY {keyset.order_by_sql()}
         """
-        cur.execute(query, tuple(params))
+        cur.execute(query, tuple(params) + tuple(keyset_params))
         
         # Coleta todos os product_ids primeiro
-        product_rows = cur.fetchall()
+        product_rows, next_cursor = keyset.paginate(cur.fetchall(), lambda row: (row[1], row[0]))
         product_ids = [row[0] for row in product_rows]
         items = []
         
@@ -1529,7 +1529,6 @@ def list_products(name_filter=None, category_id=None, page=1, page_size=10, incl
         # Se filter_unavailable=False (admin), usa o total original
         if filter_unavailable:
             filtered_total = len(items)
-            total_pages = (filtered_total + page_size - 1) // page_size if filtered_total > 0 else 0
             pagination_total = filtered_total
             
             # LOG: Estatísticas de filtragem
@@ -1538,18 +1537,12 @@ def list_products(name_filter=None, category_id=None, page=1, page_size=10, incl
                        f"{len(product_rows) - filtered_total} produtos filtrados (unavailable)")
         else:
             # Admin vê todos os produtos, usa total original
-            total_pages = (total + page_size - 1) // page_size
             pagination_total = total
             logger.info(f"[PRODUCT_SERVICE] Filtragem desabilitada (admin): {len(items)} produtos retornados")
         
         result = {  
             "items": items,  
-            "pagination": {  
-                "total": pagination_total,
-                "page": page,  
-                "page_size": page_size,  
-                "total_pages": total_pages  
-            }  
+            "pagination": build_pagination(page, page_size, pagination_total, next_cursor)
         }
         
         # LOG: Resultado final
@@ -1560,8 +1553,7 @@ def list_products(name_filter=None, category_id=None, page=1, page_size=10, incl
         
         # OTIMIZAÇÃO: Salva resultado no cache se for cacheável
         if use_cache:
-            _product_list_cache[cache_key] = result
-            _product_list_cache_timestamp[cache_key] = datetime.now()
+            _product_cache.set(cache_key, result)
         
         return result
     except fdb.Error as e:  
@@ -2068,6 +2060,7 @@ def update_product_image_url(product_id, image_url):
         sql = "UPDATE PRODUCTS SET IMAGE_URL = ? WHERE ID = ?;"
         cur.execute(sql, (image_url, product_id))
         conn.commit()
+        bump_data_version(CATALOG)
         return True
     except fdb.Error as e:
         # ALTERAÇÃO: Logger já está definido no topo do módulo
@@ -2113,13 +2106,14 @@ def search_products(name=None, category_id=None, page=1, page_size=10, include_i
 
 
 
-def get_products_by_category_id(category_id, page=1, page_size=10, include_inactive=False, filter_unavailable=True):  
+def get_products_by_category_id(category_id, page=1, page_size=10, include_inactive=False, filter_unavailable=True, cursor=None, total_mode=TOTAL_MODE_EXACT):  
     """
-    Busca produtos por ID da categoria específica
+    Busca produtos por ID da categoria específica (paginação por page/page_size ou cursor)
     """
     page = max(int(page or 1), 1)  
     page_size = max(int(page_size or 10), 1)  
     offset = (page - 1) * page_size  
+    keyset = KeysetPage([("p.NAME", "ASC"), ("p.ID", "ASC")], page_size, cursor, offset)
     conn = None  
     try:  
         conn = get_db_connection()  
@@ -2152,26 +2146,26 @@ def get_products_by_category_id(category_id, page=1, page_size=10, include_inact
         if not include_inactive:
             count_where_clauses.append("IS_ACTIVE = TRUE")
         count_where_sql = " AND ".join(count_where_clauses)
-        cur.execute(f"SELECT COUNT(*) FROM PRODUCTS WHERE {count_where_sql};", tuple(params))  
-        total = cur.fetchone()[0] or 0  
+        total = count_total(cur, f"SELECT COUNT(*) FROM PRODUCTS WHERE {count_where_sql};", params, total_mode)
         
-        # Busca os produtos paginados - Query com sintaxe FIRST/SKIP do Firebird
+        # Busca os produtos paginados - OTIMIZAÇÃO DE PERFORMANCE: keyset (NAME, ID) em vez de SKIP
         # OTIMIZAÇÃO: Incluir nome da categoria via LEFT JOIN para evitar N+1
         # IMPORTANTE: Especificar explicitamente p.IS_ACTIVE para evitar ambiguidade com c.IS_ACTIVE
+        keyset_sql, keyset_params = keyset.where()
         query = f"""
-            SELECT FIRST {page_size} SKIP {offset} 
+            SELECT {keyset.select_prefix()} 
                 p.ID, p.NAME, p.DESCRIPTION, p.PRICE, p.COST_PRICE, 
                 p.PREPARATION_TIME_MINUTES, p.CATEGORY_ID, p.IMAGE_URL, p.IS_ACTIVE,
                 COALESCE(c.NAME, 'Sem categoria') as CATEGORY_NAME
             FROM PRODUCTS p
             LEFT JOIN CATEGORIES c ON p.CATEGORY_ID = c.ID
-            WHERE {where_sql}
-            ORDER BY p.NAME
+            WHERE {where_sql} AND {keyset_sql}
+            ORDER BY {keyset.order_by_sql()}
         """
-        cur.execute(query, tuple(params))  
+        cur.execute(query, tuple(params) + tuple(keyset_params))  
         
         # Coleta todos os product_ids primeiro
-        product_rows = cur.fetchall()
+        product_rows, next_cursor = keyset.paginate(cur.fetchall(), lambda row: (row[1], row[0]))
         product_ids = [row[0] for row in product_rows]
         items = []
         
@@ -2329,12 +2323,9 @@ def get_products_by_category_id(category_id, page=1, page_size=10, include_inact
         # Se filter_unavailable=True, ajusta o total para refletir apenas produtos disponíveis
         # Se filter_unavailable=False (admin), usa o total original
         if filter_unavailable:
-            filtered_total = len(items)
-            total_pages = (filtered_total + page_size - 1) // page_size if filtered_total > 0 else 0
-            pagination_total = filtered_total
+            pagination_total = len(items)
         else:
             # Admin vê todos os produtos, usa total original
-            total_pages = (total + page_size - 1) // page_size
             pagination_total = total
         
         result = {  
@@ -2343,12 +2334,7 @@ def get_products_by_category_id(category_id, page=1, page_size=10, include_inact
                 "name": category_name
             },
             "items": items,  
-            "pagination": {  
-                "total": pagination_total,
-                "page": page,  
-                "page_size": page_size,  
-                "total_pages": total_pages  
-            }  
+            "pagination": build_pagination(page, page_size, pagination_total, next_cursor)
         }
         
         return (result, None, None)
@@ -2599,6 +2585,7 @@ def apply_group_to_product(product_id, group_id, default_min_quantity=0, default
             added.append(ing_id)
 
         conn.commit()
+        bump_data_version(CATALOG)
         return (added, None, None)
     except fdb.Error as e:
         # ALTERAÇÃO: Logger já está definido no topo do módulo
@@ -2611,15 +2598,17 @@ def apply_group_to_product(product_id, group_id, default_min_quantity=0, default
             conn.close()
 
 
-def get_most_ordered_products(page=1, page_size=10):
+def get_most_ordered_products(page=1, page_size=10, cursor=None, total_mode=TOTAL_MODE_EXACT):
     """
     Busca os produtos mais pedidos baseado no histórico de pedidos.
     Retorna produtos ordenados por quantidade total de itens vendidos.
-    Utiliza paginação padrão do sistema.
+    Utiliza paginação padrão do sistema (page/page_size ou cursor).
     """
     page = max(int(page or 1), 1)
     page_size = max(int(page_size or 10), 1)
     offset = (page - 1) * page_size
+    # OTIMIZAÇÃO DE PERFORMANCE: keyset sobre o agregado (aplicado no HAVING) com desempate por ID
+    keyset = KeysetPage([("SUM(oi.QUANTITY)", "DESC"), ("p.ID", "ASC")], page_size, cursor, offset)
     
     conn = None
     try:
@@ -2627,21 +2616,21 @@ def get_most_ordered_products(page=1, page_size=10):
         cur = conn.cursor()
         
         # ALTERAÇÃO: Conta total de produtos com vendas - considerar pedidos entregues E completos
-        cur.execute("""
+        total = count_total(cur, """
             SELECT COUNT(DISTINCT p.ID)
             FROM PRODUCTS p
             INNER JOIN ORDER_ITEMS oi ON p.ID = oi.PRODUCT_ID
             INNER JOIN ORDERS o ON oi.ORDER_ID = o.ID
             WHERE p.IS_ACTIVE = TRUE 
               AND o.STATUS IN ('delivered', 'completed')
-        """)
-        total = cur.fetchone()[0] or 0
+        """, (), total_mode)
         
         # ALTERAÇÃO: Query paginada que conta quantidades vendidas - incluir campos necessários para exibição
         # ALTERAÇÃO: Considerar pedidos entregues E completos conforme roteiro
         # ALTERAÇÃO: Firebird não suporta FETCH FIRST com placeholders, usar interpolação segura
+        keyset_sql, keyset_params = keyset.where()
         query = f"""
-            SELECT FIRST {page_size} SKIP {offset}
+            SELECT {keyset.select_prefix()}
                 p.ID, p.NAME, p.DESCRIPTION, p.PRICE, p.IMAGE_URL, 
                 p.PREPARATION_TIME_MINUTES, p.CATEGORY_ID,
                 SUM(oi.QUANTITY) as total_pedidos
@@ -2651,12 +2640,14 @@ def get_most_ordered_products(page=1, page_size=10):
             WHERE p.IS_ACTIVE = TRUE 
               AND o.STATUS IN ('delivered', 'completed')
             GROUP BY p.ID, p.NAME, p.DESCRIPTION, p.PRICE, p.IMAGE_URL, p.PREPARATION_TIME_MINUTES, p.CATEGORY_ID
-            ORDER BY total_pedidos DESC
+            HAVING {keyset_sql}
+            ORDER BY {keyset.order_by_sql()}
         """
-        cur.execute(query)
+        cur.execute(query, tuple(keyset_params))
+        rows, next_cursor = keyset.paginate(cur.fetchall(), lambda row: (row[7], row[0]))
         
         items = []
-        for row in cur.fetchall():
+        for row in rows:
             items.append({
                 "id": row[0],
                 "name": row[1],
@@ -2676,16 +2667,9 @@ def get_most_ordered_products(page=1, page_size=10):
                 except Exception:
                     items[-1]["image_hash"] = None
         
-        total_pages = (total + page_size - 1) // page_size
-        
         return {
             "items": items,
-            "pagination": {
-                "total": total,
-                "page": page,
-                "page_size": page_size,
-                "total_pages": total_pages
-            }
+            "pagination": build_pagination(page, page_size, total, next_cursor)
         }
         
     except fdb.Error as e:
@@ -2,6 +2,8 @@ import fdb
 import logging
 from datetime import datetime, timezone
 from ..database import get_db_connection
+from ..utils.response_cache import bump_data_version, CATALOG
+from ..utils.keyset_pagination import KeysetPage, count_total, TOTAL_MODE_EXACT
 
 # ALTERAÇÃO: Logger centralizado para substituir print() em produção
 logger = logging.getLogger(__name__)
@@ -112,6 +114,7 @@ def create_promotion(product_id, discount_value=None, discount_percentage=None,
         row = cur.fetchone()
         
         conn.commit()
+        bump_data_version(CATALOG)
         
         promotion = {
             "id": row[0],
@@ -328,6 +331,7 @@ def update_promotion(promotion_id, update_data, user_id=None):
             """, (expires_at, user_id, promotion_id))
         
         conn.commit()
+        bump_data_version(CATALOG)
         return (True, None, "Promoção atualizada com sucesso")
         
     except fdb.Error as e:
@@ -370,6 +374,7 @@ def delete_promotion(promotion_id):
         # Remove a promoção
         cur.execute("DELETE FROM PROMOTIONS WHERE ID = ?", (promotion_id,))
         conn.commit()
+        bump_data_version(CATALOG)
         
         return (True, None, "Promoção removida com sucesso")
         
@@ -384,7 +389,7 @@ def delete_promotion(promotion_id):
             conn.close()
 
 
-def get_all_promotions(include_expired=False, search=None, status=None, page=1, page_size=20):
+def get_all_promotions(include_expired=False, search=None, status=None, page=1, page_size=20, cursor=None, total_mode=TOTAL_MODE_EXACT):
     """
     Lista todas as promoções com detalhes dos produtos
     ALTERAÇÃO: Suporta filtros padronizados (search, status) e paginação
@@ -395,9 +400,11 @@ def get_all_promotions(include_expired=False, search=None, status=None, page=1,
         status: Filtro por status - "ativas" ou "expiradas" (padronizado)
         page: Número da página (padronizado)
         page_size: Itens por página (padronizado)
+        cursor: Cursor opaco da próxima página (keyset), substitui page quando informado
+        total_mode: 'exact', 'approx' ou 'none' para o total da paginação
     
     Returns:
-        Dict com items, pagination (count, total_pages, current_page, next, previous)
+        Dict com items, pagination (count, total_pages, current_page, next, previous, next_cursor, has_more)
     """
     # ALTERAÇÃO: Validação de paginação
     from ..utils.validators import validate_pagination_params
@@ -406,6 +413,14 @@ def get_all_promotions(include_expired=False, search=None, status=None, page=1,
     except ValueError:
         page, page_size, offset = 1, 20, 0
     
+    # OTIMIZAÇÃO DE PERFORMANCE: Paginação keyset (CREATED_AT, ID) em vez de SKIP
+    # CREATED_AT pode ser NULL em registros antigos: a chave usa a coluna pura (índice
+    # DESCENDING em (CREATED_AT, ID)) e essas linhas vêm no fim, em segmento separado
+    keyset = KeysetPage(
+        [("p.CREATED_AT", "DESC", True), ("p.ID", "DESC")],
+        page_size, cursor, offset
+    )
+    
     # ALTERAÇÃO: Determinar filtro de status baseado em parâmetros padronizados
     now = datetime.now()
     if status:
@@ -447,12 +462,12 @@ def get_all_promotions(include_expired=False, search=None, status=None, page=1,
             INNER JOIN PRODUCTS pr ON p.PRODUCT_ID = pr.ID
             WHERE {where_sql}
         """
-        cur.execute(count_sql, tuple(params))
-        total = cur.fetchone()[0] or 0
+        total = count_total(cur, count_sql, params, total_mode)
         
-        # ALTERAÇÃO: Query com paginação usando FIRST/SKIP do Firebird
-        sql = f"""
-            SELECT FIRST {page_size} SKIP {offset}
+        # ALTERAÇÃO: Query com paginação keyset (FIRST sem SKIP quando há cursor)
+        def build_sql(select_prefix, keyset_sql):
+            return f"""
+            SELECT {select_prefix}
                 p.ID, p.PRODUCT_ID, p.DISCOUNT_PERCENTAGE, p.DISCOUNT_VALUE, 
                 p.EXPIRES_AT, p.CREATED_AT, p.UPDATED_AT, p.CREATED_BY, p.UPDATED_BY,
                 pr.NAME, pr.DESCRIPTION, pr.PRICE, pr.IMAGE_URL, pr.IS_ACTIVE,
@@ -462,14 +477,16 @@ def get_all_promotions(include_expired=False, search=None, status=None, page=1,
             INNER JOIN PRODUCTS pr ON p.PRODUCT_ID = pr.ID
             LEFT JOIN USERS u1 ON p.CREATED_BY = u1.ID
             LEFT JOIN USERS u2 ON p.UPDATED_BY = u2.ID
-            WHERE {where_sql}
-            ORDER BY p.CREATED_AT DESC
+            WHERE {where_sql} AND {keyset_sql}
+            ORDER BY {keyset.order_by_sql()}
         """
         
-        cur.execute(sql, tuple(params))
+        rows, next_cursor = keyset.paginate(
+            keyset.fetch(cur, build_sql, params), lambda row: (row[5], row[0])
+        )
         promotions = []
         
-        for row in cur.fetchall():
+        for row in rows:
             promotion = {
                 "id": row[0],
                 "product_id": row[1],
@@ -522,7 +539,8 @@ def get_all_promotions(include_expired=False, search=None, status=None, page=1,
             promotions.append(promotion)
         
         # ALTERAÇÃO: Retornar formato padronizado com paginação
-        total_pages = (total + page_size - 1) // page_size if total > 0 else 1
+        # ALTERAÇÃO: next_cursor/has_more para clientes que paginam por cursor
+        total_pages = ((total + page_size - 1) // page_size if total > 0 else 1) if total is not None else None
         
         return {
             "items": promotions,
@@ -531,8 +549,10 @@ def get_all_promotions(include_expired=False, search=None, status=None, page=1,
                 "total_pages": total_pages,
                 "current_page": page,
                 "page_size": page_size,
-                "next": page + 1 if page < total_pages else None,
-                "previous": page - 1 if page > 1 else None
+                "next": page + 1 if next_cursor else None,
+                "previous": page - 1 if page > 1 else None,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
             }
         }
         
@@ -730,6 +750,7 @@ def recalculate_promotion_discount_value(product_id):
         """, (new_discount_value, promotion_id))
         
         conn.commit()
+        bump_data_version(CATALOG)
         return (True, None, None)
         
     except fdb.Error as e:
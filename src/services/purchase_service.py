@@ -9,11 +9,17 @@ import json
 import math
 from datetime import datetime
 from decimal import Decimal, ROUND_HALF_UP
-from ..database import get_db_connection
+from ..database import get_db_connection, bulk_execute
+from ..utils.response_cache import bump_data_version, CATALOG
+from ..utils.keyset_pagination import KeysetPage, count_total, parse_total_mode
 from . import financial_movement_service
 
 logger = logging.getLogger(__name__)
 
+# Tipos dos parâmetros das escritas em lote (bulk_execute), conforme as colunas
+_INVOICE_ITEM_TYPES = ['INTEGER', 'INTEGER', 'DECIMAL(10,3)', 'DECIMAL(10,2)', 'DECIMAL(12,2)']
+_STOCK_DELTA_TYPES = ['DECIMAL(10,3)', 'INTEGER']
+
 
 def _check_purchase_permission(invoice_id, user_id, user_role, action='edit', cur=None):
     """
@@ -482,6 +488,7 @@ def create_purchase_invoice(invoice_data, created_by_user_id, cur=None):
         
         if should_close_conn:
             conn.commit()
+            bump_data_version(CATALOG)
             # ALTERAÇÃO: Registrar auditoria de criação
             _log_audit_entry(
                 invoice_id=invoice_id,
@@ -538,6 +545,8 @@ def get_purchase_invoices(filters=None):
             - payment_status: 'Pending' ou 'Paid'
             - page: int (opcional, default: 1) - Número da página
             - page_size: int (opcional, default: 100) - Itens por página
+            - cursor: str (opcional) - Cursor opaco da próxima página (keyset)
+            - total_mode: 'exact' | 'approx' | 'none' (opcional) - Como calcular o total
     
     Returns:
         dict com:
@@ -606,8 +615,8 @@ def get_purchase_invoices(filters=None):
         if conditions:
             count_sql += " WHERE " + " AND ".join(conditions)
         
-        cur.execute(count_sql, params)
-        total_count = cur.fetchone()[0] or 0
+        total_mode = parse_total_mode(filters.get('total_mode') if filters else None)
+        total_count = count_total(cur, count_sql, params, total_mode)
         
         # ALTERAÇÃO: Aplicar paginação
         page = filters.get('page', 1) if filters else 1
@@ -630,17 +639,17 @@ def get_purchase_invoices(filters=None):
         # Calcular offset
         offset = (page - 1) * page_size
         
-        # ALTERAÇÃO: Adicionar FIRST/SKIP para paginação (sintaxe Firebird)
-        base_sql += " ORDER BY pi.PURCHASE_DATE DESC, pi.CREATED_AT DESC"
+        # OTIMIZAÇÃO DE PERFORMANCE: Paginação keyset (PURCHASE_DATE, ID) quando há cursor
+        keyset = KeysetPage(
+            [("pi.PURCHASE_DATE", "DESC"), ("pi.ID", "DESC")],
+            page_size, filters.get('cursor') if filters else None, offset
+        )
+        keyset_sql, keyset_params = keyset.where()
+        base_sql += (" AND " if conditions else " WHERE ") + keyset_sql
+        base_sql += f" ORDER BY {keyset.order_by_sql()}"
         
         # Firebird não suporta parametrização de FIRST/SKIP, então usar f-string
-        # Garantir que são inteiros para evitar SQL injection
-        page_size = int(page_size)
-        offset = int(offset)
-        if offset > 0:
-            paginated_sql = f"SELECT FIRST {page_size} SKIP {offset}"
-        else:
-            paginated_sql = f"SELECT FIRST {page_size}"
+        paginated_sql = f"SELECT {keyset.select_prefix()}"
         
         # Extrair campos do SELECT original
         select_fields = base_sql.split("FROM")[0].replace("SELECT", "").strip()
@@ -648,10 +657,11 @@ def get_purchase_invoices(filters=None):
         
         final_sql = f"{paginated_sql} {select_fields} {from_clause}"
         
-        cur.execute(final_sql, params)
+        cur.execute(final_sql, params + keyset_params)
+        rows, next_cursor = keyset.paginate(cur.fetchall(), lambda row: (row[4], row[0]))
         
         invoices = []
-        for row in cur.fetchall():
+        for row in rows:
             invoices.append({
                 "id": row[0],
                 "invoice_number": row[1],
@@ -668,14 +678,16 @@ def get_purchase_invoices(filters=None):
             })
         
         # ALTERAÇÃO: Retornar objeto com paginação
-        total_pages = math.ceil(total_count / page_size) if page_size > 0 else 1
+        total_pages = math.ceil(total_count / page_size) if total_count is not None else None
         
         return {
             "items": invoices,
             "total": total_count,
             "page": page,
             "page_size": page_size,
-            "total_pages": total_pages
+            "total_pages": total_pages,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         }
         
     except fdb.Error as e:
@@ -997,6 +1009,7 @@ def update_purchase_invoice(invoice_id, invoice_data, updated_by_user_id):
                 """, (invoice_data['payment_status'], datetime.now(), movement_id))
         
         conn.commit()
+        bump_data_version(CATALOG)
         
         # ALTERAÇÃO: Registrar auditoria de atualização
         changed_fields = []
@@ -1133,18 +1146,23 @@ def _update_invoice_items_with_stock_recalc(invoice_id, new_items, cur):
         old_items = cur.fetchall()
         
         # 2. Reverter estoque dos itens antigos
+        # OTIMIZAÇÃO DE PERFORMANCE: quantidades agregadas por ingrediente e UPDATEs em lote
+        reversal_by_ingredient = {}
         for old_item in old_items:
             old_ingredient_id = old_item[1]
-            old_quantity = float(old_item[2])
-            
-            # Reverter estoque
-            cur.execute("""
-                UPDATE INGREDIENTS
-                SET CURRENT_STOCK = CURRENT_STOCK - ?
-                WHERE ID = ?
-            """, (old_quantity, old_ingredient_id))
-            
-            if cur.rowcount == 0:
+            reversal_by_ingredient[old_ingredient_id] = (
+                reversal_by_ingredient.get(old_ingredient_id, Decimal('0')) + Decimal(str(old_item[2]))
+            )
+        reversal_ids = list(reversal_by_ingredient)
+        reversal_counts = bulk_execute(
+            cur,
+            "UPDATE INGREDIENTS SET CURRENT_STOCK = CURRENT_STOCK - ? WHERE ID = ?",
+            [(reversal_by_ingredient[ing_id], ing_id) for ing_id in reversal_ids],
+            _STOCK_DELTA_TYPES,
+            row_counts=True
+        )
+        for old_ingredient_id, count in zip(reversal_ids, reversal_counts):
+            if count == 0:
                 error_msg = f"Erro ao reverter estoque do ingrediente ID {old_ingredient_id}"
                 return (False, "STOCK_REVERSAL_ERROR", error_msg)
         
@@ -1191,6 +1209,9 @@ def _update_invoice_items_with_stock_recalc(invoice_id, new_items, cur):
                     f"Ingredientes não encontrados: {', '.join(map(str, invalid_ingredients))}"
                 )
         
+        # Itens e entradas de estoque são calculados primeiro e gravados em lote no final
+        item_rows = []
+        stock_by_ingredient = {}
         for item in new_items:
             ingredient_id = int(item['ingredient_id'])
             # ALTERAÇÃO: Usar Decimal ao invés de float (compatível com Firebird)
@@ -1277,33 +1298,35 @@ def _update_invoice_items_with_stock_recalc(invoice_id, new_items, cur):
             # ALTERAÇÃO: Arredondar total_price para 2 casas decimais (formatação final)
             total_price = total_price.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
             
-            # Inserir novo item
-            item_sql = """
-                INSERT INTO PURCHASE_INVOICE_ITEMS (
-                    PURCHASE_INVOICE_ID, INGREDIENT_ID,
-                    QUANTITY, UNIT_PRICE, TOTAL_PRICE
-                )
-                VALUES (?, ?, ?, ?, ?)
-            """
-            try:
-                cur.execute(item_sql, (invoice_id, ingredient_id, quantity, unit_price, total_price))
-            except fdb.Error as db_error:
-                logger.error(f"Erro ao inserir item na atualização: {db_error}")
-                # ALTERAÇÃO: Mensagem de log dividida para evitar linha muito longa
-                logger.error(
-                    f"Valores tentados: invoice_id={invoice_id}, ingredient_id={ingredient_id}, "
-                    f"quantity={quantity}, unit_price={unit_price}, total_price={total_price}"
-                )
-                raise
-            
-            # Aplicar entrada no estoque
-            cur.execute("""
-                UPDATE INGREDIENTS
-                SET CURRENT_STOCK = CURRENT_STOCK + ?
-                WHERE ID = ?
-            """, (quantity, ingredient_id))
-            
-            if cur.rowcount == 0:
+            item_rows.append((invoice_id, ingredient_id, quantity, unit_price, total_price))
+            stock_by_ingredient[ingredient_id] = stock_by_ingredient.get(ingredient_id, Decimal('0')) + quantity
+        
+        # Inserir novos itens
+        item_sql = """
+            INSERT INTO PURCHASE_INVOICE_ITEMS (
+                PURCHASE_INVOICE_ID, INGREDIENT_ID,
+                QUANTITY, UNIT_PRICE, TOTAL_PRICE
+            )
+            VALUES (?, ?, ?, ?, ?)
+        """
+        try:
+            bulk_execute(cur, item_sql, item_rows, _INVOICE_ITEM_TYPES)
+        except fdb.Error as db_error:
+            logger.error(f"Erro ao inserir itens na atualização: {db_error}")
+            logger.error(f"Valores tentados: invoice_id={invoice_id}, itens={item_rows}")
+            raise
+        
+        # Aplicar entrada no estoque
+        stock_ids = list(stock_by_ingredient)
+        stock_counts = bulk_execute(
+            cur,
+            "UPDATE INGREDIENTS SET CURRENT_STOCK = CURRENT_STOCK + ? WHERE ID = ?",
+            [(stock_by_ingredient[ing_id], ing_id) for ing_id in stock_ids],
+            _STOCK_DELTA_TYPES,
+            row_counts=True
+        )
+        for ingredient_id, count in zip(stock_ids, stock_counts):
+            if count == 0:
                 return (False, "STOCK_UPDATE_ERROR", f"Erro ao atualizar estoque do ingrediente ID {ingredient_id}")
         
         return (True, None, {"message": "Itens atualizados com sucesso"})
@@ -1489,6 +1512,7 @@ def delete_purchase_invoice(invoice_id, deleted_by_user_id):
             return (False, "DELETE_ERROR", "Erro ao excluir nota fiscal")
         
         conn.commit()
+        bump_data_version(CATALOG)
         
         return (True, None, {"message": "Nota fiscal excluída com sucesso", "invoice_id": invoice_id})
         
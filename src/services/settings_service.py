@@ -1,28 +1,23 @@
 import fdb
 import logging
 from ..database import get_db_connection
-from datetime import datetime
+from ..utils.cache_manager import get_cache_manager
 
 logger = logging.getLogger(__name__)
 
-# Cache de configurações em memória para melhor performance
-_settings_cache = None
-_cache_timestamp = None
-_cache_ttl_seconds = 300  # 5 minutos de TTL
-
-def _is_cache_valid():
-    """Verifica se o cache ainda é válido"""
-    global _cache_timestamp
-    if _cache_timestamp is None:
-        return False
-    elapsed = (datetime.now() - _cache_timestamp).total_seconds()
-    return elapsed < _cache_ttl_seconds
+# OTIMIZAÇÃO DE PERFORMANCE: Cache de configurações no namespace 'settings' do CacheManager
+# (TTL de 5 minutos, ajustável por CACHE_NAMESPACE_TTLS; métricas em /api/dashboard/cache/namespaces)
+_SETTINGS_CACHE_KEY = 'current'
+_settings_cache = get_cache_manager().namespace('settings', ttl=300, max_entries=8)
 
 def _invalidate_cache():
     """Invalida o cache forçando refresh na próxima chamada"""
-    global _settings_cache, _cache_timestamp
-    _settings_cache = None
-    _cache_timestamp = None
+    _settings_cache.clear()
+
+def warm_cache():
+    """Pré-carrega as configurações no cache (warm-up). Levanta exceção se o banco falhar"""
+    get_all_settings(use_cache=False)
+    return True
 
 def get_all_settings(use_cache=True):
     """
@@ -32,11 +27,11 @@ def get_all_settings(use_cache=True):
         use_cache: Se True, usa cache em memória. Se False, força busca no banco.
                    Padrão True para melhor performance.
     """
-    global _settings_cache, _cache_timestamp
-    
     # Verifica cache se estiver habilitado
-    if use_cache and _is_cache_valid() and _settings_cache is not None:
-        return _settings_cache
+    if use_cache:
+        cached = _settings_cache.get(_SETTINGS_CACHE_KEY)
+        if cached is not None:
+            return cached
     
     conn = None
     try:
@@ -126,8 +121,7 @@ def get_all_settings(use_cache=True):
             }
         
         # Atualiza cache
-        _settings_cache = settings
-        _cache_timestamp = datetime.now()
+        _settings_cache.set(_SETTINGS_CACHE_KEY, settings)
         
         return settings
     except fdb.Error as e:
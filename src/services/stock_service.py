@@ -2,8 +2,9 @@ import fdb
 import logging
 import math
 from decimal import Decimal
-from ..database import get_db_connection
-from ..utils import event_publisher
+from ..database import get_db_connection, bulk_execute
+from ..utils.response_cache import bump_data_version, CATALOG
+from ..utils import event_publisher, schema_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -212,10 +213,8 @@ def validate_stock_for_items(items, cur, cart_id=None):
         placeholders = ', '.join(['?' for _ in product_ids])
         
         # SIMPLIFICAÇÃO: Buscar regras de ingredientes por produto (sem perdas)
-        # Verifica se campo LOSS_PERCENTAGE existe antes de usar
-        try:
-            # Tenta ler com LOSS_PERCENTAGE (se campo existir)
-            sql_rules = f"""
+        # OTIMIZAÇÃO DE PERFORMANCE: Existência de LOSS_PERCENTAGE vem do catálogo do schema
+        sql_rules_with_loss = f"""
                 SELECT 
                     pi.PRODUCT_ID, 
                     pi.INGREDIENT_ID, 
@@ -230,30 +229,24 @@ def validate_stock_for_items(items, cur, cart_id=None):
                 JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
                 WHERE pi.PRODUCT_ID IN ({placeholders})
             """
-            cur.execute(sql_rules, tuple(product_ids))
-            use_loss_percentage = True
-        except fdb.Error as e:
-            # Se campo não existe, usa query sem LOSS_PERCENTAGE
-            error_msg = str(e).lower()
-            if 'loss_percentage' in error_msg or 'unknown' in error_msg:
-                sql_rules = f"""
-                    SELECT 
-                        pi.PRODUCT_ID, 
-                        pi.INGREDIENT_ID, 
-                        pi.PORTIONS, 
-                        pi.MIN_QUANTITY, 
-                        pi.MAX_QUANTITY,
-                        i.BASE_PORTION_QUANTITY,
-                        i.BASE_PORTION_UNIT,
-                        i.STOCK_UNIT
-                    FROM PRODUCT_INGREDIENTS pi
-                    JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
-                    WHERE pi.PRODUCT_ID IN ({placeholders})
-                """
-                cur.execute(sql_rules, tuple(product_ids))
-                use_loss_percentage = False
-            else:
-                raise
+        # Campo não existe no schema: query sem LOSS_PERCENTAGE
+        sql_rules = f"""
+                SELECT 
+                    pi.PRODUCT_ID, 
+                    pi.INGREDIENT_ID, 
+                    pi.PORTIONS, 
+                    pi.MIN_QUANTITY, 
+                    pi.MAX_QUANTITY,
+                    i.BASE_PORTION_QUANTITY,
+                    i.BASE_PORTION_UNIT,
+                    i.STOCK_UNIT
+                FROM PRODUCT_INGREDIENTS pi
+                JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
+                WHERE pi.PRODUCT_ID IN ({placeholders})
+            """
+        use_loss_percentage = schema_catalog.execute_with_optional_column(
+            cur, 'PRODUCT_INGREDIENTS', 'LOSS_PERCENTAGE', sql_rules_with_loss, sql_rules, tuple(product_ids)
+        )
         
         # Mapear ingredientes necessários por produto
         product_ingredients = {}
@@ -602,6 +595,8 @@ def deduct_stock_for_order(order_id, cur=None):
         
         # Executa as deduções de estoque
         updated_ingredients = _execute_stock_deductions(ingredient_deductions, cur)
+        # Estoque alterado: respostas cacheadas do catálogo (disponibilidade) ficam inválidas
+        bump_data_version(CATALOG)
         
         # Só faz commit se criou a conexão nesta função
         if should_close_conn:
@@ -646,6 +641,34 @@ def deduct_stock_for_order(order_id, cur=None):
         if should_close_conn and conn:
             conn.close()
 
+
+_DEDUCTION_INGREDIENTS_SQL_WITH_LOSS = """
+    SELECT 
+        pi.INGREDIENT_ID, 
+        pi.PORTIONS,
+        COALESCE(pi.LOSS_PERCENTAGE, 0) as LOSS_PERCENTAGE,
+        i.BASE_PORTION_QUANTITY,
+        i.BASE_PORTION_UNIT,
+        i.STOCK_UNIT
+    FROM PRODUCT_INGREDIENTS pi
+    JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
+    WHERE pi.PRODUCT_ID = ?
+"""
+
+# Campo não existe no schema: query sem LOSS_PERCENTAGE
+_DEDUCTION_INGREDIENTS_SQL = """
+    SELECT 
+        pi.INGREDIENT_ID, 
+        pi.PORTIONS,
+        i.BASE_PORTION_QUANTITY,
+        i.BASE_PORTION_UNIT,
+        i.STOCK_UNIT
+    FROM PRODUCT_INGREDIENTS pi
+    JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
+    WHERE pi.PRODUCT_ID = ?
+"""
+
+
 def _calculate_ingredient_deductions(order_id, order_items, cur):
     """
     Calcula deduções necessárias de ingredientes com conversão de unidades.
@@ -675,39 +698,11 @@ def _calculate_ingredient_deductions(order_id, order_items, cur):
             quantity = 1
         
         # SIMPLIFICAÇÃO: Busca ingredientes do produto (perdas opcionais)
-        # Verifica se campo LOSS_PERCENTAGE existe antes de usar
-        try:
-            cur.execute("""
-                SELECT 
-                    pi.INGREDIENT_ID, 
-                    pi.PORTIONS,
-                    COALESCE(pi.LOSS_PERCENTAGE, 0) as LOSS_PERCENTAGE,
-                    i.BASE_PORTION_QUANTITY,
-                    i.BASE_PORTION_UNIT,
-                    i.STOCK_UNIT
-                FROM PRODUCT_INGREDIENTS pi
-                JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
-                WHERE pi.PRODUCT_ID = ?
-            """, (product_id,))
-            use_loss_percentage = True
-        except fdb.Error as e:
-            # Se campo não existe, usa query sem LOSS_PERCENTAGE
-            error_msg = str(e).lower()
-            if 'loss_percentage' in error_msg or 'unknown' in error_msg:
-                cur.execute("""
-                    SELECT 
-                        pi.INGREDIENT_ID, 
-                        pi.PORTIONS,
-                        i.BASE_PORTION_QUANTITY,
-                        i.BASE_PORTION_UNIT,
-                        i.STOCK_UNIT
-                    FROM PRODUCT_INGREDIENTS pi
-                    JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
-                    WHERE pi.PRODUCT_ID = ?
-                """, (product_id,))
-                use_loss_percentage = False
-            else:
-                raise
+        # OTIMIZAÇÃO DE PERFORMANCE: Existência de LOSS_PERCENTAGE vem do catálogo do schema
+        use_loss_percentage = schema_catalog.execute_with_optional_column(
+            cur, 'PRODUCT_INGREDIENTS', 'LOSS_PERCENTAGE',
+            _DEDUCTION_INGREDIENTS_SQL_WITH_LOSS, _DEDUCTION_INGREDIENTS_SQL, (product_id,)
+        )
         
         product_ingredients = cur.fetchall()
         
@@ -834,40 +829,32 @@ def _execute_stock_deductions(ingredient_deductions, cur):
     if not ingredient_deductions:
         return updated_ingredients
     
+    # OTIMIZAÇÃO DE PERFORMANCE: Busca o estoque de todos os ingredientes em uma única query
+    # (lote mínimo opcional, conforme o catálogo do schema) e grava os UPDATEs em lote no final
+    ingredient_ids = list(ingredient_deductions)
+    placeholders = ', '.join(['?' for _ in ingredient_ids])
+    stock_sql = """
+        SELECT ID, CURRENT_STOCK, MIN_STOCK_THRESHOLD, STOCK_STATUS, NAME, {min_lot_column} as MIN_LOT_SIZE
+        FROM INGREDIENTS 
+        WHERE ID IN ({placeholders})
+    """
+    schema_catalog.execute_with_optional_column(
+        cur, 'INGREDIENTS', 'MIN_LOT_SIZE',
+        stock_sql.format(min_lot_column="COALESCE(MIN_LOT_SIZE, 0)", placeholders=placeholders),
+        stock_sql.format(min_lot_column="0", placeholders=placeholders),
+        tuple(ingredient_ids)
+    )
+    stock_rows = {row[0]: row[1:] for row in cur.fetchall()}
+    stock_updates = []
+    
     for ingredient_id, deduction_amount in ingredient_deductions.items():
-        # SIMPLIFICAÇÃO: Busca estoque atual (lote mínimo opcional)
-        # Verifica se campo MIN_LOT_SIZE existe antes de usar
-        try:
-            cur.execute("""
-                SELECT CURRENT_STOCK, MIN_STOCK_THRESHOLD, STOCK_STATUS, NAME, COALESCE(MIN_LOT_SIZE, 0) as MIN_LOT_SIZE
-                FROM INGREDIENTS 
-                WHERE ID = ?
-            """, (ingredient_id,))
-            use_min_lot_size = True
-        except fdb.Error as e:
-            # Se campo não existe, usa query sem MIN_LOT_SIZE
-            error_msg = str(e).lower()
-            if 'min_lot_size' in error_msg or 'unknown' in error_msg:
-                cur.execute("""
-                    SELECT CURRENT_STOCK, MIN_STOCK_THRESHOLD, STOCK_STATUS, NAME
-                    FROM INGREDIENTS 
-                    WHERE ID = ?
-                """, (ingredient_id,))
-                use_min_lot_size = False
-            else:
-                raise
-        
-        result = cur.fetchone()
+        result = stock_rows.get(ingredient_id)
         
         if not result:
             logger.warning(f"Ingrediente {ingredient_id} não encontrado ao deduzir estoque")
             continue
         
-        if use_min_lot_size:
-            current_stock, min_threshold, current_status, ingredient_name, min_lot_size = result
-        else:
-            current_stock, min_threshold, current_status, ingredient_name = result
-            min_lot_size = 0  # Campo não existe, usa 0
+        current_stock, min_threshold, current_status, ingredient_name, min_lot_size = result
         
         # Garante que deduction_amount é Decimal para compatibilidade com current_stock
         # Converte explicitamente para Decimal, lidando com qualquer tipo numérico
@@ -942,13 +929,7 @@ def _execute_stock_deductions(ingredient_deductions, cur):
         # Determina novo status baseado no estoque
         new_status = _determine_new_status(new_stock, min_threshold, current_status)
         
-        # Atualiza o estoque
-        cur.execute("""
-            UPDATE INGREDIENTS 
-            SET CURRENT_STOCK = ?, STOCK_STATUS = ?
-            WHERE ID = ?
-        """, (new_stock, new_status, ingredient_id))
-        
+        stock_updates.append((new_stock, new_status, ingredient_id))
         updated_ingredients.append({
             'ingredient_id': ingredient_id,
             'ingredient_name': ingredient_name,
@@ -958,6 +939,14 @@ def _execute_stock_deductions(ingredient_deductions, cur):
             'new_status': new_status
         })
     
+    # Atualiza o estoque
+    bulk_execute(
+        cur,
+        "UPDATE INGREDIENTS SET CURRENT_STOCK = ?, STOCK_STATUS = ? WHERE ID = ?",
+        stock_updates,
+        ['DECIMAL(10,3)', 'VARCHAR(20)', 'INTEGER']
+    )
+    
     return updated_ingredients
 
 def restock_for_order(order_id, cur=None, reason='order_cancellation'):
@@ -1006,6 +995,8 @@ def restock_for_order(order_id, cur=None, reason='order_cancellation'):
         
         # Executa as devoluções de estoque (ADICIONA ao invés de SUBTRAIR)
         updated_ingredients = _execute_stock_restock(ingredient_deductions, cur, reason)
+        # Estoque alterado: respostas cacheadas do catálogo (disponibilidade) ficam inválidas
+        bump_data_version(CATALOG)
         
         # Só faz commit se criou a conexão nesta função
         if should_close_conn:
@@ -1335,6 +1326,7 @@ def confirm_out_of_stock(ingredient_id):
             })
         
         conn.commit()
+        bump_data_version(CATALOG)
         
         message = f"Ingrediente '{ingredient_name}' confirmado como fora de estoque"
         if affected_products_list:
@@ -1399,6 +1391,7 @@ def adjust_stock(ingredient_id, adjustment_amount):
             reactivated_products = reactivate_products_for_ingredient(ingredient_id, cur)
         
         conn.commit()
+        bump_data_version(CATALOG)
         
         message = f"Estoque de '{ingredient_name}' ajustado: {current_stock} -> {new_stock} (status: {new_status})"
         if reactivated_products:
@@ -1488,6 +1481,7 @@ def reactivate_products_for_ingredient(ingredient_id, cursor=None):
         # Commit apenas se a conexão foi criada nesta função
         if conn:
             conn.commit()
+            bump_data_version(CATALOG)
         
         return reactivated_products
         
@@ -2232,6 +2226,54 @@ def _batch_get_ingredient_physical_stock(ingredient_ids, cur):
         return {}
 
 
+_RECIPE_INGREDIENTS_SQL_WITH_LOSS = """
+    SELECT 
+        pi.INGREDIENT_ID,
+        pi.PORTIONS,
+        COALESCE(pi.LOSS_PERCENTAGE, 0) as LOSS_PERCENTAGE,
+        i.NAME,
+        i.BASE_PORTION_QUANTITY,
+        i.BASE_PORTION_UNIT,
+        i.STOCK_UNIT,
+        i.IS_AVAILABLE
+    FROM PRODUCT_INGREDIENTS pi
+    JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
+    WHERE pi.PRODUCT_ID = ?
+      AND pi.PORTIONS > 0
+      AND i.IS_AVAILABLE = TRUE
+"""
+
+_RECIPE_INGREDIENTS_SQL = """
+    SELECT 
+        pi.INGREDIENT_ID,
+        pi.PORTIONS,
+        i.NAME,
+        i.BASE_PORTION_QUANTITY,
+        i.BASE_PORTION_UNIT,
+        i.STOCK_UNIT,
+        i.IS_AVAILABLE
+    FROM PRODUCT_INGREDIENTS pi
+    JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
+    WHERE pi.PRODUCT_ID = ?
+      AND pi.PORTIONS > 0
+      AND i.IS_AVAILABLE = TRUE
+"""
+
+
+def _select_recipe_ingredients(cur, product_id):
+    """
+    Executa a busca dos ingredientes obrigatórios disponíveis da receita base.
+    Usa LOSS_PERCENTAGE somente se a coluna existir (catálogo do schema ou tentativa/erro).
+    
+    Returns:
+        bool: True se as linhas incluem LOSS_PERCENTAGE (3ª coluna)
+    """
+    return schema_catalog.execute_with_optional_column(
+        cur, 'PRODUCT_INGREDIENTS', 'LOSS_PERCENTAGE',
+        _RECIPE_INGREDIENTS_SQL_WITH_LOSS, _RECIPE_INGREDIENTS_SQL, (product_id,)
+    )
+
+
 def calculate_product_capacity(product_id, cur=None, include_extras=True, for_listing=False):
     """
     Calcula a capacidade de produção de um produto.
@@ -2263,53 +2305,8 @@ def calculate_product_capacity(product_id, cur=None, include_extras=True, for_li
             should_close = True
         
         # SIMPLIFICAÇÃO: Busca ingredientes da receita base (perdas opcionais)
-        # Verifica se campo LOSS_PERCENTAGE existe antes de usar
-        # TODO: REVISAR - Método atual de detecção de coluna é frágil; considerar usar INFORMATION_SCHEMA
-        use_loss_percentage = False
-        try:
-            # Tenta buscar coluna LOSS_PERCENTAGE (pode não existir em versões antigas do schema)
-            cur.execute("""
-                SELECT 
-                    pi.INGREDIENT_ID,
-                    pi.PORTIONS,
-                    COALESCE(pi.LOSS_PERCENTAGE, 0) as LOSS_PERCENTAGE,
-                    i.NAME,
-                    i.BASE_PORTION_QUANTITY,
-                    i.BASE_PORTION_UNIT,
-                    i.STOCK_UNIT,
-                    i.IS_AVAILABLE
-                FROM PRODUCT_INGREDIENTS pi
-                JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
-                WHERE pi.PRODUCT_ID = ?
-                  AND pi.PORTIONS > 0
-                  AND i.IS_AVAILABLE = TRUE
-            """, (product_id,))
-            use_loss_percentage = True
-        except fdb.Error as e:
-            # Se campo não existe, usa query sem LOSS_PERCENTAGE
-            error_msg = str(e).lower()
-            if 'loss_percentage' in error_msg or 'unknown' in error_msg or 'column' in error_msg:
-                logger.debug(f"Campo LOSS_PERCENTAGE não encontrado, usando query sem perdas para produto {product_id}")
-                cur.execute("""
-                    SELECT 
-                        pi.INGREDIENT_ID,
-                        pi.PORTIONS,
-                        i.NAME,
-                        i.BASE_PORTION_QUANTITY,
-                        i.BASE_PORTION_UNIT,
-                        i.STOCK_UNIT,
-                        i.IS_AVAILABLE
-                    FROM PRODUCT_INGREDIENTS pi
-                    JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
-                    WHERE pi.PRODUCT_ID = ?
-                      AND pi.PORTIONS > 0
-                      AND i.IS_AVAILABLE = TRUE
-                """, (product_id,))
-                use_loss_percentage = False
-            else:
-                # ALTERAÇÃO: Re-raise se for outro tipo de erro (não relacionado à coluna)
-                logger.error(f"Erro inesperado ao buscar ingredientes do produto {product_id}: {e}", exc_info=True)
-                raise
+        # OTIMIZAÇÃO DE PERFORMANCE: SQL escolhido pelo catálogo do schema (sem tentativa/erro)
+        use_loss_percentage = _select_recipe_ingredients(cur, product_id)
         
         ingredients = cur.fetchall()
         
@@ -2501,53 +2498,8 @@ def calculate_product_capacity_with_extras(product_id, extras=None, base_modific
                 base_mods_map[ing_id] += delta
         
         # ALTERAÇÃO: Busca ingredientes da receita base (perdas opcionais)
-        # Verifica se campo LOSS_PERCENTAGE existe antes de usar
-        # TODO: REVISAR - Método atual de detecção de coluna é frágil; considerar usar INFORMATION_SCHEMA
-        use_loss_percentage = False
-        try:
-            # Tenta buscar coluna LOSS_PERCENTAGE (pode não existir em versões antigas do schema)
-            cur.execute("""
-                SELECT 
-                    pi.INGREDIENT_ID,
-                    pi.PORTIONS,
-                    COALESCE(pi.LOSS_PERCENTAGE, 0) as LOSS_PERCENTAGE,
-                    i.NAME,
-                    i.BASE_PORTION_QUANTITY,
-                    i.BASE_PORTION_UNIT,
-                    i.STOCK_UNIT,
-                    i.IS_AVAILABLE
-                FROM PRODUCT_INGREDIENTS pi
-                JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
-                WHERE pi.PRODUCT_ID = ?
-                  AND pi.PORTIONS > 0
-                  AND i.IS_AVAILABLE = TRUE
-            """, (product_id,))
-            use_loss_percentage = True
-        except fdb.Error as e:
-            # Se campo não existe, usa query sem LOSS_PERCENTAGE
-            error_msg = str(e).lower()
-            if 'loss_percentage' in error_msg or 'unknown' in error_msg or 'column' in error_msg:
-                logger.debug(f"Campo LOSS_PERCENTAGE não encontrado, usando query sem perdas para produto {product_id}")
-                cur.execute("""
-                    SELECT 
-                        pi.INGREDIENT_ID,
-                        pi.PORTIONS,
-                        i.NAME,
-                        i.BASE_PORTION_QUANTITY,
-                        i.BASE_PORTION_UNIT,
-                        i.STOCK_UNIT,
-                        i.IS_AVAILABLE
-                    FROM PRODUCT_INGREDIENTS pi
-                    JOIN INGREDIENTS i ON pi.INGREDIENT_ID = i.ID
-                    WHERE pi.PRODUCT_ID = ?
-                      AND pi.PORTIONS > 0
-                      AND i.IS_AVAILABLE = TRUE
-                """, (product_id,))
-                use_loss_percentage = False
-            else:
-                # ALTERAÇÃO: Re-raise se for outro tipo de erro (não relacionado à coluna)
-                logger.error(f"Erro inesperado ao buscar ingredientes do produto {product_id}: {e}", exc_info=True)
-                raise
+        # OTIMIZAÇÃO DE PERFORMANCE: SQL escolhido pelo catálogo do schema (sem tentativa/erro)
+        use_loss_percentage = _select_recipe_ingredients(cur, product_id)
         
         recipe_ingredients = cur.fetchall()
         
@@ -2,33 +2,26 @@ import fdb
 from datetime import datetime  
 from ..database import get_db_connection
 from ..config import Config  
+from ..utils.cache_manager import get_cache_manager
+from ..utils.response_cache import bump_data_version, STORE_HOURS
 
-# Cache de horários em memória para melhor performance
-_store_hours_cache = None
-_cache_timestamp = None
-_cache_ttl_seconds = 300  # 5 minutos de TTL
-
-def _is_cache_valid():
-    """Verifica se o cache ainda é válido"""
-    global _cache_timestamp
-    if _cache_timestamp is None:
-        return False
-    elapsed = (datetime.now() - _cache_timestamp).total_seconds()
-    return elapsed < _cache_ttl_seconds
+# OTIMIZAÇÃO DE PERFORMANCE: Cache de horários no namespace 'store_hours' do CacheManager
+# (TTL de 5 minutos, ajustável por CACHE_NAMESPACE_TTLS; métricas em /api/dashboard/cache/namespaces)
+_STORE_HOURS_CACHE_KEY = 'all'
+_store_hours_cache = get_cache_manager().namespace('store_hours', ttl=300, max_entries=8)
 
 def _invalidate_cache():
     """Invalida o cache forçando refresh na próxima chamada"""
-    global _store_hours_cache, _cache_timestamp
-    _store_hours_cache = None
-    _cache_timestamp = None
+    _store_hours_cache.clear()
+    bump_data_version(STORE_HOURS)
 
 def _load_hours_into_cache(force_refresh=False):
-    """Carrega horários no cache"""
-    global _store_hours_cache, _cache_timestamp
-    
+    """Retorna os horários por dia da semana, carregando-os no cache se necessário"""
     # Verifica cache se não for refresh forçado
-    if not force_refresh and _is_cache_valid() and _store_hours_cache is not None:
-        return
+    if not force_refresh:
+        hours = _store_hours_cache.get(_STORE_HOURS_CACHE_KEY)
+        if hours is not None:
+            return hours
     
     conn = None  
     try:  
@@ -36,16 +29,22 @@ def _load_hours_into_cache(force_refresh=False):
         cur = conn.cursor()  
         cur.execute("SELECT DAY_OF_WEEK, OPENING_TIME, CLOSING_TIME, IS_OPEN FROM STORE_HOURS ORDER BY DAY_OF_WEEK;")  
         hours = {row[0]: {"open": row[1], "close": row[2], "is_open": row[3]} for row in cur.fetchall()}  
-        _store_hours_cache = hours
-        _cache_timestamp = datetime.now()
+        _store_hours_cache.set(_STORE_HOURS_CACHE_KEY, hours)
         print("Cache de horários de funcionamento carregado.")  
+        return hours
     except fdb.Error as e:  
+        # Falha não é cacheada: a próxima chamada tenta novamente
         print(f"Erro ao carregar horários para o cache: {e}")  
-        _store_hours_cache = {}  
+        return {}
     finally:  
         if conn:
             conn.close()  
 
+def warm_cache():
+    """Pré-carrega os horários no cache (warm-up). Retorna False se o carregamento falhou"""
+    _load_hours_into_cache(force_refresh=True)
+    return _store_hours_cache.get(_STORE_HOURS_CACHE_KEY) is not None
+
 def is_store_open():  
     """Verifica se a loja está aberta no momento atual
     
@@ -56,15 +55,15 @@ def is_store_open():
     if Config.DEV_MODE:
         return (True, "Modo de desenvolvimento ativo - horário de funcionamento ignorado.")
     
-    _load_hours_into_cache()
+    store_hours = _load_hours_into_cache()
     
-    if not _store_hours_cache:
+    if not store_hours:
         return (False, "Horários de funcionamento não disponíveis.")
     
     now = datetime.now()  
     day_of_week = (now.weekday() + 1) % 7  # 0=Domingo, 1=Segunda, ..., 6=Sábado
     current_time = now.time()  
-    today_hours = _store_hours_cache.get(day_of_week)  
+    today_hours = store_hours.get(day_of_week)  
     
     if not today_hours or not today_hours['is_open']:  
         return (False, "A loja está fechada hoje.")  
@@ -84,9 +83,9 @@ def get_store_hours():
     Returns:
         list: Lista de dicionários com horários por dia da semana
     """
-    _load_hours_into_cache()
+    store_hours = _load_hours_into_cache()
     
-    if not _store_hours_cache:
+    if not store_hours:
         return []
     
     # Nomes dos dias da semana para facilitar uso no frontend
@@ -101,8 +100,8 @@ def get_store_hours():
     }
     
     hours_list = []
-    for day_of_week in sorted(_store_hours_cache.keys()):
-        day_data = _store_hours_cache[day_of_week]
+    for day_of_week in sorted(store_hours.keys()):
+        day_data = store_hours[day_of_week]
         opening_time = day_data['open']
         closing_time = day_data['close']
         
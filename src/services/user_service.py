@@ -1,5 +1,4 @@
 import fdb  
-import bcrypt  
 import logging
 # ALTERAÇÃO: Adicionar date ao import para uso em validações de filtros
 from datetime import datetime, timedelta, date  
@@ -9,6 +8,7 @@ from ..database import get_db_connection
 from . import auth_service
 # ALTERAÇÃO: Removido import não utilizado token_helper
 from ..utils import validators
+from ..utils import password_hasher
 
 logger = logging.getLogger(__name__)  
 
@@ -102,7 +102,8 @@ def create_user(user_data):
     if role == 'delivery':
         role = 'deliverer'
         user_data['role'] = role
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    # OTIMIZAÇÃO DE PERFORMANCE: hash da senha no pool dedicado, fora da thread da requisição
+    hashed_password = password_hasher.hash_password(password)
 
     conn = None
     try:
@@ -137,7 +138,7 @@ def create_user(user_data):
             VALUES (?, ?, ?, ?, ?, ?, ?) 
             RETURNING ID;
         """
-        cur.execute(sql, (full_name, email, hashed_password.decode('utf-8'), role, date_of_birth, phone, cpf))
+        cur.execute(sql, (full_name, email, hashed_password, role, date_of_birth, phone, cpf))
         new_user_id = cur.fetchone()[0]
         
         # Se for customer, adiciona pontos de boas-vindas ANTES do commit
@@ -207,7 +208,7 @@ def verify_user_password(user_id, password):
         if not stored_hash:
             return False
 
-        return bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8'))
+        return password_hasher.check_password(password, stored_hash)
     except fdb.Error as e:
         return False
     finally:
@@ -671,9 +672,9 @@ def finalize_password_reset(email, reset_code, new_password):
             return (False, "Este código de recuperação expirou.")
 
         # Atualiza a senha
-        hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = password_hasher.hash_password(new_password)
         sql_update_password = "UPDATE USERS SET PASSWORD_HASH = ? WHERE ID = ?;"
-        cur.execute(sql_update_password, (hashed_password.decode('utf-8'), user_id))
+        cur.execute(sql_update_password, (hashed_password, user_id))
 
         # Invalida o código
         sql_invalidate_code = "UPDATE PASSWORD_RESET SET USED_AT = CURRENT_TIMESTAMP WHERE USER_ID = ? AND VERIFICATION_CODE = ?;"
@@ -736,9 +737,9 @@ def change_user_password(user_id, current_password, new_password):
         conn = get_db_connection()
         cur = conn.cursor()
         
-        hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = password_hasher.hash_password(new_password)
         sql_update = "UPDATE USERS SET PASSWORD_HASH = ? WHERE ID = ? AND IS_ACTIVE = TRUE"
-        cur.execute(sql_update, (hashed_password.decode('utf-8'), user_id))
+        cur.execute(sql_update, (hashed_password, user_id))
         
         if cur.rowcount == 0:
             return (False, "USER_NOT_FOUND", "Usuário não encontrado")
@@ -10,6 +10,7 @@ from flask import request
 from flask_jwt_extended import decode_token
 from flask_socketio import join_room, leave_room, emit
 from .. import socketio
+from ..utils.event_outbox import get_event_outbox_relay, is_available as is_outbox_available
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,6 +28,10 @@ def handle_system_connect(auth=None):
     - Todos entram na sala: user_{user_id} (para receber notificações pessoais)
     - Se role contém 'admin' ou 'manager': Entrar na sala admin_room
     - Se role contém 'kitchen' ou 'chef': Entrar na sala kitchen_room
+    
+    Replay: com last_seq (query string ou objeto auth), reenvia os eventos do outbox
+    com sequência maior destinados às salas do usuário e emite 'events.replay_complete'.
+    Os eventos trazem o campo 'seq'; duplicados (replay + tempo real) devem ser ignorados.
     """
     try:
         # Tenta obter o token da query string primeiro
@@ -88,9 +93,17 @@ def handle_system_connect(auth=None):
             emit('system_connected', {
                 'user_id': user_id,
                 'rooms': rooms_joined,
+                'last_seq': get_event_outbox_relay().last_seq,
                 'message': 'Conectado ao sistema de notificações'
             })
             
+            # ALTERAÇÃO: Replay dos eventos perdidos enquanto o cliente estava desconectado
+            last_seq = _parse_last_seq(request.args.get('last_seq'))
+            if last_seq is None and isinstance(auth, dict):
+                last_seq = _parse_last_seq(auth.get('last_seq'))
+            if last_seq is not None:
+                _replay_events(user_id, last_seq, rooms_joined)
+            
             return True
             
         except Exception as e:
@@ -102,6 +115,41 @@ def handle_system_connect(auth=None):
         return False
 
 
+def _parse_last_seq(value):
+    """Converte last_seq informado pelo cliente (None se ausente ou inválido)"""
+    if value is None or value == '':
+        return None
+    try:
+        last_seq = int(value)
+    except (TypeError, ValueError):
+        return None
+    return last_seq if last_seq >= 0 else None
+
+
+def _replay_events(user_id, last_seq, rooms):
+    """Reenvia ao cliente conectado os eventos do outbox posteriores a last_seq"""
+    relay = get_event_outbox_relay()
+    if not is_outbox_available():
+        emit('events.replay_complete', {'last_seq': last_seq, 'replayed': 0, 'truncated': False, 'available': False})
+        return
+    try:
+        events, truncated, read_until = relay.replay_since(last_seq, rooms)
+        for _, event_type, data in events:
+            emit(event_type, data)
+        emit('events.replay_complete', {
+            'last_seq': read_until if read_until is not None else last_seq,
+            'replayed': len(events),
+            'truncated': truncated,
+            'available': True
+        })
+        logger.info(f"Replay para usuário {user_id}: {len(events)} eventos após seq {last_seq}"
+                    f"{' (truncado)' if truncated else ''}")
+    except Exception as e:
+        # A conexão não é rejeitada: o cliente pode recarregar o estado completo
+        logger.error(f"Erro no replay de eventos para usuário {user_id}: {e}", exc_info=True)
+        emit('events.replay_complete', {'last_seq': last_seq, 'replayed': 0, 'truncated': True, 'available': False})
+
+
 @socketio.on('disconnect')
 def handle_system_disconnect():
     """
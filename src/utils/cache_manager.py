@@ -2,36 +2,682 @@
 Gerenciador de Cache em Memória
 ALTERAÇÃO: Removido Redis - usando apenas cache em memória para melhor performance
 ALTERAÇÃO: Adicionado métricas de performance do cache
+OTIMIZAÇÃO DE PERFORMANCE: Armazenamento limitado (LRU + orçamento aproximado de bytes)
+com varredura de expirados em background guiada por um heap de TTL, para que a memória
+fique estável em workers de longa duração
 """
+import heapq
 import logging
+import sys
 import time
 import threading
+import weakref
 from typing import Any, Optional, Dict
 from functools import wraps
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+
+from ..config import Config
 
 logger = logging.getLogger(__name__)
 
-# Cache em memória
-_memory_cache = {}
-_memory_cache_timestamps = {}
-_memory_cache_lock = threading.Lock()
-
-# ALTERAÇÃO: Métricas de performance do cache (thread-safe)
-_cache_metrics = {
-    'hits': 0,
-    'misses': 0,
-    'sets': 0,
-    'deletes': 0,
-    'errors': 0,
-    'total_get_time': 0.0,
-    'total_set_time': 0.0,
-    'total_delete_time': 0.0,
-    'operation_counts_by_key_prefix': defaultdict(int)
-}
+
+def _estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Tamanho aproximado (bytes) de um valor cacheado.
+    Percorre dicts/listas/tuplas/sets até 4 níveis; abaixo disso usa sys.getsizeof.
+    """
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += _estimate_size(k, _depth + 1) + _estimate_size(v, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += _estimate_size(item, _depth + 1)
+    return size
+
+
+class _CacheEntry:
+    __slots__ = ('value', 'expires_at', 'size', 'tags')
+
+    def __init__(self, value, expires_at, size, tags=()):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tags = tags
+
+
+class BoundedCacheStore:
+    """
+    Armazenamento do cache: LRU com limite de entradas e de bytes aproximados.
+
+    - get/set movem a chave para o fim da ordem LRU; ao exceder max_entries ou
+      max_bytes, as entradas menos usadas recentemente são removidas
+    - cada set registra (expires_at, key) num heap; a thread de varredura remove as
+      entradas vencidas sem depender de alguém lê-las (entradas do heap que não
+      correspondem mais à entrada atual são descartadas)
+    - valores maiores que max_bytes não são armazenados
+    - entradas podem ser registradas sob tags (ex: 'products', 'product:42'); um
+      índice reverso tag -> chaves permite invalidar uma tag em O(chaves da tag)
+    """
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 sweep_interval: float = 30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._entries: 'OrderedDict[str, _CacheEntry]' = OrderedDict()
+        self._expiry_heap = []
+        self._tag_index: Dict[str, set] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'evictions': 0, 'expirations': 0, 'rejected': 0, 'sweeps': 0}
+        self._sweeper_thread = None
+        self._sweeper_stop = threading.Event()
+
+    # --- operações (thread-safe) ---
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry.expires_at <= time.time():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                return default
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def contains(self, key: str) -> bool:
+        """Indica se a chave existe e não expirou (sem alterar a ordem LRU)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires_at > time.time()
+
+    def set(self, key: str, value: Any, ttl: float, tags=None) -> bool:
+        tags = frozenset(tags) if tags else ()
+        size = _estimate_size(value) + sys.getsizeof(key)
+        expires_at = time.time() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes and size > self.max_bytes:
+                self._stats['rejected'] += 1
+                return False
+            self._entries[key] = _CacheEntry(value, expires_at, size, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            self._evict_overflow()
+            self._compact_heap()
+        self._ensure_sweeper()
+        return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._remove(key)
+
+    def delete_tags(self, tags) -> int:
+        """Remove todas as entradas registradas sob qualquer uma das tags"""
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tag_index.get(tag, ())):
+                    if self._remove(key):
+                        removed += 1
+        return removed
+
+    def delete_matching(self, predicate) -> int:
+        """Remove as chaves para as quais predicate(key) é verdadeiro"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._expiry_heap = []
+            self._tag_index.clear()
+            self._bytes = 0
+
+    def sweep(self) -> int:
+        """Remove as entradas vencidas (topo do heap). Retorna quantas foram removidas."""
+        removed = 0
+        now = time.time()
+        with self._lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] <= now:
+                expires_at, key = heapq.heappop(heap)
+                entry = self._entries.get(key)
+                # Entrada do heap obsoleta (chave regravada ou removida)
+                if entry is None or entry.expires_at != expires_at:
+                    continue
+                self._remove(key)
+                removed += 1
+            self._stats['expirations'] += removed
+            self._stats['sweeps'] += 1
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'tags': len(self._tag_index),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self._stats['evictions'],
+                'expirations': self._stats['expirations'],
+                'rejected': self._stats['rejected'],
+                'sweeps': self._stats['sweeps']
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def stop(self) -> None:
+        self._sweeper_stop.set()
+
+    # --- internos (chamar com _lock) ---
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._drop(key, entry)
+        return True
+
+    def _drop(self, key: str, entry: _CacheEntry) -> None:
+        """Desconta o tamanho e retira a chave do índice de tags"""
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def _evict_overflow(self) -> None:
+        while self._entries and (
+            (self.max_entries and len(self._entries) > self.max_entries) or
+            (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key, entry = self._entries.popitem(last=False)
+            self._drop(key, entry)
+            self._stats['evictions'] += 1
+
+    def _compact_heap(self) -> None:
+        """Reconstrói o heap quando as entradas obsoletas dominam (regravações frequentes)"""
+        if len(self._expiry_heap) > 2 * len(self._entries) + 1024:
+            self._expiry_heap = [(entry.expires_at, key) for key, entry in self._entries.items()]
+            heapq.heapify(self._expiry_heap)
+
+    # --- varredura em background ---
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper_thread is not None or self.sweep_interval <= 0:
+            return
+        with self._lock:
+            if self._sweeper_thread is not None:
+                return
+            self._sweeper_thread = threading.Thread(
+                target=self._sweeper_loop,
+                name='cache-expiry-sweeper',
+                daemon=True
+            )
+        self._sweeper_thread.start()
+
+    def _sweeper_loop(self) -> None:
+        while not self._sweeper_stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Erro na varredura de expiração do cache: {e}", exc_info=True)
+
+
+class StripedCacheStore:
+    """
+    Cache dividido em N faixas (stripes) independentes, escolhidas pelo hash da chave.
+
+    OTIMIZAÇÃO DE PERFORMANCE: cada faixa é um BoundedCacheStore com lock próprio,
+    então get/set de chaves diferentes raramente disputam o mesmo lock. Os limites
+    (entradas e bytes) são divididos igualmente entre as faixas e uma única thread
+    varre as entradas expiradas de todas elas.
+    """
+    def __init__(self, stripes: int = 16, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 sweep_interval: float = 30):
+        self.stripes = max(int(stripes), 1)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._shards = [
+            BoundedCacheStore(
+                max_entries=-(-max_entries // self.stripes) if max_entries else 0,
+                max_bytes=-(-max_bytes // self.stripes) if max_bytes else 0,
+                sweep_interval=0
+            )
+            for _ in range(self.stripes)
+        ]
+        self._sweeper_thread = None
+        self._sweeper_lock = threading.Lock()
+        self._sweeper_stop = threading.Event()
+
+    def _shard(self, key: str) -> BoundedCacheStore:
+        return self._shards[hash(key) % self.stripes]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._shard(key).get(key, default)
+
+    def contains(self, key: str) -> bool:
+        return self._shard(key).contains(key)
+
+    def set(self, key: str, value: Any, ttl: float, tags=None) -> bool:
+        stored = self._shard(key).set(key, value, ttl, tags)
+        if self._sweeper_thread is None:
+            self._ensure_sweeper()
+        return stored
+
+    def delete(self, key: str) -> bool:
+        return self._shard(key).delete(key)
+
+    def delete_tags(self, tags) -> int:
+        return sum(shard.delete_tags(tags) for shard in self._shards)
+
+    def delete_matching(self, predicate) -> int:
+        return sum(shard.delete_matching(predicate) for shard in self._shards)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            shard.clear()
+
+    def sweep(self) -> int:
+        return sum(shard.sweep() for shard in self._shards)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {'entries': 0, 'tags': 0, 'bytes': 0, 'evictions': 0, 'expirations': 0, 'rejected': 0, 'sweeps': 0}
+        for shard in self._shards:
+            for key, value in shard.get_stats().items():
+                if key in stats:
+                    stats[key] += value
+        # Cada varredura percorre todas as faixas: conta uma vez
+        stats['sweeps'] //= self.stripes
+        stats.update({'max_entries': self.max_entries, 'max_bytes': self.max_bytes, 'stripes': self.stripes})
+        return stats
+
+    def reset_stats(self) -> None:
+        for shard in self._shards:
+            shard.reset_stats()
+
+    def stop(self) -> None:
+        self._sweeper_stop.set()
+
+    def _ensure_sweeper(self) -> None:
+        if self.sweep_interval <= 0:
+            return
+        with self._sweeper_lock:
+            if self._sweeper_thread is not None:
+                return
+            self._sweeper_thread = threading.Thread(
+                target=self._sweeper_loop,
+                name='cache-expiry-sweeper',
+                daemon=True
+            )
+            self._sweeper_thread.start()
+
+    def _sweeper_loop(self) -> None:
+        while not self._sweeper_stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Erro na varredura de expiração do cache: {e}", exc_info=True)
+
+
+_MISSING = object()
+
+# Cache em memória (limites configuráveis via CACHE_MAX_ENTRIES / CACHE_MAX_BYTES / CACHE_LOCK_STRIPES)
+_memory_cache = StripedCacheStore(
+    stripes=Config.CACHE_LOCK_STRIPES,
+    max_entries=Config.CACHE_MAX_ENTRIES,
+    max_bytes=Config.CACHE_MAX_BYTES,
+    sweep_interval=Config.CACHE_SWEEP_INTERVAL_SEC
+)
+
+
+class _ThreadMetrics:
+    """Contadores de métricas de uma thread (escritos só pela própria thread, sem lock)"""
+    __slots__ = ('hits', 'misses', 'sets', 'deletes', 'errors',
+                 'total_get_time', 'total_set_time', 'total_delete_time', 'by_prefix',
+                 'coalesced', 'coalesce_timeouts', 'stale_hits', 'refreshes', 'by_namespace')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.deletes = 0
+        self.errors = 0
+        self.total_get_time = 0.0
+        self.total_set_time = 0.0
+        self.total_delete_time = 0.0
+        self.by_prefix = defaultdict(int)
+        self.coalesced = 0
+        self.coalesce_timeouts = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.by_namespace = {}  # namespace -> [hits, misses, sets] (escrito só por CacheNamespace)
+
+    def merge_into(self, totals: '_ThreadMetrics'):
+        totals.hits += self.hits
+        totals.misses += self.misses
+        totals.sets += self.sets
+        totals.deletes += self.deletes
+        totals.errors += self.errors
+        totals.total_get_time += self.total_get_time
+        totals.total_set_time += self.total_set_time
+        totals.total_delete_time += self.total_delete_time
+        totals.coalesced += self.coalesced
+        totals.coalesce_timeouts += self.coalesce_timeouts
+        totals.stale_hits += self.stale_hits
+        totals.refreshes += self.refreshes
+        # Cópia: a thread dona pode inserir prefixos novos durante a iteração
+        for prefix, count in list(self.by_prefix.items()):
+            totals.by_prefix[prefix] += count
+        for name, counts in list(self.by_namespace.items()):
+            merged = totals.by_namespace.setdefault(name, [0, 0, 0])
+            for i, count in enumerate(counts):
+                merged[i] += count
+
+
+# OTIMIZAÇÃO DE PERFORMANCE: Métricas por thread, combinadas apenas em get_metrics()
+# (o caminho quente não toma lock). Contadores de threads encerradas são acumulados
+# em _retired_metrics para o registro não crescer com threads por requisição.
+_thread_metrics = threading.local()
+_metrics_registry = {}  # id(thread_metrics) -> (weakref da thread, _ThreadMetrics)
+_retired_metrics = _ThreadMetrics()
 _metrics_lock = threading.Lock()
 
 
+def _prune_dead_thread_metrics():
+    """Acumula em _retired_metrics os contadores de threads encerradas (chamar com _metrics_lock)"""
+    for key, (thread_ref, metrics) in list(_metrics_registry.items()):
+        thread = thread_ref()
+        if thread is None or not thread.is_alive():
+            metrics.merge_into(_retired_metrics)
+            del _metrics_registry[key]
+
+
+def _metrics() -> _ThreadMetrics:
+    """Contadores da thread atual (registrados na primeira operação da thread)"""
+    metrics = getattr(_thread_metrics, 'metrics', None)
+    if metrics is None:
+        metrics = _ThreadMetrics()
+        _thread_metrics.metrics = metrics
+        with _metrics_lock:
+            if len(_metrics_registry) >= 2 * threading.active_count() + 16:
+                _prune_dead_thread_metrics()
+            _metrics_registry[id(metrics)] = (weakref.ref(threading.current_thread()), metrics)
+    return metrics
+
+
+# OTIMIZAÇÃO DE PERFORMANCE: No caminho quente (get/set/delete) só há incrementos de
+# inteiros; a contagem por prefixo de chave (concatenação de string + dict por operação)
+# é opcional (CACHE_PREFIX_METRICS_ENABLED) e a de namespace fica em CacheNamespace.
+_PREFIX_METRICS = Config.CACHE_PREFIX_METRICS_ENABLED
+_NS_HITS, _NS_MISSES, _NS_SETS = 0, 1, 2
+
+
+def _namespace_counts(name: str) -> list:
+    """Contadores [hits, misses, sets] do namespace na thread atual"""
+    by_namespace = _metrics().by_namespace
+    counts = by_namespace.get(name)
+    if counts is None:
+        counts = by_namespace[name] = [0, 0, 0]
+    return counts
+
+
+def _key_prefix(key: str) -> str:
+    prefix, sep, _ = key.partition(':')
+    return prefix if sep else key[:20]
+
+
+def _merged_metrics() -> _ThreadMetrics:
+    """Combina os contadores de todas as threads (únicos pontos que tomam _metrics_lock)"""
+    totals = _ThreadMetrics()
+    with _metrics_lock:
+        _prune_dead_thread_metrics()
+        _retired_metrics.merge_into(totals)
+        for _, metrics in _metrics_registry.values():
+            metrics.merge_into(totals)
+    return totals
+
+
+class _StaleableValue:
+    """Valor gravado com stale-while-revalidate: fresco até fresh_until, depois servido como velho"""
+    __slots__ = ('value', 'fresh_until')
+
+    def __init__(self, value, fresh_until):
+        self.value = value
+        self.fresh_until = fresh_until
+
+
+class _Flight:
+    """Cálculo em andamento de uma chave; as demais requisições aguardam o resultado"""
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Cache L2 entre processos (opcional, CACHE_L2_ENABLED): criada na primeira utilização
+_l2_tier = None
+_l2_initialized = False
+_l2_lock = threading.Lock()
+
+
+def _get_l2():
+    """Retorna a camada L2 (None se desativada ou se não pôde ser aberta)"""
+    global _l2_tier, _l2_initialized
+    if _l2_initialized:
+        return _l2_tier
+    with _l2_lock:
+        if not _l2_initialized:
+            if Config.CACHE_L2_ENABLED:
+                try:
+                    from .shared_cache import SqliteCacheTier, default_l2_path
+                    _l2_tier = SqliteCacheTier(
+                        Config.CACHE_L2_PATH or default_l2_path(),
+                        sync_interval=Config.CACHE_L2_SYNC_INTERVAL_SEC,
+                        max_value_bytes=Config.CACHE_L2_MAX_VALUE_BYTES
+                    )
+                    logger.info(f"Cache L2 compartilhado ativo: {_l2_tier.path}")
+                except Exception as e:
+                    logger.error(f"Cache L2 desativado - não foi possível abrir o arquivo: {e}", exc_info=True)
+                    _l2_tier = None
+            _l2_initialized = True
+    return _l2_tier
+
+
+# Callbacks chamados com as tags após cada invalidate_tags (ex: re-aquecimento do cache)
+_invalidation_listeners = []
+
+
+def add_invalidation_listener(callback) -> None:
+    """
+    Registra callback(tags) executado após cada invalidate_tags (inclusive clear() de
+    namespaces, que invalida a tag 'ns:<nome>'). Deve ser rápido: roda na thread que invalidou.
+    """
+    if callback not in _invalidation_listeners:
+        _invalidation_listeners.append(callback)
+
+
+# OTIMIZAÇÃO DE PERFORMANCE: Single-flight - chave -> cálculo em andamento
+_inflight: Dict[str, _Flight] = {}
+_inflight_lock = threading.Lock()
+
+
+# OTIMIZAÇÃO DE PERFORMANCE: Namespaces - regiões nomeadas sobre o mesmo store
+_NAMESPACE_PREFIX = 'ns:'
+_namespaces: Dict[str, 'CacheNamespace'] = {}
+_namespaces_lock = threading.Lock()
+
+
+def _parse_namespace_overrides(raw: str) -> Dict[str, int]:
+    """Converte 'nome=valor,nome2=valor2' em dict (itens inválidos são ignorados com aviso)"""
+    overrides = {}
+    for item in (raw or '').split(','):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition('=')
+        try:
+            if not sep:
+                raise ValueError(item)
+            overrides[name.strip()] = int(value)
+        except ValueError:
+            logger.warning(f"Ajuste de namespace de cache inválido ignorado: {item!r}")
+    return overrides
+
+
+_NAMESPACE_TTLS = _parse_namespace_overrides(Config.CACHE_NAMESPACE_TTLS)
+_NAMESPACE_MAX_ENTRIES = _parse_namespace_overrides(Config.CACHE_NAMESPACE_MAX_ENTRIES)
+
+
+def _namespace_of(key: str) -> Optional[str]:
+    """Nome do namespace de uma chave 'ns:<nome>:<chave>' (None para chaves sem namespace)"""
+    if not key.startswith(_NAMESPACE_PREFIX):
+        return None
+    name, sep, _ = key[len(_NAMESPACE_PREFIX):].partition(':')
+    return name if sep else None
+
+
+class CacheNamespace:
+    """
+    Região nomeada do cache (ex: 'settings', 'auth_tokens').
+    
+    As chaves são gravadas como 'ns:<nome>:<chave>' no store comum e todas recebem a
+    tag 'ns:<nome>', então clear() remove a região inteira pelo índice de tags (e, com a
+    L2 ativa, também nos demais workers). Tags passadas às operações ficam restritas ao
+    namespace. Cada namespace tem TTL padrão, limite de entradas (as gravadas há mais
+    tempo são descartadas) e contadores de hit/miss próprios.
+    """
+    
+    def __init__(self, manager: 'CacheManager', name: str, ttl: int, max_entries: int):
+        self.manager = manager
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._prefix = f"{_NAMESPACE_PREFIX}{name}:"
+        self._tag = f"{_NAMESPACE_PREFIX}{name}"
+        self._keys: 'OrderedDict[str, None]' = OrderedDict()  # chaves completas, em ordem de gravação
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._flushes = 0
+    
+    def _tags(self, tags) -> list:
+        return [self._tag] + [self._prefix + tag for tag in tags or ()]
+    
+    def get(self, key: str) -> Optional[Any]:
+        value = self.manager.get(self._prefix + key)
+        _namespace_counts(self.name)[_NS_MISSES if value is None else _NS_HITS] += 1
+        return value
+    
+    def set(self, key: str, value: Any, ttl: int = None, tags=None) -> bool:
+        success = self.manager.set(self._prefix + key, value, ttl or self.ttl, self._tags(tags))
+        if success:
+            _namespace_counts(self.name)[_NS_SETS] += 1
+        return success
+    
+    def get_or_compute(self, key: str, compute, ttl: int = None, tags=None,
+                       stale_ttl: int = 0, wait_timeout: float = None) -> Any:
+        computed = False
+        
+        def counted_compute():
+            nonlocal computed
+            computed = True
+            return compute()
+        
+        value = self.manager.get_or_compute(
+            self._prefix + key, counted_compute, ttl=ttl or self.ttl, tags=self._tags(tags),
+            stale_ttl=stale_ttl, wait_timeout=wait_timeout
+        )
+        # Calculado por esta chamada = miss (e gravação); servido do cache ou do cálculo de outra = hit
+        counts = _namespace_counts(self.name)
+        if computed:
+            counts[_NS_MISSES] += 1
+            if value is not None:
+                counts[_NS_SETS] += 1
+        else:
+            counts[_NS_HITS] += 1
+        return value
+    
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            self._keys.pop(self._prefix + key, None)
+        return self.manager.delete(self._prefix + key)
+    
+    def invalidate_tags(self, *tags: str) -> int:
+        return self.manager.invalidate_tags(*(self._prefix + tag for tag in tags))
+    
+    def clear(self) -> int:
+        """Remove todas as entradas do namespace. Retorna o número de chaves removidas"""
+        with self._lock:
+            self._keys.clear()
+            self._flushes += 1
+        return self.manager.invalidate_tags(self._tag)
+    
+    def _track(self, full_key: str) -> None:
+        """Registra a gravação e descarta as entradas mais antigas acima de max_entries"""
+        overflow = []
+        with self._lock:
+            self._keys[full_key] = None
+            self._keys.move_to_end(full_key)
+            while len(self._keys) > self.max_entries:
+                overflow.append(self._keys.popitem(last=False)[0])
+        if overflow:
+            evicted = sum(1 for key in overflow if _memory_cache.delete(key))
+            with self._lock:
+                self._evictions += evicted
+    
+    def get_stats(self, counters: Dict = None) -> Dict[str, Any]:
+        if counters is None:
+            counters = _merged_metrics().by_namespace
+        with self._lock:
+            keys = list(self._keys)
+        # Descarta chaves que expiraram ou foram invalidadas por tag/outro worker
+        dead = [key for key in keys if not _memory_cache.contains(key)]
+        with self._lock:
+            for key in dead:
+                self._keys.pop(key, None)
+            entries = len(self._keys)
+            evictions, flushes = self._evictions, self._flushes
+        hits, misses, sets = counters.get(self.name, (0, 0, 0))
+        return {
+            'ttl': self.ttl,
+            'max_entries': self.max_entries,
+            'entries': entries,
+            'hits': hits,
+            'misses': misses,
+            'sets': sets,
+            'hit_rate': round(hits / (hits + misses) * 100, 2) if hits + misses else 0.0,
+            'evictions': evictions,
+            'flushes': flushes
+        }
+    
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._evictions = 0
+            self._flushes = 0
+
+
 class CacheManager:
     """
     Gerenciador de cache em memória.
@@ -58,42 +704,47 @@ class CacheManager:
         Returns:
             Valor do cache ou None se não existir/expirado
         """
-        start_time = time.time()
+        result = self._get_entry(key)
+        if isinstance(result, _StaleableValue):
+            return result.value
+        return result
+    
+    def _get_entry(self, key: str) -> Optional[Any]:
+        """Valor armazenado (pode ser _StaleableValue), com métricas de hit/miss"""
+        start_time = time.perf_counter()
         result = None
         is_hit = False
         
         try:
-            with _memory_cache_lock:
-                if key in _memory_cache:
-                    # Verificar se expirou
-                    if key in _memory_cache_timestamps:
-                        if time.time() < _memory_cache_timestamps[key]:
-                            result = _memory_cache[key]
-                            is_hit = True
-                        else:
-                            # Expirou, remover
-                            del _memory_cache[key]
-                            del _memory_cache_timestamps[key]
-                            result = None
-                    else:
-                        result = _memory_cache[key]
-                        is_hit = True
+            l2 = _get_l2()
+            if l2 is not None:
+                # Aplica ao L1 as invalidações feitas por outros workers (no máximo 1x por intervalo)
+                l2.sync(_memory_cache)
+            # OTIMIZAÇÃO DE PERFORMANCE: expiração verificada e posição LRU atualizada no store
+            result = _memory_cache.get(key, _MISSING)
+            if result is _MISSING and l2 is not None:
+                # L1 sem a chave: reaproveita o valor calculado por outro worker
+                shared = l2.get(key)
+                if shared is not None:
+                    result, expires_at, entry_tags = shared
+                    _memory_cache.set(key, result, max(expires_at - time.time(), 0.001), entry_tags)
+            is_hit = result is not _MISSING
+            if not is_hit:
+                result = None
         finally:
-            # ALTERAÇÃO: Atualizar métricas de performance
-            elapsed_time = time.time() - start_time
-            with _metrics_lock:
-                if is_hit:
-                    _cache_metrics['hits'] += 1
-                else:
-                    _cache_metrics['misses'] += 1
-                _cache_metrics['total_get_time'] += elapsed_time
-                # Rastrear operações por prefixo de chave
-                key_prefix = key.split(':')[0] if ':' in key else key[:20]
-                _cache_metrics['operation_counts_by_key_prefix'][f'get:{key_prefix}'] += 1
+            # ALTERAÇÃO: Atualizar métricas de performance (contadores da thread, sem lock)
+            metrics = _metrics()
+            if is_hit:
+                metrics.hits += 1
+            else:
+                metrics.misses += 1
+            metrics.total_get_time += time.perf_counter() - start_time
+            if _PREFIX_METRICS:
+                metrics.by_prefix['get:' + _key_prefix(key)] += 1
         
         return result
     
-    def set(self, key: str, value: Any, ttl: int = None) -> bool:
+    def set(self, key: str, value: Any, ttl: int = None, tags=None) -> bool:
         """
         Define valor no cache.
         ALTERAÇÃO: Adicionado rastreamento de métricas de performance
@@ -102,32 +753,36 @@ class CacheManager:
             key: Chave do cache
             value: Valor a armazenar
             ttl: Time to live em segundos (None para usar default_ttl)
+            tags: Tags da entrada (ex: ['products', 'category:3']) para invalidate_tags()
         
         Returns:
             True se sucesso, False caso contrário
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         success = False
         
         try:
             ttl = ttl or self.default_ttl
             
-            with _memory_cache_lock:
-                _memory_cache[key] = value
-                _memory_cache_timestamps[key] = time.time() + ttl
-            success = True
+            # Valores acima do orçamento de bytes não são armazenados (retorna False)
+            success = _memory_cache.set(key, value, ttl, tags)
+            l2 = _get_l2()
+            if l2 is not None:
+                l2.set(key, value, ttl, tags)
+            namespace = _namespace_of(key)
+            if success and namespace is not None and namespace in _namespaces:
+                # Aplica o limite de entradas do namespace
+                _namespaces[namespace]._track(key)
         finally:
-            # ALTERAÇÃO: Atualizar métricas de performance
-            elapsed_time = time.time() - start_time
-            with _metrics_lock:
-                if success:
-                    _cache_metrics['sets'] += 1
-                    _cache_metrics['total_set_time'] += elapsed_time
-                else:
-                    _cache_metrics['errors'] += 1
-                # Rastrear operações por prefixo de chave
-                key_prefix = key.split(':')[0] if ':' in key else key[:20]
-                _cache_metrics['operation_counts_by_key_prefix'][f'set:{key_prefix}'] += 1
+            # ALTERAÇÃO: Atualizar métricas de performance (contadores da thread, sem lock)
+            metrics = _metrics()
+            if success:
+                metrics.sets += 1
+                metrics.total_set_time += time.perf_counter() - start_time
+            else:
+                metrics.errors += 1
+            if _PREFIX_METRICS:
+                metrics.by_prefix['set:' + _key_prefix(key)] += 1
         
         return success
     
@@ -142,65 +797,202 @@ class CacheManager:
         Returns:
             True se sucesso, False caso contrário
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         success = False
         
         try:
-            with _memory_cache_lock:
-                if key in _memory_cache:
-                    del _memory_cache[key]
-                if key in _memory_cache_timestamps:
-                    del _memory_cache_timestamps[key]
+            _memory_cache.delete(key)
+            l2 = _get_l2()
+            if l2 is not None:
+                l2.delete(key)
             success = True
         finally:
-            # ALTERAÇÃO: Atualizar métricas de performance
-            elapsed_time = time.time() - start_time
-            with _metrics_lock:
-                if success:
-                    _cache_metrics['deletes'] += 1
-                    _cache_metrics['total_delete_time'] += elapsed_time
-                else:
-                    _cache_metrics['errors'] += 1
-                # Rastrear operações por prefixo de chave
-                key_prefix = key.split(':')[0] if ':' in key else key[:20]
-                _cache_metrics['operation_counts_by_key_prefix'][f'delete:{key_prefix}'] += 1
+            # ALTERAÇÃO: Atualizar métricas de performance (contadores da thread, sem lock)
+            metrics = _metrics()
+            if success:
+                metrics.deletes += 1
+                metrics.total_delete_time += time.perf_counter() - start_time
+            else:
+                metrics.errors += 1
+            if _PREFIX_METRICS:
+                metrics.by_prefix['delete:' + _key_prefix(key)] += 1
         
         return success
     
+    def get_or_compute(self, key: str, compute, ttl: int = None, tags=None,
+                       stale_ttl: int = 0, wait_timeout: float = None) -> Any:
+        """
+        Obtém do cache ou calcula o valor, com proteção contra estouro de misses.
+        
+        OTIMIZAÇÃO DE PERFORMANCE:
+        - Single-flight: quando a chave não está no cache, só a primeira requisição
+          executa compute(); as concorrentes aguardam o resultado dela (até wait_timeout,
+          depois calculam por conta própria). Exceções do cálculo são repassadas a quem aguarda.
+        - Stale-while-revalidate (stale_ttl > 0): por stale_ttl segundos após expirar,
+          o valor antigo continua sendo servido enquanto uma thread em background o
+          recalcula. Invalidação por tag/delete remove o valor (não é servido velho).
+        
+        Args:
+            key: Chave do cache
+            compute: Função sem argumentos que calcula o valor
+            ttl: Tempo (s) em que o valor é considerado fresco (None = default_ttl)
+            tags: Tags da entrada
+            stale_ttl: Janela (s) em que o valor expirado ainda é servido
+            wait_timeout: Espera máxima (s) pelo cálculo de outra requisição
+                (None = CACHE_SINGLE_FLIGHT_TIMEOUT_SEC)
+        
+        Returns:
+            Valor do cache ou calculado (None não é cacheado)
+        """
+        ttl = ttl or self.default_ttl
+        entry = self._get_entry(key)
+        if entry is not None:
+            if not isinstance(entry, _StaleableValue):
+                return entry
+            if time.time() < entry.fresh_until:
+                return entry.value
+            # Valor velho: serve agora e recalcula em background (um único refresh por chave)
+            _metrics().stale_hits += 1
+            self._refresh_in_background(key, compute, ttl, tags, stale_ttl)
+            return entry.value
+        
+        with _inflight_lock:
+            flight = _inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                _inflight[key] = flight
+        
+        if leader:
+            return self._compute_and_store(key, compute, ttl, tags, stale_ttl, flight)
+        
+        timeout = Config.CACHE_SINGLE_FLIGHT_TIMEOUT_SEC if wait_timeout is None else wait_timeout
+        metrics = _metrics()
+        if flight.event.wait(timeout):
+            metrics.coalesced += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        # Cálculo da outra requisição demorou demais: calcula sem coordenar
+        metrics.coalesce_timeouts += 1
+        logger.warning(f"Timeout aguardando cálculo em andamento da chave de cache: {key}")
+        result = compute()
+        self._store(key, result, ttl, tags, stale_ttl)
+        return result
+    
+    def _store(self, key, result, ttl, tags, stale_ttl):
+        if result is None:
+            return
+        if stale_ttl:
+            self.set(key, _StaleableValue(result, time.time() + ttl), ttl + stale_ttl, tags)
+        else:
+            self.set(key, result, ttl, tags)
+    
+    def _compute_and_store(self, key, compute, ttl, tags, stale_ttl, flight):
+        """Executa o cálculo como líder do single-flight e libera quem aguarda"""
+        try:
+            flight.result = compute()
+            self._store(key, flight.result, ttl, tags, stale_ttl)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with _inflight_lock:
+                if _inflight.get(key) is flight:
+                    del _inflight[key]
+            flight.event.set()
+    
+    def _refresh_in_background(self, key, compute, ttl, tags, stale_ttl):
+        """Recalcula a chave numa thread daemon, se ainda não houver cálculo em andamento"""
+        with _inflight_lock:
+            if key in _inflight:
+                return
+            flight = _Flight()
+            _inflight[key] = flight
+        
+        # Preserva o contexto da aplicação Flask (config, extensões) na thread de refresh
+        app = None
+        try:
+            from flask import current_app, has_app_context
+            if has_app_context():
+                app = current_app._get_current_object()
+        except ImportError:
+            pass
+        
+        def refresh():
+            _metrics().refreshes += 1
+            try:
+                if app is not None:
+                    with app.app_context():
+                        self._compute_and_store(key, compute, ttl, tags, stale_ttl, flight)
+                else:
+                    self._compute_and_store(key, compute, ttl, tags, stale_ttl, flight)
+            except Exception as e:
+                logger.warning(f"Erro ao recalcular chave de cache em background ({key}): {e}")
+        
+        threading.Thread(target=refresh, name='cache-refresh', daemon=True).start()
+    
     def clear_pattern(self, pattern: str) -> int:
         """
         Remove todas as chaves que correspondem ao padrão.
         ALTERAÇÃO: Adicionado rastreamento de métricas de performance
         
+        Percorre todas as chaves (O(total de chaves)); prefira invalidate_tags().
+        
         Args:
-            pattern: Padrão de chaves (ex: 'financial_movements:*')
+            pattern: Padrão de chaves (ex: 'financial_movements:*'). '*' só é
+                aceito no final: o padrão casa chaves que começam com o prefixo
         
         Returns:
             Número de chaves removidas
         """
-        count = 0
-        
-        with _memory_cache_lock:
-            # ALTERAÇÃO: Usar list comprehension com filtro direto para melhor performance
-            prefix = pattern.replace('*', '')
-            keys_to_delete = [k for k in _memory_cache.keys() if prefix in k]
-            for key in keys_to_delete:
-                del _memory_cache[key]
-                if key in _memory_cache_timestamps:
-                    del _memory_cache_timestamps[key]
-            count = len(keys_to_delete)
+        # ALTERAÇÃO: casa por prefixo (antes era substring, o que removia chaves
+        # não relacionadas que apenas continham o texto)
+        prefix = pattern.rstrip('*')
+        count = _memory_cache.delete_matching(lambda k: k.startswith(prefix))
+        l2 = _get_l2()
+        if l2 is not None:
+            l2.delete_prefix(prefix)
         
         # ALTERAÇÃO: Atualizar métricas de performance
-        with _metrics_lock:
-            # Rastrear operações por prefixo de chave
-            pattern_prefix = pattern.split(':')[0] if ':' in pattern else pattern[:20]
-            _cache_metrics['operation_counts_by_key_prefix'][f'clear_pattern:{pattern_prefix}'] += 1
-            # Adicionar contagem de deletes (clear_pattern é uma operação de delete em lote)
-            if count > 0:
-                _cache_metrics['deletes'] += count
+        metrics = _metrics()
+        if _PREFIX_METRICS:
+            metrics.by_prefix['clear_pattern:' + _key_prefix(pattern)] += 1
+        # Adicionar contagem de deletes (clear_pattern é uma operação de delete em lote)
+        metrics.deletes += count
         
         return count
     
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        Remove todas as entradas registradas sob qualquer uma das tags.
+        OTIMIZAÇÃO DE PERFORMANCE: usa o índice reverso tag -> chaves, então o custo é
+        proporcional às chaves da tag, e não ao total de chaves do cache.
+        
+        Args:
+            tags: Tags a invalidar (ex: 'financial_movements', 'product:42')
+        
+        Returns:
+            Número de chaves removidas
+        """
+        count = _memory_cache.delete_tags(tags)
+        l2 = _get_l2()
+        if l2 is not None:
+            # Remove da L2 e registra a invalidação para os demais workers
+            l2.delete_tags(tags)
+        metrics = _metrics()
+        if _PREFIX_METRICS:
+            for tag in tags:
+                metrics.by_prefix['invalidate_tag:' + _key_prefix(tag)] += 1
+        metrics.deletes += count
+        for listener in list(_invalidation_listeners):
+            try:
+                listener(tags)
+            except Exception as e:
+                logger.warning(f"Erro em listener de invalidação de cache: {e}")
+        return count
+    
     def exists(self, key: str) -> bool:
         """
         Verifica se chave existe no cache.
@@ -211,18 +1003,7 @@ class CacheManager:
         Returns:
             True se existe, False caso contrário
         """
-        with _memory_cache_lock:
-            if key in _memory_cache:
-                # Verificar se expirou
-                if key in _memory_cache_timestamps:
-                    if time.time() < _memory_cache_timestamps[key]:
-                        return True
-                    else:
-                        del _memory_cache[key]
-                        del _memory_cache_timestamps[key]
-                else:
-                    return True
-        return False
+        return _memory_cache.contains(key)
     
     def get_metrics(self) -> Dict[str, Any]:
         """
@@ -242,52 +1023,66 @@ class CacheManager:
             - avg_delete_time: Tempo médio de operações delete (ms)
             - total_operations: Total de operações
             - cache_type: Tipo de cache usado ('memory')
-            - operation_counts_by_prefix: Contadores por prefixo de chave
+            - operation_counts_by_prefix: Contadores por prefixo de chave (vazio se
+              CACHE_PREFIX_METRICS_ENABLED estiver desativado)
+            - size: Entradas/bytes atuais e limites, evictions (LRU), expirations,
+              rejected (acima do orçamento de bytes), sweeps e número de faixas de lock
+            - single_flight: requisições que aguardaram o cálculo de outra (coalesced),
+              esperas que estouraram o prazo, valores velhos servidos e refreshes em background
+            - l2: estatísticas da cache compartilhada entre processos ({'enabled': False} se desativada)
+            - namespaces: métricas por namespace (ver get_namespace_metrics)
         """
-        with _metrics_lock:
-            total_gets = _cache_metrics['hits'] + _cache_metrics['misses']
-            total_operations = (
-                _cache_metrics['hits'] + 
-                _cache_metrics['misses'] + 
-                _cache_metrics['sets'] + 
-                _cache_metrics['deletes']
-            )
-            
-            # Calcular taxa de sucesso
-            hit_rate = 0.0
-            if total_gets > 0:
-                hit_rate = (_cache_metrics['hits'] / total_gets) * 100
-            
-            # Calcular tempos médios (em milissegundos)
-            avg_get_time = 0.0
-            if total_gets > 0:
-                avg_get_time = (_cache_metrics['total_get_time'] / total_gets) * 1000
-            
-            avg_set_time = 0.0
-            if _cache_metrics['sets'] > 0:
-                avg_set_time = (_cache_metrics['total_set_time'] / _cache_metrics['sets']) * 1000
-            
-            avg_delete_time = 0.0
-            if _cache_metrics['deletes'] > 0:
-                avg_delete_time = (_cache_metrics['total_delete_time'] / _cache_metrics['deletes']) * 1000
-            
+        size_stats = _memory_cache.get_stats()
+        l2 = _get_l2()
+        l2_stats = l2.get_stats() if l2 is not None else {'enabled': False}
+        totals = _merged_metrics()
+        
+        total_gets = totals.hits + totals.misses
+        total_operations = totals.hits + totals.misses + totals.sets + totals.deletes
+        
+        # Calcular taxa de sucesso
+        hit_rate = 0.0
+        if total_gets > 0:
+            hit_rate = (totals.hits / total_gets) * 100
+        
+        # Calcular tempos médios (em milissegundos)
+        avg_get_time = 0.0
+        if total_gets > 0:
+            avg_get_time = (totals.total_get_time / total_gets) * 1000
+        
+        avg_set_time = 0.0
+        if totals.sets > 0:
+            avg_set_time = (totals.total_set_time / totals.sets) * 1000
+        
+        avg_delete_time = 0.0
+        if totals.deletes > 0:
+            avg_delete_time = (totals.total_delete_time / totals.deletes) * 1000
+        
+        return {
+            'hits': totals.hits,
+            'misses': totals.misses,
+            'sets': totals.sets,
+            'deletes': totals.deletes,
+            'errors': totals.errors,
+            'hit_rate': round(hit_rate, 2),
+            'avg_get_time_ms': round(avg_get_time, 3),
+            'avg_set_time_ms': round(avg_set_time, 3),
+            'avg_delete_time_ms': round(avg_delete_time, 3),
+            'total_operations': total_operations,
+            'cache_type': 'memory',
             # Converter defaultdict para dict para serialização
-            operation_counts = dict(_cache_metrics['operation_counts_by_key_prefix'])
-            
-            return {
-                'hits': _cache_metrics['hits'],
-                'misses': _cache_metrics['misses'],
-                'sets': _cache_metrics['sets'],
-                'deletes': _cache_metrics['deletes'],
-                'errors': _cache_metrics['errors'],
-                'hit_rate': round(hit_rate, 2),
-                'avg_get_time_ms': round(avg_get_time, 3),
-                'avg_set_time_ms': round(avg_set_time, 3),
-                'avg_delete_time_ms': round(avg_delete_time, 3),
-                'total_operations': total_operations,
-                'cache_type': 'memory',
-                'operation_counts_by_prefix': operation_counts
-            }
+            'operation_counts_by_prefix': dict(totals.by_prefix),
+            'size': size_stats,
+            'single_flight': {
+                'coalesced': totals.coalesced,
+                'coalesce_timeouts': totals.coalesce_timeouts,
+                'stale_hits': totals.stale_hits,
+                'background_refreshes': totals.refreshes,
+                'in_flight': len(_inflight)
+            },
+            'l2': l2_stats,
+            'namespaces': self._namespace_metrics(totals)
+        }
     
     def reset_metrics(self) -> None:
         """
@@ -295,16 +1090,59 @@ class CacheManager:
         ALTERAÇÃO: Implementado método para resetar métricas
         """
         with _metrics_lock:
-            _cache_metrics['hits'] = 0
-            _cache_metrics['misses'] = 0
-            _cache_metrics['sets'] = 0
-            _cache_metrics['deletes'] = 0
-            _cache_metrics['errors'] = 0
-            _cache_metrics['total_get_time'] = 0.0
-            _cache_metrics['total_set_time'] = 0.0
-            _cache_metrics['total_delete_time'] = 0.0
-            _cache_metrics['operation_counts_by_key_prefix'].clear()
-            logger.info("Métricas de cache resetadas")
+            _retired_metrics.reset()
+            for _, metrics in _metrics_registry.values():
+                metrics.reset()
+        _memory_cache.reset_stats()
+        l2 = _get_l2()
+        if l2 is not None:
+            l2.reset_stats()
+        for namespace in list(_namespaces.values()):
+            namespace.reset_stats()
+        logger.info("Métricas de cache resetadas")
+    
+    # --- namespaces ---
+    
+    def namespace(self, name: str, ttl: int = None, max_entries: int = None) -> 'CacheNamespace':
+        """
+        Retorna (criando na primeira chamada) o namespace do cache com o nome dado.
+        CACHE_NAMESPACE_TTLS / CACHE_NAMESPACE_MAX_ENTRIES sobrepõem ttl e max_entries.
+        
+        Args:
+            name: Nome do namespace (sem ':')
+            ttl: TTL padrão (s) das entradas do namespace (None = default_ttl)
+            max_entries: Limite de entradas (None = CACHE_NAMESPACE_DEFAULT_MAX_ENTRIES)
+        """
+        if ':' in name:
+            raise ValueError(f"Nome de namespace de cache inválido: {name}")
+        with _namespaces_lock:
+            namespace = _namespaces.get(name)
+            if namespace is None:
+                namespace = CacheNamespace(
+                    self,
+                    name,
+                    _NAMESPACE_TTLS.get(name, ttl or self.default_ttl),
+                    _NAMESPACE_MAX_ENTRIES.get(name, max_entries or Config.CACHE_NAMESPACE_DEFAULT_MAX_ENTRIES)
+                )
+                _namespaces[name] = namespace
+            return namespace
+    
+    def get_namespace(self, name: str) -> Optional['CacheNamespace']:
+        """Namespace já registrado (None se não existir)"""
+        return _namespaces.get(name)
+    
+    def get_namespace_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Métricas por namespace: ttl, max_entries, entries (vivas), hits, misses, sets,
+        hit_rate (%), evictions (por max_entries) e flushes (clear()).
+        """
+        return self._namespace_metrics(_merged_metrics())
+    
+    def _namespace_metrics(self, totals: _ThreadMetrics) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: namespace.get_stats(totals.by_namespace)
+            for name, namespace in sorted(_namespaces.items())
+        }
 
 
 # Instância global do cache manager
@@ -322,15 +1160,23 @@ def get_cache_manager() -> CacheManager:
     return _cache_manager_instance
 
 
-def cache_result(key_prefix: str, ttl: int = 300, key_builder: callable = None):
+def cache_result(key_prefix: str, ttl: int = 300, key_builder: callable = None, tags=None,
+                 stale_ttl: int = 0, wait_timeout: float = None):
     """
     Decorator para cachear resultado de função.
     ALTERAÇÃO: Implementado decorator para facilitar cache de funções
+    OTIMIZAÇÃO DE PERFORMANCE: Quando a chave expira, apenas uma chamada recalcula o
+    valor e as concorrentes aguardam o resultado (single-flight). Com stale_ttl, o valor
+    expirado continua sendo servido enquanto uma thread o recalcula em background.
+    Exceções da função não são cacheadas (e são repassadas a quem aguardava o cálculo).
     
     Args:
         key_prefix: Prefixo da chave do cache
         ttl: Time to live em segundos
         key_builder: Função para construir chave baseada nos argumentos
+        tags: Lista de tags da entrada, ou função (*args, **kwargs) -> tags
+        stale_ttl: Segundos em que o valor expirado ainda é servido (0 = desativado)
+        wait_timeout: Espera máxima pelo cálculo em andamento (None = CACHE_SINGLE_FLIGHT_TIMEOUT_SEC)
     
     Exemplo:
         @cache_result('financial_movements', ttl=60)
@@ -354,17 +1200,15 @@ def cache_result(key_prefix: str, ttl: int = 300, key_builder: callable = None):
                     key_parts.append(str(hash(str(sorted(kwargs.items())))))
                 cache_key = ':'.join(key_parts)
             
-            # Tentar obter do cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"Cache hit: {cache_key}")
-                return cached_result
-            
-            # Executar função e cachear resultado
-            logger.debug(f"Cache miss: {cache_key}")
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, ttl)
-            return result
+            entry_tags = tags(*args, **kwargs) if callable(tags) else tags
+            return cache.get_or_compute(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                tags=entry_tags,
+                stale_ttl=stale_ttl,
+                wait_timeout=wait_timeout
+            )
         
         return wrapper
     return decorator
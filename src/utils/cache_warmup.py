@@ -0,0 +1,200 @@
+"""
+Aquecimento (warm-up) do cache na inicialização e após invalidações.
+
+OTIMIZAÇÃO DE PERFORMANCE: Depois de um deploy/restart, as primeiras requisições pagariam
+o custo completo de listagem de produtos, categorias com produtos, configurações e
+horários da loja justamente quando o balanceador passa a enviar tráfego à instância.
+O warm-up pré-carrega esses caches em background e /api/health/ready só responde 200
+quando todos foram carregados.
+
+Quando um namespace aquecido é invalidado (escrita em produtos, categorias, etc.), o
+aquecedor correspondente é reexecutado de forma assíncrona, depois do commit da
+transação que invalidou, para que as chaves mais acessadas não fiquem frias.
+O job periódico do scheduler (rewarm_cache) repete aquecedores que falharam e
+recarrega entradas que expiraram por TTL.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from ..config import Config
+from .cache_manager import add_invalidation_listener
+
+logger = logging.getLogger(__name__)
+
+
+class _Warmer:
+    __slots__ = ('name', 'func', 'tags', 'last_run', 'last_duration_ms', 'last_error', 'ok', 'runs')
+
+    def __init__(self, name: str, func: Callable[[], Any], tags):
+        self.name = name
+        self.func = func
+        self.tags = frozenset(tags)
+        self.last_run = None
+        self.last_duration_ms = None
+        self.last_error = None
+        self.ok = False
+        self.runs = 0
+
+
+_warmers: Dict[str, _Warmer] = {}
+_app = None
+_state = {'status': 'pending', 'started_at': None, 'finished_at': None}
+_state_lock = threading.Lock()
+
+# Re-aquecimento assíncrono: nomes pendentes processados por uma única thread
+_pending = set()
+_pending_lock = threading.Lock()
+_pending_event = threading.Event()
+_rewarm_thread = None
+
+
+def register_warmer(name: str, func: Callable[[], Any], tags=()) -> None:
+    """
+    Registra um aquecedor.
+
+    Args:
+        name: Identificador (aparece em /api/health/ready)
+        func: Função sem argumentos que popula o cache; retornar False ou levantar
+              exceção marca o aquecimento como falho
+        tags: Tags de cache cuja invalidação dispara o re-aquecimento (ex: 'ns:products')
+    """
+    _warmers[name] = _Warmer(name, func, tags)
+
+
+def _register_default_warmers() -> None:
+    # Imports locais para evitar dependência circular com os serviços
+    from ..services import settings_service, store_service, product_service, category_service
+    register_warmer('settings', settings_service.warm_cache, tags=['ns:settings'])
+    register_warmer('store_hours', store_service.warm_cache, tags=['ns:store_hours'])
+    register_warmer('products', product_service.warm_cache, tags=['ns:products'])
+    register_warmer('categories_with_products', category_service.warm_cache,
+                    tags=['ns:categories', 'ns:categories:with_products'])
+
+
+def _run_warmer(warmer: _Warmer) -> bool:
+    start = time.perf_counter()
+    try:
+        with _app.app_context():
+            ok = warmer.func() is not False
+        warmer.last_error = None if ok else 'aquecedor retornou False'
+    except Exception as e:
+        ok = False
+        warmer.last_error = str(e)
+        logger.warning(f"Falha ao aquecer cache '{warmer.name}': {e}")
+    warmer.ok = ok
+    warmer.runs += 1
+    warmer.last_run = time.time()
+    warmer.last_duration_ms = round((time.perf_counter() - start) * 1000, 1)
+    return ok
+
+
+def run_warmup(only_failed: bool = False) -> bool:
+    """
+    Executa os aquecedores (todos, ou só os que falharam na última execução).
+    Retorna True se todos estão aquecidos ao final.
+    """
+    if _app is None:
+        return False
+    for warmer in list(_warmers.values()):
+        if only_failed and warmer.ok:
+            continue
+        _run_warmer(warmer)
+    all_ok = all(warmer.ok for warmer in _warmers.values())
+    with _state_lock:
+        if _state['status'] != 'warming':
+            _state['status'] = 'ready' if all_ok else 'degraded'
+    return all_ok
+
+
+def _initial_warmup() -> None:
+    with _state_lock:
+        _state['status'] = 'warming'
+        _state['started_at'] = time.time()
+    start = time.perf_counter()
+    for warmer in list(_warmers.values()):
+        _run_warmer(warmer)
+    all_ok = all(warmer.ok for warmer in _warmers.values())
+    with _state_lock:
+        _state['status'] = 'ready' if all_ok else 'degraded'
+        _state['finished_at'] = time.time()
+    logger.info(
+        f"Warm-up do cache concluído em {(time.perf_counter() - start) * 1000:.0f}ms "
+        f"({'todos os aquecedores ok' if all_ok else 'com falhas'})"
+    )
+
+
+def _on_invalidation(tags) -> None:
+    """Listener do CacheManager: agenda o re-aquecimento dos aquecedores afetados"""
+    if _app is None or not Config.CACHE_REWARM_ON_INVALIDATION:
+        return
+    names = {warmer.name for warmer in _warmers.values() if warmer.tags.intersection(tags)}
+    if not names:
+        return
+    # Só depois do commit: antes dele, o re-aquecimento leria os dados antigos
+    from ..database import run_after_commit
+    run_after_commit(lambda: _schedule_rewarm(names))
+
+
+def _schedule_rewarm(names) -> None:
+    global _rewarm_thread
+    with _pending_lock:
+        _pending.update(names)
+        if _rewarm_thread is None or not _rewarm_thread.is_alive():
+            _rewarm_thread = threading.Thread(target=_rewarm_loop, name='cache-rewarm', daemon=True)
+            _rewarm_thread.start()
+    _pending_event.set()
+
+
+def _rewarm_loop() -> None:
+    while True:
+        _pending_event.wait()
+        # Agrupa invalidações em rajada (ex: várias escritas na mesma requisição)
+        time.sleep(Config.CACHE_REWARM_DELAY_SEC)
+        with _pending_lock:
+            _pending_event.clear()
+            names = list(_pending)
+            _pending.clear()
+        for name in names:
+            warmer = _warmers.get(name)
+            if warmer is not None:
+                _run_warmer(warmer)
+
+
+def init_cache_warmup(app) -> None:
+    """
+    Registra os aquecedores padrão e inicia o warm-up em background (CACHE_WARMUP_ENABLED).
+    Com o warm-up desativado, a instância é considerada pronta imediatamente.
+    """
+    global _app
+    _app = app
+    if not Config.CACHE_WARMUP_ENABLED:
+        with _state_lock:
+            _state['status'] = 'ready'
+        return
+    _register_default_warmers()
+    add_invalidation_listener(_on_invalidation)
+    threading.Thread(target=_initial_warmup, name='cache-warmup', daemon=True).start()
+
+
+def is_ready() -> bool:
+    with _state_lock:
+        return _state['status'] == 'ready'
+
+
+def get_status() -> Dict[str, Any]:
+    """Estado do warm-up e de cada aquecedor (usado por /api/health/ready)"""
+    with _state_lock:
+        status = dict(_state)
+    status['warmers'] = {
+        warmer.name: {
+            'ok': warmer.ok,
+            'runs': warmer.runs,
+            'last_run': warmer.last_run,
+            'last_duration_ms': warmer.last_duration_ms,
+            'last_error': warmer.last_error
+        }
+        for warmer in _warmers.values()
+    }
+    return status
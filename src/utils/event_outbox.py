@@ -0,0 +1,287 @@
+"""
+Outbox transacional de eventos de domínio (EVENT_OUTBOX) com números de sequência e replay.
+
+ALTERAÇÃO: order.created e order.status_changed eram publicados depois do commit, fora
+da transação do pedido: uma falha entre o commit e a publicação perdia o evento, e um
+cliente desconectado (tablet da cozinha, painel admin) não tinha como recuperar o que
+foi emitido enquanto estava offline.
+
+Fluxo:
+- enqueue(cur, ...) grava o evento em EVENT_OUTBOX no mesmo cursor/transação da
+  alteração do pedido: o evento existe se e somente se a alteração foi confirmada;
+- o relay (uma thread por processo) numera as linhas confirmadas: sob o lock da linha
+  única de EVENT_OUTBOX_STATE, atribui SEQ = LAST_SEQ + 1, + 2, ... e confirma. Como a
+  numeração é serializada entre os workers e confirmada de uma vez, SEQ é crescente,
+  sem buracos, e toda linha com SEQ <= LAST_SEQ já está visível;
+- o relay de cada processo lê as linhas com SEQ maior que a última emitida, em ordem,
+  e as entrega diretamente (na thread do relay, sem a fila descartável do barramento
+  de eventos) aos clientes conectados àquele processo, com o campo 'seq' no payload;
+- na conexão do WebSocket, o cliente informa last_seq e recebe os eventos seguintes das
+  suas salas (replay_since). Eventos podem chegar duplicados (replay + tempo real) e
+  devem ser descartados pelo 'seq'.
+
+Enquanto a migração create_event_outbox.sql não for aplicada, enqueue retorna False e
+o chamador publica o evento após o commit, como antes.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import Config
+from . import schema_catalog
+
+logger = logging.getLogger(__name__)
+
+_INSERT_SQL = "INSERT INTO EVENT_OUTBOX (EVENT_TYPE, PAYLOAD) VALUES (?, ?)"
+_PENDING_SQL = "SELECT FIRST {limit} ID FROM EVENT_OUTBOX WHERE SEQ IS NULL ORDER BY ID"
+_LOCK_STATE_SQL = "SELECT LAST_SEQ FROM EVENT_OUTBOX_STATE WHERE ID = 1 WITH LOCK"
+_ASSIGN_SEQ_SQL = "UPDATE EVENT_OUTBOX SET SEQ = ?, PUBLISHED_AT = CURRENT_TIMESTAMP WHERE ID = ?"
+_UPDATE_STATE_SQL = "UPDATE EVENT_OUTBOX_STATE SET LAST_SEQ = ? WHERE ID = 1"
+_LAST_SEQ_SQL = "SELECT LAST_SEQ FROM EVENT_OUTBOX_STATE WHERE ID = 1"
+_SINCE_SQL = (
+    "SELECT FIRST {limit} SEQ, EVENT_TYPE, PAYLOAD FROM EVENT_OUTBOX "
+    "WHERE SEQ > ? ORDER BY SEQ"
+)
+_PRUNE_SQL = "DELETE FROM EVENT_OUTBOX WHERE SEQ IS NOT NULL AND PUBLISHED_AT < ?"
+
+# Intervalo entre as podas de eventos antigos (feitas por quem numera)
+_PRUNE_INTERVAL_SEC = 3600
+
+
+def is_available() -> bool:
+    """Outbox habilitado e tabela criada (migração aplicada)"""
+    return Config.EVENT_OUTBOX_ENABLED and schema_catalog.has_table('EVENT_OUTBOX')
+
+
+def enqueue(cur, event_type: str, data: Dict[str, Any]) -> bool:
+    """
+    Grava o evento na transação do cursor informado (antes do commit do chamador).
+
+    Returns:
+        True se o evento foi gravado no outbox; False se o outbox não está disponível
+        e o chamador deve publicar o evento diretamente após o commit.
+    """
+    if not is_available():
+        return False
+    cur.execute(_INSERT_SQL, (event_type, json.dumps(data, default=str)))
+    return True
+
+
+def _decode(seq, event_type, payload) -> Tuple[int, str, Dict[str, Any]]:
+    if hasattr(payload, 'read'):
+        payload = payload.read()
+    data = json.loads(payload) if payload else {}
+    data['seq'] = int(seq)
+    return int(seq), event_type.strip(), data
+
+
+class EventOutboxRelay:
+    """Numera as linhas confirmadas do outbox e as entrega em ordem neste processo"""
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._last_emitted: Optional[int] = None
+        self._last_prune = 0.0
+        self._last_error = None
+        self._stats = {
+            'sequenced': 0, 'relayed': 0, 'lock_conflicts': 0, 'errors': 0,
+            'pruned': 0, 'replays': 0, 'replayed_events': 0, 'replays_truncated': 0,
+            'replays_pruned': 0
+        }
+
+    @property
+    def last_seq(self) -> Optional[int]:
+        """Última sequência entregue por este processo (None antes da primeira leitura)"""
+        return self._last_emitted
+
+    def wake(self) -> None:
+        """Antecipa o próximo ciclo (chamado após o commit de um evento neste processo)"""
+        self._wakeup.set()
+
+    def _connect(self):
+        from ..database import get_db_connection
+        # Conexão isolada: não participa da transação da requisição
+        return get_db_connection(shared=False)
+
+    def sequence_pending(self) -> int:
+        """Atribui SEQ às linhas confirmadas ainda sem número. Retorna quantas foram numeradas."""
+        import fdb
+        conn = None
+        try:
+            conn = self._connect()
+            cur = conn.cursor()
+            # Leitura sem lock primeiro: evita gravar na linha de estado a cada ciclo ocioso
+            cur.execute(_PENDING_SQL.format(limit=int(Config.EVENT_OUTBOX_BATCH_SIZE)))
+            if not cur.fetchall():
+                conn.commit()
+                return 0
+            try:
+                cur.execute(_LOCK_STATE_SQL)
+                row = cur.fetchone()
+            except fdb.DatabaseError:
+                # Outro worker está numerando (ou acabou de numerar): fica para o próximo ciclo
+                conn.rollback()
+                self._stats['lock_conflicts'] += 1
+                return 0
+            last_seq = int(row[0]) if row else 0
+            # Relê sob o lock: linhas numeradas por outro worker antes do lock não voltam aqui
+            cur.execute(_PENDING_SQL.format(limit=int(Config.EVENT_OUTBOX_BATCH_SIZE)))
+            ids = [r[0] for r in cur.fetchall()]
+            for event_id in ids:
+                last_seq += 1
+                cur.execute(_ASSIGN_SEQ_SQL, (last_seq, event_id))
+            if ids:
+                cur.execute(_UPDATE_STATE_SQL, (last_seq,))
+            self._prune_if_due(cur)
+            conn.commit()
+            self._stats['sequenced'] += len(ids)
+            return len(ids)
+        except Exception:
+            if conn:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def _prune_if_due(self, cur) -> None:
+        now = time.time()
+        if now - self._last_prune < _PRUNE_INTERVAL_SEC:
+            return
+        self._last_prune = now
+        cutoff = datetime.now() - timedelta(hours=Config.EVENT_OUTBOX_RETENTION_HOURS)
+        cur.execute(_PRUNE_SQL, (cutoff,))
+        self._stats['pruned'] += max(cur.rowcount or 0, 0)
+
+    def _read(self, sql: str, params: tuple) -> list:
+        conn = None
+        try:
+            conn = self._connect()
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            # Encerra a transação para que a próxima leitura veja os commits recentes
+            conn.commit()
+            return rows
+        finally:
+            if conn:
+                conn.close()
+
+    def fetch_since(self, last_seq: int, limit: int) -> List[Tuple[int, str, Dict[str, Any]]]:
+        rows = self._read(_SINCE_SQL.format(limit=int(limit)), (int(last_seq),))
+        return [_decode(seq, event_type, payload) for seq, event_type, payload in rows]
+
+    def _read_last_seq(self) -> int:
+        rows = self._read(_LAST_SEQ_SQL, ())
+        return int(rows[0][0]) if rows else 0
+
+    def _ensure_start_seq(self) -> None:
+        """
+        Primeira leitura: começa do LAST_SEQ atual (o histórico só vai por replay).
+        Precisa ocorrer antes da primeira numeração deste processo, senão as linhas
+        numeradas por ele (pendentes de antes da inicialização) nunca seriam entregues.
+        """
+        with self._lock:
+            if self._last_emitted is None:
+                self._last_emitted = self._read_last_seq()
+
+    def relay_committed(self) -> int:
+        """Entrega, em ordem de SEQ, as linhas numeradas ainda não emitidas por este processo"""
+        from .event_publisher import publish_sequenced_event
+        self._ensure_start_seq()
+        with self._lock:
+            events = self.fetch_since(self._last_emitted, Config.EVENT_OUTBOX_BATCH_SIZE)
+            for seq, event_type, data in events:
+                publish_sequenced_event(event_type, data)
+                self._last_emitted = seq
+            self._stats['relayed'] += len(events)
+            return len(events)
+
+    def tick(self) -> None:
+        """Um ciclo do relay: numera as pendentes e entrega as numeradas"""
+        if not is_available():
+            return
+        try:
+            self._ensure_start_seq()
+            self.sequence_pending()
+            while self.relay_committed() >= Config.EVENT_OUTBOX_BATCH_SIZE:
+                pass
+            self._last_error = None
+        except Exception as e:
+            self._stats['errors'] += 1
+            self._last_error = str(e)
+            logger.warning(f"Falha no relay do outbox de eventos: {e}")
+
+    def replay_since(self, last_seq: int, rooms) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], bool, Optional[int]]:
+        """
+        Eventos com SEQ > last_seq destinados a alguma das salas informadas.
+
+        Returns:
+            (eventos, truncado, última sequência lida). Truncado indica que havia mais de
+            EVENT_OUTBOX_REPLAY_LIMIT eventos ou que parte dos eventos após last_seq já foi
+            removida pela retenção; o cliente deve recarregar o estado completo.
+        """
+        from .event_publisher import resolve_rooms
+        limit = Config.EVENT_OUTBOX_REPLAY_LIMIT
+        events = self.fetch_since(last_seq, limit + 1)
+        truncated = len(events) > limit
+        events = events[:limit]
+        # SEQ é contínuo: lacuna logo após last_seq só ocorre por poda (EVENT_OUTBOX_RETENTION_HOURS)
+        if events:
+            pruned = events[0][0] > last_seq + 1
+        else:
+            pruned = last_seq < self._read_last_seq()
+        if pruned:
+            self._stats['replays_pruned'] += 1
+            truncated = True
+        rooms = set(rooms)
+        selected = [e for e in events if rooms.intersection(resolve_rooms(e[1], e[2]))]
+        self._stats['replays'] += 1
+        self._stats['replayed_events'] += len(selected)
+        if truncated:
+            self._stats['replays_truncated'] += 1
+        return selected, truncated, (events[-1][0] if events else None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': Config.EVENT_OUTBOX_ENABLED,
+            'available': is_available(),
+            'last_seq': self._last_emitted,
+            'last_error': self._last_error,
+            **self._stats
+        }
+
+
+_relay = EventOutboxRelay()
+_relay_thread = None
+
+
+def get_event_outbox_relay() -> EventOutboxRelay:
+    return _relay
+
+
+def notify_committed() -> None:
+    """Acorda o relay deste processo (use com run_after_commit após enqueue)"""
+    _relay.wake()
+
+
+def _relay_loop() -> None:
+    while True:
+        _relay._wakeup.wait(Config.EVENT_OUTBOX_POLL_INTERVAL_SEC)
+        _relay._wakeup.clear()
+        _relay.tick()
+
+
+def init_event_outbox_relay() -> None:
+    """Inicia o relay do outbox em background (EVENT_OUTBOX_ENABLED)"""
+    global _relay_thread
+    if not Config.EVENT_OUTBOX_ENABLED or _relay_thread is not None:
+        return
+    _relay_thread = threading.Thread(target=_relay_loop, name='event-outbox-relay', daemon=True)
+    _relay_thread.start()
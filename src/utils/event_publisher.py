@@ -4,130 +4,351 @@ Publicador de eventos do sistema.
 Este módulo gerencia a publicação de eventos tanto para listeners locais
 (em memória) quanto para clientes conectados via WebSocket (SocketIO).
 
-Mantém a lógica em memória para listeners internos e adiciona a emissão
-via SocketIO para notificações em tempo real.
+OTIMIZAÇÃO DE PERFORMANCE: publish_event executava os listeners locais e os
+socketio.emit na thread da requisição que alterou o pedido/mesa, então um fanout
+lento (muitos clientes ou um cliente lento) somava latência a update_order_status.
+Agora os eventos entram num barramento em memória limitado (EVENT_BUS_MAX_QUEUE) e
+publish_event retorna imediatamente; uma thread despachante entrega os eventos em
+lotes, na ordem de publicação, aos listeners e às salas do SocketIO.
+
+Rajadas do mesmo estado são coalescidas enquanto o evento ainda está na fila (ex:
+várias mudanças de status da mesma mesa viram um único table.status_changed, com o
+old_status do primeiro e o new_status do último). A thread espera
+EVENT_BUS_COALESCE_WINDOW_MS após o primeiro evento de um lote para agrupar a rajada.
+Com a fila cheia, o evento novo é descartado e contabilizado (nunca bloqueia o produtor).
+
+Com EVENT_BUS_ENABLED=false os eventos são entregues na thread do chamador, como antes.
 """
 
+import atexit
 import logging
+import threading
+import time
+from collections import deque
 from typing import Dict, Any, Optional, Callable, List
 
+from ..config import Config
+
 logger = logging.getLogger(__name__)
 
 # Dicionário para armazenar listeners locais (em memória)
 _local_listeners: Dict[str, List[Callable]] = {}
 
+# Eventos coalescíveis: tipo -> (campo que identifica o recurso, campos preservados do primeiro evento)
+_COALESCE_RULES = {
+    'table.status_changed': ('table_id', ('old_status',)),
+    'stock.alert': ('ingredient_id', ()),
+}
 
-def publish_event(event_type: str, data: Dict[str, Any]) -> None:
-    """
-    Publica um evento tanto para listeners locais quanto via SocketIO.
-    
-    Args:
-        event_type: Tipo do evento (ex: 'order.created', 'order.status_changed')
-        data: Dados do evento (dicionário)
-    """
-    # Publica para listeners locais (mantém compatibilidade com código existente)
-    if event_type in _local_listeners:
-        for listener in _local_listeners[event_type]:
-            try:
-                listener(event_type, data)
-            except Exception as e:
-                logger.error(f"Erro ao executar listener local para {event_type}: {e}", exc_info=True)
-    
-    # Publica via SocketIO
+
+def _coalesce_key(event_type: str, data: Dict[str, Any], rooms) -> Optional[tuple]:
+    rule = _COALESCE_RULES.get(event_type)
+    if rule is None or rooms is not None or not isinstance(data, dict):
+        return None
+    resource_id = data.get(rule[0])
+    if resource_id is None:
+        return None
+    return (event_type, resource_id)
+
+
+def resolve_rooms(event_type: str, data: Dict[str, Any]) -> List[str]:
+    """Roteamento de eventos para as salas apropriadas"""
+    if event_type == 'order.created':
+        # Admin e cozinha
+        return ['admin_room', 'kitchen_room']
+
+    if event_type == 'order.status_changed':
+        # Admin e sala pessoal do usuário dono do pedido
+        rooms = ['admin_room']
+        user_id = data.get('user_id')
+        try:
+            user_id_int = int(user_id) if user_id else None
+        except (TypeError, ValueError):
+            user_id_int = None
+        if user_id_int:
+            rooms.append(f"user_{user_id_int}")
+        else:
+            logger.warning(f"order.status_changed sem user_id válido (pedido {data.get('order_id')})")
+        return rooms
+
+    # stock.alert, table.status_changed e demais tipos: apenas admin
+    return ['admin_room']
+
+
+def _run_local_listeners(event_type: str, data: Dict[str, Any]) -> None:
+    for listener in list(_local_listeners.get(event_type, ())):
+        try:
+            listener(event_type, data)
+        except Exception as e:
+            logger.error(f"Erro ao executar listener local para {event_type}: {e}", exc_info=True)
+
+
+def _emit(event_type: str, data: Dict[str, Any], rooms: List[str]) -> None:
     try:
         # Importação tardia para evitar import circular
         from .. import socketio
-        
-        # Roteamento de eventos para salas apropriadas
-        if event_type == 'order.created':
-            # Emite para admin e cozinha
-            socketio.emit('order.created', data, room='admin_room')
-            socketio.emit('order.created', data, room='kitchen_room')
-            logger.debug(f"Evento order.created emitido para admin_room e kitchen_room: {data}")
-            
-        elif event_type == 'order.status_changed':
-            # Emite para admin
-            socketio.emit('order.status_changed', data, room='admin_room')
-            logger.info(f"Evento order.status_changed emitido para admin_room: {data}")
-            
-            # Emite para a sala pessoal do usuário dono do pedido
-            user_id = data.get('user_id')
-            if user_id:
-                # Garantir que user_id seja inteiro
-                user_id_int = int(user_id) if user_id else None
-                if user_id_int:
-                    user_room = f"user_{user_id_int}"
-                    socketio.emit('order.status_changed', data, room=user_room)
-                    logger.info(f"Evento order.status_changed emitido para {user_room}: {data}")
-                else:
-                    logger.warning(f"order.status_changed com user_id inválido: {user_id}")
-            else:
-                logger.warning(f"order.status_changed sem user_id: {data}")
-                
-        elif event_type == 'stock.alert':
-            # Emite apenas para admin
-            socketio.emit('stock.alert', data, room='admin_room')
-            logger.debug(f"Evento stock.alert emitido para admin_room: {data}")
-            
-        elif event_type == 'table.status_changed':
-            # Emite para admin
-            socketio.emit('table.status_changed', data, room='admin_room')
-            logger.debug(f"Evento table.status_changed emitido para admin_room: {data}")
-            
-        else:
-            # Para outros tipos de evento, emite para admin_room por padrão
-            socketio.emit(event_type, data, room='admin_room')
-            logger.debug(f"Evento {event_type} emitido para admin_room: {data}")
-            
+        for room in rooms:
+            socketio.emit(event_type, data, room=room)
+        logger.debug(f"Evento {event_type} emitido para {', '.join(rooms)}")
     except ImportError:
         # Se socketio não estiver disponível, apenas loga aviso
         logger.warning("SocketIO não disponível. Eventos serão apenas locais.")
     except Exception as e:
-        logger.error(f"Erro ao emitir evento via SocketIO: {e}", exc_info=True)
+        logger.error(f"Erro ao emitir evento {event_type} via SocketIO: {e}", exc_info=True)
+
+
+def _deliver(event_type: str, data: Dict[str, Any], rooms: Optional[List[str]] = None) -> None:
+    """Entrega um evento: listeners locais (só eventos de publish_event) e salas do SocketIO"""
+    if rooms is None:
+        _run_local_listeners(event_type, data)
+        rooms = resolve_rooms(event_type, data)
+    _emit(event_type, data, rooms)
+
+
+class _Event:
+    __slots__ = ('event_type', 'data', 'rooms', 'key', 'enqueued_at')
+
+    def __init__(self, event_type, data, rooms, key):
+        self.event_type = event_type
+        self.data = data
+        self.rooms = rooms
+        self.key = key
+        self.enqueued_at = time.perf_counter()
+
+
+class EventBus:
+    """
+    Fila limitada de eventos + thread despachante.
+
+    Args:
+        max_queue: Eventos pendentes aceitos (acima disso o evento novo é descartado)
+        batch_size: Eventos entregues por ciclo da thread despachante
+        coalesce_window_ms: Espera após o primeiro evento de um lote para agrupar rajadas
+    """
+    def __init__(self, max_queue=None, batch_size=None, coalesce_window_ms=None):
+        self.max_queue = max(1, max_queue or Config.EVENT_BUS_MAX_QUEUE)
+        self.batch_size = max(1, batch_size or Config.EVENT_BUS_BATCH_SIZE)
+        self.coalesce_window = (
+            Config.EVENT_BUS_COALESCE_WINDOW_MS if coalesce_window_ms is None else coalesce_window_ms
+        ) / 1000
+        self._queue = deque()
+        self._pending_by_key: Dict[tuple, _Event] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._in_flight = 0
+        self._max_depth_seen = 0
+        self._dispatch_ms = deque(maxlen=500)
+        self._lag_ms = deque(maxlen=500)
+        self._stats = {'published': 0, 'dispatched': 0, 'coalesced': 0, 'dropped': 0, 'batches': 0, 'errors': 0}
+
+    def publish(self, event_type: str, data: Dict[str, Any], rooms: Optional[List[str]] = None) -> bool:
+        """Enfileira o evento e retorna imediatamente. False se a fila estiver cheia."""
+        key = _coalesce_key(event_type, data, rooms)
+        with self._cond:
+            self._stats['published'] += 1
+            pending = self._pending_by_key.get(key) if key is not None else None
+            if pending is not None:
+                # Evento do mesmo recurso ainda na fila: mantém a posição e atualiza o estado
+                preserved = {field: pending.data[field] for field in _COALESCE_RULES[event_type][1]
+                             if field in pending.data}
+                pending.data = {**data, **preserved}
+                self._stats['coalesced'] += 1
+                return True
+            if len(self._queue) >= self.max_queue:
+                self._stats['dropped'] += 1
+                dropped = self._stats['dropped']
+            else:
+                event = _Event(event_type, data, rooms, key)
+                self._queue.append(event)
+                if key is not None:
+                    self._pending_by_key[key] = event
+                self._max_depth_seen = max(self._max_depth_seen, len(self._queue))
+                self._cond.notify()
+                dropped = None
+        if dropped is not None:
+            logger.warning(f"Fila de eventos cheia ({self.max_queue}); evento {event_type} descartado (total: {dropped})")
+            return False
+        self._ensure_dispatcher()
+        return True
+
+    def _ensure_dispatcher(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._dispatch_loop, name='event-bus-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> List[_Event]:
+        with self._cond:
+            while not self._queue and not self._stopping:
+                self._cond.wait()
+            if not self._queue:
+                return []
+        if self.coalesce_window > 0 and not self._stopping:
+            # Janela de agrupamento: eventos do mesmo recurso que chegarem agora são coalescidos
+            time.sleep(self.coalesce_window)
+        with self._cond:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                event = self._queue.popleft()
+                if event.key is not None:
+                    self._pending_by_key.pop(event.key, None)
+                batch.append(event)
+            self._in_flight = len(batch)
+            return batch
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            for event in batch:
+                start = time.perf_counter()
+                try:
+                    _deliver(event.event_type, event.data, event.rooms)
+                except Exception as e:
+                    with self._cond:
+                        self._stats['errors'] += 1
+                    logger.error(f"Erro ao despachar evento {event.event_type}: {e}", exc_info=True)
+                end = time.perf_counter()
+                with self._cond:
+                    self._in_flight -= 1
+                    self._stats['dispatched'] += 1
+                    self._dispatch_ms.append((end - start) * 1000)
+                    self._lag_ms.append((start - event.enqueued_at) * 1000)
+            with self._cond:
+                self._stats['batches'] += 1
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 5) -> bool:
+        """Aguarda a entrega dos eventos pendentes. True se a fila esvaziou dentro do prazo."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None or not self._thread.is_alive():
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 5) -> None:
+        """Entrega o que estiver na fila (até timeout) e encerra a thread despachante"""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            dispatch_ms = sorted(self._dispatch_ms)
+            lag_ms = sorted(self._lag_ms)
+            depth = len(self._queue)
+            stats = dict(self._stats)
+            max_depth_seen = self._max_depth_seen
+            running = self._thread is not None and self._thread.is_alive()
+
+        def percentile(values, p):
+            if not values:
+                return None
+            return round(values[min(len(values) - 1, int(len(values) * p))], 2)
+
+        return {
+            'enabled': Config.EVENT_BUS_ENABLED,
+            'dispatcher_running': running,
+            'queue_depth': depth,
+            'max_queue': self.max_queue,
+            'max_depth_seen': max_depth_seen,
+            'batch_size': self.batch_size,
+            'coalesce_window_ms': round(self.coalesce_window * 1000, 1),
+            'dispatch_ms_p50': percentile(dispatch_ms, 0.50),
+            'dispatch_ms_p95': percentile(dispatch_ms, 0.95),
+            'queue_lag_ms_p50': percentile(lag_ms, 0.50),
+            'queue_lag_ms_p95': percentile(lag_ms, 0.95),
+            **stats
+        }
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = EventBus()
+                atexit.register(_bus.shutdown, 2)
+    return _bus
+
+
+def get_event_bus_stats() -> Dict[str, Any]:
+    return get_event_bus().get_stats()
+
+
+def _publish(event_type: str, data: Dict[str, Any], rooms: Optional[List[str]] = None) -> None:
+    if Config.EVENT_BUS_ENABLED:
+        get_event_bus().publish(event_type, data, rooms)
+    else:
+        _deliver(event_type, data, rooms)
+
+
+def publish_event(event_type: str, data: Dict[str, Any]) -> None:
+    """
+    Publica um evento tanto para listeners locais quanto via SocketIO.
+    A entrega é feita pela thread do barramento de eventos (não bloqueia o chamador).
+
+    Args:
+        event_type: Tipo do evento (ex: 'order.created', 'order.status_changed')
+        data: Dados do evento (dicionário)
+    """
+    _publish(event_type, data)
+
+
+def publish_sequenced_event(event_type: str, data: Dict[str, Any]) -> None:
+    """
+    Entrega um evento numerado do outbox (event_outbox), com o campo 'seq' no payload.
+    Chamado pela thread do relay; não passa pela fila do barramento, que pode descartar
+    eventos e coalescer rajadas: o cliente precisa receber todas as sequências.
+
+    Args:
+        event_type: Tipo do evento
+        data: Dados do evento (inclui 'seq')
+    """
+    _deliver(event_type, data)
 
 
 def publish_admin_event(event_type: str, data: Dict[str, Any]) -> None:
     """
     Método auxiliar para publicar eventos apenas para administradores.
-    
+
     Args:
         event_type: Tipo do evento
         data: Dados do evento
     """
-    try:
-        from .. import socketio
-        socketio.emit(event_type, data, room='admin_room')
-        logger.debug(f"Evento admin {event_type} emitido: {data}")
-    except ImportError:
-        logger.warning("SocketIO não disponível. Evento admin não será emitido.")
-    except Exception as e:
-        logger.error(f"Erro ao emitir evento admin: {e}", exc_info=True)
+    _publish(event_type, data, ['admin_room'])
 
 
 def publish_user_event(user_id: int, event_type: str, data: Dict[str, Any]) -> None:
     """
     Método auxiliar para publicar eventos para um usuário específico.
-    
+
     Args:
         user_id: ID do usuário destinatário
         event_type: Tipo do evento
         data: Dados do evento
     """
-    try:
-        from .. import socketio
-        user_room = f"user_{user_id}"
-        socketio.emit(event_type, data, room=user_room)
-        logger.debug(f"Evento {event_type} emitido para {user_room}: {data}")
-    except ImportError:
-        logger.warning("SocketIO não disponível. Evento de usuário não será emitido.")
-    except Exception as e:
-        logger.error(f"Erro ao emitir evento de usuário: {e}", exc_info=True)
+    _publish(event_type, data, [f"user_{user_id}"])
 
 
 def subscribe(event_type: str, callback: Callable) -> None:
     """
     Registra um listener local para um tipo de evento.
-    
+    Os listeners rodam na thread despachante do barramento, não na do publicador.
+
     Args:
         event_type: Tipo do evento
         callback: Função callback que será chamada quando o evento for publicado
@@ -141,7 +362,7 @@ def subscribe(event_type: str, callback: Callable) -> None:
 def unsubscribe(event_type: str, callback: Callable) -> None:
     """
     Remove um listener local de um tipo de evento.
-    
+
     Args:
         event_type: Tipo do evento
         callback: Função callback a ser removida
@@ -0,0 +1,254 @@
+"""
+Paginação por keyset (cursor) para listagens Firebird.
+
+OTIMIZAÇÃO DE PERFORMANCE: FIRST/SKIP obriga o Firebird a ler e descartar todas as
+linhas anteriores à página, então o custo cresce linearmente com a profundidade.
+Com keyset, a próxima página parte do último registro lido ("WHERE chave < ?"),
+usando o índice da ordenação, e custa o mesmo na página 1 ou na 500.
+
+O cursor entregue ao cliente é opaco: codifica os valores da chave de ordenação
+mais o ID (desempate) do último item da página, junto com uma assinatura da
+ordenação para impedir que seja reaproveitado em outra listagem/ordem.
+
+Sem cursor, as listagens continuam aceitando page/page_size (FIRST/SKIP) por
+compatibilidade e já devolvem next_cursor para o cliente migrar.
+
+A chave deve ser a coluna pura (sem COALESCE) coberta por um índice composto na mesma
+direção (ex: DESCENDING em (CREATED_AT, ID)); só assim o Firebird navega o índice a
+partir do cursor em vez de ordenar a tabela inteira. O predicado começa com um limite
+simples na primeira coluna (k1 <= ?) que o otimizador usa como início da faixa.
+Uma primeira coluna anulável em ordem DESC (onde o Firebird coloca os NULLs no fim) é
+paginada em dois segmentos: os valores preenchidos e, depois, as linhas NULL (segments).
+"""
+import base64
+import hashlib
+import json
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+TOTAL_MODE_EXACT = 'exact'
+TOTAL_MODE_APPROX = 'approx'
+TOTAL_MODE_NONE = 'none'
+_TOTAL_MODES = (TOTAL_MODE_EXACT, TOTAL_MODE_APPROX, TOTAL_MODE_NONE)
+
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginação malformado ou de outra listagem"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'$d': value.isoformat()}
+    if isinstance(value, time):
+        return {'$t': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'$dec': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if '$dt' in value:
+            return datetime.fromisoformat(value['$dt'])
+        if '$d' in value:
+            return date.fromisoformat(value['$d'])
+        if '$t' in value:
+            return time.fromisoformat(value['$t'])
+        if '$dec' in value:
+            return Decimal(value['$dec'])
+        raise InvalidCursorError("Valor de cursor inválido")
+    return value
+
+
+def parse_total_mode(value, default: str = TOTAL_MODE_EXACT) -> str:
+    """Normaliza o parâmetro 'total' (exact | approx | none)"""
+    if not value:
+        return default
+    value = str(value).strip().lower()
+    return value if value in _TOTAL_MODES else default
+
+
+class KeysetPage:
+    """
+    Monta as cláusulas de uma página keyset.
+
+    Args:
+        order_by: Lista de (expressão SQL, 'ASC'|'DESC'[, anulável]); a última deve ser
+            única (normalmente o ID). Só a primeira pode ser anulável, e apenas em DESC.
+        page_size: Itens por página
+        cursor: Cursor opaco recebido do cliente (None = primeira página)
+        offset: Offset legado (page/page_size), usado apenas quando não há cursor
+
+    Exemplo:
+        keyset = KeysetPage([("o.CREATED_AT", "DESC"), ("o.ID", "DESC")], page_size, cursor, offset)
+        where_sql, where_params = keyset.where()
+        sql = f"SELECT {keyset.select_prefix()} ... WHERE {where_sql} ORDER BY {keyset.order_by_sql()}"
+        rows, next_cursor = keyset.paginate(cur.fetchall(), lambda row: (row[3], row[0]))
+
+    Com primeira coluna anulável, use fetch() para percorrer os dois segmentos:
+        rows = keyset.fetch(cur, lambda prefix, where_sql: f"SELECT {prefix} ... WHERE {where_sql} ...", params)
+
+    Raises:
+        InvalidCursorError: se o cursor não puder ser decodificado
+    """
+    def __init__(self, order_by: Sequence[Tuple[str, str]], page_size: int,
+                 cursor: Optional[str] = None, offset: int = 0):
+        self.order_by = [(key[0], key[1].upper()) for key in order_by]
+        self.nullable = len(order_by[0]) > 2 and bool(order_by[0][2])
+        if self.nullable and self.order_by[0][1] != 'DESC':
+            raise ValueError("Primeira chave anulável só é suportada em ordem DESC (NULLs no fim)")
+        if any(len(key) > 2 and key[2] for key in order_by[1:]):
+            raise ValueError("Apenas a primeira chave do keyset pode ser anulável")
+        self.page_size = page_size
+        self.offset = offset
+        self._signature = hashlib.sha1(
+            '|'.join(f"{expr} {direction}" for expr, direction in self.order_by).encode()
+        ).hexdigest()[:8]
+        self.values = self._decode(cursor) if cursor else None
+
+    @property
+    def uses_cursor(self) -> bool:
+        return self.values is not None
+
+    def _decode(self, token: str) -> List[Any]:
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if payload.get('s') != self._signature:
+                raise InvalidCursorError("Cursor pertence a outra listagem ou ordenação")
+            values = [_decode_value(v) for v in payload['k']]
+        except InvalidCursorError:
+            raise
+        except Exception as e:
+            raise InvalidCursorError(f"Cursor de paginação inválido: {e}")
+        if len(values) != len(self.order_by):
+            raise InvalidCursorError("Cursor de paginação inválido")
+        if any(v is None for v in values[1:]) or (values[0] is None and not self.nullable):
+            raise InvalidCursorError("Cursor de paginação inválido")
+        return values
+
+    def encode(self, key_values: Sequence[Any]) -> str:
+        payload = {'s': self._signature, 'k': [_encode_value(v) for v in key_values]}
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+        return token.decode().rstrip('=')
+
+    def select_prefix(self, limit: Optional[int] = None) -> str:
+        """FIRST/SKIP do SELECT: busca um item extra para saber se há próxima página"""
+        limit = self.page_size + 1 if limit is None else limit
+        if self.uses_cursor or not self.offset:
+            return f"FIRST {limit}"
+        return f"FIRST {limit} SKIP {self.offset}"
+
+    @staticmethod
+    def _after(keys, values) -> Tuple[str, List[Any]]:
+        """(k1 < ?) OR (k1 = ? AND k2 < ?) OR ... (o Firebird não compara row values)"""
+        disjuncts = []
+        params = []
+        for i, (expr, direction) in enumerate(keys):
+            terms = [f"{prev_expr} = ?" for prev_expr, _ in keys[:i]]
+            terms.append(f"{expr} {'<' if direction == 'DESC' else '>'} ?")
+            params.extend(values[:i + 1])
+            disjuncts.append("(" + " AND ".join(terms) + ")")
+        return "(" + " OR ".join(disjuncts) + ")", params
+
+    def where(self) -> Tuple[str, List[Any]]:
+        """
+        Predicado keyset: limite na primeira chave (início da faixa no índice) seguido
+        da comparação expandida. Retorna ("1=1", []) na primeira página.
+        Com a primeira chave anulável e cursor num valor preenchido, cobre apenas o
+        segmento preenchido; o segmento NULL vem de segments().
+        """
+        if not self.uses_cursor:
+            return "1=1", []
+        (first_expr, first_direction), rest = self.order_by[0], self.order_by[1:]
+        if self.values[0] is None:
+            # Cursor já no segmento NULL: desempata pelas demais chaves
+            after_sql, after_params = self._after(rest, self.values[1:])
+            return f"({first_expr} IS NULL AND {after_sql})", after_params
+        after_sql, after_params = self._after(self.order_by, self.values)
+        bound = '<=' if first_direction == 'DESC' else '>='
+        return f"({first_expr} {bound} ? AND {after_sql})", [self.values[0]] + after_params
+
+    def segments(self) -> List[Tuple[str, List[Any]]]:
+        """Predicados a consultar em ordem até completar a página (ver fetch)"""
+        segments = [self.where()]
+        if self.nullable and self.uses_cursor and self.values[0] is not None:
+            segments.append((f"{self.order_by[0][0]} IS NULL", []))
+        return segments
+
+    def fetch(self, cur, build_sql: Callable[[str, str], str], params: Sequence[Any]) -> List[Any]:
+        """
+        Executa a página percorrendo os segmentos (preenchidos e depois NULL).
+
+        Args:
+            build_sql: Recebe (prefixo FIRST/SKIP, predicado keyset) e retorna o SELECT
+            params: Parâmetros da query antes dos parâmetros do predicado keyset
+        """
+        rows: List[Any] = []
+        for where_sql, where_params in self.segments():
+            cur.execute(build_sql(self.select_prefix(self.page_size + 1 - len(rows)), where_sql),
+                        tuple(params) + tuple(where_params))
+            rows.extend(cur.fetchall())
+            if len(rows) > self.page_size:
+                break
+        return rows
+
+    def order_by_sql(self) -> str:
+        return ", ".join(f"{expr} {direction}" for expr, direction in self.order_by)
+
+    def paginate(self, rows: List[Any], key_of: Callable[[Any], Sequence[Any]]) -> Tuple[List[Any], Optional[str]]:
+        """Corta o item extra e gera o cursor da próxima página (None se não houver)"""
+        if len(rows) <= self.page_size:
+            return rows, None
+        rows = rows[:self.page_size]
+        return rows, self.encode(key_of(rows[-1]))
+
+
+def count_total(cur, count_sql: str, params: Sequence[Any], total_mode: str = TOTAL_MODE_EXACT,
+                cache_key: Optional[str] = None) -> Optional[int]:
+    """
+    Executa o COUNT(*) da listagem conforme o modo:
+    - exact: sempre conta
+    - approx: reaproveita a contagem em cache por PAGINATION_APPROX_TOTAL_TTL segundos
+    - none: não conta (retorna None)
+    """
+    if total_mode == TOTAL_MODE_NONE:
+        return None
+    cache = None
+    if total_mode == TOTAL_MODE_APPROX:
+        from .cache_manager import get_cache_manager
+        cache = get_cache_manager()
+        cache_key = 'pagination_total:' + hashlib.sha1(
+            f"{cache_key or count_sql}|{list(params)!r}".encode()
+        ).hexdigest()
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    cur.execute(count_sql, tuple(params))
+    total = cur.fetchone()[0] or 0
+    if cache is not None:
+        cache.set(cache_key, total, Config.PAGINATION_APPROX_TOTAL_TTL)
+    return total
+
+
+def build_pagination(page: int, page_size: int, total: Optional[int], next_cursor: Optional[str]) -> dict:
+    """Metadados de paginação: mantém os campos legados e adiciona next_cursor/has_more"""
+    total_pages = None
+    if total is not None:
+        total_pages = (total + page_size - 1) // page_size if total > 0 else 0
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
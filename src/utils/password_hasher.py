@@ -0,0 +1,230 @@
+"""
+Hash e verificação de senhas (bcrypt) num pool dedicado e limitado.
+
+OTIMIZAÇÃO DE PERFORMANCE: bcrypt é CPU-bound por design (~250ms por operação com
+custo 12). Executado na thread da requisição, uma rajada de logins ocupa todos os
+workers da API e atrasa pedidos, cardápio e pagamentos. Aqui as operações vão para um
+executor com PASSWORD_HASH_WORKERS workers, o que limita os núcleos usados por
+autenticação. No máximo PASSWORD_HASH_MAX_PENDING operações ficam em execução ou na
+fila; acima disso a requisição espera até PASSWORD_HASH_QUEUE_TIMEOUT_SEC por uma
+vaga e depois recebe 503 com Retry-After (PasswordHasherBusyError).
+
+Executor (PASSWORD_HASH_EXECUTOR):
+- 'thread' (padrão): o bcrypt libera o GIL durante o hash, então threads dedicadas
+  já rodam em paralelo real e isolam o consumo de CPU pelo número de workers;
+- 'process': processos separados (contexto spawn). Exige que o módulo principal não
+  crie o app na importação (ex: gunicorn 'src:create_app()'), pois o spawn reimporta
+  o __main__ em cada processo filho.
+
+Com BCRYPT_ROUNDS diferente do custo de um hash armazenado, needs_rehash() indica
+que o hash deve ser regravado no próximo login bem-sucedido (rehash transparente).
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict
+
+import bcrypt
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusyError(Exception):
+    """Fila do pool de hash de senhas cheia por mais que o prazo de espera"""
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Funções executadas nos workers (nível de módulo para serem importáveis pelo spawn)
+
+def _hash_worker(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+
+def _check_worker(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def _default_workers() -> int:
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+class PasswordHasher:
+    """Executor dedicado com limite de concorrência e métricas de fila"""
+    def __init__(self, workers=None, max_pending=None, mode=None):
+        self.workers = workers or Config.PASSWORD_HASH_WORKERS or _default_workers()
+        self.max_pending = max(max_pending or Config.PASSWORD_HASH_MAX_PENDING, self.workers)
+        self.mode = (mode or Config.PASSWORD_HASH_EXECUTOR).lower()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self._max_pending_seen = 0
+        self._latencies_ms = deque(maxlen=500)
+        self._stats = {'hashes': 0, 'checks': 0, 'rejected': 0, 'rehashes': 0, 'errors': 0, 'inline': 0}
+
+    def _get_executor(self):
+        executor = self._executor
+        if executor is not None:
+            return executor
+        with self._executor_lock:
+            if self._executor is None:
+                if self.mode == 'process':
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hasher')
+                logger.info(f"Pool de hash de senhas iniciado ({self.mode}, {self.workers} workers)")
+            return self._executor
+
+    def _run(self, func, *args):
+        if not Config.PASSWORD_HASH_POOL_ENABLED:
+            with self._stats_lock:
+                self._stats['inline'] += 1
+            return func(*args)
+
+        if not self._slots.acquire(timeout=Config.PASSWORD_HASH_QUEUE_TIMEOUT_SEC):
+            with self._stats_lock:
+                self._stats['rejected'] += 1
+            raise PasswordHasherBusyError(
+                f"Pool de hash de senhas ocupado ({self.max_pending} operações pendentes)",
+                retry_after=Config.PASSWORD_HASH_RETRY_AFTER_SEC
+            )
+        start = time.perf_counter()
+        with self._stats_lock:
+            self._pending += 1
+            self._max_pending_seen = max(self._max_pending_seen, self._pending)
+        try:
+            try:
+                return self._get_executor().submit(func, *args).result()
+            except BrokenProcessPool:
+                # Processo worker morreu: recria o pool e executa na thread atual desta vez
+                logger.error("Pool de hash de senhas quebrado; recriando", exc_info=True)
+                with self._executor_lock:
+                    self._executor = None
+                with self._stats_lock:
+                    self._stats['errors'] += 1
+                    self._stats['inline'] += 1
+                return func(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                self._pending -= 1
+                self._latencies_ms.append(elapsed_ms)
+            self._slots.release()
+
+    def hash_password(self, password: str) -> str:
+        """Gera o hash bcrypt da senha com o custo BCRYPT_ROUNDS"""
+        hashed = self._run(_hash_worker, password.encode('utf-8'), Config.BCRYPT_ROUNDS)
+        with self._stats_lock:
+            self._stats['hashes'] += 1
+        return hashed.decode('utf-8')
+
+    def check_password(self, password: str, hashed: str) -> bool:
+        """Verifica a senha contra o hash armazenado"""
+        result = self._run(_check_worker, password.encode('utf-8'), hashed.encode('utf-8'))
+        with self._stats_lock:
+            self._stats['checks'] += 1
+        return result
+
+    def record_rehash(self) -> None:
+        with self._stats_lock:
+            self._stats['rehashes'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            latencies = sorted(self._latencies_ms)
+            pending = self._pending
+            stats = dict(self._stats)
+            max_pending_seen = self._max_pending_seen
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 1)
+
+        return {
+            'enabled': Config.PASSWORD_HASH_POOL_ENABLED,
+            'mode': self.mode,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'bcrypt_rounds': Config.BCRYPT_ROUNDS,
+            'pending': pending,
+            'in_flight': min(pending, self.workers),
+            'queue_depth': max(0, pending - self.workers),
+            'max_pending_seen': max_pending_seen,
+            'latency_ms_p50': percentile(0.50),
+            'latency_ms_p95': percentile(0.95),
+            **stats
+        }
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher()
+    return _hasher
+
+
+def hash_password(password: str) -> str:
+    return get_password_hasher().hash_password(password)
+
+
+def check_password(password: str, hashed: str) -> bool:
+    return get_password_hasher().check_password(password, hashed)
+
+
+def get_hash_rounds(hashed: str):
+    """Custo (log2 de rounds) de um hash bcrypt '$2b$12$...' ou None se o formato for desconhecido"""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Indica se o hash armazenado usa custo diferente de BCRYPT_ROUNDS"""
+    rounds = get_hash_rounds(hashed)
+    return rounds is not None and rounds != Config.BCRYPT_ROUNDS
+
+
+def init_app(app) -> None:
+    """Responde 503 com Retry-After quando o pool de hash de senhas está saturado"""
+    import atexit
+    from flask import jsonify
+
+    @app.errorhandler(PasswordHasherBusyError)
+    def handle_password_hasher_busy(e):
+        response = jsonify({
+            "error": "Serviço temporariamente sobrecarregado. Tente novamente em instantes.",
+            "code": "SERVICE_UNAVAILABLE",
+            "retry_after": e.retry_after
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+    atexit.register(lambda: _hasher.shutdown() if _hasher is not None else None)
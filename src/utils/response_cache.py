@@ -0,0 +1,152 @@
+"""
+Cache de respostas HTTP (ETag/304) para os endpoints de catálogo.
+
+OTIMIZAÇÃO DE PERFORMANCE: Produtos, categorias, cardápio e horários da loja são lidos
+muito mais do que alterados. A resposta de um GET é guardada já serializada (JSON) e já
+comprimida (gzip), por rota + query string normalizada, no namespace 'http_responses'
+do CacheManager. Uma requisição com If-None-Match igual ao ETag atual recebe 304 sem
+executar a view (e sem tocar no banco).
+
+Cada escopo de dados (CATALOG, STORE_HOURS) tem um contador de versão incrementado por
+bump_data_version() quando os dados mudam. A versão faz parte da chave, então uma
+resposta calculada antes da alteração nunca é servida depois dela, mesmo que o
+cálculo termine após a invalidação. O ETag é o hash do corpo: continua válido entre
+workers e reinícios enquanto o conteúdo for o mesmo.
+
+Rotas cuja resposta depende do estoque disponível (listagem/detalhe de produtos e
+produtos do cardápio, com max_available e filtro de indisponíveis) NÃO usam este
+cache: o estoque disponível desconta TEMPORARY_RESERVATIONS, que mudam a cada ação no
+carrinho e expiram com o tempo, sem passar por bump_data_version().
+"""
+import gzip
+import hashlib
+import logging
+import threading
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, current_app, request
+
+from ..config import Config
+from .cache_manager import get_cache_manager
+
+logger = logging.getLogger(__name__)
+
+# Escopos de dados
+CATALOG = 'catalog'  # produtos, categorias, estoque/ingredientes e promoções
+STORE_HOURS = 'store_hours'
+
+_response_cache = get_cache_manager().namespace('http_responses', ttl=60, max_entries=2000)
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def bump_data_version(*scopes):
+    """
+    Marca os escopos como alterados: incrementa as versões e remove as respostas
+    cacheadas. Dentro de uma requisição, repete a invalidação após o commit, para que
+    nenhuma resposta montada com os dados antigos sobreviva à transação.
+    """
+    _bump(scopes)
+    from ..database import run_after_commit
+    run_after_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    with _versions_lock:
+        for scope in scopes:
+            _versions[scope] = _versions.get(scope, 0) + 1
+    _response_cache.invalidate_tags(*scopes)
+
+
+def get_data_versions():
+    """Versões atuais de cada escopo (para métricas/diagnóstico)"""
+    with _versions_lock:
+        return dict(_versions)
+
+
+def _cache_key(scopes):
+    query = urlencode(sorted(request.args.items(multi=True)))
+    with _versions_lock:
+        versions = ','.join(f"{scope}={_versions.get(scope, 0)}" for scope in scopes)
+    return f"{request.path}?{query}|{versions}"
+
+
+def _build_entry(response):
+    """Serializa a resposta da view: corpo, variante gzip e hash para o ETag"""
+    body = response.get_data()
+    entry = {
+        'body': body,
+        'mimetype': response.mimetype,
+        'digest': hashlib.sha1(body).hexdigest()[:20],
+        'gzip': None
+    }
+    if len(body) >= current_app.config.get('COMPRESS_MIN_SIZE', 500):
+        # mtime=0: mesma entrada gera sempre os mesmos bytes
+        entry['gzip'] = gzip.compress(body, compresslevel=current_app.config.get('COMPRESS_LEVEL', 6), mtime=0)
+    return entry
+
+
+def _matches_if_none_match(digest):
+    """If-None-Match contém o ETag de alguma variante (identidade ou comprimida) do corpo"""
+    etags = request.if_none_match
+    if not etags:
+        return False
+    if etags.star_tag:
+        return True
+    # Variantes comprimidas usam '<digest>:<algoritmo>' (mesmo formato do flask_compress)
+    return any(tag == digest or tag.startswith(digest + ':') for tag in etags.as_set(include_weak=True))
+
+
+def _respond(entry, cache_status):
+    use_gzip = entry['gzip'] is not None and request.accept_encodings['gzip'] > 0
+    etag = f"{entry['digest']}:gzip" if use_gzip else entry['digest']
+
+    if _matches_if_none_match(entry['digest']):
+        response = Response(status=304)
+    else:
+        response = Response(entry['gzip'] if use_gzip else entry['body'], mimetype=entry['mimetype'])
+        if use_gzip:
+            # Com Content-Encoding definido o flask_compress não recomprime a resposta
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Clientes sempre revalidam (If-None-Match), recebendo 304 enquanto a versão não mudar
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Cache'] = cache_status
+    return response
+
+
+def cached_response(*scopes):
+    """
+    Decorator para views GET públicas cujo resultado depende apenas da rota, da query
+    string e dos escopos de dados informados. Só respostas 200 JSON são cacheadas.
+
+    Exemplo:
+        @category_bp.route('/', methods=['GET'])
+        @cached_response(CATALOG)
+        def list_categories_route():
+            ...
+    """
+    scopes = tuple(scopes) or (CATALOG,)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not Config.HTTP_RESPONSE_CACHE_ENABLED or request.method != 'GET':
+                return view(*args, **kwargs)
+
+            key = _cache_key(scopes)
+            entry = _response_cache.get(key)
+            if entry is not None:
+                return _respond(entry, 'HIT')
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed or not response.is_json:
+                return response
+            entry = _build_entry(response)
+            _response_cache.set(key, entry, tags=scopes)
+            return _respond(entry, 'MISS')
+
+        return wrapper
+    return decorator
@@ -0,0 +1,293 @@
+"""
+Índice em memória das revogações de tokens JWT (TOKEN_BLACKLIST e USER_TOKEN_REVOCATIONS).
+
+OTIMIZAÇÃO DE PERFORMANCE: is_token_revoked roda em toda requisição autenticada e, a
+cada miss do cache, fazia uma busca por JTI e um LIKE 'REVOKE_USER_{id}_%' no banco,
+seguido do parse do timestamp embutido no JTI. O índice mantém em memória:
+
+- o conjunto de JTIs revogados (logout) ainda não expirados;
+- a marca de revogação global por usuário (USER_TOKEN_REVOCATIONS.REVOKED_AT, gravada
+  por revoke_all_tokens_for_user): tokens com iat menor ou igual à marca estão revogados.
+  Enquanto a migração create_user_token_revocations.sql não for aplicada, a marca vem
+  dos JTIs legados 'REVOKE_USER_{ID}_{TIMESTAMP}' de TOKEN_BLACKLIST.
+
+A verificação passa a ser uma consulta O(1) em memória, sem acesso ao banco.
+
+O índice é carregado por completo na inicialização e sincronizado em background de
+forma incremental pelas marcas d'água de CREATED_AT e REVOKED_AT (só as linhas novas
+são lidas).
+Como CURRENT_TIMESTAMP no Firebird é o horário do statement, e não do commit, cada
+sincronização relê uma janela de REVOCATION_INDEX_SYNC_LOOKBACK_SEC antes da marca
+d'água para não perder linhas de transações que demoraram a confirmar. Remoções
+(clear_user_revoke_tokens) e a poda de expirados são reconciliadas na recarga completa
+periódica. Revogações feitas neste processo entram no índice imediatamente; as feitas
+em outros workers aparecem após no máximo REVOCATION_INDEX_SYNC_INTERVAL_SEC.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from ..config import Config
+from . import schema_catalog
+
+logger = logging.getLogger(__name__)
+
+REVOKE_USER_PREFIX = 'REVOKE_USER_'
+
+# Margem na poda de JTIs expirados: EXPIRES_AT é gravado sem fuso horário (ora UTC,
+# ora horário local), então só removemos entradas seguramente vencidas
+_EXPIRY_SLACK = timedelta(days=1)
+
+_FULL_LOAD_SQL = "SELECT JTI, CREATED_AT FROM TOKEN_BLACKLIST WHERE EXPIRES_AT > ?"
+_INCREMENTAL_SQL = (
+    "SELECT JTI, CREATED_AT FROM TOKEN_BLACKLIST "
+    "WHERE CREATED_AT >= ? AND EXPIRES_AT > ?"
+)
+_USER_REVOCATIONS_SQL = "SELECT USER_ID, REVOKED_AT FROM USER_TOKEN_REVOCATIONS"
+_USER_REVOCATIONS_INCREMENTAL_SQL = _USER_REVOCATIONS_SQL + " WHERE REVOKED_AT >= ?"
+
+
+def _use_revocations_table() -> bool:
+    return schema_catalog.has_table('USER_TOKEN_REVOCATIONS')
+
+
+def watermark_from_datetime(revoked_at: datetime) -> float:
+    """Converte REVOKED_AT (UTC, sem fuso) na marca de revogação (epoch, segundos)"""
+    return revoked_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def parse_revoke_watermark(jti: str) -> float:
+    """
+    Extrai a marca de revogação (epoch, segundos) de um JTI legado 'REVOKE_USER_{ID}_{TIMESTAMP}'.
+    O timestamp é interpretado como UTC (mesma regra da verificação anterior no banco).
+    Timestamp ilegível revoga todos os tokens do usuário, por segurança.
+    """
+    try:
+        timestamp_str = jti.rsplit('_', 1)[1]
+        return watermark_from_datetime(datetime.strptime(timestamp_str, "%Y%m%d%H%M%S"))
+    except (ValueError, IndexError) as e:
+        logger.warning(f"Erro ao processar timestamp de revogação ({jti[:24]}): {e}")
+        return float('inf')
+
+
+def _parse_revoke_user(jti: str) -> Optional[str]:
+    """Retorna o ID do usuário de um JTI de revogação global (ou None se não for um)"""
+    if not jti.startswith(REVOKE_USER_PREFIX):
+        return None
+    user_id = jti[len(REVOKE_USER_PREFIX):].rsplit('_', 1)[0]
+    return user_id or None
+
+
+class RevocationIndex:
+    """
+    Conjunto de JTIs revogados + marca de revogação por usuário.
+
+    Leituras não usam lock: as estruturas são substituídas por inteiro na recarga
+    completa e as escritas pontuais são atômicas sob o GIL.
+    """
+    def __init__(self):
+        self._jtis = set()
+        self._user_watermarks: Dict[str, float] = {}
+        self._high_water: Optional[datetime] = None
+        self._revocations_high_water: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._last_full_load = 0.0
+        self._last_sync = 0.0
+        self._last_error = None
+        self._stats = {'full_loads': 0, 'syncs': 0, 'sync_rows': 0, 'sync_errors': 0, 'checks': 0}
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    # --- Consulta ---
+
+    def is_revoked(self, jti: str, user_sub=None, token_iat=None) -> bool:
+        """Verificação O(1): JTI na blacklist ou token emitido até a revogação global do usuário"""
+        self._stats['checks'] += 1
+        if jti in self._jtis:
+            return True
+        if user_sub is not None and token_iat is not None:
+            watermark = self._user_watermarks.get(str(user_sub))
+            if watermark is not None and int(token_iat) <= watermark:
+                return True
+        return False
+
+    # --- Escritas locais (aplicadas sem esperar a próxima sincronização) ---
+
+    def add_jti(self, jti: str) -> None:
+        user_id = _parse_revoke_user(jti)
+        with self._lock:
+            if user_id is not None:
+                self._apply_watermark(user_id, parse_revoke_watermark(jti))
+            else:
+                self._jtis.add(jti)
+
+    def set_user_watermark(self, user_id, watermark: float) -> None:
+        """Registra a revogação global do usuário (substitui a marca anterior)"""
+        with self._lock:
+            self._user_watermarks[str(user_id)] = watermark
+
+    def clear_user_watermark(self, user_id) -> None:
+        """Remove a revogação global do usuário (clear_user_revoke_tokens)"""
+        with self._lock:
+            self._user_watermarks.pop(str(user_id), None)
+
+    def _apply_watermark(self, user_id: str, watermark: float) -> None:
+        current = self._user_watermarks.get(user_id)
+        if current is None or watermark > current:
+            self._user_watermarks[user_id] = watermark
+
+    # --- Sincronização com o banco ---
+
+    def _fetch(self, queries):
+        """Executa [(sql, params), ...] numa conexão isolada e retorna as linhas de cada query"""
+        from ..database import get_db_connection
+        conn = None
+        try:
+            # Conexão isolada: não participa da transação da requisição
+            conn = get_db_connection(shared=False)
+            cur = conn.cursor()
+            results = []
+            for sql, params in queries:
+                cur.execute(sql, params)
+                results.append(cur.fetchall())
+            # Encerra a transação para que a próxima leitura veja os commits recentes
+            conn.commit()
+            return results
+        finally:
+            if conn:
+                conn.close()
+
+    def full_load(self) -> None:
+        """Recarrega o índice inteiro (também reconcilia remoções e poda expirados)"""
+        queries = [(_FULL_LOAD_SQL, (datetime.now() - _EXPIRY_SLACK,))]
+        if _use_revocations_table():
+            queries.append((_USER_REVOCATIONS_SQL, ()))
+        results = self._fetch(queries)
+        rows = results[0]
+        jtis = set()
+        watermarks: Dict[str, float] = {}
+        high_water = None
+        for jti, created_at in rows:
+            jti = jti.strip()
+            user_id = _parse_revoke_user(jti)
+            if user_id is not None:
+                watermark = parse_revoke_watermark(jti)
+                if watermark > watermarks.get(user_id, float('-inf')):
+                    watermarks[user_id] = watermark
+            else:
+                jtis.add(jti)
+            if created_at is not None and (high_water is None or created_at > high_water):
+                high_water = created_at
+        revocations_high_water = None
+        for user_id, revoked_at in (results[1] if len(results) > 1 else ()):
+            watermark = watermark_from_datetime(revoked_at)
+            user_id = str(user_id)
+            if watermark > watermarks.get(user_id, float('-inf')):
+                watermarks[user_id] = watermark
+            if revocations_high_water is None or revoked_at > revocations_high_water:
+                revocations_high_water = revoked_at
+        with self._lock:
+            self._jtis = jtis
+            self._user_watermarks = watermarks
+            self._high_water = high_water
+            self._revocations_high_water = revocations_high_water
+            self._loaded = True
+            self._last_full_load = self._last_sync = time.time()
+            self._last_error = None
+            self._stats['full_loads'] += 1
+        logger.info(f"Índice de revogação carregado: {len(jtis)} JTIs, {len(watermarks)} usuários com revogação global")
+
+    def sync(self) -> int:
+        """Lê apenas as linhas criadas desde as marcas d'água (com janela de segurança)"""
+        lookback = timedelta(seconds=Config.REVOCATION_INDEX_SYNC_LOOKBACK_SEC)
+        since = (self._high_water or datetime.now()) - lookback
+        queries = [(_INCREMENTAL_SQL, (since, datetime.now() - _EXPIRY_SLACK))]
+        if _use_revocations_table():
+            # REVOKED_AT é gravado em UTC pela aplicação
+            utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+            revocations_since = (self._revocations_high_water or utc_now) - lookback
+            queries.append((_USER_REVOCATIONS_INCREMENTAL_SQL, (revocations_since,)))
+        results = self._fetch(queries)
+        rows = results[0]
+        revocation_rows = results[1] if len(results) > 1 else []
+        with self._lock:
+            for jti, created_at in rows:
+                jti = jti.strip()
+                user_id = _parse_revoke_user(jti)
+                if user_id is not None:
+                    self._apply_watermark(user_id, parse_revoke_watermark(jti))
+                else:
+                    self._jtis.add(jti)
+                if created_at is not None and (self._high_water is None or created_at > self._high_water):
+                    self._high_water = created_at
+            for user_id, revoked_at in revocation_rows:
+                self._apply_watermark(str(user_id), watermark_from_datetime(revoked_at))
+                if self._revocations_high_water is None or revoked_at > self._revocations_high_water:
+                    self._revocations_high_water = revoked_at
+            self._last_sync = time.time()
+            self._last_error = None
+            self._stats['syncs'] += 1
+            self._stats['sync_rows'] += len(rows) + len(revocation_rows)
+        return len(rows) + len(revocation_rows)
+
+    def refresh(self) -> None:
+        """Um ciclo do sincronizador: carga completa quando devida, senão incremental"""
+        try:
+            due = time.time() - self._last_full_load >= Config.REVOCATION_INDEX_FULL_RELOAD_SEC
+            if not self._loaded or due:
+                self.full_load()
+            else:
+                self.sync()
+        except Exception as e:
+            self._stats['sync_errors'] += 1
+            self._last_error = str(e)
+            logger.warning(f"Falha ao sincronizar índice de revogação de tokens: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'loaded': self._loaded,
+            'revoked_jtis': len(self._jtis),
+            'users_with_watermark': len(self._user_watermarks),
+            'high_water': self._high_water.isoformat() if self._high_water else None,
+            'revocations_high_water': (
+                self._revocations_high_water.isoformat() if self._revocations_high_water else None
+            ),
+            'last_full_load': self._last_full_load or None,
+            'last_sync': self._last_sync or None,
+            'last_error': self._last_error,
+            **self._stats
+        }
+
+
+_index = RevocationIndex()
+_sync_thread = None
+
+
+def get_revocation_index() -> RevocationIndex:
+    return _index
+
+
+def _sync_loop() -> None:
+    while True:
+        time.sleep(Config.REVOCATION_INDEX_SYNC_INTERVAL_SEC)
+        _index.refresh()
+
+
+def init_revocation_index() -> None:
+    """
+    Carrega o índice e inicia a sincronização em background (REVOCATION_INDEX_ENABLED).
+    Se o banco estiver indisponível, is_token_revoked consulta o banco até a próxima
+    tentativa de carga bem-sucedida.
+    """
+    global _sync_thread
+    if not Config.REVOCATION_INDEX_ENABLED:
+        return
+    _index.refresh()
+    if _sync_thread is None:
+        _sync_thread = threading.Thread(target=_sync_loop, name='revocation-index-sync', daemon=True)
+        _sync_thread.start()
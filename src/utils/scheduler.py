@@ -74,8 +74,24 @@ def _register_jobs():
         misfire_grace_time=300  # 5 minutos de tolerância para execuções atrasadas
     )
     
+    # Job 2: Manter aquecidos os caches mais acessados (repete aquecedores com falha)
+    from ..config import Config
+    if Config.CACHE_WARMUP_ENABLED and Config.CACHE_WARMUP_INTERVAL_SEC > 0:
+        _scheduler.add_job(
+            func=rewarm_cache_job,
+            trigger=IntervalTrigger(seconds=Config.CACHE_WARMUP_INTERVAL_SEC),
+            id='rewarm_cache',
+            name='Re-aquecer Cache',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=Config.CACHE_WARMUP_INTERVAL_SEC
+        )
+    
     logger.info("Jobs periódicos registrados:")
     logger.info("  - cleanup_expired_reservations: a cada 5 minutos")
+    if Config.CACHE_WARMUP_ENABLED and Config.CACHE_WARMUP_INTERVAL_SEC > 0:
+        logger.info(f"  - rewarm_cache: a cada {Config.CACHE_WARMUP_INTERVAL_SEC} segundos")
     
     # ALTERAÇÃO: Outros jobs podem ser adicionados aqui no futuro
     # Exemplo:
@@ -122,6 +138,20 @@ def cleanup_expired_reservations_job():
         )
 
 
+def rewarm_cache_job():
+    """
+    Job periódico de re-aquecimento do cache.
+    Recarrega entradas que expiraram por TTL e repete aquecedores que falharam
+    (ex: banco indisponível durante o warm-up), liberando /api/health/ready.
+    """
+    try:
+        from .cache_warmup import run_warmup
+        if not run_warmup():
+            logger.warning("[JOB] Re-aquecimento do cache concluído com falhas")
+    except Exception as e:
+        logger.error(f"[JOB] Erro inesperado ao re-aquecer cache: {e}", exc_info=True)
+
+
 def _job_executed_listener(event):
     """
     Listener para eventos de execução de jobs.
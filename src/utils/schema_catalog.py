@@ -0,0 +1,202 @@
+"""
+Catálogo do schema do banco (tabelas, colunas e índices).
+
+OTIMIZAÇÃO DE PERFORMANCE: Em vez de descobrir colunas opcionais executando a query
+e tratando o erro do Firebird (o que custa um round-trip com falha a cada chamada),
+o catálogo é carregado uma vez de RDB$RELATION_FIELDS/RDB$INDICES e os serviços
+consultam has_column() em O(1) para escolher o SQL correto antes de executar
+(execute_with_optional_column, que volta à tentativa/erro se o catálogo não carregou).
+
+O catálogo é carregado na inicialização da aplicação. Depois de aplicar scripts de
+database/migrations, chame refresh_schema_catalog() (ou POST
+/api/dashboard/db/schema/refresh) para recarregá-lo sem reiniciar o servidor.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre tentativas de carga quando o banco não está acessível
+_RETRY_INTERVAL_SEC = 30
+
+_COLUMNS_SQL = """
+    SELECT TRIM(rf.RDB$RELATION_NAME), TRIM(rf.RDB$FIELD_NAME)
+    FROM RDB$RELATION_FIELDS rf
+    JOIN RDB$RELATIONS r ON r.RDB$RELATION_NAME = rf.RDB$RELATION_NAME
+    WHERE COALESCE(r.RDB$SYSTEM_FLAG, 0) = 0
+"""
+
+_INDICES_SQL = """
+    SELECT TRIM(i.RDB$INDEX_NAME), TRIM(i.RDB$RELATION_NAME),
+           COALESCE(i.RDB$UNIQUE_FLAG, 0), TRIM(s.RDB$FIELD_NAME)
+    FROM RDB$INDICES i
+    LEFT JOIN RDB$INDEX_SEGMENTS s ON s.RDB$INDEX_NAME = i.RDB$INDEX_NAME
+    WHERE COALESCE(i.RDB$SYSTEM_FLAG, 0) = 0
+    ORDER BY i.RDB$INDEX_NAME, s.RDB$FIELD_POSITION
+"""
+
+
+class SchemaCatalog:
+    """Snapshot imutável de tabelas/colunas/índices do banco (nomes em maiúsculas)"""
+    def __init__(self, columns: Dict[str, frozenset], indices: Dict[str, Dict[str, Any]]):
+        self._columns = columns
+        self._indices = indices
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, cur) -> 'SchemaCatalog':
+        columns: Dict[str, set] = {}
+        cur.execute(_COLUMNS_SQL)
+        for table, column in cur.fetchall():
+            columns.setdefault(table.upper(), set()).add(column.upper())
+
+        indices: Dict[str, Dict[str, Any]] = {}
+        cur.execute(_INDICES_SQL)
+        for name, table, unique, column in cur.fetchall():
+            index = indices.setdefault(name.upper(), {
+                'table': table.upper(),
+                'unique': bool(unique),
+                'columns': []
+            })
+            if column:
+                index['columns'].append(column.upper())
+
+        return cls({table: frozenset(cols) for table, cols in columns.items()}, indices)
+
+    def has_table(self, table: str) -> bool:
+        return table.upper() in self._columns
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column.upper() in self._columns.get(table.upper(), ())
+
+    def get_columns(self, table: str) -> frozenset:
+        return self._columns.get(table.upper(), frozenset())
+
+    def has_index(self, name: str) -> bool:
+        return name.upper() in self._indices
+
+    def get_indices(self, table: str) -> List[Dict[str, Any]]:
+        """Índices da tabela: [{'name', 'unique', 'columns'}]"""
+        table = table.upper()
+        return [
+            {'name': name, 'unique': index['unique'], 'columns': list(index['columns'])}
+            for name, index in self._indices.items()
+            if index['table'] == table
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'tables': len(self._columns),
+            'columns': sum(len(cols) for cols in self._columns.values()),
+            'indices': len(self._indices),
+            'loaded_at': self.loaded_at
+        }
+
+
+_catalog: Optional[SchemaCatalog] = None
+_catalog_lock = threading.Lock()
+_last_attempt = 0.0
+
+
+def refresh_schema_catalog() -> SchemaCatalog:
+    """
+    (Re)carrega o catálogo do banco. Usar na inicialização e após aplicar migrações.
+
+    Raises:
+        fdb.Error: se o banco não estiver acessível
+    """
+    global _catalog, _last_attempt
+    from ..database import get_db_connection
+
+    with _catalog_lock:
+        _last_attempt = time.time()
+        conn = None
+        try:
+            # Conexão isolada: não participa da transação da requisição
+            conn = get_db_connection(shared=False)
+            catalog = SchemaCatalog.load(conn.cursor())
+            conn.commit()
+        finally:
+            if conn:
+                conn.close()
+        _catalog = catalog
+    stats = catalog.get_stats()
+    logger.info(
+        f"Catálogo do schema carregado: {stats['tables']} tabelas, "
+        f"{stats['columns']} colunas, {stats['indices']} índices"
+    )
+    return catalog
+
+
+def get_schema_catalog() -> Optional[SchemaCatalog]:
+    """
+    Retorna o catálogo carregado, carregando-o sob demanda se a inicialização falhou.
+    Retorna None se o banco continuar inacessível (nova tentativa após _RETRY_INTERVAL_SEC).
+    """
+    catalog = _catalog
+    if catalog is not None:
+        return catalog
+    if time.time() - _last_attempt < _RETRY_INTERVAL_SEC:
+        return None
+    try:
+        return refresh_schema_catalog()
+    except Exception as e:
+        logger.warning(f"Não foi possível carregar o catálogo do schema: {e}")
+        return None
+
+
+def has_table(table: str) -> bool:
+    """Indica se a tabela existe (False se o catálogo não puder ser carregado)"""
+    catalog = get_schema_catalog()
+    return catalog is not None and catalog.has_table(table)
+
+
+def has_column(table: str, column: str) -> Optional[bool]:
+    """
+    Indica se a coluna existe.
+
+    Returns:
+        True/False conforme o catálogo; None se o catálogo não puder ser carregado
+        (desconhecido não é o mesmo que ausente: ver execute_with_optional_column)
+    """
+    catalog = get_schema_catalog()
+    if catalog is None:
+        return None
+    return catalog.has_column(table, column)
+
+
+def execute_with_optional_column(cur, table: str, column: str, sql_with: str,
+                                 sql_without: str, params=()) -> bool:
+    """
+    Executa a query que usa uma coluna opcional (criada por migração) ou a alternativa sem ela.
+
+    Com o catálogo carregado, escolhe o SQL antes de executar. Sem catálogo (banco
+    inacessível na carga), mantém o comportamento anterior: tenta a query completa e só
+    usa a alternativa se o Firebird rejeitar a coluna, para não descartar a coluna
+    silenciosamente num banco que a possui.
+
+    Returns:
+        True se a query executada inclui a coluna opcional
+    """
+    present = has_column(table, column)
+    if present is None:
+        import fdb
+        try:
+            cur.execute(sql_with, params)
+            return True
+        except fdb.Error as e:
+            error_msg = str(e).lower()
+            if column.lower() not in error_msg and 'unknown' not in error_msg:
+                raise
+        cur.execute(sql_without, params)
+        return False
+    cur.execute(sql_with if present else sql_without, params)
+    return present
+
+
+def has_index(name: str) -> bool:
+    """Indica se o índice existe (False se o catálogo não puder ser carregado)"""
+    catalog = get_schema_catalog()
+    return catalog is not None and catalog.has_index(name)
@@ -0,0 +1,331 @@
+"""
+Camada L2 do cache, compartilhada entre processos do mesmo host (SQLite em modo WAL).
+
+OTIMIZAÇÃO DE PERFORMANCE: Com vários workers (gunicorn/uwsgi), cada processo tem o seu
+cache em memória (L1). A L2 guarda os mesmos valores num arquivo SQLite local, então um
+valor calculado por um worker é reaproveitado pelos demais, sem serviço externo.
+
+Invalidações (delete, tag, prefixo) são gravadas num log com um contador de geração
+crescente. Cada worker guarda a última geração aplicada e, no máximo a cada
+CACHE_L2_SYNC_INTERVAL_SEC, aplica ao seu L1 as invalidações mais novas. Se o worker
+ficou para trás além da retenção do log, limpa o L1 inteiro.
+
+Falhas da L2 nunca interrompem a requisição: são registradas e o cache segue só com o L1.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TAG_SEPARATOR = '\x1f'
+# Retenção do log de invalidações e intervalo da limpeza de entradas expiradas
+_INVALIDATION_LOG_RETENTION_SEC = 600
+_CLEANUP_INTERVAL_SEC = 60
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires_at REAL NOT NULL,
+        tags TEXT NOT NULL DEFAULT ''
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_cache_entries_expires ON cache_entries (expires_at)",
+    """CREATE TABLE IF NOT EXISTS cache_tags (
+        tag TEXT NOT NULL,
+        key TEXT NOT NULL,
+        PRIMARY KEY (tag, key)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_cache_tags_key ON cache_tags (key)",
+    """CREATE TABLE IF NOT EXISTS cache_invalidations (
+        generation INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        target TEXT NOT NULL,
+        origin TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )""",
+)
+
+
+def private_state_path(filename: str) -> str:
+    """
+    Caminho de um arquivo de estado compartilhado pelos workers do host, num diretório
+    privado (0700) do usuário no diretório temporário. Os arquivos podem conter dados
+    desserializados com pickle, então não podem ficar num local em que outro usuário
+    consiga escrever.
+
+    Raises:
+        PermissionError: se o diretório existir e pertencer a outro usuário
+    """
+    getuid = getattr(os, 'getuid', None)
+    suffix = str(getuid()) if getuid else 'default'
+    directory = os.path.join(tempfile.gettempdir(), f'royalburger-cache-{suffix}')
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if getuid and os.stat(directory).st_uid != getuid():
+        raise PermissionError(f"Diretório de estado compartilhado pertence a outro usuário: {directory}")
+    return os.path.join(directory, filename)
+
+
+def default_l2_path() -> str:
+    """Arquivo padrão da L2 (ver private_state_path)"""
+    return private_state_path('cache_l2.sqlite3')
+
+
+class SqliteCacheTier:
+    """
+    Cache L2 em SQLite (WAL), seguro para várias threads e processos.
+
+    Args:
+        path: Arquivo SQLite
+        sync_interval: Intervalo mínimo (s) entre verificações do log de invalidações
+        max_value_bytes: Valores serializados maiores que isso não vão para a L2
+        busy_timeout_ms: Espera por lock de escrita de outro processo
+    """
+    def __init__(self, path: str, sync_interval: float = 1.0, max_value_bytes: int = 1024 * 1024,
+                 busy_timeout_ms: int = 2000):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.max_value_bytes = max_value_bytes
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0.0
+        self._last_cleanup = 0.0
+        self._generation = None
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'skipped': 0, 'errors': 0,
+                       'invalidations_applied': 0, 'full_resyncs': 0}
+        self._init_schema()
+
+    # --- conexão (uma por thread e por processo) ---
+
+    @property
+    def origin(self) -> str:
+        """Identifica este processo no log (invalidações próprias já foram aplicadas ao L1)"""
+        pid = os.getpid()
+        if getattr(self, '_origin_pid', None) != pid:
+            self._origin_pid = pid
+            self._origin = f"{pid}-{uuid.uuid4().hex[:8]}"
+        return self._origin
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        # Após fork, a conexão herdada não pode ser usada pelo processo filho
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        # Um worker novo começa da geração atual: não há L1 a invalidar
+        self._generation = self._current_generation(conn)
+
+    @staticmethod
+    def _current_generation(conn) -> int:
+        row = conn.execute("SELECT MAX(generation) FROM cache_invalidations").fetchone()
+        return row[0] or 0
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[stat] += amount
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        self._count('errors')
+        logger.warning(f"Cache L2 indisponível ({operation}): {error}")
+
+    # --- valores ---
+
+    def get(self, key: str) -> Optional[Tuple[Any, float, Tuple[str, ...]]]:
+        """Retorna (valor, expires_at, tags) ou None se ausente/expirado/ilegível"""
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at, tags FROM cache_entries WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._failed('get', e)
+            return None
+        if row is None:
+            self._count('misses')
+            return None
+        try:
+            value = pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Valor ilegível na cache L2 ({key}): {e}")
+            self.delete(key)
+            self._count('misses')
+            return None
+        self._count('hits')
+        tags = tuple(tag for tag in row[2].split(_TAG_SEPARATOR) if tag)
+        return value, row[1], tags
+
+    def set(self, key: str, value: Any, ttl: float, tags=None) -> bool:
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            # Valor não serializável: fica apenas no L1 deste processo
+            logger.debug(f"Valor não serializável para a cache L2 ({key}): {e}")
+            self._count('skipped')
+            return False
+        if self.max_value_bytes and len(payload) > self.max_value_bytes:
+            self._count('skipped')
+            return False
+        tags = tuple(tags or ())
+        try:
+            conn = self._connect()
+            with immediate_transaction(conn):
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, tags) VALUES (?, ?, ?, ?)",
+                    (key, payload, time.time() + ttl, _TAG_SEPARATOR.join(tags))
+                )
+                conn.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+                if tags:
+                    conn.executemany("INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)",
+                                     [(tag, key) for tag in tags])
+        except sqlite3.Error as e:
+            self._failed('set', e)
+            return False
+        self._count('sets')
+        return True
+
+    # --- invalidação (propagada aos demais processos pelo log de gerações) ---
+
+    def delete(self, key: str) -> None:
+        self._invalidate('key', [key], "WHERE key = ?", (key,))
+
+    def delete_tags(self, tags) -> None:
+        tags = list(tags)
+        if not tags:
+            return
+        placeholders = ', '.join('?' for _ in tags)
+        self._invalidate(
+            'tag', tags,
+            f"WHERE key IN (SELECT key FROM cache_tags WHERE tag IN ({placeholders}))",
+            tuple(tags)
+        )
+
+    def delete_prefix(self, prefix: str) -> None:
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        self._invalidate('prefix', [prefix], "WHERE key LIKE ? ESCAPE '\\'", (escaped + '%',))
+
+    def _invalidate(self, kind: str, targets, where_sql: str, params: tuple) -> None:
+        try:
+            conn = self._connect()
+            now = time.time()
+            with immediate_transaction(conn):
+                # Chaves resolvidas antes de apagar: o filtro por tag depende de cache_tags
+                keys = [(row[0],) for row in conn.execute(f"SELECT key FROM cache_entries {where_sql}", params)]
+                conn.executemany("DELETE FROM cache_tags WHERE key = ?", keys)
+                conn.executemany("DELETE FROM cache_entries WHERE key = ?", keys)
+                conn.executemany(
+                    "INSERT INTO cache_invalidations (kind, target, origin, created_at) VALUES (?, ?, ?, ?)",
+                    [(kind, target, self.origin, now) for target in targets]
+                )
+        except sqlite3.Error as e:
+            self._failed('invalidate', e)
+
+    def sync(self, local_store, force: bool = False) -> int:
+        """
+        Aplica ao L1 (local_store) as invalidações feitas por outros processos.
+        Executa no máximo a cada sync_interval segundos (exceto com force).
+        Retorna o número de invalidações aplicadas.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return 0
+        if not self._sync_lock.acquire(blocking=False):
+            return 0  # outra thread já está sincronizando
+        try:
+            self._last_sync = now
+            conn = self._connect()
+            oldest = conn.execute("SELECT MIN(generation) FROM cache_invalidations").fetchone()[0]
+            rows = conn.execute(
+                "SELECT generation, kind, target, origin FROM cache_invalidations WHERE generation > ? ORDER BY generation",
+                (self._generation,)
+            ).fetchall()
+            if oldest is not None and oldest > self._generation + 1:
+                # Log já foi podado além do ponto deste worker: invalida tudo
+                local_store.clear()
+                self._count('full_resyncs')
+            else:
+                origin = self.origin
+                for _, kind, target, row_origin in rows:
+                    if row_origin == origin:
+                        continue
+                    if kind == 'key':
+                        local_store.delete(target)
+                    elif kind == 'tag':
+                        local_store.delete_tags([target])
+                    elif kind == 'prefix':
+                        local_store.delete_matching(lambda k, prefix=target: k.startswith(prefix))
+            if rows:
+                self._generation = rows[-1][0]
+                self._count('invalidations_applied', len(rows))
+            if now - self._last_cleanup >= _CLEANUP_INTERVAL_SEC:
+                self._last_cleanup = now
+                self._cleanup(conn)
+            return len(rows)
+        except sqlite3.Error as e:
+            self._failed('sync', e)
+            return 0
+        finally:
+            self._sync_lock.release()
+
+    def _cleanup(self, conn) -> None:
+        """Remove entradas expiradas e invalidações além da retenção"""
+        now = time.time()
+        with immediate_transaction(conn):
+            conn.execute(
+                "DELETE FROM cache_tags WHERE key IN (SELECT key FROM cache_entries WHERE expires_at <= ?)", (now,)
+            )
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+            # Mantém sempre a última geração para que MAX(generation) nunca volte atrás
+            conn.execute(
+                "DELETE FROM cache_invalidations WHERE created_at < ? "
+                "AND generation < (SELECT MAX(generation) FROM cache_invalidations)",
+                (now - _INVALIDATION_LOG_RETENTION_SEC,)
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({'enabled': True, 'path': self.path, 'generation': self._generation})
+        try:
+            stats['entries'] = self._connect().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        except sqlite3.Error as e:
+            self._failed('stats', e)
+            stats['entries'] = None
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+
+class immediate_transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK (conexão em modo autocommit)"""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
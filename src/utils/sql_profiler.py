@@ -0,0 +1,356 @@
+"""
+Instrumentação de SQL por requisição.
+
+Quando habilitada (SQL_INSTRUMENTATION_ENABLED), cada execute feito pelos cursores
+do pool é registrado num trace local da requisição (SQL normalizado, duração e
+linhas). Ao final da requisição o trace é agregado por endpoint Flask, permitindo
+encontrar os caminhos quentes reais (p50/p95 de tempo de banco e queries por
+requisição). Statements acima de SQL_SLOW_QUERY_MS vão para o log de queries lentas
+apenas com o formato dos parâmetros (tipos), nunca com os valores.
+
+O mesmo trace alimenta o detector de N+1 (SQL_N_PLUS_ONE_DETECTION): uma requisição
+é sinalizada quando o mesmo statement normalizado roda mais de
+SQL_N_PLUS_ONE_THRESHOLD vezes com parâmetros diferentes, junto com a pilha de
+chamadas do serviço que o disparou. Em testes, use detect_n_plus_one() para falhar
+quando o limite for excedido.
+"""
+import logging
+import re
+import threading
+import os
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from flask import g, has_request_context, request
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger(__name__ + '.slow')
+
+_enabled = Config.SQL_INSTRUMENTATION_ENABLED
+_n_plus_one_enabled = Config.SQL_N_PLUS_ONE_DETECTION
+
+# Detectores ativos via detect_n_plus_one() na thread atual
+_local = threading.local()
+
+# Agregados por endpoint: endpoint -> estatísticas
+_endpoint_stats: Dict[str, Dict[str, Any]] = {}
+_slow_queries = deque(maxlen=200)
+_n_plus_one_violations = deque(maxlen=200)
+_stats_lock = threading.Lock()
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def is_enabled() -> bool:
+    """Indica se os cursores devem reportar executes (métricas ou detector de N+1)"""
+    return _enabled or _n_plus_one_enabled or bool(getattr(_local, 'detectors', None))
+
+
+def set_enabled(enabled: bool) -> None:
+    """Liga/desliga a instrumentação em tempo de execução"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def set_n_plus_one_detection(enabled: bool) -> None:
+    """Liga/desliga o detector de N+1 por requisição em tempo de execução"""
+    global _n_plus_one_enabled
+    _n_plus_one_enabled = bool(enabled)
+
+
+class NPlusOneError(AssertionError):
+    """Statement repetido acima do limite com parâmetros diferentes (padrão N+1)"""
+    def __init__(self, violations):
+        self.violations = violations
+        details = '\n'.join(
+            f"- {v['count']}x ({v['distinct_params']} parâmetros distintos): {v['sql']}\n"
+            + '\n'.join(f"    {frame}" for frame in v['stack'])
+            for v in violations
+        )
+        super().__init__(f"Padrão N+1 detectado em {len(violations)} statement(s):\n{details}")
+
+
+def _app_stack(limit: int = 8) -> List[str]:
+    """Frames da aplicação (serviços/rotas) que levaram ao execute, do mais interno ao externo"""
+    frames = []
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        filename = frame.filename
+        if f'{os.sep}src{os.sep}' not in filename:
+            continue
+        if filename.endswith(('database.py', 'sql_profiler.py')):
+            continue
+        frames.append(f"{os.path.relpath(filename)}:{frame.lineno} in {frame.name}")
+        if len(frames) >= limit:
+            break
+    return frames
+
+
+class NPlusOneDetector:
+    """Conta execuções por statement normalizado e parâmetros distintos"""
+    def __init__(self, threshold: int = None):
+        self.threshold = Config.SQL_N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        self._statements: Dict[str, Dict[str, Any]] = {}
+        self.violations: List[Dict[str, Any]] = []
+
+    def track(self, normalized: str, params) -> None:
+        statement = self._statements.get(normalized)
+        if statement is None:
+            statement = {'count': 0, 'params': set(), 'violation': None}
+            self._statements[normalized] = statement
+        statement['count'] += 1
+        try:
+            statement['params'].add(hash(repr(params)))
+        except Exception:
+            return
+        violation = statement['violation']
+        if violation is None and len(statement['params']) > self.threshold:
+            violation = {'sql': normalized, 'stack': _app_stack()}
+            statement['violation'] = violation
+            self.violations.append(violation)
+        if violation is not None:
+            violation['count'] = statement['count']
+            violation['distinct_params'] = len(statement['params'])
+
+
+@contextmanager
+def detect_n_plus_one(threshold: int = None, raise_on_exit: bool = True):
+    """
+    Detecta N+1 nos executes feitos dentro do bloco (na thread atual).
+
+    Exemplo (teste):
+        with detect_n_plus_one(threshold=3):
+            product_service.list_products(page=1, page_size=20)
+    """
+    detector = NPlusOneDetector(threshold)
+    detectors = getattr(_local, 'detectors', None)
+    if detectors is None:
+        detectors = _local.detectors = []
+    detectors.append(detector)
+    try:
+        yield detector
+    finally:
+        detectors.remove(detector)
+    if raise_on_exit and detector.violations:
+        raise NPlusOneError(detector.violations)
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    """
+    Normaliza o SQL para agrupamento: remove literais, colapsa listas IN e espaços.
+
+    Exemplo:
+        "SELECT * FROM PRODUCTS WHERE ID IN (?, ?, ?) AND PRICE > 10"
+        -> "SELECT * FROM PRODUCTS WHERE ID IN (?...) AND PRICE > ?"
+    """
+    normalized = _STRING_LITERAL_RE.sub('?', sql)
+    normalized = _NUMBER_LITERAL_RE.sub('?', normalized)
+    normalized = _IN_LIST_RE.sub('IN (?...)', normalized)
+    return _WHITESPACE_RE.sub(' ', normalized).strip()
+
+
+def param_shape(params) -> str:
+    """Descreve os parâmetros apenas pelos tipos (ex: '(int, str, NoneType)')"""
+    if params is None:
+        return '()'
+    if isinstance(params, (list, tuple)):
+        return '(' + ', '.join(type(p).__name__ for p in params) + ')'
+    return type(params).__name__
+
+
+def _get_trace() -> Optional[List[Dict[str, Any]]]:
+    if not has_request_context():
+        return None
+    trace = getattr(g, '_sql_trace', None)
+    if trace is None:
+        trace = []
+        g._sql_trace = trace
+    return trace
+
+
+def record_query(sql, params, duration: float) -> Optional[Dict[str, Any]]:
+    """
+    Registra um execute no trace da requisição atual.
+
+    Returns:
+        Entrada do trace (para somar linhas lidas depois) ou None fora de requisição
+    """
+    if not isinstance(sql, str):
+        sql = getattr(sql, 'sql', str(sql))
+    normalized = normalize_sql(sql)
+    entry = {
+        'sql': normalized,
+        'duration': duration,
+        'rows': 0
+    }
+    if _enabled:
+        trace = _get_trace()
+        if trace is not None:
+            trace.append(entry)
+
+    if _n_plus_one_enabled and has_request_context():
+        detector = getattr(g, '_n_plus_one_detector', None)
+        if detector is None:
+            detector = g._n_plus_one_detector = NPlusOneDetector()
+        detector.track(normalized, params)
+    for detector in getattr(_local, 'detectors', None) or ():
+        detector.track(normalized, params)
+
+    if duration * 1000 >= Config.SQL_SLOW_QUERY_MS:
+        endpoint = request.endpoint if has_request_context() else None
+        shape = param_shape(params)
+        slow_query_logger.warning(
+            f"[SLOW SQL] {duration * 1000:.1f}ms endpoint={endpoint} params={shape} sql={normalized}"
+        )
+        with _stats_lock:
+            _slow_queries.append({
+                'endpoint': endpoint,
+                'sql': normalized,
+                'params_shape': shape,
+                'duration_ms': round(duration * 1000, 3),
+                'at': time.time()
+            })
+    return entry
+
+
+def add_rows(entry: Optional[Dict[str, Any]], count: int) -> None:
+    """Soma linhas lidas via fetch* à entrada do trace"""
+    if entry is not None and count:
+        entry['rows'] += count
+
+
+def check_n_plus_one(response):
+    """
+    Registra as violações de N+1 da requisição (after_request).
+    Com SQL_N_PLUS_ONE_RAISE, levanta NPlusOneError para falhar testes/desenvolvimento
+    mesmo quando o serviço capturou exceções internamente.
+    """
+    detector = g.pop('_n_plus_one_detector', None)
+    if detector is None or not detector.violations:
+        return response
+    endpoint = request.endpoint or request.path
+    for violation in detector.violations:
+        logger.warning(
+            f"[N+1] endpoint={endpoint} {violation['count']}x "
+            f"({violation['distinct_params']} parâmetros distintos) sql={violation['sql']} "
+            f"stack={' <- '.join(violation['stack'])}"
+        )
+    with _stats_lock:
+        for violation in detector.violations:
+            _n_plus_one_violations.append(dict(violation, endpoint=endpoint, at=time.time()))
+    if Config.SQL_N_PLUS_ONE_RAISE:
+        raise NPlusOneError(detector.violations)
+    return response
+
+
+def get_n_plus_one_violations(limit: int = 50) -> List[Dict[str, Any]]:
+    """Retorna as violações de N+1 mais recentes"""
+    with _stats_lock:
+        return list(_n_plus_one_violations)[-limit:][::-1]
+
+
+def finish_request(exc=None) -> None:
+    """Agrega o trace da requisição nas estatísticas do endpoint (teardown_request)"""
+    trace = g.pop('_sql_trace', None)
+    if not trace:
+        return
+    endpoint = request.endpoint or request.path
+    db_time = sum(entry['duration'] for entry in trace)
+    with _stats_lock:
+        stats = _endpoint_stats.get(endpoint)
+        if stats is None:
+            stats = {
+                'requests': 0,
+                'queries': 0,
+                'rows': 0,
+                'db_time': 0.0,
+                'samples': deque(maxlen=Config.SQL_METRICS_SAMPLE_SIZE),
+                'statements': {}
+            }
+            _endpoint_stats[endpoint] = stats
+        stats['requests'] += 1
+        stats['queries'] += len(trace)
+        stats['db_time'] += db_time
+        stats['samples'].append((db_time, len(trace)))
+        for entry in trace:
+            stats['rows'] += entry['rows']
+            statement = stats['statements'].setdefault(entry['sql'], {'count': 0, 'time': 0.0})
+            statement['count'] += 1
+            statement['time'] += entry['duration']
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def get_endpoint_summary(top_statements: int = 5) -> Dict[str, Any]:
+    """
+    Retorna o resumo por endpoint, ordenado por tempo total de banco.
+
+    Para cada endpoint: requisições, queries por requisição (média e máximo),
+    p50/p95 do tempo de banco por requisição (ms) e os statements mais custosos.
+    """
+    with _stats_lock:
+        summary = []
+        for endpoint, stats in _endpoint_stats.items():
+            db_times = sorted(sample[0] for sample in stats['samples'])
+            query_counts = [sample[1] for sample in stats['samples']]
+            statements = sorted(
+                stats['statements'].items(), key=lambda item: item[1]['time'], reverse=True
+            )[:top_statements]
+            summary.append({
+                'endpoint': endpoint,
+                'requests': stats['requests'],
+                'queries_per_request': round(stats['queries'] / stats['requests'], 2),
+                'max_queries_per_request': max(query_counts) if query_counts else 0,
+                'rows_per_request': round(stats['rows'] / stats['requests'], 2),
+                'db_time_p50_ms': round(_percentile(db_times, 0.50) * 1000, 3),
+                'db_time_p95_ms': round(_percentile(db_times, 0.95) * 1000, 3),
+                'db_time_total_ms': round(stats['db_time'] * 1000, 3),
+                'top_statements': [
+                    {
+                        'sql': sql,
+                        'count': data['count'],
+                        'total_time_ms': round(data['time'] * 1000, 3)
+                    }
+                    for sql, data in statements
+                ]
+            })
+    summary.sort(key=lambda item: item['db_time_total_ms'], reverse=True)
+    return {
+        'enabled': _enabled,
+        'slow_query_threshold_ms': Config.SQL_SLOW_QUERY_MS,
+        'endpoints': summary
+    }
+
+
+def get_slow_queries(limit: int = 50) -> List[Dict[str, Any]]:
+    """Retorna as queries lentas mais recentes"""
+    with _stats_lock:
+        return list(_slow_queries)[-limit:][::-1]
+
+
+def reset_metrics() -> None:
+    with _stats_lock:
+        _endpoint_stats.clear()
+        _slow_queries.clear()
+        _n_plus_one_violations.clear()
+    logger.info("Métricas de SQL resetadas")
+
+
+def init_app(app) -> None:
+    """Registra a verificação de N+1 e a agregação do trace ao final de cada requisição"""
+    app.after_request(check_n_plus_one)
+    app.teardown_request(finish_request)